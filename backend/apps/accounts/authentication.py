@@ -0,0 +1,93 @@
+"""
+Token authentication with cached user resolution.
+
+DRF's ``TokenAuthentication`` runs ``Token.objects.select_related('user')``
+on every request, and nearly every view then reads ``request.user.organization``
+(one more query).  ``CachedTokenAuthentication`` stores the field values of
+the resolved user and of their organization in the shared cache for
+``TOKEN_CACHE_TTL`` seconds, and builds fresh instances from them on every
+request.  The password hash is never cached: it stays deferred and is loaded
+from the database if a view reads it.
+
+Entries are dropped by signals (see ``signals.py``) when the token is
+deleted (logout, password change rotation) and when the user or their
+organization is saved (deactivation, role change...).  The TTL only bounds
+staleness for bulk ``QuerySet.update()`` writes, which send no signals.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from apps.organizations.models import Organization
+
+from .models import User
+
+_KEY_PREFIX = 'auth:token:v2'
+_UNCACHED_USER_FIELDS = {'password'}
+
+
+def _cache_ttl():
+    return getattr(settings, 'TOKEN_CACHE_TTL', 60)
+
+
+def token_cache_key(key):
+    # Raw tokens are credentials, keep them out of cache keys.
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return f'{_KEY_PREFIX}:{digest}'
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_tokens(keys):
+    keys = [token_cache_key(key) for key in keys]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _field_values(instance, exclude=()):
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields if field.attname not in exclude
+    }
+
+
+def _from_values(model, values):
+    # Missing fields (the password) are deferred, as with .only().
+    return model.from_db('default', list(values), list(values.values()))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` backed by the shared cache."""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is None:
+            try:
+                token = Token.objects.select_related('user__organization').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user = token.user
+            if user.is_active:
+                organization = user.organization
+                cache.set(cache_key, {
+                    'user': _field_values(user, _UNCACHED_USER_FIELDS),
+                    'organization': organization and _field_values(organization),
+                    'created': token.created,
+                }, _cache_ttl())
+        else:
+            user = _from_values(User, cached['user'])
+            if cached['organization'] is not None:
+                user.organization = _from_values(Organization, cached['organization'])
+            token = Token(key=key, user=user, created=cached['created'])
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, token)
@@ -0,0 +1,227 @@
+"""
+Cached license entitlements and permissions.
+
+Resolving what a user may do needs the active licenses of the organization
+and the custom ``UserPermission`` rows of the user.  The mobile app polls
+``/auth/module-access/`` and permission classes check entitlements on every
+request, so the result is cached at two levels:
+
+* a process-local LRU of ``ENTITLEMENTS_LOCAL_MAX_ENTRIES`` users and as
+  many organizations, trusted for ``ENTITLEMENTS_LOCAL_TTL`` seconds, which
+  makes repeated checks a dict lookup;
+* the shared Django cache, keyed by the organization/user versions of the
+  ``'entitlements'`` namespace (see apps.core.cache).
+
+Signals in ``signals.py`` bump those versions when licenses, organizations,
+users or user permissions change.  Other processes pick up the change when
+their local entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core.cache import get_versions, invalidate
+
+NAMESPACE = 'entitlements'
+
+MODULE_PHARMACY = 'PHARMACY'
+MODULE_HOSPITAL = 'HOSPITAL'
+MODULE_OCCUPATIONAL_HEALTH = 'OCCUPATIONAL_HEALTH'
+
+# License type → modules it unlocks (mirrors License.license_modules).
+LICENSE_TYPE_MODULES = {
+    'PHARMACY': frozenset({MODULE_PHARMACY}),
+    'HOSPITAL': frozenset({MODULE_HOSPITAL}),
+    'OCCUPATIONAL_HEALTH': frozenset({MODULE_OCCUPATIONAL_HEALTH}),
+    'PHARMACY_HOSPITAL': frozenset({MODULE_PHARMACY, MODULE_HOSPITAL}),
+    'HOSPITAL_OCCUPATIONAL_HEALTH': frozenset({MODULE_HOSPITAL, MODULE_OCCUPATIONAL_HEALTH}),
+    'COMBINED': frozenset({MODULE_PHARMACY, MODULE_HOSPITAL, MODULE_OCCUPATIONAL_HEALTH}),
+}
+
+_CACHE_TIMEOUT = 60 * 60
+
+# Process-local entries, least recently used first: key → (expires_at, value)
+_local_orgs = OrderedDict()
+_local_users = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _local_ttl():
+    return getattr(settings, 'ENTITLEMENTS_LOCAL_TTL', 10)
+
+
+def _local_max_entries():
+    return getattr(settings, 'ENTITLEMENTS_LOCAL_MAX_ENTRIES', 1000)
+
+
+class LicenseGrant:
+    """An active license of an organization."""
+    __slots__ = (
+        'id', 'type', 'license_number', 'modules', 'expiry_date',
+        'created_at', 'updated_at',
+    )
+
+    def __init__(self, id, type, license_number, expiry_date, created_at, updated_at):
+        self.id = id
+        self.type = type
+        self.license_number = license_number
+        self.modules = LICENSE_TYPE_MODULES.get(type, frozenset())
+        self.expiry_date = expiry_date
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @property
+    def is_expired(self):
+        return self.expiry_date < timezone.now().date()
+
+
+class OrganizationEntitlements:
+    """Active licenses of an organization and the modules they unlock."""
+    __slots__ = ('organization_id', 'is_active', 'licenses', 'modules')
+
+    def __init__(self, organization_id, is_active, licenses):
+        self.organization_id = organization_id
+        self.is_active = is_active
+        self.licenses = tuple(licenses)
+        self.modules = frozenset().union(*(grant.modules for grant in self.licenses))
+
+    def has_module(self, module):
+        """True if a non-expired active license covers ``module``."""
+        if not self.is_active or module not in self.modules:
+            return False
+        return any(module in grant.modules and not grant.is_expired for grant in self.licenses)
+
+
+class UserEntitlements:
+    """Everything needed to authorize a user, without touching the database."""
+    __slots__ = ('user_id', 'role', 'permissions', 'organization')
+
+    def __init__(self, user_id, role, permissions, organization):
+        self.user_id = user_id
+        self.role = role
+        self.permissions = frozenset(permissions)
+        self.organization = organization
+
+    def has_permission(self, permission):
+        return permission in self.permissions
+
+    def has_module(self, module):
+        return self.organization is not None and self.organization.has_module(module)
+
+
+def _local_get(store, key):
+    with _local_lock:
+        entry = store.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del store[key]
+            return None
+        store.move_to_end(key)
+        return entry[1]
+
+
+def _local_set(store, key, value):
+    with _local_lock:
+        store[key] = (time.monotonic() + _local_ttl(), value)
+        store.move_to_end(key)
+        while len(store) > _local_max_entries():
+            store.popitem(last=False)
+
+
+def _load_organization(organization_id):
+    from apps.organizations.models import Organization
+    from apps.licenses.models import License, LicenseStatus
+
+    is_active = Organization.objects.filter(pk=organization_id).values_list(
+        'is_active', flat=True
+    ).first()
+    licenses = License.objects.filter(
+        organization_id=organization_id, status=LicenseStatus.ACTIVE,
+    ).order_by('-created_at').values_list(
+        'id', 'type', 'license_number', 'expiry_date', 'created_at', 'updated_at',
+    )
+    return OrganizationEntitlements(
+        organization_id,
+        bool(is_active),
+        [LicenseGrant(*row) for row in licenses],
+    )
+
+
+def get_organization_entitlements(organization_id):
+    """Entitlements of an organization (``None`` for users without one)."""
+    if organization_id is None:
+        return None
+    cached = _local_get(_local_orgs, organization_id)
+    if cached is not None:
+        return cached
+
+    versions = get_versions(NAMESPACE, f'org:{organization_id}')
+    key = f'{NAMESPACE}:org:{organization_id}:v{versions[0]}.{versions[1]}'
+    entitlements = cache.get(key)
+    if entitlements is None:
+        entitlements = _load_organization(organization_id)
+        cache.set(key, entitlements, _CACHE_TIMEOUT)
+    _local_set(_local_orgs, organization_id, entitlements)
+    return entitlements
+
+
+def _load_user_permissions(user):
+    from .models import UserPermission
+
+    permissions = {str(p) for p in user.get_default_permissions()}
+    permissions.update(
+        UserPermission.objects.filter(user_id=user.pk).values_list('permission', flat=True)
+    )
+    return permissions
+
+
+def get_user_entitlements(user):
+    """Entitlements of an authenticated ``user`` (``None`` for anonymous)."""
+    if user is None or not user.is_authenticated:
+        return None
+    cached = _local_get(_local_users, user.pk)
+    if cached is not None:
+        return cached
+
+    versions = get_versions(NAMESPACE, f'user:{user.pk}')
+    key = f'{NAMESPACE}:user:{user.pk}:v{versions[0]}.{versions[1]}'
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = frozenset(_load_user_permissions(user))
+        cache.set(key, permissions, _CACHE_TIMEOUT)
+
+    entitlements = UserEntitlements(
+        user.pk,
+        user.primary_role,
+        permissions,
+        get_organization_entitlements(user.organization_id),
+    )
+    _local_set(_local_users, user.pk, entitlements)
+    return entitlements
+
+
+def invalidate_organization(organization_id):
+    invalidate(NAMESPACE, organization=organization_id)
+    with _local_lock:
+        _local_orgs.pop(organization_id, None)
+        # User entries embed the organization entitlements.
+        for user_id, (_, value) in list(_local_users.items()):
+            if value.organization is not None and value.organization.organization_id == organization_id:
+                _local_users.pop(user_id, None)
+
+
+def invalidate_user(user_id):
+    invalidate(NAMESPACE, user=user_id)
+    with _local_lock:
+        _local_users.pop(user_id, None)
+
+
+def clear_local_cache():
+    with _local_lock:
+        _local_orgs.clear()
+        _local_users.clear()
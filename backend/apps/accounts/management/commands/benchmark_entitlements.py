@@ -0,0 +1,79 @@
+"""
+benchmark_entitlements — Latency of license/permission checks.
+
+Compares the direct database resolution (what user_module_access_view used
+to do on every call) with the entitlement cache, cold (shared cache only)
+and warm (process-local hit). Fixtures are rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_entitlements
+    python manage.py benchmark_entitlements --iterations 5000
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.accounts import entitlements
+from apps.accounts.models import User, UserPermission, Permission
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.licenses.models import License, LicenseStatus
+from apps.organizations.models import Organization
+
+
+class Command(BaseCommand):
+    help = 'Benchmark permission-check latency with and without the entitlement cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with rolled_back():
+            user = self._fixtures()
+
+            def uncached():
+                licenses = list(user.organization.licenses.filter(status=LicenseStatus.ACTIVE))
+                granted = set(UserPermission.objects.filter(user=user).values_list('permission', flat=True))
+                return any(l.type == 'PHARMACY' for l in licenses) and Permission.ACCESS_POS in granted
+
+            def cached():
+                ent = entitlements.get_user_entitlements(user)
+                return ent.has_module(entitlements.MODULE_PHARMACY) and ent.has_permission(Permission.ACCESS_POS)
+
+            # Force a database round trip on user.organization for each uncached call.
+            results = [
+                ('database (uncached)', measure(
+                    uncached, iterations,
+                    setup=lambda: user._state.fields_cache.pop('organization', None),
+                )),
+                ('entitlements (shared cache)', measure(
+                    cached, iterations, setup=entitlements.clear_local_cache,
+                )),
+                ('entitlements (process-local)', measure(cached, iterations)),
+            ]
+
+        self.stdout.write(f'Permission check latency over {iterations} iterations:')
+        for label, result in results:
+            self.stdout.write(format_result(label, result))
+        speedup = results[0][1]['mean_us'] / max(results[2][1]['mean_us'], 1e-3)
+        self.stdout.write(self.style.SUCCESS(f'Process-local checks are {speedup:.0f}x faster'))
+
+    def _fixtures(self):
+        stamp = timezone.now().timestamp()
+        org = Organization.objects.create(
+            name='Benchmark Pharmacie', type='pharmacy',
+            registration_number=f'BENCH-{stamp}', address='-', city='Lubumbashi',
+            phone='+243990000001', email='bench@example.cd', director_name='Bench',
+        )
+        user = User.objects.create(
+            phone='+243990000002', email=f'bench-{stamp}@example.cd',
+            first_name='Bench', last_name='User', primary_role='cashier', organization=org,
+        )
+        for license_type in ('PHARMACY', 'HOSPITAL', 'OCCUPATIONAL_HEALTH'):
+            License.objects.create(
+                organization=org, type=license_type, status=LicenseStatus.ACTIVE,
+                expiry_date=timezone.now().date() + timedelta(days=365),
+            )
+        UserPermission.objects.create(user=user, permission=Permission.ACCESS_POS, granted_by=user)
+        return user
@@ -0,0 +1,79 @@
+"""
+benchmark_token_auth — Cost of authenticating a request by token.
+
+Compares DRF's TokenAuthentication followed by ``request.user.organization``
+(what every organization-scoped view does) with CachedTokenAuthentication.
+Fixtures are rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_token_auth
+    python manage.py benchmark_token_auth --iterations 5000
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.authentication import CachedTokenAuthentication, invalidate_token
+from apps.accounts.models import User
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.organizations.models import Organization
+
+
+class Command(BaseCommand):
+    help = 'Benchmark token authentication with and without the user cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with rolled_back():
+            token = self._fixtures()
+            factory = APIRequestFactory()
+
+            def run(authenticator):
+                def call():
+                    request = Request(
+                        factory.get('/', HTTP_AUTHORIZATION=f'Token {token.key}'),
+                        authenticators=[authenticator],
+                    )
+                    return request.user.organization.name
+                return call
+
+            results = [
+                ('TokenAuthentication', measure(run(TokenAuthentication()), iterations)),
+                ('CachedTokenAuthentication (miss)', measure(
+                    run(CachedTokenAuthentication()), iterations,
+                    setup=lambda: invalidate_token(token.key),
+                )),
+                ('CachedTokenAuthentication (hit)', measure(
+                    run(CachedTokenAuthentication()), iterations,
+                )),
+            ]
+            invalidate_token(token.key)
+
+        self.stdout.write(
+            f'Authentication + request.user.organization over {iterations} iterations '
+            f"({settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]}):"
+        )
+        for label, result in results:
+            self.stdout.write(format_result(label, result))
+        saved = results[0][1]['queries'] - results[2][1]['queries']
+        self.stdout.write(self.style.SUCCESS(f'Cache hits save {saved} queries per request'))
+
+    def _fixtures(self):
+        stamp = timezone.now().timestamp()
+        org = Organization.objects.create(
+            name='Benchmark Pharmacie', type='pharmacy',
+            registration_number=f'BENCH-{stamp}', address='-', city='Lubumbashi',
+            phone='+243990000001', email='bench@example.cd', director_name='Bench',
+        )
+        user = User.objects.create(
+            phone='+243990000003', email=f'bench-auth-{stamp}@example.cd',
+            first_name='Bench', last_name='User', primary_role='cashier', organization=org,
+        )
+        return Token.objects.create(user=user)
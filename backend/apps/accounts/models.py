@@ -93,6 +93,12 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.phone})"
 
+    # Columns read by full_name / get_full_name (sparse fieldsets, apps.core.fieldsets).
+    FIELD_DEPENDENCIES = {
+        'full_name': ['first_name', 'last_name'],
+        'get_full_name': ['first_name', 'last_name'],
+    }
+
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -0,0 +1,65 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from apps.licenses.models import License
+from apps.organizations.models import Organization
+from .authentication import invalidate_token, invalidate_tokens
+from .entitlements import invalidate_organization, invalidate_user
+from .models import User, UserPermission
+
+
+# ═══════════════════════════════════════════════════════════════
+#  ENTITLEMENT CACHE INVALIDATION
+# ═══════════════════════════════════════════════════════════════
+
+@receiver(post_save, sender=License)
+@receiver(post_delete, sender=License)
+def invalidate_entitlements_on_license_change(sender, instance, **kwargs):
+    invalidate_organization(instance.organization_id)
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_entitlements_on_organization_change(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_organization(instance.pk)
+
+
+@receiver(post_save, sender=UserPermission)
+@receiver(post_delete, sender=UserPermission)
+def invalidate_entitlements_on_permission_change(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_entitlements_on_user_change(sender, instance, created=False, **kwargs):
+    # Role, organization or activation changes alter the user's entitlements.
+    if not created:
+        invalidate_user(instance.pk)
+
+
+# ═══════════════════════════════════════════════════════════════
+#  AUTH TOKEN CACHE INVALIDATION
+# ═══════════════════════════════════════════════════════════════
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    # Logout and the token rotation of change_password_view delete the token.
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_tokens_on_user_change(sender, instance, created, **kwargs):
+    # The cached user must not outlive a deactivation or profile change.
+    if not created:
+        invalidate_tokens(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_cached_tokens_on_organization_change(sender, instance, created, **kwargs):
+    # Cached users carry their organization.
+    if not created:
+        invalidate_tokens(
+            Token.objects.filter(user__organization=instance).values_list('key', flat=True)
+        )
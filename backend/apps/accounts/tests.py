@@ -0,0 +1,246 @@
+"""
+Unit tests for the Accounts module — entitlement cache and cached token
+authentication.
+Covers: license/module resolution, custom permissions, invalidation on
+License/UserPermission/User changes, local cache size, module-access endpoint,
+token → user caching and its invalidation on logout/password change/deactivation.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from apps.accounts import entitlements
+from apps.accounts.authentication import CachedTokenAuthentication
+from apps.accounts.models import User, UserPermission, Permission
+from apps.licenses.models import License, LicenseStatus
+from apps.organizations.models import Organization
+
+
+# ──────────────────────────────────────────────────────────────
+# Helpers
+# ──────────────────────────────────────────────────────────────
+
+def _org(suffix="1"):
+    return Organization.objects.create(
+        name=f"Pharmacie Acc {suffix}",
+        type="pharmacy",
+        registration_number=f"ACC-REG-{suffix}-{timezone.now().timestamp()}",
+        address="12 Avenue des Comptes",
+        city="Lubumbashi",
+        phone=f"+243810000{suffix.zfill(3)}",
+        email=f"acc{suffix}@test.cd",
+        director_name="Dr Comptes",
+    )
+
+
+def _user(org, suffix="1", role="cashier"):
+    user = User.objects.create(
+        phone=f"+243820000{suffix.zfill(3)}",
+        email=f"acc.user{suffix}@test.cd",
+        first_name="Acc",
+        last_name=f"User{suffix}",
+        primary_role=role,
+        organization=org,
+    )
+    user.set_password("testpass123")
+    user.save()
+    return user
+
+
+def _license(org, license_type="PHARMACY", status=LicenseStatus.ACTIVE, days=365):
+    return License.objects.create(
+        organization=org,
+        type=license_type,
+        status=status,
+        expiry_date=timezone.now().date() + timedelta(days=days),
+    )
+
+
+class EntitlementCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        entitlements.clear_local_cache()
+        self.org = _org("1")
+        self.user = _user(self.org, "1")
+        self.license = _license(self.org, "PHARMACY_HOSPITAL")
+
+    def test_modules_follow_active_licenses(self):
+        ent = entitlements.get_user_entitlements(self.user)
+        self.assertTrue(ent.has_module(entitlements.MODULE_PHARMACY))
+        self.assertTrue(ent.has_module(entitlements.MODULE_HOSPITAL))
+        self.assertFalse(ent.has_module(entitlements.MODULE_OCCUPATIONAL_HEALTH))
+
+    def test_role_defaults_and_custom_permissions(self):
+        UserPermission.objects.create(
+            user=self.user, permission=Permission.VIEW_REPORTS, granted_by=self.user
+        )
+        ent = entitlements.get_user_entitlements(self.user)
+        self.assertTrue(ent.has_permission(Permission.ACCESS_POS))  # cashier default
+        self.assertTrue(ent.has_permission(Permission.VIEW_REPORTS))
+        self.assertFalse(ent.has_permission(Permission.MANAGE_USERS))
+
+    def test_repeated_checks_do_not_query(self):
+        entitlements.get_user_entitlements(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(10):
+                entitlements.get_user_entitlements(self.user).has_module(entitlements.MODULE_PHARMACY)
+        self.assertEqual(len(queries), 0)
+
+    def test_shared_cache_serves_other_processes(self):
+        entitlements.get_user_entitlements(self.user)
+        entitlements.clear_local_cache()  # simulates another worker
+        with CaptureQueriesContext(connection) as queries:
+            ent = entitlements.get_user_entitlements(self.user)
+        self.assertEqual(len(queries), 0)
+        self.assertTrue(ent.has_module(entitlements.MODULE_PHARMACY))
+
+    def test_license_suspension_invalidates(self):
+        entitlements.get_user_entitlements(self.user)
+        self.license.status = LicenseStatus.SUSPENDED
+        self.license.save()
+        ent = entitlements.get_user_entitlements(self.user)
+        self.assertFalse(ent.has_module(entitlements.MODULE_PHARMACY))
+
+    def test_expired_active_license_grants_nothing(self):
+        self.license.expiry_date = timezone.now().date() - timedelta(days=1)
+        self.license.save()
+        ent = entitlements.get_user_entitlements(self.user)
+        self.assertFalse(ent.has_module(entitlements.MODULE_PHARMACY))
+
+    def test_permission_revocation_invalidates(self):
+        grant = UserPermission.objects.create(
+            user=self.user, permission=Permission.VIEW_REPORTS, granted_by=self.user
+        )
+        self.assertTrue(entitlements.get_user_entitlements(self.user).has_permission(Permission.VIEW_REPORTS))
+        grant.delete()
+        self.assertFalse(entitlements.get_user_entitlements(self.user).has_permission(Permission.VIEW_REPORTS))
+
+    def test_role_change_invalidates(self):
+        entitlements.get_user_entitlements(self.user)
+        self.user.primary_role = 'doctor'
+        self.user.save()
+        ent = entitlements.get_user_entitlements(self.user)
+        self.assertTrue(ent.has_permission(Permission.PRESCRIBE_MEDICATION))
+        self.assertFalse(ent.has_permission(Permission.ACCESS_POS))
+
+    def test_local_cache_keeps_most_recent_users(self):
+        other = _user(self.org, "lru")
+        with self.settings(ENTITLEMENTS_LOCAL_MAX_ENTRIES=1):
+            entitlements.get_user_entitlements(self.user)
+            entitlements.get_user_entitlements(other)
+        self.assertEqual(list(entitlements._local_users), [other.pk])
+        self.assertEqual(len(entitlements._local_orgs), 1)
+
+    def test_organization_deactivation_invalidates(self):
+        entitlements.get_user_entitlements(self.user)
+        self.org.is_active = False
+        self.org.save()
+        self.assertFalse(entitlements.get_user_entitlements(self.user).has_module(entitlements.MODULE_PHARMACY))
+
+
+class ModuleAccessAPITests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        entitlements.clear_local_cache()
+        self.org = _org("3")
+        self.user = _user(self.org, "3")
+        self.client.force_authenticate(self.user)
+
+    def test_module_access_lists_active_licenses(self):
+        active = _license(self.org, "PHARMACY")
+        _license(self.org, "HOSPITAL", status=LicenseStatus.SUSPENDED)
+        response = self.client.get('/api/v1/auth/module-access/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        entry = response.data[0]
+        self.assertEqual(entry['licenseId'], str(active.id))
+        self.assertEqual(entry['moduleType'], 'PHARMACY')
+        self.assertEqual(entry['facilityAccess'], [str(self.org.id)])
+
+    def test_new_license_is_visible_immediately(self):
+        self.assertEqual(self.client.get('/api/v1/auth/module-access/').data, [])
+        _license(self.org, "OCCUPATIONAL_HEALTH")
+        self.assertEqual(len(self.client.get('/api/v1/auth/module-access/').data), 1)
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        entitlements.clear_local_cache()
+        self.org = _org("4")
+        self.user = _user(self.org, "4")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _queries_for_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries]
+
+    def test_cached_user_skips_token_and_organization_queries(self):
+        first = self._queries_for_profile()
+        second = self._queries_for_profile()
+        self.assertTrue(any('authtoken_token' in sql for sql in first))
+        self.assertFalse(any('authtoken_token' in sql for sql in second))
+        self.assertFalse(any('organizations_organization' in sql for sql in second))
+        self.assertEqual(len(first) - len(second), 1)
+
+    def test_cache_holds_no_password_hash(self):
+        from apps.accounts.authentication import token_cache_key
+
+        self._queries_for_profile()
+        cached = cache.get(token_cache_key(self.token.key))
+        self.assertNotIn('password', cached['user'])
+        self.assertNotIn(self.user.password, repr(cached))
+
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        user, _ = CachedTokenAuthentication().authenticate(request)
+        self.assertIsNot(user, CachedTokenAuthentication().authenticate(request)[0])
+        self.assertEqual(user.organization.name, self.org.name)
+        # Deferred: loaded from the database when read.
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token deadbeef')
+        self.assertEqual(self.client.get('/api/v1/auth/profile/').status_code, 401)
+
+    def test_token_deletion_invalidates_cached_token(self):
+        # logout_view deletes request.user.auth_token
+        self._queries_for_profile()
+        self.user.auth_token.delete()
+        self.assertEqual(self.client.get('/api/v1/auth/profile/').status_code, 401)
+
+    def test_password_change_rotates_cached_token(self):
+        self._queries_for_profile()
+        response = self.client.post('/api/v1/auth/change-password/', {
+            'current_password': 'testpass123',
+            'new_password': 'N0uveau-Passe!2024',
+            'confirm_password': 'N0uveau-Passe!2024',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.client.get('/api/v1/auth/profile/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        self.assertEqual(self.client.get('/api/v1/auth/profile/').status_code, 200)
+
+    def test_deactivation_invalidates_cached_user(self):
+        self._queries_for_profile()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/v1/auth/profile/').status_code, 401)
+
+    def test_organization_change_refreshes_cached_user(self):
+        self._queries_for_profile()
+        self.org.name = 'Pharmacie Renommée'
+        self.org.save()
+        response = self.client.get('/api/v1/auth/profile/')
+        self.assertEqual(response.data['organization_name'], 'Pharmacie Renommée')
@@ -12,6 +12,8 @@ from .serializers import (
     UserPermissionSerializer, LoginSerializer, ChangePasswordSerializer,
     UserRoleChoicesSerializer, PermissionChoicesSerializer
 )
+from apps.core.cache import cached_response, CHOICES_CACHE_TIMEOUT
+from .entitlements import get_user_entitlements
 
 
 class UserFilter(filters.FilterSet):
@@ -168,6 +170,7 @@ def change_password_view(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def user_role_choices_view(request):
     """Get user role choices"""
     choices = [
@@ -179,6 +182,7 @@ def user_role_choices_view(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def permission_choices_view(request):
     """Get permission choices"""
     choices = [
@@ -252,40 +256,37 @@ def user_module_access_view(request):
         
         # For now, we'll generate module access based on organization licenses
         # In a more complex system, this would be stored in a separate table
-        if not user.organization:
+        if not user.organization_id:
             return Response([])
         
-        organization = user.organization
-        licenses = organization.licenses.filter(status='active')
+        entitlements = get_user_entitlements(user)
+        organization_id = str(user.organization_id)
+        
+        # Generate basic permissions based on user role and license type
+        if user.primary_role == 'ADMIN':
+            permissions = ['read', 'write', 'delete', 'manage_users', 'manage_settings']
+        elif user.primary_role == 'MANAGER':
+            permissions = ['read', 'write', 'delete']
+        elif user.primary_role == 'EMPLOYEE':
+            permissions = ['read', 'write']
+        else:
+            permissions = ['read']
         
         module_access_data = []
-        for license_obj in licenses:
-            # Map backend license type to frontend ModuleType
-            module_type = license_obj.type
-            
-            # Generate basic permissions based on user role and license type
-            permissions = []
-            if user.primary_role == 'ADMIN':
-                permissions = ['read', 'write', 'delete', 'manage_users', 'manage_settings']
-            elif user.primary_role == 'MANAGER':
-                permissions = ['read', 'write', 'delete']
-            elif user.primary_role == 'EMPLOYEE':
-                permissions = ['read', 'write']
-            else:
-                permissions = ['read']
-            
+        for grant in entitlements.organization.licenses:
             module_access_data.append({
-                'id': f"{user.id}_{license_obj.id}",
+                'id': f"{user.id}_{grant.id}",
                 'userId': str(user.id),
-                'licenseId': str(license_obj.id),
-                'moduleType': module_type,
+                'licenseId': str(grant.id),
+                # Map backend license type to frontend ModuleType
+                'moduleType': grant.type,
                 'role': user.primary_role,
-                'permissions': permissions,
-                'facilityAccess': [str(user.organization.id)],  # User can access their org
+                'permissions': list(permissions),
+                'facilityAccess': [organization_id],  # User can access their org
                 'isActive': True,
-                'grantedAt': license_obj.created_at.isoformat(),
-                'createdAt': license_obj.created_at.isoformat(),
-                'updatedAt': license_obj.updated_at.isoformat() if license_obj.updated_at else None
+                'grantedAt': grant.created_at.isoformat(),
+                'createdAt': grant.created_at.isoformat(),
+                'updatedAt': grant.updated_at.isoformat() if grant.updated_at else None
             })
         
         return Response(module_access_data)
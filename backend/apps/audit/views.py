@@ -10,6 +10,8 @@ from django.http import HttpResponse
 import csv
 import json
 
+from apps.core.pagination import OptionalKeysetPagination
+
 from .models import AuditLog, PharmacyAuditLog, AuditLogSummary, AuditActionType, AuditSeverity
 from .serializers import (
     AuditLogSerializer, AuditLogListSerializer, PharmacyAuditLogSerializer,
@@ -28,6 +30,7 @@ class AuditLogListAPIView(generics.ListAPIView):
     filterset_fields = ['action', 'severity', 'success', 'module', 'user', 'organization']
     search_fields = ['username', 'description', 'ip_address', 'object_repr']
     ordering = ['-timestamp']
+    pagination_class = OptionalKeysetPagination
     
     def get_queryset(self):
         queryset = super().get_queryset()
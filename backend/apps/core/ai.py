@@ -0,0 +1,393 @@
+"""
+Shared gateway to the generative AI provider (Gemini REST API).
+
+Every AI-assisted flow (product image scan, consultation transcription...)
+calls ``get_gateway().generate(...)`` instead of building its own client:
+
+* one pooled HTTP session per process, so TLS connections are reused;
+* responses are cached in the shared Django cache under a hash of the
+  model, prompt, generation config and the SHA-256 of every image or audio
+  part: re-scanning the same product photo is served from the cache
+  without calling (or paying for) the model again;
+* at most ``AI_MAX_CONCURRENCY`` calls run at once per process; the others
+  wait, within their latency budget;
+* transient failures (network errors, 429 and 5xx) are retried with
+  exponential backoff and jitter as long as the next attempt still fits in
+  the latency budget (``AI_LATENCY_BUDGET`` seconds, or ``budget=``);
+* calls, cache hits, retries, errors and latency are counted per operation
+  in the shared cache (``get_ai_stats``, ``GET /api/v1/system/ai/stats/``).
+
+``AI_GATEWAY`` names the gateway class; tests and local development use
+``FakeGateway``, which answers from canned responses without any network.
+
+Usage::
+
+    from apps.core.ai import AIError, Blob, get_gateway
+
+    result = get_gateway().generate(
+        'product_scan', [prompt, Blob('image/jpeg', data=image_bytes)],
+        model='gemini-1.5-flash', config={'responseMimeType': 'application/json'},
+        budget=30,
+    )
+    result.text, result.cached
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+from base64 import b64encode
+from dataclasses import dataclass
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from .cache import incr_counter
+
+logger = logging.getLogger(__name__)
+
+GEMINI_BASE_URL = 'https://generativelanguage.googleapis.com'
+DEFAULT_MODEL = 'gemini-2.5-flash'
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# First backoff delay in seconds, doubled on every retry.
+BACKOFF_BASE = 0.5
+# Larger media parts go through the Files API instead of inline base64.
+INLINE_MAX_BYTES = 15 * 1024 * 1024
+
+_KEY_PREFIX = 'ai'
+STAT_FIELDS = ('calls', 'cache_hits', 'retries', 'errors', 'latency_ms')
+
+# Operations declared through register_operation, used to report statistics.
+_operations = set()
+
+
+def _max_concurrency():
+    return getattr(settings, 'AI_MAX_CONCURRENCY', 4)
+
+
+def _latency_budget():
+    return getattr(settings, 'AI_LATENCY_BUDGET', 60)
+
+
+def _max_attempts():
+    return getattr(settings, 'AI_MAX_ATTEMPTS', 4)
+
+
+def _cache_timeout():
+    return getattr(settings, 'AI_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+
+
+class AIError(Exception):
+    """The provider could not answer: not configured, refused, or out of budget."""
+
+    def __init__(self, detail, status=None, body=''):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+        self.body = body
+
+
+class TransientAIError(AIError):
+    """A failure worth retrying (network error, rate limit, provider overload)."""
+
+
+@dataclass
+class Blob:
+    """Image or audio part, in memory (``data``) or on disk (``path``)."""
+    mime_type: str
+    data: bytes = None
+    path: str = None
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    def read(self):
+        if self.data is not None:
+            return self.data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def digest(self):
+        digest = hashlib.sha256()
+        if self.data is not None:
+            digest.update(self.data)
+        else:
+            with open(self.path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+
+@dataclass
+class AIResult:
+    text: str
+    cached: bool = False
+    attempts: int = 0
+    latency_ms: int = 0
+
+
+def cache_key(operation, model, parts, config):
+    """Content-hash key of a request: same prompt, media and config, same answer."""
+    fingerprint = [
+        {'mime_type': part.mime_type, 'sha256': part.digest()} if isinstance(part, Blob) else part
+        for part in parts
+    ]
+    payload = json.dumps([model, fingerprint, config or {}], sort_keys=True, default=str)
+    return f'{_KEY_PREFIX}:{operation}:{hashlib.sha256(payload.encode()).hexdigest()}'
+
+
+# ──────────────────────────────────────────────────────────────
+# Metrics
+# ──────────────────────────────────────────────────────────────
+
+def _stats_key(operation, field):
+    return f'{_KEY_PREFIX}:stats:{operation}:{field}'
+
+
+def register_operation(name):
+    """Declare an AI operation (at import time) so every process reports it."""
+    _operations.add(name)
+    return name
+
+
+def record_call(operation, result=None, retries=0, error=False, latency_ms=0):
+    _operations.add(operation)
+    incr_counter(_stats_key(operation, 'calls'))
+    if result is not None and result.cached:
+        incr_counter(_stats_key(operation, 'cache_hits'))
+    if retries:
+        incr_counter(_stats_key(operation, 'retries'), retries)
+    if error:
+        incr_counter(_stats_key(operation, 'errors'))
+    if latency_ms:
+        incr_counter(_stats_key(operation, 'latency_ms'), latency_ms)
+
+
+def get_ai_stats():
+    """Call, cache hit, retry and error counters and mean latency per operation."""
+    operations = sorted(_operations)
+    counters = cache.get_many([
+        _stats_key(operation, field) for operation in operations for field in STAT_FIELDS
+    ])
+    stats = {}
+    for operation in operations:
+        row = {field: counters.get(_stats_key(operation, field), 0) for field in STAT_FIELDS}
+        provider_calls = row['calls'] - row['cache_hits']
+        row['cache_hit_rate'] = round(row['cache_hits'] / row['calls'], 4) if row['calls'] else None
+        row['mean_latency_ms'] = round(row.pop('latency_ms') / provider_calls) if provider_calls else None
+        stats[operation] = row
+    return {'gateway': type(get_gateway()).__name__, 'operations': stats}
+
+
+def reset_ai_stats():
+    cache.delete_many([
+        _stats_key(operation, field) for operation in _operations for field in STAT_FIELDS
+    ])
+
+
+# ──────────────────────────────────────────────────────────────
+# Gateways
+# ──────────────────────────────────────────────────────────────
+
+class Gateway:
+    """Caching, concurrency limit, retries and metrics around ``_send``."""
+
+    def __init__(self):
+        self._slots = threading.BoundedSemaphore(_max_concurrency())
+
+    def _send(self, operation, model, parts, config, timeout):
+        """Text generated for one attempt; raise ``TransientAIError`` to retry."""
+        raise NotImplementedError
+
+    def generate(self, operation, parts, model=DEFAULT_MODEL, config=None, budget=None, cache_timeout=None):
+        """
+        Text generated by ``model`` for ``parts`` (strings and ``Blob``), as an
+        ``AIResult``.  ``cache_timeout=0`` disables the response cache.
+        Raises ``AIError`` when the provider fails or the budget runs out.
+        """
+        started = time.monotonic()
+        cache_timeout = _cache_timeout() if cache_timeout is None else cache_timeout
+        key = cache_key(operation, model, parts, config) if cache_timeout else None
+        if key:
+            text = cache.get(key)
+            if text is not None:
+                result = AIResult(text, cached=True)
+                record_call(operation, result)
+                return result
+
+        deadline = started + (budget if budget is not None else _latency_budget())
+        attempts = 0
+        try:
+            if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise AIError('Service IA saturé, réessayez plus tard', status=503)
+            try:
+                while True:
+                    attempts += 1
+                    try:
+                        text = self._send(
+                            operation, model, parts, config, timeout=max(deadline - time.monotonic(), 1),
+                        )
+                        break
+                    except TransientAIError:
+                        delay = BACKOFF_BASE * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+                        if attempts >= _max_attempts() or time.monotonic() + delay >= deadline:
+                            raise
+                        logger.warning('AI %s attempt %s failed, retrying in %.1fs', operation, attempts, delay)
+                        time.sleep(delay)
+            finally:
+                self._slots.release()
+        except AIError:
+            record_call(
+                operation, retries=max(attempts - 1, 0), error=True,
+                latency_ms=int((time.monotonic() - started) * 1000),
+            )
+            raise
+
+        result = AIResult(text, attempts=attempts, latency_ms=int((time.monotonic() - started) * 1000))
+        record_call(operation, result, retries=attempts - 1, latency_ms=result.latency_ms)
+        logger.info('AI %s answered in %s ms (%s attempts)', operation, result.latency_ms, attempts)
+        if key:
+            cache.set(key, text, cache_timeout)
+        return result
+
+
+class GeminiGateway(Gateway):
+    """Gemini ``generateContent`` over one pooled ``requests`` session."""
+
+    def __init__(self):
+        super().__init__()
+        self.api_key = getattr(settings, 'GEMINI_API_KEY', '')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_max_concurrency())
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, url, timeout, **kwargs):
+        params = kwargs.pop('params', {})
+        try:
+            response = self.session.request(
+                method, url, params={'key': self.api_key, **params}, timeout=timeout, **kwargs,
+            )
+        except requests.RequestException as exc:
+            raise TransientAIError(f'Erreur réseau IA : {exc}') from exc
+        if response.status_code in RETRY_STATUSES:
+            raise TransientAIError('Service IA indisponible', response.status_code, response.text[:500])
+        if response.status_code >= 400:
+            raise AIError('Requête IA refusée', response.status_code, response.text[:500])
+        return response
+
+    def _upload(self, blob, timeout):
+        """Upload a large part through the Files API; returns the file resource."""
+        start = self._request(
+            'POST', f'{GEMINI_BASE_URL}/upload/v1beta/files', timeout,
+            headers={
+                'X-Goog-Upload-Protocol': 'resumable',
+                'X-Goog-Upload-Command': 'start',
+                'X-Goog-Upload-Header-Content-Length': str(blob.size),
+                'X-Goog-Upload-Header-Content-Type': blob.mime_type,
+            },
+            json={'file': {'display_name': os.path.basename(blob.path or 'media')}},
+        )
+        upload_url = start.headers.get('X-Goog-Upload-URL')
+        if not upload_url:
+            raise TransientAIError('Envoi du fichier IA impossible')
+        with open(blob.path, 'rb') if blob.path else io.BytesIO(blob.data) as body:
+            response = self._request(
+                'POST', upload_url, timeout,
+                headers={'X-Goog-Upload-Offset': '0', 'X-Goog-Upload-Command': 'upload, finalize'},
+                data=body,
+            )
+        return response.json()['file']
+
+    def _send(self, operation, model, parts, config, timeout):
+        if not self.api_key:
+            raise AIError('GEMINI_API_KEY is not configured on server', status=503)
+        uploaded = []
+        try:
+            body_parts = []
+            for part in parts:
+                if not isinstance(part, Blob):
+                    body_parts.append({'text': part})
+                elif part.size > INLINE_MAX_BYTES:
+                    resource = self._upload(part, timeout)
+                    uploaded.append(resource['name'])
+                    body_parts.append({'file_data': {'mime_type': part.mime_type, 'file_uri': resource['uri']}})
+                else:
+                    body_parts.append({'inline_data': {
+                        'mime_type': part.mime_type, 'data': b64encode(part.read()).decode(),
+                    }})
+            payload = {'contents': [{'parts': body_parts}]}
+            if config:
+                payload['generationConfig'] = config
+            response = self._request(
+                'POST', f'{GEMINI_BASE_URL}/v1beta/models/{model}:generateContent', timeout, json=payload,
+            )
+        finally:
+            for name in uploaded:
+                try:
+                    self._request('DELETE', f'{GEMINI_BASE_URL}/v1beta/{name}', 10)
+                except AIError as exc:
+                    logger.warning('Could not delete AI file %s: %s', name, exc.detail)
+        return response_text(response.json())
+
+
+def response_text(body):
+    """Text of the first candidate of a ``generateContent`` response."""
+    candidates = body.get('candidates') or []
+    if not candidates:
+        return ''
+    parts = (candidates[0].get('content') or {}).get('parts') or []
+    return ''.join(part.get('text') or '' for part in parts)
+
+
+class FakeGateway(Gateway):
+    """
+    Local stand-in answering without any network; records the calls.
+    ``responses[operation]`` is the text to answer, a callable taking the
+    parts, an exception to raise, or a list of those consumed one per
+    attempt (the last one repeats).  Set ``AI_GATEWAY = 'apps.core.ai.FakeGateway'``.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.responses = {}
+        self.calls = []
+
+    def _send(self, operation, model, parts, config, timeout):
+        self.calls.append((operation, model, parts))
+        response = self.responses.get(operation, '{}')
+        if isinstance(response, list):
+            response = response.pop(0) if len(response) > 1 else response[0]
+        if isinstance(response, Exception):
+            raise response
+        return response(parts) if callable(response) else response
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """The process-wide gateway of class ``AI_GATEWAY``."""
+    global _gateway
+    path = getattr(settings, 'AI_GATEWAY', 'apps.core.ai.GeminiGateway')
+    gateway = _gateway
+    if gateway is None or gateway.path != path:
+        with _gateway_lock:
+            if _gateway is None or _gateway.path != path:
+                _gateway = import_string(path)()
+                _gateway.path = path
+            gateway = _gateway
+    return gateway
+
+
+def reset_gateway():
+    global _gateway
+    with _gateway_lock:
+        _gateway = None
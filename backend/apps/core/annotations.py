@@ -0,0 +1,152 @@
+"""
+Annotated serializer fields.
+
+Count/latest-date fields such as ``IntegerField(source='workers.count')``
+run one query per serialized object.  An annotated field declares the
+aggregate it needs instead::
+
+    class EnterpriseListSerializer(serializers.ModelSerializer):
+        worker_count = AnnotatedIntegerField(RelatedCount('workers'), source='workers.count')
+
+Views using ``AnnotatedFieldsMixin`` annotate their queryset with the
+aggregates of every annotated field of the serializer in use, so the list
+costs a single query.  When the annotation is absent (serializer used on a
+plain instance, nested serializer, after ``create()``...) the field falls
+back to ``source`` like a regular field, or to the serializer method named
+by ``method_name`` (as for ``SerializerMethodField``)::
+
+    total_beds = AnnotatedIntegerField(
+        RelatedCount('beds', is_active=True), method_name='get_total_beds'
+    )
+
+``RelatedCount`` and ``RelatedMax`` build correlated subqueries rather
+than JOIN + GROUP BY, so several of them on one serializer do not multiply
+rows.  Any Django expression can be passed as well.
+"""
+from django.db.models import IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+ANNOTATION_PREFIX = 'annotated_'
+
+
+def _related_queryset(model, relation, filters):
+    """Queryset of ``relation`` objects correlated with the outer row."""
+    field = model._meta.get_field(relation)
+    related_model = field.related_model
+    if field.auto_created and not field.concrete:
+        # Reverse FK / M2M: filter on the forward field.
+        lookup = field.field.name
+    else:
+        # Forward M2M: filter on its reverse query name.
+        lookup = field.related_query_name()
+    return related_model._default_manager.filter(
+        **{lookup: OuterRef('pk')}, **filters
+    ).order_by()
+
+
+class _SubqueryCount(Subquery):
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+class RelatedCount:
+    """``COUNT`` of related objects, optionally filtered."""
+
+    def __init__(self, relation, **filters):
+        self.relation = relation
+        self.filters = filters
+
+    def resolve(self, model):
+        queryset = _related_queryset(model, self.relation, self.filters)
+        return _SubqueryCount(queryset.values('pk'))
+
+
+class RelatedMax:
+    """Largest ``field`` value among related objects (``None`` if none)."""
+
+    def __init__(self, relation, field, **filters):
+        self.relation = relation
+        self.field = field
+        self.filters = filters
+
+    def resolve(self, model):
+        queryset = _related_queryset(model, self.relation, self.filters)
+        return Subquery(
+            queryset.filter(**{f'{self.field}__isnull': False})
+            .order_by(f'-{self.field}').values(self.field)[:1]
+        )
+
+
+class AnnotatedFieldMixin:
+    """Read-only field served from a queryset annotation when available."""
+
+    def __init__(self, expression, method_name=None, **kwargs):
+        self.expression = expression
+        self.method_name = method_name
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    @property
+    def annotation_name(self):
+        return f'{ANNOTATION_PREFIX}{self.field_name}'
+
+    def get_expression(self, model):
+        if hasattr(self.expression, 'resolve'):
+            return self.expression.resolve(model)
+        return self.expression
+
+    def get_attribute(self, instance):
+        try:
+            return getattr(instance, self.annotation_name)
+        except AttributeError:
+            pass
+        if self.method_name:
+            return getattr(self.parent, self.method_name)(instance)
+        return super().get_attribute(instance)
+
+
+class AnnotatedIntegerField(AnnotatedFieldMixin, serializers.IntegerField):
+    def get_expression(self, model):
+        return Coalesce(super().get_expression(model), 0)
+
+
+class AnnotatedDateField(AnnotatedFieldMixin, serializers.DateField):
+    pass
+
+
+class AnnotatedFloatField(AnnotatedFieldMixin, serializers.FloatField):
+    pass
+
+
+def get_annotations(serializer_class, model):
+    """``{annotation name: expression}`` needed by ``serializer_class``."""
+    if serializer_class is None:
+        return {}
+    fields = serializer_class().fields
+    return {
+        field.annotation_name: field.get_expression(model)
+        for field in fields.values()
+        if isinstance(field, AnnotatedFieldMixin)
+    }
+
+
+def annotate_for_serializer(queryset, serializer_class):
+    annotations = get_annotations(serializer_class, queryset.model)
+    if not annotations:
+        return queryset
+    return queryset.annotate(**annotations)
+
+
+class AnnotatedFieldsMixin:
+    """
+    Generic view mixin adding the annotations of the current serializer.
+
+    Applied in ``filter_queryset`` so it also covers views that override
+    ``get_queryset`` without calling ``super()``; both ``list()`` and
+    ``get_object()`` go through it.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return annotate_for_serializer(queryset, self.get_serializer_class())
@@ -0,0 +1,71 @@
+"""
+Helpers for the ``benchmark_*`` management commands.
+
+Benchmarks create their fixtures inside ``rolled_back()`` so they can be run
+against any database (including production replicas) without leaving data
+behind, and report latency percentiles plus queries per call.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def measure(func, iterations=1000, setup=None):
+    """
+    Call ``func`` ``iterations`` times and return timing statistics.
+
+    ``setup`` (optional) runs before every call and is not timed.
+    Queries are counted on one extra, untimed call.
+    """
+    timings = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+
+    return summarize(timings, len(queries))
+
+
+def summarize(timings, queries=0):
+    """Statistics of ``timings`` (seconds) in the format of ``measure``."""
+    timings = sorted(timings)
+    return {
+        'iterations': len(timings),
+        'mean_us': statistics.fmean(timings) * 1e6,
+        'p50_us': timings[len(timings) // 2] * 1e6,
+        'p95_us': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1e6,
+        'queries': queries,
+    }
+
+
+def format_result(label, result):
+    return (
+        f"{label:<40} mean {result['mean_us']:>10.1f} µs   "
+        f"p50 {result['p50_us']:>10.1f} µs   p95 {result['p95_us']:>10.1f} µs   "
+        f"{result['queries']} queries"
+    )
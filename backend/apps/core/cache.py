@@ -0,0 +1,237 @@
+"""
+Shared API response cache.
+
+All API processes talk to the same Django cache (Redis in production, see
+``CACHES`` in settings), so a response cached by one gunicorn worker is
+served by every other worker.
+
+Cached entries are grouped by *namespace* (e.g. ``'choices'``)
+and optionally scoped per organization or per user.  Every key embeds a
+version number; invalidating a namespace only bumps that version, stale
+entries are never deleted explicitly and simply expire.
+
+Usage on a function view::
+
+    @api_view(['GET'])
+    @cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
+    def license_type_choices_view(request):
+        ...
+
+and on a viewset action::
+
+    @action(detail=False, methods=['get'])
+    @cached_response('inventory_summary', scope=SCOPE_ORGANIZATION)
+    def summary(self, request):
+        ...
+
+Writers invalidate with ``invalidate('choices')`` or, for
+scoped namespaces, ``invalidate('inventory_summary', organization=org)``.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+SCOPE_GLOBAL = 'global'
+SCOPE_ORGANIZATION = 'org'
+SCOPE_USER = 'user'
+
+# Choice lists are defined in code and only change on deploy.
+CHOICES_CACHE_TIMEOUT = 60 * 60 * 24
+
+_KEY_PREFIX = 'api'
+
+# Namespaces declared through @cached_response, used to report statistics.
+_registered_namespaces = {}
+
+
+def _default_timeout():
+    return getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+
+def _stats_enabled():
+    return getattr(settings, 'API_CACHE_STATS', True)
+
+
+def _version_key(namespace, scope_key=None):
+    if scope_key:
+        return f'{_KEY_PREFIX}:v:{namespace}:{scope_key}'
+    return f'{_KEY_PREFIX}:v:{namespace}'
+
+
+def _stats_key(namespace, outcome):
+    return f'{_KEY_PREFIX}:stats:{namespace}:{outcome}'
+
+
+def incr_counter(key, delta=1):
+    """Atomic increment that creates the counter on first use."""
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The counter was evicted between add() and incr().
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def get_scope_key(request, scope):
+    """Return the cache partition for ``request`` under ``scope``."""
+    if scope == SCOPE_GLOBAL:
+        return None
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'anon'
+    if scope == SCOPE_USER:
+        return f'user:{user.pk}'
+    if scope == SCOPE_ORGANIZATION:
+        org_id = getattr(user, 'organization_id', None)
+        return f'org:{org_id}' if org_id else 'org:none'
+    raise ValueError(f'Unknown cache scope: {scope}')
+
+
+def get_versions(namespace, *scope_keys):
+    """Return the namespace version followed by the version of each scope key."""
+    keys = [_version_key(namespace)]
+    keys.extend(_version_key(namespace, scope_key) for scope_key in scope_keys if scope_key)
+    found = cache.get_many(keys)
+    return tuple(found.get(key, 1) for key in keys)
+
+
+def invalidate(namespace, organization=None, user=None):
+    """
+    Invalidate cached responses of ``namespace``.
+
+    Without arguments every partition of the namespace is invalidated;
+    pass ``organization`` or ``user`` to only invalidate that partition.
+    """
+    if organization is not None:
+        org_id = getattr(organization, 'pk', organization)
+        key = _version_key(namespace, f'org:{org_id}')
+    elif user is not None:
+        user_id = getattr(user, 'pk', user)
+        key = _version_key(namespace, f'user:{user_id}')
+    else:
+        key = _version_key(namespace)
+    # Versions start at 1, the first bump must move them to 2.
+    cache.add(key, 1, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+        return 2
+
+
+def build_cache_key(request, namespace, scope=SCOPE_GLOBAL, vary_on_query=True, vary_on=None):
+    """Build the versioned cache key of ``request`` in ``namespace``."""
+    scope_key = get_scope_key(request, scope)
+    versions = get_versions(namespace, scope_key)
+    path = request.path
+    if vary_on_query:
+        query = sorted(request.query_params.lists()) if hasattr(request, 'query_params') \
+            else sorted(request.GET.lists())
+        path = f'{path}?{query}'
+    if vary_on is not None:
+        path = f'{path}#{vary_on(request)}'
+    digest = hashlib.md5(path.encode('utf-8'), usedforsecurity=False).hexdigest()
+    version = '.'.join(str(v) for v in versions)
+    return f'{_KEY_PREFIX}:{namespace}:{scope_key or SCOPE_GLOBAL}:v{version}:{digest}'
+
+
+def record_hit(namespace):
+    if _stats_enabled():
+        incr_counter(_stats_key(namespace, 'hits'))
+
+
+def record_miss(namespace):
+    if _stats_enabled():
+        incr_counter(_stats_key(namespace, 'misses'))
+
+
+def _find_request(args):
+    """Locate the request among function view or viewset method args."""
+    for arg in args[:2]:
+        if hasattr(arg, 'method') and hasattr(arg, 'META'):
+            return arg
+    return None
+
+
+def cached_response(namespace, scope=SCOPE_GLOBAL, timeout=None, vary_on_query=True, vary_on=None):
+    """
+    Cache the data of successful GET responses of a DRF view.
+
+    Must be applied *below* ``@api_view`` / ``@action`` so it receives the
+    DRF request.  Only ``response.data`` is stored; rendering still happens
+    per request so content negotiation is unaffected.
+
+    ``vary_on`` is an optional ``callable(request) -> str`` whose result is
+    added to the key, e.g. today's date for date-relative responses.
+    """
+    if scope not in (SCOPE_GLOBAL, SCOPE_ORGANIZATION, SCOPE_USER):
+        raise ValueError(f'Unknown cache scope: {scope}')
+    _registered_namespaces[namespace] = scope
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = _find_request(args)
+            if request is None or request.method not in ('GET', 'HEAD'):
+                return func(*args, **kwargs)
+
+            key = build_cache_key(request, namespace, scope, vary_on_query, vary_on)
+            cached = cache.get(key)
+            if cached is not None:
+                record_hit(namespace)
+                data, status_code = cached
+                return Response(data, status=status_code)
+
+            record_miss(namespace)
+            response = func(*args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                ttl = _default_timeout() if timeout is None else timeout
+                cache.set(key, (response.data, response.status_code), ttl)
+            return response
+        return wrapper
+    return decorator
+
+
+def get_cache_stats():
+    """Return hit/miss counters and hit rate per registered namespace."""
+    namespaces = sorted(_registered_namespaces)
+    keys = []
+    for namespace in namespaces:
+        keys.append(_stats_key(namespace, 'hits'))
+        keys.append(_stats_key(namespace, 'misses'))
+    counters = cache.get_many(keys)
+
+    stats = {}
+    total_hits = total_misses = 0
+    for namespace in namespaces:
+        hits = counters.get(_stats_key(namespace, 'hits'), 0)
+        misses = counters.get(_stats_key(namespace, 'misses'), 0)
+        total_hits += hits
+        total_misses += misses
+        stats[namespace] = {
+            'scope': _registered_namespaces[namespace],
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+
+    total = total_hits + total_misses
+    return {
+        'backend': settings.CACHES['default']['BACKEND'],
+        'hits': total_hits,
+        'misses': total_misses,
+        'hit_rate': round(total_hits / total, 4) if total else None,
+        'namespaces': stats,
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many([
+        _stats_key(namespace, outcome)
+        for namespace in _registered_namespaces
+        for outcome in ('hits', 'misses')
+    ])
@@ -0,0 +1,102 @@
+"""
+Negotiated compression of API responses.
+
+Large lists (workers, exposure readings, the protocol tree, expiring
+products) travel over slow mining-site links.  ``CompressionMiddleware``
+compresses responses of at least ``API_COMPRESSION_MIN_SIZE`` bytes with
+brotli when the client accepts it and the ``brotli`` package is installed,
+otherwise with gzip.  Like Django's ``GZipMiddleware`` it skips streaming
+and already encoded responses, keeps the result only when it is smaller,
+adds ``Vary: Accept-Encoding`` and weakens strong ETags.  Gzip output gets
+the same BREACH mitigation (random filename bytes) as ``GZipMiddleware``.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Quality 5 keeps brotli faster than gzip -6 while compressing better.
+BROTLI_QUALITY = 5
+
+
+def _enabled():
+    return getattr(settings, 'API_COMPRESSION', True)
+
+
+def _min_size():
+    return getattr(settings, 'API_COMPRESSION_MIN_SIZE', 1024)
+
+
+def parse_accept_encoding(header):
+    """``{coding: quality}`` of an ``Accept-Encoding`` header."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """Best supported coding accepted by the client, or ``None``."""
+    accepted = parse_accept_encoding(header or '')
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0.0
+    for coding in supported:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=GZipMiddleware.max_random_bytes)
+
+
+class CompressionMiddleware:
+    """Compress large responses with brotli or gzip, as negotiated."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not _enabled()
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < _min_size()
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
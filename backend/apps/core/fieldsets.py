@@ -0,0 +1,263 @@
+"""
+Sparse fieldsets: ``?fields=`` / ``?omit=`` pushed down to the queryset.
+
+Mobile list screens show a handful of columns of serializers built with
+``fields = '__all__'`` and many derived fields.  The renderer already trims
+the response to ``?fields=`` (apps.core.renderers); views using
+``SparseFieldsetsMixin`` also avoid computing and loading what is dropped::
+
+    GET /api/v1/occupational-health/workers/?fields=id,full_name,enterprise_name
+    GET /api/v1/inventory/products/?omit=indication,contraindications,side_effects
+
+* the serializer loses the fields that are not requested (or are omitted),
+  so nested serializers and derived fields are not computed;
+* the sources of the remaining fields are resolved to model paths
+  (``enterprise.name`` → ``enterprise__name``, ``get_sector_display`` →
+  ``sector``) and the queryset only loads those columns, keeping only the
+  ``select_related`` joins and prefetches they traverse.
+
+Properties and methods are resolved through the ``FIELD_DEPENDENCIES``
+declared on their model::
+
+    class Worker(models.Model):
+        FIELD_DEPENDENCIES = {'full_name': ['first_name', 'last_name']}
+
+When a remaining field reads something that cannot be resolved (method
+field, undeclared property, ``source='*'``), the queryset is left as is:
+the payload is still trimmed but every column is loaded, as without
+``?fields=``.  Only safe methods are affected; writes always use the full
+serializer.
+"""
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+
+from .annotations import AnnotatedFieldMixin
+from .renderers import FIELDS_PARAM, OMIT_PARAM
+
+_DISPLAY_METHOD = re.compile(r'get_(\w+)_display')
+
+
+def requested_fieldset(request):
+    """``(fields, omit)`` of a GET request, or ``None`` when the full representation is asked."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields = [name for name in params.get(FIELDS_PARAM, '').split(',') if name]
+    omit = [name for name in params.get(OMIT_PARAM, '').split(',') if name]
+    if not fields and not omit:
+        return None
+    return fields, omit
+
+
+def prune_serializer(serializer, fields=(), omit=()):
+    """Drop the fields of ``serializer`` not in ``fields`` or in ``omit``."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    for name in list(serializer.fields):
+        if (fields and name not in fields) or name in omit:
+            serializer.fields.pop(name)
+    return serializer
+
+
+def _is_to_many(field):
+    """Relations that are prefetched (or queried) rather than joined."""
+    return field.many_to_many or field.one_to_many or (field.one_to_one and not field.concrete)
+
+
+def resolve_source(model, attrs):
+    """
+    Model paths read when following ``attrs`` from an instance of ``model``.
+
+    Walks forward relations, stops at to-many and reverse relations (their
+    path is returned), and expands ``FIELD_DEPENDENCIES``.  ``None`` when an
+    attribute cannot be resolved.
+    """
+    path = []
+    for position, attr in enumerate(attrs):
+        display = _DISPLAY_METHOD.fullmatch(attr)
+        if display:
+            attr = display.group(1)
+        if attr == 'pk':
+            attr = model._meta.pk.name
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            declared = getattr(model, 'FIELD_DEPENDENCIES', {}).get(attr)
+            if declared is None or position + 1 < len(attrs):
+                return None
+            paths = set()
+            for dependency in declared:
+                resolved = resolve_source(model, dependency.split(LOOKUP_SEP))
+                if resolved is None:
+                    return None
+                paths.update(LOOKUP_SEP.join(path + [each]) for each in resolved)
+            return paths
+
+        path.append(field.name)
+        if not field.is_relation or position + 1 == len(attrs) or _is_to_many(field):
+            return {LOOKUP_SEP.join(path)}
+        if field.related_model is None:  # generic foreign key
+            return None
+        model = field.related_model
+    return {LOOKUP_SEP.join(path)} if path else set()
+
+
+def serializer_paths(serializer, model, annotations=()):
+    """
+    Model paths read by the fields of ``serializer``, or ``None`` if unknown.
+
+    ``annotations`` are the queryset annotations: annotated fields served
+    from them read no column.
+    """
+    paths = set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, AnnotatedFieldMixin) and field.annotation_name in annotations:
+            continue
+        if field.source == '*':
+            if not isinstance(field, serializers.ModelSerializer):
+                return None
+            resolved = serializer_paths(field, model)
+        else:
+            resolved = resolve_source(model, field.source_attrs)
+        if resolved is None:
+            return None
+
+        if isinstance(field, serializers.ModelSerializer) and field.source != '*':
+            # Nested object: the columns its own fields read.
+            if len(resolved) != 1:
+                return None
+            (relation,) = resolved
+            if not _crosses_to_many(model, relation):
+                nested = serializer_paths(field, field.Meta.model)
+                if nested is None:
+                    return None
+                resolved = {LOOKUP_SEP.join([relation, each]) for each in nested} | {relation}
+        elif isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer):
+            return None
+        elif isinstance(field, serializers.RelatedField) and not isinstance(
+            field, serializers.PrimaryKeyRelatedField
+        ):
+            # Slug/string related fields read the related object.
+            return None
+        paths.update(resolved)
+    return paths
+
+
+def _walk(model, path):
+    """``(forward relations traversed, column, to-many root)`` of a model path."""
+    parts = path.split(LOOKUP_SEP)
+    relations = []
+    for position, part in enumerate(parts):
+        field = model._meta.get_field(part)
+        prefix = LOOKUP_SEP.join(parts[:position + 1])
+        if field.is_relation and _is_to_many(field):
+            return relations, None, prefix
+        if not field.is_relation or position + 1 == len(parts):
+            return relations, prefix, None
+        relations.append(prefix)
+        model = field.related_model
+    return relations, None, None
+
+
+def _crosses_to_many(model, path):
+    return _walk(model, path)[2] is not None
+
+
+def _select_related_paths(select_related, prefix=''):
+    paths = set()
+    for name, nested in select_related.items():
+        path = prefix + name
+        paths.add(path)
+        paths.update(_select_related_paths(nested, path + LOOKUP_SEP))
+    return paths
+
+
+def _ordering_paths(queryset):
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return [item.lstrip('-') for item in ordering if isinstance(item, str) and item != '?']
+
+
+def prune_queryset(queryset, paths):
+    """Load only ``paths`` (and the ordering), with the joins and prefetches they need."""
+    walked = []
+    for path in set(paths) | set(_ordering_paths(queryset)):
+        try:
+            walked.append(_walk(queryset.model, path))
+        except FieldDoesNotExist:
+            # Annotations (search rank...) are not columns.
+            continue
+
+    select_related = queryset.query.select_related
+    needed_joins = {relation for relations, _, _ in walked for relation in relations}
+    if select_related is True:
+        joins = needed_joins
+    elif select_related:
+        joins = needed_joins & _select_related_paths(select_related)
+    else:
+        joins = set()
+
+    only = {queryset.model._meta.pk.name}
+    roots = set()
+    for relations, column, root in walked:
+        for relation in relations:
+            only.add(relation)
+            if relation not in joins:
+                # Not joined: the row keeps the foreign key, the rest loads lazily as before.
+                break
+        else:
+            if column is not None:
+                only.add(column)
+            if root is not None:
+                roots.add(root)
+
+    def needed(lookup):
+        lookup = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+        return any(
+            lookup == root or lookup.startswith(root + LOOKUP_SEP) or root.startswith(lookup + LOOKUP_SEP)
+            for root in roots
+        )
+
+    prefetches = [lookup for lookup in queryset._prefetch_related_lookups if needed(lookup)]
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if joins:
+        queryset = queryset.select_related(*sorted(joins))
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset.only(*only)
+
+
+class SparseFieldsetsMixin:
+    """
+    Generic view mixin serving ``?fields=`` / ``?omit=`` with a pruned
+    serializer and queryset.
+
+    Applied in ``filter_queryset`` after the other queryset mixins
+    (``QuerysetProfileMixin``, ``AnnotatedFieldsMixin``), so it must come
+    first in the bases.
+    """
+
+    def get_sparse_fieldset(self):
+        return requested_fieldset(self.request)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            prune_serializer(serializer, *fieldset)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None:
+            return queryset
+        paths = serializer_paths(self.get_serializer(), queryset.model, queryset.query.annotations)
+        if paths is None:
+            return queryset
+        return prune_queryset(queryset, paths)
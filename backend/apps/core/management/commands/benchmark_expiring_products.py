@@ -0,0 +1,116 @@
+"""
+benchmark_expiring_products — expiring products report latency.
+
+Fills one organization with synthetic products, stock and dated batches,
+then times the 30-day report as computed so far (every available batch
+loaded and filtered in Python on the earliest of batch and product expiry)
+against the indexed ``effective_expiry`` query of
+``apps.inventory.expiry``: its first page (``?limit=100``) and the whole
+report.  Fixtures are rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_expiring_products
+    python manage.py benchmark_expiring_products --products 5000 --batches 20 --iterations 5
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.inventory import expiry
+from apps.inventory.models import Product, InventoryItem, InventoryBatch, effective_expiry
+from apps.organizations.models import Organization
+
+DAYS = 30
+PAGE_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the expiring products report: Python filtering vs indexed effective expiry'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--batches', type=int, default=20, help='Batches per product')
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        today = timezone.now().date()
+        cutoff_date = today + timedelta(days=DAYS)
+        with rolled_back():
+            organization = self._fixtures(options['products'], options['batches'], today)
+            rows = expiry.expiring_rows(organization, expiry.SCOPE_WINDOW, today, cutoff_date)
+            self.stdout.write(
+                f"{options['products'] * options['batches']} batches, {rows.count()} expiring "
+                f'within {DAYS} days, {iterations} iterations'
+            )
+            self.stdout.write(format_result(
+                'python filter', measure(lambda: self._python_filter(organization, today, cutoff_date), iterations),
+            ))
+            self.stdout.write(format_result(
+                f'indexed, first {PAGE_SIZE}',
+                measure(lambda: [expiry.format_row(row, today) for row in rows[:PAGE_SIZE]], iterations),
+            ))
+            self.stdout.write(format_result(
+                'indexed, full report',
+                measure(lambda: [expiry.format_row(row, today) for row in rows.iterator(chunk_size=2000)], iterations),
+            ))
+
+    def _python_filter(self, organization, today, cutoff_date):
+        """The report's batch side before ``effective_expiry`` was stored."""
+        batches = InventoryBatch.objects.filter(
+            status='AVAILABLE', expiry_date__isnull=False, current_quantity__gt=0,
+            inventory_item__organization=organization,
+        ).select_related('inventory_item__product')
+        results = []
+        for batch in batches:
+            date = effective_expiry(batch.expiry_date, batch.inventory_item.product.expiration_date)
+            if date is not None and date <= cutoff_date:
+                results.append((date, batch.pk, batch.batch_number, (date - today).days))
+        results.sort()
+        return results
+
+    def _fixtures(self, products, batches, today):
+        rng = random.Random(42)
+        organization = Organization.objects.create(
+            name='Pharmacie Benchmark', type='pharmacy', registration_number='BENCH-EXPIRY',
+            address='1 Avenue du Commerce', city='Lubumbashi', phone='+243800000000',
+            email='benchmark@example.cd', director_name='Benchmark',
+        )
+        product_rows = [
+            Product(
+                organization=organization, name=f'Produit {i}', sku=f'EXP{i:07d}',
+                selling_price=Decimal(rng.randrange(100, 50000)),
+                # A tenth of the products carry their own (shorter) expiration date.
+                expiration_date=today + timedelta(days=rng.randrange(-30, 365)) if i % 10 == 0 else None,
+            )
+            for i in range(products)
+        ]
+        Product.objects.bulk_create(product_rows, batch_size=5000)
+        items = [
+            InventoryItem(
+                product=product, organization=organization, facility_id='main',
+                quantity_on_hand=batches * 10, quantity_available=batches * 10,
+            )
+            for product in product_rows
+        ]
+        InventoryItem.objects.bulk_create(items, batch_size=5000)
+
+        batch_rows = []
+        for item, product in zip(items, product_rows):
+            for j in range(batches):
+                expiry_date = today + timedelta(days=rng.randrange(-60, 720))
+                batch_rows.append(InventoryBatch(
+                    inventory_item=item, batch_number=f'L{j:03d}', received_date=today,
+                    expiry_date=expiry_date,
+                    # bulk_create skips save(): derive the stored date here.
+                    effective_expiry=effective_expiry(expiry_date, product.expiration_date),
+                    initial_quantity=10, current_quantity=rng.choice([0, 10, 10, 10]),
+                    unit_cost=Decimal('100.00'),
+                    status=rng.choice(['AVAILABLE'] * 8 + ['QUARANTINE', 'EXPIRED']),
+                ))
+        InventoryBatch.objects.bulk_create(batch_rows, batch_size=5000)
+        return organization
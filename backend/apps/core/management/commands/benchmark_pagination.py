@@ -0,0 +1,112 @@
+"""
+benchmark_pagination — Page latency by depth, OFFSET vs keyset.
+
+Fills the audit log of a throwaway organization, then times page-number
+pagination (COUNT(*) + OFFSET) and keyset pagination at increasing depths,
+plus exact vs estimated counts.  Fixtures are rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_pagination
+    python manage.py benchmark_pagination --rows 200000 --iterations 20
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.audit.models import AuditLog
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.core.pagination import KeysetPagination, estimate_count
+from apps.organizations.models import Organization
+
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Benchmark OFFSET and keyset pagination at increasing page depths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+        # Any allowed host will do, keyset links are built from the request URL.
+        factory = APIRequestFactory(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+
+        with rolled_back():
+            organization = self._fixtures(rows)
+            queryset = AuditLog.objects.filter(organization=organization)
+            last_page = rows // PAGE_SIZE
+            depths = sorted({1, 10, 100, last_page // 2, last_page} - {0})
+
+            self.stdout.write(f'{rows} audit log rows, {PAGE_SIZE} per page, {iterations} iterations')
+            for page in depths:
+                cursor = self._cursor_for(queryset, factory, (page - 1) * PAGE_SIZE)
+                self.stdout.write(format_result(
+                    f'page {page}: OFFSET',
+                    measure(self._offset_page(queryset, factory, page), iterations),
+                ))
+                self.stdout.write(format_result(
+                    f'page {page}: keyset',
+                    measure(self._keyset_page(queryset, factory, cursor), iterations),
+                ))
+
+            self.stdout.write(format_result('COUNT(*)', measure(queryset.count, iterations)))
+            self.stdout.write(format_result(
+                'planner estimate', measure(lambda: estimate_count(queryset), iterations),
+            ))
+            self.stdout.write(f'exact {queryset.count()} / estimated {estimate_count(queryset)}')
+
+    def _offset_page(self, queryset, factory, page):
+        def call():
+            paginator = PageNumberPagination()
+            paginator.page_size = PAGE_SIZE
+            request = Request(factory.get('/', {'page': page}))
+            return paginator.paginate_queryset(queryset, request)
+        return call
+
+    def _keyset_page(self, queryset, factory, cursor):
+        def call():
+            paginator = KeysetPagination()
+            paginator.page_size = PAGE_SIZE
+            params = {'cursor': cursor} if cursor else {}
+            return paginator.paginate_queryset(queryset, Request(factory.get('/', params)))
+        return call
+
+    def _cursor_for(self, queryset, factory, offset):
+        """Cursor pointing just before the row at ``offset`` (untimed)."""
+        if offset == 0:
+            return None
+        paginator = KeysetPagination()
+        paginator.paginate_queryset(queryset, Request(factory.get('/')))
+        previous = queryset.order_by('-timestamp', '-id')[offset - 1]
+        url = paginator.encode_cursor(previous)
+        return url.split('cursor=', 1)[1]
+
+    def _fixtures(self, rows):
+        stamp = timezone.now()
+        organization = Organization.objects.create(
+            name='Benchmark Pagination', type='pharmacy',
+            registration_number=f'BENCH-PAGE-{stamp.timestamp()}', address='-', city='Lubumbashi',
+            phone='+243990000004', email='bench-page@example.cd', director_name='Bench',
+        )
+        batch = []
+        for i in range(rows):
+            batch.append(AuditLog(
+                organization=organization, action='VIEW', description='benchmark',
+                timestamp=stamp - timedelta(seconds=i // 3),
+            ))
+            if len(batch) == 5000:
+                AuditLog.objects.bulk_create(batch)
+                batch = []
+        AuditLog.objects.bulk_create(batch)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {AuditLog._meta.db_table}')
+        return organization
@@ -0,0 +1,93 @@
+"""
+benchmark_product_lookup — POS product typeahead latency.
+
+Fills one organization with synthetic products and stock, then times, for a
+few typical prefixes, the product list search the POS used so far
+(``PRODUCT_SEARCH.filter`` + ``ProductSerializer`` with its joins) and the
+in-memory prefix index of ``apps.inventory.lookup``.  Fixtures are rolled
+back afterwards.
+
+Usage:
+    python manage.py benchmark_product_lookup
+    python manage.py benchmark_product_lookup --rows 50000 --iterations 200
+"""
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.inventory import lookup
+from apps.inventory.models import Product, InventoryItem, PRODUCT_SEARCH
+from apps.inventory.serializers import ProductSerializer
+from apps.organizations.models import Organization
+
+MOLECULES = [
+    'Amoxicilline', 'Paracétamol', 'Ibuprofène', 'Métronidazole', 'Artéméther',
+    'Quinine', 'Ciprofloxacine', 'Oméprazole', 'Cotrimoxazole', 'Doxycycline',
+    'Fluconazole', 'Salbutamol', 'Métformine', 'Amlodipine', 'Diclofénac',
+]
+STRENGTHS = ['100mg', '250mg', '500mg', '1g', '5ml']
+QUERIES = ['am', 'parac', 'metro', 'SKU00042', '6150000012']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the POS product lookup: list search vs in-memory prefix index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=100)
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+        with rolled_back():
+            organization = self._fixtures(rows)
+            lookup.clear_local_indexes()
+            build = measure(lambda: lookup.OrganizationIndex(organization.pk).build((0, 0)), 3)
+            self.stdout.write(f'{rows} products, first 20 matches, {iterations} iterations')
+            self.stdout.write(format_result('index build', build))
+            lookup.get_index(organization.pk)
+            for query in QUERIES:
+                self.stdout.write(format_result(
+                    f'{query!r}: list search', measure(self._listed(organization, query), iterations),
+                ))
+                self.stdout.write(format_result(
+                    f'{query!r}: prefix index', measure(self._indexed(organization, query), iterations),
+                ))
+        lookup.clear_local_indexes()
+
+    def _listed(self, organization, query):
+        queryset = Product.objects.select_related(
+            'organization', 'primary_supplier', 'created_by', 'updated_by',
+        ).filter(organization=organization).order_by('name')
+        return lambda: ProductSerializer(PRODUCT_SEARCH.filter(queryset, query)[:20], many=True).data
+
+    def _indexed(self, organization, query):
+        return lambda: [entry.as_dict() for entry in lookup.lookup(organization.pk, query)]
+
+    def _fixtures(self, rows):
+        rng = random.Random(42)
+        organization = Organization.objects.create(
+            name='Pharmacie Benchmark', type='pharmacy', registration_number='BENCH-LOOKUP',
+            address='1 Avenue du Commerce', city='Lubumbashi', phone='+243800000000',
+            email='benchmark@example.cd', director_name='Benchmark',
+        )
+        products = [
+            Product(
+                organization=organization,
+                name=f'{rng.choice(MOLECULES)} {rng.choice(STRENGTHS)} #{i}',
+                sku=f'SKU{i:07d}', barcode=f'615{i:010d}',
+                selling_price=Decimal(rng.randrange(100, 50000)),
+            )
+            for i in range(rows)
+        ]
+        Product.objects.bulk_create(products, batch_size=5000)
+        items = []
+        for product in products:
+            quantity = rng.randrange(0, 500)
+            items.append(InventoryItem(
+                product=product, organization=organization, facility_id='main',
+                quantity_on_hand=quantity, quantity_available=quantity,
+            ))
+        InventoryItem.objects.bulk_create(items, batch_size=5000)
+        return organization
@@ -0,0 +1,83 @@
+"""
+benchmark_renderers — JSON rendering time and bytes on the wire.
+
+Serializes a page of synthetic workers with ``WorkerListSerializer`` and
+times DRF's ``JSONRenderer`` against ``FastJSONRenderer`` (orjson), for the
+regular and the columnar (``?columnar=true``) layouts, then reports the
+response size uncompressed, gzipped and, when the ``brotli`` package is
+installed, brotli-compressed.  Fixtures are rolled back afterwards.
+
+Usage:
+    python manage.py benchmark_renderers
+    python manage.py benchmark_renderers --rows 5000 --iterations 50
+"""
+import random
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.core import compression, renderers
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.occupational_health.models import Enterprise, Worker
+from apps.occupational_health.serializers import WorkerListSerializer
+
+FIRST_NAMES = ['Hélène', 'Jean', 'Marie', 'Joseph', 'Françoise', 'Patrick', 'Chantal', 'Aimé']
+LAST_NAMES = ['Mukendi', 'Kabila', 'Ilunga', 'Kasongo', 'Mbuyi', 'Ngoy', 'Kalala', 'Mwamba']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering (json vs orjson, columnar) and compressed sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson unavailable: FastJSONRenderer falls back to json'))
+
+        with rolled_back():
+            self._fixtures(rows)
+            workers = Worker.objects.select_related('enterprise', 'work_site')
+            data = list(WorkerListSerializer(workers, many=True).data)
+
+        layouts = {'rows': data, 'columnar': renderers.to_columns(data)}
+        self.stdout.write(f'{rows} workers (WorkerListSerializer), {iterations} iterations')
+        for layout, payload in layouts.items():
+            self.stdout.write(format_result(
+                f'{layout}: JSONRenderer', measure(lambda: JSONRenderer().render(payload), iterations),
+            ))
+            self.stdout.write(format_result(
+                f'{layout}: FastJSONRenderer',
+                measure(lambda: renderers.FastJSONRenderer().render(payload), iterations),
+            ))
+
+        encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+        for layout, payload in layouts.items():
+            content = renderers.FastJSONRenderer().render(payload)
+            sizes = [f'identity {len(content):>9} B']
+            sizes.extend(
+                f'{encoding} {len(compression.compress(content, encoding)):>9} B' for encoding in encodings
+            )
+            self.stdout.write(f'{layout + " size":<40} ' + '   '.join(sizes))
+
+    def _fixtures(self, rows):
+        rng = random.Random(42)
+        enterprise = Enterprise.objects.create(
+            name='Minière Benchmark', sector='mining', rccm='RCCM-BENCH-RENDER',
+            nif='NIF-BENCH-RENDER', address='Route de Likasi', contact_person='Benchmark',
+            phone='+243800000000', email='benchmark@mine.cd', contract_start_date=date.today(),
+        )
+        Worker.objects.bulk_create([
+            Worker(
+                employee_id=f'BR{i:06d}', first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES), date_of_birth=date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+                gender='male' if i % 3 else 'female', enterprise=enterprise,
+                job_category='machine_operator', job_title='Opérateur', hire_date=date(2015, 1, 1),
+                phone='+243123456789', address='Cité Gécamines',
+                emergency_contact_name='Contact', emergency_contact_phone='+243987654321',
+            )
+            for i in range(rows)
+        ], batch_size=2000)
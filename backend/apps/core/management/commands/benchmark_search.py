@@ -0,0 +1,88 @@
+"""
+benchmark_search — Patient search latency, icontains OR vs trigram index.
+
+Fills the patients table with synthetic French/Congolese names, then times
+the historical ``icontains`` OR across five columns and
+``PATIENT_SEARCH.filter`` (ranked, accent-insensitive, trigram GIN index)
+for a few typical queries.  Fixtures are rolled back afterwards.
+
+On a database without ``pg_trgm``/``unaccent`` both columns measure the
+icontains fallback.
+
+Usage:
+    python manage.py benchmark_search
+    python manage.py benchmark_search --rows 100000 --iterations 20
+"""
+import random
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from apps.core.benchmark import rolled_back, measure, format_result
+from apps.core.search import search_index_available
+from apps.patients.models import Patient, PATIENT_SEARCH
+
+FIRST_NAMES = [
+    'Hélène', 'Jean', 'Marie', 'Joseph', 'Françoise', 'Patrick', 'Chantal', 'Aimé',
+    'Thérèse', 'Didier', 'Béatrice', 'Serge', 'Noëlle', 'Crispin', 'Mélanie', 'Olivier',
+]
+LAST_NAMES = [
+    'Mukendi', 'Kabila', 'Ilunga', 'Tshisekedi', 'Kasongo', 'Mbuyi', 'Ngoy', 'Kalala',
+    'Lumumba', 'Mwamba', 'Banza', 'Kabeya', 'Lefèvre', 'Ngalula', 'Tshibangu', 'Mulumba',
+]
+QUERIES = ['helene', 'mukendi', 'jean kasongo', 'PAT0420', '0812']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark patient search: icontains OR vs trigram/unaccent index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000)
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows, iterations = options['rows'], options['iterations']
+        if not search_index_available(connection):
+            self.stdout.write(self.style.WARNING(
+                'pg_trgm/unaccent unavailable: the index path falls back to icontains'
+            ))
+
+        with rolled_back():
+            self._fixtures(rows)
+            self.stdout.write(f'{rows} patients, first 20 matches, {iterations} iterations')
+            for query in QUERIES:
+                self.stdout.write(format_result(
+                    f'{query!r}: icontains OR', measure(self._legacy(query), iterations),
+                ))
+                self.stdout.write(format_result(
+                    f'{query!r}: search index', measure(self._indexed(query), iterations),
+                ))
+
+    def _legacy(self, query):
+        condition = reduce(or_, (Q(**{f'{field}__icontains': query}) for field in PATIENT_SEARCH.fields))
+        return lambda: list(Patient.objects.filter(condition).order_by('-created_at')[:20])
+
+    def _indexed(self, query):
+        return lambda: list(PATIENT_SEARCH.filter(Patient.objects.all(), query)[:20])
+
+    def _fixtures(self, rows):
+        rng = random.Random(42)
+        batch = []
+        for i in range(rows):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            batch.append(Patient(
+                patient_number=f'PAT{i:07d}', first_name=first, last_name=f'{last}{i % 997}',
+                date_of_birth=date(1950 + i % 60, 1 + i % 12, 1 + i % 28), gender='female',
+                phone=f'+24381{rng.randrange(10 ** 7):07d}', email=f'patient{i}@example.cd',
+            ))
+            if len(batch) == 5000:
+                Patient.objects.bulk_create(batch)
+                batch = []
+        Patient.objects.bulk_create(batch)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Patient._meta.db_table}')
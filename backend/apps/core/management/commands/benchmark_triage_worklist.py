@@ -0,0 +1,140 @@
+"""
+benchmark_triage_worklist — concurrent load test of the triage worklist.
+
+Queues synthetic triaged patients in one organization, then lets several
+clinicians (threads, each with its own database connection) take the next
+patient (``apps.hospital.worklist.next_patient``) until the queue is empty.
+Reports the latency of a claim and the throughput, and checks that every
+patient was claimed exactly once and in priority order per clinician.
+
+The threads need committed data, so unlike the other benchmarks the
+fixtures are committed and deleted afterwards.
+
+Usage:
+    python manage.py benchmark_triage_worklist
+    python manage.py benchmark_triage_worklist --patients 5000 --clinicians 16
+"""
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.core.benchmark import summarize, format_result
+from apps.hospital import worklist
+from apps.hospital.models import HospitalDepartment, Triage
+from apps.organizations.models import Organization
+from apps.patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = 'Load test the triage worklist: concurrent clinicians taking the next patient'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000)
+        parser.add_argument('--clinicians', type=int, default=8)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        organization, clinicians = self._fixtures(tag, options['patients'], options['clinicians'])
+        try:
+            claims, timings, elapsed = self._run(organization, clinicians)
+        finally:
+            self._cleanup(organization, tag)
+
+        claimed = [triage_id for clinician_claims in claims for triage_id, _ in clinician_claims]
+        if len(claimed) != options['patients'] or len(set(claimed)) != len(claimed):
+            raise CommandError(
+                f'{len(claimed)} claims for {options["patients"]} patients, {len(set(claimed))} distinct'
+            )
+        for clinician_claims in claims:
+            keys = [key for _, key in clinician_claims]
+            if keys != sorted(keys):
+                raise CommandError('A clinician got patients out of priority order')
+
+        self.stdout.write(
+            f"{options['patients']} patients, {options['clinicians']} clinicians: "
+            f'{len(claimed) / elapsed:.0f} claims/s, no double claims'
+        )
+        self.stdout.write(format_result('next patient', summarize(timings, 2)))
+
+    def _run(self, organization, clinicians):
+        claims = [[] for _ in clinicians]
+        timings = []
+        timings_lock = threading.Lock()
+        start_barrier = threading.Barrier(len(clinicians))
+
+        def clinician(position, user):
+            local = []
+            try:
+                start_barrier.wait()
+                while True:
+                    start = time.perf_counter()
+                    triage = worklist.next_patient(organization, user)
+                    local.append(time.perf_counter() - start)
+                    if triage is None:
+                        break
+                    claims[position].append((triage.pk, (triage.queue_priority, triage.queued_at)))
+            finally:
+                connection.close()
+                with timings_lock:
+                    timings.extend(local)
+
+        threads = [
+            threading.Thread(target=clinician, args=(position, user))
+            for position, user in enumerate(clinicians)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return claims, timings, time.perf_counter() - started
+
+    def _fixtures(self, tag, patients, clinicians):
+        rng = random.Random(42)
+        organization = Organization.objects.create(
+            name=f'Hôpital Benchmark {tag}', type='hospital', registration_number=f'BENCH-TRIAGE-{tag}',
+            address='1 Avenue de la Santé', city='Lubumbashi', phone='+243800000000',
+            email=f'triage.{tag}@example.cd', director_name='Benchmark',
+        )
+        HospitalDepartment.objects.create(organization=organization, name='Urgences', code=f'URG-{tag}')
+        users = [
+            User.objects.create(
+                phone=f'+2439{tag[:4]}{i:04d}', email=f'clinician{i}.{tag}@example.cd',
+                first_name='Clinicien', last_name=str(i), primary_role='doctor', organization=organization,
+            )
+            for i in range(clinicians)
+        ]
+        people = Patient.objects.bulk_create([
+            Patient(
+                first_name='Patient', last_name=str(i), date_of_birth=date(1980, 1, 1), gender='male',
+                patient_number=f'BT{tag}{i:06d}',
+            )
+            for i in range(patients)
+        ])
+        now = timezone.now()
+        triages = []
+        for i, patient in enumerate(people):
+            level = rng.choice([1, 2, 3, 3, 3, 4, 4, 5])
+            queued_at = now - timedelta(minutes=rng.randrange(0, 240))
+            # bulk_create skips save(): set the queue key here.
+            triages.append(Triage(
+                triage_number=f'TRB{tag}{i:06d}', patient=patient, organization=organization,
+                chief_complaint='Benchmark', triage_level=level, queue_priority=level,
+                queued_at=queued_at, arrival_time=queued_at, status='completed',
+            ))
+        Triage.objects.bulk_create(triages, batch_size=2000)
+        return organization, users
+
+    def _cleanup(self, organization, tag):
+        Triage.objects.filter(organization=organization).delete()
+        Patient.objects.filter(patient_number__startswith=f'BT{tag}').delete()
+        HospitalDepartment.objects.filter(organization=organization).delete()
+        User.objects.filter(organization=organization).delete()
+        organization.delete()
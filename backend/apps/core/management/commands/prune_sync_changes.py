@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core.models import SyncChange
+from apps.core.sync import current_sequence
+
+
+class Command(BaseCommand):
+    help = 'Delete old delta sync changes (clients behind them get reset: true)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Number of days of changes to retain (default: 90)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would be deleted without actually deleting',
+        )
+
+    def handle(self, *args, **options):
+        cutoff_date = timezone.now() - timedelta(days=options['days'])
+        # The latest change is always kept: its sequence tells clients whose
+        # sequence predates the retained changes that they must reset.
+        query = SyncChange.objects.filter(changed_at__lt=cutoff_date, sequence__lt=current_sequence())
+        count = query.count()
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: Would delete {count} sync changes'))
+            return
+
+        query.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {count} sync changes older than {cutoff_date.date()}'
+        ))
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+EXTENSIONS = ('pg_trgm', 'unaccent')
+
+# unaccent() is only STABLE (its dictionary could change), which rules it out
+# of index expressions; the wrapper pins the dictionary and is IMMUTABLE.
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+"""
+DROP_FUNCTION = "DROP FUNCTION IF EXISTS immutable_unaccent(text)"
+
+
+def create_search_support(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_available_extensions WHERE name = ANY(%s)',
+            [list(EXTENSIONS)],
+        )
+        if cursor.fetchone()[0] < len(EXTENSIONS):
+            # Server built without the contrib modules: search keeps using
+            # icontains (see apps.core.search.search_index_available).
+            return
+    for extension in EXTENSIONS:
+        schema_editor.execute(f'CREATE EXTENSION IF NOT EXISTS {extension} SCHEMA public')
+    schema_editor.execute(CREATE_FUNCTION)
+
+
+def drop_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_FUNCTION)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.RunPython(create_search_support, drop_search_support),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_search_extensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(help_text='Nom de synchronisation du modèle', max_length=50)),
+                ('object_id', models.CharField(max_length=64)),
+                ('organization_id', models.UUIDField(blank=True, help_text='Vide pour les données partagées', null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Modification synchronisée',
+                'verbose_name_plural': 'Modifications synchronisées',
+                'db_table': 'sync_changes',
+                'indexes': [models.Index(fields=['model', 'organization_id', 'id'], name='sync_changes_feed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_syncchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommitSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Séquence de validation',
+                'verbose_name_plural': 'Séquences de validation',
+                'db_table': 'commit_sequences',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    # Existing rows keep their id as sequence, so clients' cursors stay valid.
+    SyncChange = apps.get_model('core', 'SyncChange')
+    CommitSequence = apps.get_model('core', 'CommitSequence')
+    SyncChange.objects.update(sequence=F('id'))
+    CommitSequence.objects.update_or_create(
+        name='sync',
+        defaults={'value': SyncChange.objects.aggregate(value=Max('id'))['value'] or 0},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_commit_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncchange',
+            name='sequence',
+            field=models.PositiveBigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='syncchange',
+            name='sync_changes_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['model', 'organization_id', 'sequence'], name='sync_changes_seq_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(condition=models.Q(('sequence__isnull', True)), fields=['id'], name='sync_changes_pending_idx'),
+        ),
+    ]
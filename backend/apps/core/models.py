@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class CommitSequence(models.Model):
+    """
+    Counter numbering change log rows in commit order (apps.core.sequence).
+    One row per log, locked while a batch of committed rows is numbered.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'commit_sequences'
+        verbose_name = 'Séquence de validation'
+        verbose_name_plural = 'Séquences de validation'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class SyncChange(models.Model):
+    """
+    Append-only change feed of the models registered with apps.core.sync.
+    ``sequence`` is numbered in commit order once the writer's transaction
+    commits (apps.core.sequence): it only ever grows, so mobile clients ask
+    for the rows changed since the sequence they hold.
+    Rows are written by signals, never edited by hand.
+    """
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=50, help_text='Nom de synchronisation du modèle')
+    object_id = models.CharField(max_length=64)
+    organization_id = models.UUIDField(null=True, blank=True, help_text='Vide pour les données partagées')
+    deleted = models.BooleanField(default=False)
+    sequence = models.PositiveBigIntegerField(null=True, blank=True, unique=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'sync_changes'
+        verbose_name = 'Modification synchronisée'
+        verbose_name_plural = 'Modifications synchronisées'
+        indexes = [
+            models.Index(fields=['model', 'organization_id', 'sequence'], name='sync_changes_seq_feed_idx'),
+            models.Index(fields=['id'], condition=models.Q(sequence__isnull=True), name='sync_changes_pending_idx'),
+        ]
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"#{self.sequence} {self.model}:{self.object_id} {action}"
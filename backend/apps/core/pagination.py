@@ -0,0 +1,320 @@
+"""
+Keyset (cursor) pagination for high-volume lists.
+
+``PageNumberPagination`` runs ``COUNT(*)`` and ``OFFSET n`` on every page, so
+page 1000 of the audit log scans 20 000 rows before returning 20.  Keyset
+pagination instead remembers the ordering values and primary key of the
+last row and asks for the rows *after* it::
+
+    WHERE (movement_date < %s) OR (movement_date = %s AND id < %s)
+    ORDER BY movement_date DESC, id DESC
+    LIMIT 21
+
+which costs the same whatever the depth, using the ordering indexes.
+
+The ordering is the one of the filtered queryset (``OrderingFilter``,
+``.order_by()`` or ``Meta.ordering``) with the primary key appended as a
+tie-breaker.  Ordering on expressions is not supported; such querysets are
+paginated by primary key.
+
+Two classes are provided:
+
+* ``KeysetPagination`` — always keyset, opt in with
+  ``pagination_class = KeysetPagination``;
+* ``OptionalKeysetPagination`` — the default page-number pagination unless
+  the client sends ``?cursor=`` (empty for the first page), so existing
+  clients are unaffected.
+
+Counts are omitted by default.  ``?count=estimate`` returns the planner's
+row estimate (PostgreSQL ``EXPLAIN``) instead of an exact ``COUNT(*)``,
+``?count=exact`` the exact count.
+"""
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder keeping full microsecond precision of datetimes."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+# Below this many estimated rows an exact COUNT(*) is cheap enough.
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """
+    Row count of ``queryset`` estimated by the query planner.
+
+    Falls back to ``COUNT(*)`` on databases other than PostgreSQL and for
+    small results, where planner estimates are least reliable.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on the queryset ordering plus primary key."""
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        self.ordering = self.get_ordering(queryset)
+        position = self.decode_cursor(request)
+        self.reverse = bool(position and position.get('r'))
+
+        ordered = queryset.order_by(*self._order_expressions(reverse=self.reverse))
+        if position is not None:
+            ordered = ordered.filter(self._after(position['v'], reverse=self.reverse))
+
+        rows = list(ordered[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.page = rows
+        return rows
+
+    # ── Configuration ────────────────────────────────────────
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    def get_ordering(self, queryset):
+        """
+        Resolve the queryset ordering to ``(lookup, attr_path, descending,
+        nullable)`` tuples ending with the primary key.
+        """
+        query = queryset.query
+        ordering = list(query.order_by) or (
+            list(query.get_meta().ordering) if query.default_ordering else []
+        )
+        opts = queryset.model._meta
+        resolved = []
+        for item in ordering:
+            if not isinstance(item, str) or item == '?':
+                return [self._pk_ordering(opts, descending=True)]
+            descending = item.startswith('-')
+            name = item.lstrip('-+')
+            if name == 'pk':
+                break
+            field_info = self._resolve_field(opts, name)
+            if field_info is None:
+                return [self._pk_ordering(opts, descending=True)]
+            lookup, attr_path, nullable = field_info
+            if lookup == opts.pk.attname:
+                break
+            resolved.append((lookup, attr_path, descending, nullable))
+        pk_descending = resolved[0][2] if resolved else True
+        resolved.append(self._pk_ordering(opts, descending=pk_descending))
+        return resolved
+
+    @staticmethod
+    def _pk_ordering(opts, descending):
+        return (opts.pk.attname, (opts.pk.attname,), descending, False)
+
+    @staticmethod
+    def _resolve_field(opts, name):
+        """Map an ordering name to a filterable lookup and attribute path."""
+        parts = name.split(LOOKUP_SEP)
+        attr_path = []
+        nullable = False
+        for index, part in enumerate(parts):
+            try:
+                field = opts.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            nullable = nullable or getattr(field, 'null', False)
+            last = index == len(parts) - 1
+            if field.is_relation:
+                if field.many_to_many or field.one_to_many:
+                    return None
+                if last:
+                    # Order by the foreign key value, not the related ordering.
+                    attr_path.append(field.attname)
+                    lookup = LOOKUP_SEP.join(parts[:-1] + [field.attname])
+                    return lookup, tuple(attr_path), nullable
+                attr_path.append(part)
+                opts = field.related_model._meta
+            elif not last:
+                return None
+            else:
+                attr_path.append(field.attname)
+        return name, tuple(attr_path), nullable
+
+    # ── Query building ───────────────────────────────────────
+
+    def _order_expressions(self, reverse):
+        expressions = []
+        for lookup, _, descending, nullable in self.ordering:
+            descending = descending != reverse
+            if not nullable:
+                # Plain ORDER BY keeps (backward) index scans usable.
+                expressions.append(f'-{lookup}' if descending else lookup)
+            elif descending:
+                expressions.append(F(lookup).desc(nulls_last=not reverse, nulls_first=reverse))
+            else:
+                expressions.append(F(lookup).asc(nulls_last=not reverse, nulls_first=reverse))
+        return expressions
+
+    def _after(self, values, reverse, index=0):
+        """Q matching rows that come after ``values`` in traversal order."""
+        lookup, _, descending, nullable = self.ordering[index]
+        value = values[index]
+        is_last = index == len(self.ordering) - 1
+        operator = 'lt' if descending != reverse else 'gt'
+        rest = Q() if is_last else self._after(values, reverse, index + 1)
+
+        # NULLs sort last when paging forward, first when paging back.
+        if value is None:
+            condition = Q(**{f'{lookup}__isnull': True}) & rest
+            if reverse:
+                condition |= Q(**{f'{lookup}__isnull': False})
+            return condition
+
+        condition = Q(**{f'{lookup}__{operator}': value})
+        if not is_last:
+            condition |= Q(**{lookup: value}) & rest
+        if nullable and not reverse:
+            condition |= Q(**{f'{lookup}__isnull': True})
+        elif index == 0 and not is_last:
+            # Redundant range on the leading column: the planner cannot turn
+            # the OR above into an index range scan on its own.
+            condition = Q(**{f'{lookup}__{operator}e': value}) & condition
+        return condition
+
+    # ── Cursors ──────────────────────────────────────────────
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if len(position['v']) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, obj, reverse=False):
+        values = []
+        for _, attr_path, _, _ in self.ordering:
+            value = obj
+            for attr in attr_path:
+                value = getattr(value, attr) if value is not None else None
+            values.append(value)
+        position = {'v': values}
+        if reverse:
+            position['r'] = 1
+        raw = json.dumps(position, cls=_CursorEncoder, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    # ── Response ─────────────────────────────────────────────
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to ``KeysetPagination`` when the
+    request carries a ``cursor`` parameter.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,177 @@
+"""
+Query budgets and N+1 detection.
+
+``QueryRecorder`` hooks ``connection.execute_wrapper`` (so it works with
+``DEBUG = False``) and records every SQL statement with its duration.
+Statements are grouped by *shape* — the SQL with parameters left as
+placeholders and ``IN (...)`` lists collapsed — and a shape executed
+``QUERY_BUDGET_DUPLICATE_THRESHOLD`` times or more in one request is the
+signature of an N+1 (a per-row lookup in a serializer).
+
+Views declare how many queries each action may run::
+
+    class WorkerViewSet(viewsets.ModelViewSet):
+        query_budgets = {'list': 8, 'retrieve': 12}
+
+Generic views without actions key the dict by HTTP method (``'get'``).
+
+Budgets are enforced in tests with ``QueryBudgetTestMixin`` and reported at
+runtime by ``QueryBudgetMiddleware``, which is opt-in: with
+``QUERY_BUDGET_HEADERS`` enabled, a sampled fraction of requests
+(``QUERY_BUDGET_SAMPLE_RATE``) gets ``X-Query-Count``/``X-DB-Time`` headers,
+and budget overruns or duplicated shapes are logged.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _duplicate_threshold():
+    return getattr(settings, 'QUERY_BUDGET_DUPLICATE_THRESHOLD', 5)
+
+
+def sql_shape(sql):
+    """Normalize ``sql`` so repeated per-row queries compare equal."""
+    sql = _WHITESPACE.sub(' ', sql.strip())
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """Record the queries executed on the given databases."""
+
+    def __init__(self, using=None):
+        self.aliases = [using] if using else list(connections)
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for alias in self.aliases:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration_ms(self):
+        return sum(duration for _, duration in self.queries) * 1000
+
+    def duplicates(self, threshold=None):
+        """``{shape: count}`` of shapes run at least ``threshold`` times."""
+        threshold = _duplicate_threshold() if threshold is None else threshold
+        shapes = Counter(sql_shape(sql) for sql, _ in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+def get_query_budget(view, request):
+    """Query budget declared by ``view`` for the current action, if any."""
+    budgets = getattr(view, 'query_budgets', None)
+    if not budgets:
+        return None
+    action = getattr(view, 'action', None) or request.method.lower()
+    return budgets.get(action)
+
+
+def _response_view(response):
+    context = getattr(response, 'renderer_context', None) or {}
+    return context.get('view')
+
+
+class QueryBudgetMiddleware:
+    """
+    Opt-in per-request query instrumentation.
+
+    Adds ``X-Query-Count`` and ``X-DB-Time`` (milliseconds) to sampled
+    responses and logs a warning when a request exceeds the budget of its
+    view or repeats a query shape.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _sampled(self):
+        if not getattr(settings, 'QUERY_BUDGET_HEADERS', False):
+            return False
+        rate = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 1.0)
+        return rate >= 1 or random.random() < rate
+
+    def __call__(self, request):
+        if not self._sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-DB-Time'] = f'{recorder.duration_ms:.1f}'
+
+        view = _response_view(response)
+        budget = get_query_budget(view, request) if view is not None else None
+        if budget is not None:
+            response['X-Query-Budget'] = str(budget)
+            if recorder.count > budget:
+                logger.warning(
+                    'Query budget exceeded: %s %s ran %d queries (budget %d)',
+                    request.method, request.path, recorder.count, budget,
+                )
+        for shape, count in recorder.duplicates().items():
+            logger.warning(
+                'Possible N+1 on %s %s: %d x %s', request.method, request.path, count, shape,
+            )
+        return response
+
+
+class QueryBudgetTestMixin:
+    """
+    Assertions for ``APITestCase`` subclasses.
+
+    ``assertWithinQueryBudget`` performs a request through ``self.client``
+    and fails if it exceeds the budget its view declares for the action or
+    if a query shape is repeated (N+1).
+    """
+
+    def assertWithinQueryBudget(self, method, url, *args, budget=None, **kwargs):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = getattr(self.client, method)(url, *args, **kwargs)
+
+        view = _response_view(response)
+        if budget is None and view is not None:
+            budget = get_query_budget(view, response.wsgi_request)
+        if budget is None:
+            self.fail(f'No query budget declared for {method.upper()} {url}')
+
+        queries = '\n'.join(f'  {sql}' for sql, _ in recorder.queries)
+        self.assertLessEqual(
+            recorder.count, budget,
+            f'{method.upper()} {url} ran {recorder.count} queries (budget {budget}):\n{queries}',
+        )
+        self.assertNoDuplicateQueries(recorder)
+        return response
+
+    def assertNoDuplicateQueries(self, recorder, threshold=None):
+        duplicates = recorder.duplicates(threshold)
+        if duplicates:
+            details = '\n'.join(f'  {count} x {shape}' for shape, count in duplicates.items())
+            self.fail(f'Repeated query shapes (N+1):\n{details}')
@@ -0,0 +1,86 @@
+"""
+Per-action queryset profiles.
+
+Viewsets usually build one queryset for every action, so the paginated
+``list`` loads the prefetches and wide columns only ``retrieve`` needs.
+A profile declares, per action, how the queryset is shaped::
+
+    class WorkerViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
+        queryset_profiles = {
+            'list': QuerysetProfile(
+                only=['id', 'first_name', 'enterprise__name'],
+                select_related=['enterprise'],
+                prefetch_related=[],
+            ),
+        }
+
+Like ``query_budgets``, profiles are keyed by action, or by HTTP method for
+generic views without actions.  ``select_related`` and ``prefetch_related``
+*replace* those of the base queryset when given (``[]`` drops them all);
+left as ``None`` they keep them.  ``only``/``defer`` must cover every column
+the serializer reads, including the foreign keys traversed by
+``select_related`` — a deferred column read later costs one query per row,
+which ``QueryBudgetTestMixin`` reports as an N+1.
+"""
+
+
+class QuerysetProfile:
+    """Column, join and prefetch shape of a queryset for one action."""
+
+    def __init__(self, only=None, defer=None, select_related=None,
+                 prefetch_related=None, annotations=None):
+        self.only = only
+        self.defer = defer
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+        self.annotations = annotations or {}
+
+    def apply(self, queryset):
+        if self.select_related is not None:
+            queryset = queryset.select_related(None)
+            if self.select_related:
+                queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related is not None:
+            queryset = queryset.prefetch_related(None)
+            if self.prefetch_related:
+                queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        if self.defer:
+            queryset = queryset.defer(*self.defer)
+        return queryset
+
+
+def model_columns(model, exclude=()):
+    """Names of the concrete columns of ``model``, for ``only`` lists."""
+    return [
+        field.name for field in model._meta.concrete_fields
+        if field.name not in exclude
+    ]
+
+
+def get_queryset_profile(view, request):
+    """Queryset profile declared by ``view`` for the current action, if any."""
+    profiles = getattr(view, 'queryset_profiles', None)
+    if not profiles:
+        return None
+    action = getattr(view, 'action', None) or request.method.lower()
+    return profiles.get(action)
+
+
+class QuerysetProfileMixin:
+    """
+    Generic view mixin applying ``queryset_profiles`` to the queryset.
+
+    Applied in ``filter_queryset``, like ``AnnotatedFieldsMixin``, so views
+    overriding ``get_queryset`` are covered too.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        profile = get_queryset_profile(self, self.request)
+        if profile is None:
+            return queryset
+        return profile.apply(queryset)
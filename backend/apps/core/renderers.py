@@ -0,0 +1,102 @@
+"""
+Fast JSON rendering and the compact list layout.
+
+``FastJSONRenderer`` is the default renderer (see ``REST_FRAMEWORK`` in
+settings).  It produces the same bytes as DRF's ``JSONRenderer`` but
+encodes with ``orjson`` when it is installed; types orjson does not know
+(``Decimal``, lazy translations, datetimes, which DRF renders as ``...Z``)
+go through DRF's encoder, and anything orjson rejects falls back to
+``JSONRenderer``.  Indented (browsable) output always uses ``JSONRenderer``.
+
+List responses — a plain list of objects or the ``results`` of a page —
+also accept an opt-in compact mode::
+
+    ?fields=id,first_name,last_name    only these keys in each row
+    ?omit=notes,allergies              every key but these
+    ?columnar=true                     {"columns": [...], "rows": [[...], ...]}
+
+which mobile clients on slow links use to shrink the payload before
+compression (apps.core.compression).  Views using ``SparseFieldsetsMixin``
+(apps.core.fieldsets) also skip loading and serializing the dropped fields.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+COLUMNAR_PARAM = 'columnar'
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+_encoder = JSONEncoder()
+
+
+def _requested_layout(renderer_context):
+    """``(fields, columnar, omit)`` asked by the request of a successful response."""
+    request = renderer_context.get('request')
+    response = renderer_context.get('response')
+    if request is None or (response is not None and response.status_code >= 300):
+        return [], False, []
+    params = getattr(request, 'query_params', request.GET)
+    fields = [field for field in params.get(FIELDS_PARAM, '').split(',') if field]
+    omit = [field for field in params.get(OMIT_PARAM, '').split(',') if field]
+    columnar = params.get(COLUMNAR_PARAM, '').lower() in _TRUE_VALUES
+    return fields, columnar, omit
+
+
+def to_columns(rows, fields=None):
+    """``{"columns": [...], "rows": [[...], ...]}`` layout of a list of objects."""
+    columns = list(fields) if fields else (list(rows[0]) if rows else [])
+    return {'columns': columns, 'rows': [[row.get(column) for column in columns] for row in rows]}
+
+
+def compact_payload(data, fields=(), columnar=False, omit=()):
+    """Apply ``?fields=`` / ``?omit=`` / ``?columnar=`` to a list payload; other data is returned as is."""
+    if not fields and not omit and not columnar:
+        return data
+    paginated = isinstance(data, dict) and isinstance(data.get('results'), list)
+    rows = data['results'] if paginated else data
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return data
+
+    if fields:
+        rows = [{field: row[field] for field in fields if field in row} for row in rows]
+    if omit:
+        rows = [{key: value for key, value in row.items() if key not in omit} for row in rows]
+    if columnar:
+        rows = to_columns(rows, [field for field in fields if field not in omit])
+    if paginated:
+        return {**data, 'results': rows}
+    return rows
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` encoding with orjson when available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        data = compact_payload(data, *_requested_layout(renderer_context))
+
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_encoder.default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            # Integers beyond 64 bits, circular references...
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict JavaScript subset as JSONRenderer.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
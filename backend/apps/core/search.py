@@ -0,0 +1,155 @@
+"""
+Accent-insensitive, ranked search over a few text columns.
+
+``Q(first_name__icontains=...) | Q(last_name__icontains=...) | ...`` cannot
+use an index, so every keystroke of the mobile search boxes scans the
+whole patients/workers/products table.  On PostgreSQL a ``SearchDocument``
+instead matches the search terms against one expression::
+
+    immutable_unaccent(lower(first_name || ' ' || last_name || ' ' || ...))
+
+covered by a trigram GIN index (``pg_trgm``), so ``LIKE '%term%'`` on it is an
+index scan, and "helene" finds "Hélène".  Each word of the query must
+appear; results are ranked by trigram word similarity.
+
+On other databases, and on PostgreSQL servers without the ``pg_trgm`` and
+``unaccent`` contrib modules, it falls back to ``icontains``: each word must
+appear in one of the columns.
+
+The index is created by a migration calling ``create_search_index`` (see
+``apps/core/migrations/0001_search_extensions.py`` for the extensions and
+the ``immutable_unaccent`` function the expression relies on)::
+
+    PATIENT_SEARCH = SearchDocument(
+        ['first_name', 'last_name', 'patient_number', 'phone', 'email'],
+        index_name='patients_search_trgm',
+    )
+"""
+import unicodedata
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connections
+from django.db.models import F, Func, Q, TextField, Value
+from django.db.models.functions import Coalesce, Lower
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+SEARCH_ANNOTATION = 'search_document'
+RANK_ANNOTATION = 'search_rank'
+
+
+class _Document(Func):
+    """``a || ' ' || b ...``: unlike ``CONCAT()``, immutable and so indexable."""
+    arg_joiner = " || ' ' || "
+    template = '(%(expressions)s)'
+    output_field = TextField()
+
+
+class ImmutableUnaccent(Func):
+    """``unaccent()`` wrapper declared IMMUTABLE so it can be indexed."""
+    function = 'immutable_unaccent'
+    output_field = TextField()
+
+
+def normalize(text):
+    """Lower-case ``text`` and strip its accents, like the indexed expression."""
+    text = text.lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+_availability = {}
+
+
+def search_index_available(connection):
+    """Whether ``connection`` has ``pg_trgm`` and ``immutable_unaccent``."""
+    if connection.vendor != 'postgresql':
+        return False
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _availability:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regprocedure('immutable_unaccent(text)') IS NOT NULL"
+                " AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"
+            )
+            _availability[key] = cursor.fetchone()[0]
+    return _availability[key]
+
+
+class SearchDocument:
+    """The searchable text columns of a model."""
+
+    def __init__(self, fields, index_name):
+        self.fields = list(fields)
+        self.index_name = index_name
+
+    def expression(self):
+        document = _Document(*(Coalesce(F(field), Value('')) for field in self.fields))
+        return ImmutableUnaccent(Lower(document))
+
+    def index(self):
+        from django.contrib.postgres.indexes import GinIndex, OpClass
+
+        return GinIndex(OpClass(self.expression(), name='gin_trgm_ops'), name=self.index_name)
+
+    def filter(self, queryset, query, rank=True):
+        """
+        Rows of ``queryset`` matching every word of ``query``, best matches
+        first when ``rank`` is set.
+        """
+        words = query.split()
+        if not words:
+            return queryset
+        if not search_index_available(connections[queryset.db]):
+            return queryset.filter(reduce(and_, (
+                reduce(or_, (Q(**{f'{field}__icontains': word}) for field in self.fields))
+                for word in words
+            )))
+
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        queryset = queryset.annotate(**{SEARCH_ANNOTATION: self.expression()})
+        queryset = queryset.filter(reduce(and_, (
+            Q(**{f'{SEARCH_ANNOTATION}__contains': normalize(word)}) for word in words
+        )))
+        if rank:
+            similarity = TrigramWordSimilarity(Value(normalize(query)), SEARCH_ANNOTATION)
+            ordering = queryset.query.order_by or (
+                queryset.model._meta.ordering if queryset.query.default_ordering else ()
+            )
+            queryset = queryset.annotate(**{RANK_ANNOTATION: similarity}).order_by(
+                f'-{RANK_ANNOTATION}', *ordering
+            )
+        return queryset
+
+
+def create_search_index(model, document, schema_editor):
+    """Create the trigram index of ``document`` where search supports it."""
+    _availability.clear()
+    if search_index_available(schema_editor.connection):
+        schema_editor.add_index(model, document.index())
+
+
+def drop_search_index(model, document, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(document.index_name)}')
+
+
+class DocumentSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` backed by the view's ``search_document``.
+
+    Matches are ranked unless the client asked for an explicit ``?ordering=``;
+    put it after ``OrderingFilter`` so the default ordering only breaks ties.
+    Views without ``search_document`` get the regular ``SearchFilter``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        document = getattr(view, 'search_document', None)
+        if document is None:
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '')
+        explicit_ordering = OrderingFilter.ordering_param in request.query_params
+        return document.filter(queryset, query, rank=not explicit_ordering)
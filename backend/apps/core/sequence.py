@@ -0,0 +1,66 @@
+"""
+Commit-ordered sequence numbers for change logs.
+
+An autoincrement id is handed out when a row is inserted, not when its
+transaction commits: the transaction that inserted id 10 can commit after
+the one that inserted id 11, and a client that already read up to 11 would
+never see 10.  Change logs (``SyncChange``, ``ProtocolTreeChange``) insert
+their rows in the writer's transaction with an empty sequence field, so a
+change exists exactly when its data does, and number them once committed:
+
+* ``stamp`` locks the log's ``CommitSequence`` row, numbers every visible
+  (hence committed) unnumbered row in id order and commits.  Numbers are
+  therefore handed out in commit order, and a reader that sees number N
+  also sees every row numbered below N;
+* ``schedule_stamp`` runs ``stamp`` after the writer's commit, once per
+  transaction.  Should the process die in between, the rows are numbered by
+  the next stamp of the log: late, never lost.
+
+Readers only ever return numbered rows, up to ``current``.
+"""
+from django.db import transaction
+
+from .models import CommitSequence
+
+
+def current(name):
+    """Highest number handed out in the ``name`` log (0 before the first)."""
+    return CommitSequence.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def stamp(model, field, name):
+    """Number the committed rows of ``model`` whose ``field`` is empty; returns the current number."""
+    pending = model._default_manager.filter(**{f'{field}__isnull': True})
+    if not pending.exists():
+        return current(name)
+    with transaction.atomic():
+        counter = CommitSequence.objects.select_for_update().get_or_create(name=name)[0]
+        # Read once the lock is held: rows numbered by the stamp we waited for are skipped.
+        ids = list(pending.order_by('pk').values_list('pk', flat=True))
+        model._default_manager.bulk_update(
+            [model(pk=pk, **{field: counter.value + offset}) for offset, pk in enumerate(ids, 1)],
+            [field], batch_size=1000,
+        )
+        counter.value += len(ids)
+        counter.save(update_fields=['value'])
+    return counter.value
+
+
+class _PendingStamp:
+    """On-commit stamp of a log."""
+
+    def __init__(self, model, field, name):
+        self.model, self.field, self.name = model, field, name
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        stamp(self.model, self.field, self.name)
+
+
+def schedule_stamp(model, field, name):
+    """Number the rows of the ``name`` log after the commit, once per transaction."""
+    for _, callback, *_ in transaction.get_connection().run_on_commit:
+        if isinstance(callback, _PendingStamp) and callback.name == name and not callback.done:
+            return
+    transaction.on_commit(_PendingStamp(model, field, name))
@@ -0,0 +1,175 @@
+"""
+Delta sync change feed for the offline-first mobile app.
+
+The frontend keeps local copies of workers, products, patients and exams.
+Instead of re-pulling full lists, it asks ``GET /api/v1/sync/`` for the rows
+changed since the last change sequence it holds:
+
+* models are registered under a short sync name::
+
+      sync.register('workers', Worker, 'apps.occupational_health.serializers.WorkerListSerializer',
+                    select_related=['enterprise', 'work_site'])
+
+  pass ``organization_field`` for per-organization models (e.g. products);
+  the others are shared by every organization, like their list endpoints;
+* saves and deletes of a registered model append a ``SyncChange`` row in
+  the same transaction (a tombstone for deletes), so the feed never returns
+  rows of rolled back transactions.  Once committed the row is numbered in
+  commit order (``apps.core.sequence``): that number is the change
+  sequence.  Insert ids are not used, since a transaction holding a low id
+  may commit after clients already synced past a higher one;
+* ``get_changes`` returns, per model, the current serialization of the rows
+  changed after ``since`` and the ids of the deleted ones, in batches of at
+  most ``limit`` change rows.
+
+A client first asks for the feed without ``since``: the response carries
+``reset: true`` and the current sequence as ``until``.  It then downloads the
+full lists and syncs from ``until`` onwards.  ``reset`` is also returned when
+the changes after ``since`` were pruned (``prune_sync_changes``).
+
+``QuerySet.update()`` and ``bulk_create()`` do not send signals and are not
+recorded.
+"""
+from django.db.models import Min, Q
+from django.db.models.signals import post_save, post_delete
+from django.utils.module_loading import import_string
+
+from . import sequence
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 2000
+SEQUENCE = 'sync'
+
+# sync name → SyncModel
+_registry = {}
+
+
+class SyncModel:
+    """A model exposed through the change feed."""
+
+    def __init__(self, name, model, serializer, select_related=(), organization_field=None):
+        self.name = name
+        self.model = model
+        self.serializer = serializer
+        self.select_related = list(select_related)
+        self.organization_field = organization_field
+
+    @property
+    def serializer_class(self):
+        if isinstance(self.serializer, str):
+            self.serializer = import_string(self.serializer)
+        return self.serializer
+
+    def organization_of(self, instance):
+        if self.organization_field is None:
+            return None
+        return getattr(instance, self.organization_field)
+
+    def get_queryset(self, organization_id):
+        queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.organization_field is not None:
+            queryset = queryset.filter(**{self.organization_field: organization_id})
+        return queryset
+
+
+def register(name, model, serializer, select_related=(), organization_field=None):
+    """Record the changes of ``model`` in the feed under ``name``."""
+    sync_model = SyncModel(name, model, serializer, select_related, organization_field)
+    _registry[name] = sync_model
+
+    def on_change(sender, instance, **kwargs):
+        deleted = kwargs['signal'] is post_delete
+        record_change(name, instance.pk, sync_model.organization_of(instance), deleted)
+
+    post_save.connect(on_change, sender=model, weak=False, dispatch_uid=f'sync:{name}')
+    post_delete.connect(on_change, sender=model, weak=False, dispatch_uid=f'sync:{name}')
+    return sync_model
+
+
+def registered_models():
+    return sorted(_registry)
+
+
+def record_change(name, object_id, organization_id=None, deleted=False):
+    """Append a change in the current transaction; it gets a sequence once committed."""
+    from .models import SyncChange
+
+    SyncChange.objects.create(
+        model=name, object_id=str(object_id), organization_id=organization_id, deleted=deleted,
+    )
+    sequence.schedule_stamp(SyncChange, 'sequence', SEQUENCE)
+
+
+def _feed(names, organization_id):
+    from .models import SyncChange
+
+    # Shared models have no organization; per-organization models only
+    # return the changes of the caller's organization.
+    return SyncChange.objects.filter(model__in=names).filter(
+        Q(organization_id__isnull=True) | Q(organization_id=organization_id)
+    )
+
+
+def current_sequence():
+    return sequence.current(SEQUENCE)
+
+
+def get_changes(since, names, organization_id=None, limit=DEFAULT_BATCH_SIZE, context=None):
+    """
+    Rows of the ``names`` models changed after the ``since`` sequence.
+
+    ``until`` is the sequence to send as ``since`` next time; ``has_more``
+    tells that the batch was cut at ``limit`` change rows.
+    """
+    from .models import SyncChange
+
+    oldest = SyncChange.objects.aggregate(oldest=Min('sequence'))['oldest']
+    if oldest is not None and since + 1 < oldest:
+        return reset_payload()
+
+    # Unnumbered (not yet stamped) changes are left for the next call.
+    rows = list(
+        _feed(names, organization_id).filter(sequence__gt=since)
+        .order_by('sequence').values_list('sequence', 'model', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Only the last change of each row matters.
+    latest = {}
+    for _, name, object_id, deleted in rows:
+        latest[(name, object_id)] = deleted
+
+    changes = {}
+    for name in names:
+        updated_ids = [oid for (model, oid), deleted in latest.items() if model == name and not deleted]
+        deleted_ids = [oid for (model, oid), deleted in latest.items() if model == name and deleted]
+        if not updated_ids and not deleted_ids:
+            continue
+        sync_model = _registry[name]
+        updated = []
+        if updated_ids:
+            queryset = sync_model.get_queryset(organization_id).filter(pk__in=updated_ids)
+            updated = sync_model.serializer_class(queryset, many=True, context=context or {}).data
+        changes[name] = {'updated': updated, 'deleted': deleted_ids}
+
+    return {
+        'since': since,
+        'until': rows[-1][0] if rows else since,
+        'has_more': has_more,
+        'reset': False,
+        'changes': changes,
+    }
+
+
+def reset_payload():
+    """Tell the client to download full lists, then sync from ``until``."""
+    return {
+        'since': None,
+        'until': current_sequence(),
+        'has_more': False,
+        'reset': True,
+        'changes': {},
+    }
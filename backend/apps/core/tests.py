@@ -0,0 +1,736 @@
+"""
+Unit tests for the shared infrastructure — API response cache and keyset
+pagination.
+Covers: cache hits/misses, versioned invalidation, org/user scoping,
+hit-rate statistics, keyset paging forward/backward with ties and NULLs,
+estimated counts, opt-in via ?cursor=, query recording, N+1 detection,
+the opt-in query-count headers, the accent-insensitive search documents,
+the delta sync change feed, the orjson renderer, the compact list layout,
+negotiated response compression and the AI gateway.
+"""
+import gzip
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from apps.accounts.models import User
+from apps.audit.models import AuditLog
+from apps.organizations.models import Organization
+from apps.core import ai
+from apps.core import cache as api_cache
+from apps.core import compression, renderers
+from apps.core.pagination import KeysetPagination, estimate_count
+from apps.core.querybudget import QueryBudgetTestMixin, QueryRecorder, sql_shape
+from apps.core import search
+from apps.core import sync
+from apps.core import timeseries
+from apps.core.models import SyncChange
+from apps.inventory.models import Product
+from apps.patients.models import Patient, PATIENT_SEARCH
+
+
+# ──────────────────────────────────────────────────────────────
+# Helpers
+# ──────────────────────────────────────────────────────────────
+
+def _org(suffix="1"):
+    return Organization.objects.create(
+        name=f"Clinique Core {suffix}",
+        type="hospital",
+        registration_number=f"CORE-REG-{suffix}-{timezone.now().timestamp()}",
+        address="1 Avenue du Cache",
+        city="Lubumbashi",
+        phone=f"+243850000{suffix.zfill(3)}",
+        email=f"core{suffix}@test.cd",
+        director_name="Dr Core",
+    )
+
+
+def _user(org, suffix="1", **extra):
+    user = User.objects.create(
+        phone=f"+243860000{suffix.zfill(3)}",
+        email=f"core.user{suffix}@test.cd",
+        first_name="Core",
+        last_name=f"User{suffix}",
+        primary_role="admin",
+        organization=org,
+        **extra,
+    )
+    user.set_password("testpass123")
+    user.save()
+    return user
+
+
+def _counting_view(namespace, scope=api_cache.SCOPE_GLOBAL):
+    calls = []
+
+    @api_view(['GET'])
+    @api_cache.cached_response(namespace, scope=scope)
+    def view(request):
+        calls.append(request.query_params.get('q'))
+        return Response({'calls': len(calls)})
+
+    return view, calls
+
+
+class CachedResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.org_a = _org("1")
+        self.org_b = _org("2")
+        self.user_a = _user(self.org_a, "1")
+        self.user_b = _user(self.org_b, "2")
+
+    def _get(self, view, user, path='/x/'):
+        request = self.factory.get(path)
+        force_authenticate(request, user=user)
+        return view(request)
+
+    def test_second_request_is_served_from_cache(self):
+        view, calls = _counting_view('test_hit')
+        first = self._get(view, self.user_a)
+        second = self._get(view, self.user_a)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(len(calls), 1)
+
+    def test_query_string_is_part_of_the_key(self):
+        view, calls = _counting_view('test_query')
+        self._get(view, self.user_a, '/x/?q=1')
+        self._get(view, self.user_a, '/x/?q=2')
+        self._get(view, self.user_a, '/x/?q=1')
+        self.assertEqual(calls, ['1', '2'])
+
+    def test_invalidate_bumps_version(self):
+        view, calls = _counting_view('test_invalidate')
+        self._get(view, self.user_a)
+        api_cache.invalidate('test_invalidate')
+        self._get(view, self.user_a)
+        self.assertEqual(len(calls), 2)
+
+    def test_org_scope_isolates_organizations(self):
+        view, calls = _counting_view('test_org', scope=api_cache.SCOPE_ORGANIZATION)
+        self._get(view, self.user_a)
+        self._get(view, self.user_b)
+        self._get(view, self.user_a)
+        self.assertEqual(len(calls), 2)
+
+    def test_org_invalidation_only_affects_that_org(self):
+        view, calls = _counting_view('test_org_inv', scope=api_cache.SCOPE_ORGANIZATION)
+        self._get(view, self.user_a)
+        self._get(view, self.user_b)
+        api_cache.invalidate('test_org_inv', organization=self.org_a)
+        self._get(view, self.user_a)
+        self._get(view, self.user_b)
+        self.assertEqual(len(calls), 3)
+
+    def test_user_scope_isolates_users(self):
+        colleague = _user(self.org_a, "3")
+        view, calls = _counting_view('test_user', scope=api_cache.SCOPE_USER)
+        self._get(view, self.user_a)
+        self._get(view, colleague)
+        self.assertEqual(len(calls), 2)
+
+    def test_error_responses_are_not_cached(self):
+        calls = []
+
+        @api_view(['GET'])
+        @api_cache.cached_response('test_error')
+        def view(request):
+            calls.append(1)
+            return Response({'error': 'boom'}, status=400)
+
+        self._get(view, self.user_a)
+        self._get(view, self.user_a)
+        self.assertEqual(len(calls), 2)
+
+    def test_stats_report_hit_rate(self):
+        view, _ = _counting_view('test_stats')
+        api_cache.reset_cache_stats()
+        for _ in range(4):
+            self._get(view, self.user_a)
+        stats = api_cache.get_cache_stats()['namespaces']['test_stats']
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.75)
+
+    def test_unknown_scope_is_rejected(self):
+        with self.assertRaises(ValueError):
+            api_cache.cached_response('test_bad', scope='tenant')
+
+
+class CacheStatsAPITests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        org = _org("4")
+        self.admin = _user(org, "4", is_staff=True)
+        self.staff_less = _user(org, "5")
+
+    def test_stats_require_admin(self):
+        self.client.force_authenticate(self.staff_less)
+        response = self.client.get('/api/v1/system/cache/stats/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_choices_endpoints_populate_stats(self):
+        self.client.force_authenticate(self.admin)
+        self.client.get('/api/v1/licenses/choices/types/')
+        self.client.get('/api/v1/licenses/choices/types/')
+        response = self.client.get('/api/v1/system/cache/stats/')
+        self.assertEqual(response.status_code, 200)
+        choices = response.data['namespaces']['choices']
+        self.assertGreaterEqual(choices['hits'], 1)
+
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        base = timezone.now()
+        logs = []
+        for i in range(23):
+            # Groups of 4 share a timestamp to exercise the pk tie-breaker.
+            logs.append(AuditLog(
+                action='VIEW', description=f'Entrée {i}',
+                timestamp=base - timedelta(minutes=i // 4),
+                duration_ms=None if i % 5 == 0 else (i * 7) % 11,
+            ))
+        AuditLog.objects.bulk_create(logs)
+
+    def _page(self, queryset, url):
+        paginator = KeysetPagination()
+        paginator.page_size = 5
+        request = Request(self.factory.get(url))
+        rows = paginator.paginate_queryset(queryset, request)
+        response = paginator.get_paginated_response([row.pk for row in rows])
+        return response.data
+
+    def _walk(self, queryset, url='/logs/'):
+        ids, pages = [], []
+        while url:
+            data = self._page(queryset, url)
+            pages.append(data['results'])
+            ids.extend(data['results'])
+            url = data['next']
+        return ids, pages, data
+
+    def test_forward_walk_matches_ordering(self):
+        queryset = AuditLog.objects.all()
+        ids, pages, _ = self._walk(queryset)
+        self.assertEqual(ids, list(queryset.order_by('-timestamp', '-id').values_list('id', flat=True)))
+        self.assertEqual([len(p) for p in pages], [5, 5, 5, 5, 3])
+
+    def test_backward_walk_returns_same_pages(self):
+        queryset = AuditLog.objects.all()
+        _, pages, last = self._walk(queryset)
+        url, backward = last['previous'], []
+        while url:
+            data = self._page(queryset, url)
+            backward.insert(0, data['results'])
+            url = data['previous']
+        self.assertEqual(backward, pages[:-1])
+
+    def test_nullable_ordering_puts_nulls_last(self):
+        queryset = AuditLog.objects.order_by('duration_ms')
+        ids, _, _ = self._walk(queryset)
+        logs = sorted(
+            AuditLog.objects.all(),
+            key=lambda log: (log.duration_ms is None, log.duration_ms or 0, log.pk),
+        )
+        self.assertEqual(ids, [log.pk for log in logs])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(NotFound):
+            self._page(AuditLog.objects.all(), '/logs/?cursor=not-a-cursor')
+
+    def test_counts_are_opt_in(self):
+        self.assertNotIn('count', self._page(AuditLog.objects.all(), '/logs/'))
+        self.assertEqual(self._page(AuditLog.objects.all(), '/logs/?count=exact')['count'], 23)
+        # Small results are counted exactly even when an estimate is requested.
+        self.assertEqual(estimate_count(AuditLog.objects.filter(action='VIEW')), 23)
+
+
+class OptionalKeysetPaginationAPITests(APITestCase):
+
+    def setUp(self):
+        self.user = _user(_org("9"), "9", is_staff=True)
+        self.client.force_authenticate(self.user)
+        self.seeded = {log.pk for log in AuditLog.objects.bulk_create(
+            AuditLog(action='VIEW', description=f'Log {i}') for i in range(25)
+        )}
+
+    def test_page_number_by_default(self):
+        response = self.client.get('/api/v1/audit/logs/')
+        self.assertEqual(response.status_code, 200)
+        # Requests are audited too, hence >=.
+        self.assertGreaterEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+
+    def test_cursor_switches_to_keyset(self):
+        response = self.client.get('/api/v1/audit/logs/?cursor=')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        following = self.client.get(response.data['next'])
+        first_ids = {row['id'] for row in response.data['results']}
+        next_ids = {row['id'] for row in following.data['results']}
+        self.assertFalse(first_ids & next_ids)
+        self.assertLessEqual(self.seeded, first_ids | next_ids)
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+
+    def setUp(self):
+        org = _org("7")
+        self.users = [_user(org, f"7{i}") for i in range(1, 7)]
+        self.admin = _user(org, "70", is_staff=True)
+
+    def test_repeated_shapes_are_flagged(self):
+        recorder = QueryRecorder()
+        with recorder.record():
+            for user in self.users:
+                User.objects.filter(pk=user.pk).exists()
+            Organization.objects.count()
+        self.assertEqual(recorder.count, 7)
+        self.assertEqual(list(recorder.duplicates().values()), [6])
+        with self.assertRaises(AssertionError):
+            self.assertNoDuplicateQueries(recorder)
+
+    def test_in_lists_share_a_shape(self):
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM t WHERE id IN (%s, %s)'),
+            sql_shape('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+        )
+
+    def test_headers_are_opt_in(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/v1/system/cache/stats/')
+        self.assertNotIn('X-Query-Count', response)
+        with override_settings(QUERY_BUDGET_HEADERS=True):
+            response = self.client.get('/api/v1/system/cache/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(int(response['X-Query-Count']), 0)
+        self.assertIn('X-DB-Time', response)
+
+    def test_budget_overrun_is_logged(self):
+        from apps.accounts.views import UserListCreateAPIView
+
+        self.client.force_authenticate(self.admin)
+        budgets = {'get': 1}  # generic views key budgets by HTTP method
+        with override_settings(QUERY_BUDGET_HEADERS=True), \
+                mock.patch.object(UserListCreateAPIView, 'query_budgets', budgets, create=True), \
+                self.assertLogs('apps.core.querybudget', level='WARNING') as logs:
+            response = self.client.get('/api/v1/auth/users/')
+        self.assertEqual(response['X-Query-Budget'], '1')
+        self.assertIn('Query budget exceeded', logs.output[0])
+
+
+def _patient(number, first_name, last_name, phone=""):
+    return Patient.objects.create(
+        patient_number=number, first_name=first_name, last_name=last_name,
+        date_of_birth=date(1980, 1, 1), gender="female", phone=phone,
+    )
+
+
+class SearchDocumentTests(APITestCase):
+
+    def setUp(self):
+        self.helene = _patient("PAT-S1", "Hélène", "Mukendi", phone="+243812345678")
+        self.jean = _patient("PAT-S2", "Jean", "Kasongo")
+        self.marie = _patient("PAT-S3", "Marie", "Mukendi-Ilunga")
+        self.user = _user(_org("s"), "s")
+        self.client.force_authenticate(self.user)
+
+    def _search(self, query):
+        return list(PATIENT_SEARCH.filter(Patient.objects.all(), query))
+
+    def test_normalize_strips_accents_and_case(self):
+        self.assertEqual(search.normalize("Hélène LEFÈVRE"), "helene lefevre")
+
+    def test_document_expression_is_indexable(self):
+        sql = str(Patient.objects.annotate(doc=PATIENT_SEARCH.expression()).query)
+        self.assertIn('immutable_unaccent(LOWER(', sql)
+        self.assertIn("|| ' ' ||", sql)
+        self.assertNotIn('CONCAT', sql)  # CONCAT() is not IMMUTABLE
+
+    def test_icontains_fallback(self):
+        with mock.patch.object(search, 'search_index_available', return_value=False):
+            self.assertEqual({p.pk for p in self._search("mukendi")}, {self.helene.pk, self.marie.pk})
+            self.assertEqual(self._search("2345"), [self.helene])
+            # Each word in any column, not the whole query in one column.
+            self.assertEqual(self._search("marie mukendi"), [self.marie])
+            self.assertEqual(self._search("jean mukendi"), [])
+            self.assertEqual(self._search("   "), list(Patient.objects.all()))
+
+    def test_ranked_accent_insensitive_search(self):
+        if not search.search_index_available(connection):
+            self.skipTest('requires pg_trgm and unaccent')
+        self.assertEqual(self._search("helene"), [self.helene])
+        self.assertEqual(self._search("HELENE mukendi"), [self.helene])
+        results = self._search("mukendi")
+        self.assertEqual(set(results), {self.helene, self.marie})
+
+    def test_patient_search_endpoint(self):
+        response = self.client.get('/api/v1/patients/', {'search': 'Kasongo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [str(self.jean.pk)])
+
+
+# ──────────────────────────────────────────────────────────────
+# DELTA SYNC — change feed
+# ──────────────────────────────────────────────────────────────
+
+def _product(org, sku):
+    return Product.objects.create(organization=org, name=f"Produit {sku}", sku=sku)
+
+
+class SyncFeedTests(APITestCase):
+    url = "/api/v1/sync/"
+
+    def setUp(self):
+        self.org = _org("sy1")
+        self.user = _user(self.org, "sy1")
+        self.client.force_authenticate(self.user)
+        # Sequences are not reset between tests: anchor on a change of our own.
+        with self.captureOnCommitCallbacks(execute=True):
+            sync.record_change("patients", "baseline", deleted=True)
+        self.start = sync.current_sequence()
+
+    def _get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_first_sync_returns_reset_with_current_sequence(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            _patient("PAT-Y1", "Hélène", "Mukendi")
+        data = self._get()
+        self.assertTrue(data["reset"])
+        self.assertEqual(data["until"], sync.current_sequence())
+        self.assertEqual(data["changes"], {})
+
+    def test_updates_and_tombstones_since_sequence(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            kept = _patient("PAT-Y2", "Jean", "Kasongo")
+            gone = _patient("PAT-Y3", "Marie", "Ilunga")
+        with self.captureOnCommitCallbacks(execute=True):
+            kept.first_name = "Jean-Pierre"
+            kept.save()
+            gone_id = str(gone.pk)
+            gone.delete()
+
+        data = self._get(since=self.start, models="patients")
+        self.assertFalse(data["reset"])
+        self.assertFalse(data["has_more"])
+        self.assertEqual(data["until"], sync.current_sequence())
+        patients = data["changes"]["patients"]
+        self.assertEqual([row["first_name"] for row in patients["updated"]], ["Jean-Pierre"])
+        self.assertEqual(patients["deleted"], [gone_id])
+
+        self.assertEqual(self._get(since=data["until"])["changes"], {})
+
+    def test_batches_are_cut_at_limit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                _patient(f"PAT-Y4{i}", "Patient", f"Lot{i}")
+        first = self._get(since=self.start, limit=2)
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(first["changes"]["patients"]["updated"]), 2)
+        second = self._get(since=first["until"], limit=2)
+        self.assertFalse(second["has_more"])
+        self.assertEqual(len(second["changes"]["patients"]["updated"]), 1)
+
+    def test_per_organization_models_are_scoped(self):
+        other = _org("sy2")
+        with self.captureOnCommitCallbacks(execute=True):
+            mine = _product(self.org, "SYNC-1")
+            _product(other, "SYNC-2")
+        data = self._get(since=self.start, models="products")
+        self.assertEqual([row["id"] for row in data["changes"]["products"]["updated"]], [str(mine.pk)])
+        self.assertEqual(data["until"], SyncChange.objects.filter(organization_id=self.org.pk).latest("sequence").sequence)
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    _patient("PAT-Y5", "Annulé", "Rollback")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(sync.current_sequence(), self.start)
+
+    def test_changes_are_numbered_once_committed(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            patient = _patient("PAT-Y8", "Pas", "Encore")
+        self.assertEqual(SyncChange.objects.filter(sequence__isnull=True).count(), 1)
+        self.assertEqual(self._get(since=self.start)["changes"], {})
+
+        for callback in callbacks:
+            callback()
+        data = self._get(since=self.start, models="patients")
+        self.assertEqual([row["id"] for row in data["changes"]["patients"]["updated"]], [str(patient.pk)])
+        self.assertEqual(data["until"], self.start + 1)
+
+    def test_pruned_history_requires_reset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            _patient("PAT-Y6", "Ancien", "Patient")
+            _patient("PAT-Y7", "Récent", "Patient")
+        SyncChange.objects.update(changed_at=timezone.now() - timedelta(days=100))
+        call_command("prune_sync_changes", days=90, stdout=mock.Mock())
+        self.assertEqual(SyncChange.objects.count(), 1)
+        self.assertTrue(self._get(since=self.start)["reset"])
+        self.assertFalse(self._get(since=sync.current_sequence() - 1)["reset"])
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {"since": 0, "models": "patients,unknown"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("patients", response.data["models"])
+        self.assertEqual(self.client.get(self.url, {"since": "x"}).status_code, 400)
+
+
+# ──────────────────────────────────────────────────────────────
+# COMPACT RESPONSES — orjson renderer, ?fields= / ?columnar=, compression
+# ──────────────────────────────────────────────────────────────
+
+class CompactResponseTests(APITestCase):
+    url = "/api/v1/patients/"
+
+    payload = {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "measured_at": datetime(2026, 10, 19, 8, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        "exam_date": date(2026, 10, 19),
+        "dose": Decimal("12.50"),
+        "label": gettext_lazy("Active"),
+        "name": "Hélène Mukendi\u2028",
+        "values": [1, 2.5, None, True],
+        "by_id": {1: "un"},
+    }
+
+    def setUp(self):
+        self.user = _user(_org("cr"), "cr")
+        self.client.force_authenticate(self.user)
+        _patient("PAT-C1", "Hélène", "Mukendi")
+        _patient("PAT-C2", "Jean", "Kasongo")
+
+    def test_fast_renderer_matches_json_renderer(self):
+        if renderers.orjson is None:
+            self.skipTest("orjson is not installed")
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(self.payload),
+            JSONRenderer().render(self.payload),
+        )
+
+    def test_fallback_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            content = renderers.FastJSONRenderer().render(self.payload)
+        self.assertEqual(content, JSONRenderer().render(self.payload))
+
+    def test_fields_selects_keys(self):
+        response = self.client.get(self.url, {"fields": "id,last_name"})
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual({tuple(row) for row in rows}, {("id", "last_name")})
+        self.assertEqual({row["last_name"] for row in rows}, {"Mukendi", "Kasongo"})
+
+    def test_columnar_layout(self):
+        response = self.client.get(self.url, {"fields": "last_name,first_name", "columnar": "true"})
+        data = response.json()
+        self.assertEqual(data["columns"], ["last_name", "first_name"])
+        self.assertCountEqual(data["rows"], [["Mukendi", "Hélène"], ["Kasongo", "Jean"]])
+
+    def test_compact_payload_keeps_pagination_and_errors(self):
+        page = {"count": 1, "next": None, "results": [{"id": 1, "name": "a"}]}
+        self.assertEqual(
+            renderers.compact_payload(page, ["id"], True),
+            {"count": 1, "next": None, "results": {"columns": ["id"], "rows": [[1]]}},
+        )
+        self.assertEqual(
+            renderers.compact_payload([{"id": 1, "name": "a", "notes": "x"}], omit=["notes"]),
+            [{"id": 1, "name": "a"}],
+        )
+        error = {"detail": "Not found."}
+        self.assertEqual(renderers.compact_payload(error, ["id"], True), error)
+
+    @override_settings(API_COMPRESSION_MIN_SIZE=200)
+    def test_large_responses_are_gzipped(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 2)
+
+    def test_small_or_unaccepted_responses_are_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        with override_settings(API_COMPRESSION_MIN_SIZE=10 ** 6):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_encoding_negotiation(self):
+        with mock.patch.object(compression, "brotli", None):
+            self.assertEqual(compression.choose_encoding("gzip, br"), "gzip")
+            self.assertIsNone(compression.choose_encoding("br"))
+            self.assertIsNone(compression.choose_encoding("gzip;q=0"))
+            self.assertEqual(compression.choose_encoding("*"), "gzip")
+        with mock.patch.object(compression, "brotli", mock.Mock()):
+            self.assertEqual(compression.choose_encoding("gzip, br"), "br")
+            self.assertEqual(compression.choose_encoding("gzip;q=1, br;q=0.5"), "gzip")
+
+    def test_brotli_when_installed(self):
+        if compression.brotli is None:
+            self.skipTest("brotli is not installed")
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="br, gzip")
+        self.assertEqual(response["Content-Encoding"], "br")
+
+
+class AIGatewayTests(APITestCase):
+    """Response cache, retries within budget, concurrency limit and metrics of apps.core.ai."""
+
+    def setUp(self):
+        cache.clear()
+        ai.reset_gateway()
+        self.addCleanup(ai.reset_gateway)
+        self.gateway = ai.get_gateway()
+        sleep = mock.patch('apps.core.ai.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def _scan(self, data=b'photo', **kwargs):
+        return self.gateway.generate('test_scan', ['Extract', ai.Blob('image/jpeg', data=data)], **kwargs)
+
+    def test_fake_gateway_in_tests(self):
+        self.assertIsInstance(self.gateway, ai.FakeGateway)
+        self.assertIs(ai.get_gateway(), self.gateway)
+
+    def test_cache_keyed_on_content_hash(self):
+        self.gateway.responses['test_scan'] = '{"name": "Amoxicilline"}'
+        first = self._scan()
+        second = self._scan()
+        self.assertEqual((first.cached, second.cached), (False, True))
+        self.assertEqual(second.text, '{"name": "Amoxicilline"}')
+        self.assertEqual(len(self.gateway.calls), 1)
+
+        self._scan(data=b'another photo')
+        self._scan(cache_timeout=0)
+        self.assertEqual(len(self.gateway.calls), 3)
+
+    def test_transient_errors_retried_with_backoff(self):
+        self.gateway.responses['test_scan'] = [
+            ai.TransientAIError('Service IA indisponible', 503), ai.TransientAIError('timeout'), 'ok',
+        ]
+        with mock.patch('apps.core.ai.random.uniform', return_value=1.0):
+            result = self._scan()
+        self.assertEqual((result.text, result.attempts), ('ok', 3))
+        self.assertEqual([call.args[0] for call in self.sleep.call_args_list], [0.5, 1.0])
+
+        stats = ai.get_ai_stats()['operations']['test_scan']
+        self.assertEqual((stats['calls'], stats['retries'], stats['errors']), (1, 2, 0))
+
+    def test_budget_and_permanent_errors_stop_retries(self):
+        self.gateway.responses['test_scan'] = ai.TransientAIError('Service IA indisponible', 503)
+        with self.assertRaises(ai.TransientAIError):
+            # The first backoff (at least 0.25 s) does not fit in the budget.
+            self._scan(budget=0.2)
+        self.assertEqual(len(self.gateway.calls), 1)
+
+        self.gateway.responses['test_scan'] = ai.AIError('Requête IA refusée', 400)
+        with self.assertRaises(ai.AIError):
+            self._scan()
+        self.assertEqual(len(self.gateway.calls), 2)
+        self.assertEqual(ai.get_ai_stats()['operations']['test_scan']['errors'], 2)
+
+    @override_settings(AI_MAX_CONCURRENCY=1)
+    def test_concurrency_limit(self):
+        ai.reset_gateway()
+        gateway = ai.get_gateway()
+        gateway._slots.acquire()
+        with self.assertRaises(ai.AIError) as raised:
+            gateway.generate('test_scan', ['Extract'], budget=0.05)
+        self.assertEqual(raised.exception.status, 503)
+        gateway._slots.release()
+        gateway.generate('test_scan', ['Extract'])
+
+    @override_settings(AI_GATEWAY='apps.core.ai.GeminiGateway', GEMINI_API_KEY='test-key')
+    def test_gemini_gateway_reuses_session(self):
+        gateway = ai.get_gateway()
+        self.assertIsInstance(gateway, ai.GeminiGateway)
+        overloaded = mock.Mock(status_code=503, text='overloaded')
+        answer = mock.Mock(status_code=200)
+        answer.json.return_value = {'candidates': [{'content': {'parts': [{'text': '{"name": "X"}'}]}}]}
+        with mock.patch.object(gateway.session, 'request', side_effect=[overloaded, answer]) as request:
+            result = gateway.generate(
+                'test_scan', ['Extract', ai.Blob('image/png', data=b'\x89PNG')],
+                model='gemini-1.5-flash', config={'temperature': 0.1},
+            )
+        self.assertEqual(result.text, '{"name": "X"}')
+        self.assertEqual(request.call_count, 2)
+        method, url = request.call_args.args
+        self.assertEqual(url, f'{ai.GEMINI_BASE_URL}/v1beta/models/gemini-1.5-flash:generateContent')
+        self.assertEqual(request.call_args.kwargs['params'], {'key': 'test-key'})
+        payload = request.call_args.kwargs['json']
+        self.assertEqual(payload['contents'][0]['parts'][1], {'inline_data': {'mime_type': 'image/png', 'data': 'iVBORw=='}})
+        self.assertEqual(payload['generationConfig'], {'temperature': 0.1})
+
+    def test_stats_api(self):
+        self.gateway.generate('test_scan', ['Extract'])
+        org = _org("ai1")
+        self.client.force_authenticate(_user(org, "ai1"))
+        self.assertEqual(self.client.get('/api/v1/system/ai/stats/').status_code, 403)
+        self.client.force_authenticate(_user(org, "ai2", is_staff=True))
+        response = self.client.get('/api/v1/system/ai/stats/')
+        self.assertEqual(response.data['gateway'], 'FakeGateway')
+        self.assertEqual(response.data['operations']['test_scan']['calls'], 1)
+        self.assertEqual(self.client.delete('/api/v1/system/ai/stats/').status_code, 204)
+        self.assertEqual(ai.get_ai_stats()['operations']['test_scan']['calls'], 0)
+
+
+class TimeseriesTests(TestCase):
+    """Window parsing and LTTB point selection (apps.core.timeseries)."""
+
+    def test_lttb_keeps_ends_and_peaks(self):
+        data = [(t, 1.0) for t in range(1000)]
+        data[500] = (500, 40.0)
+        data[750] = (750, -10.0)
+        sampled = timeseries.lttb_points(data, 20)
+        self.assertEqual(len(sampled), 20)
+        self.assertEqual((sampled[0], sampled[-1]), (data[0], data[-1]))
+        self.assertIn((500, 40.0), sampled)
+        self.assertIn((750, -10.0), sampled)
+        self.assertEqual(sampled, sorted(sampled))
+        self.assertEqual(timeseries.lttb_points(data[:10], 20), data[:10])
+
+    def test_parse_window(self):
+        start, end, points, method = timeseries.parse_window({
+            'start': '2026-01-01', 'end': '2026-01-31', 'points': '50', 'method': 'lttb',
+        })
+        self.assertEqual((start.day, end.month, end.day, points, method), (1, 2, 1, 50, 'lttb'))
+        start, end, points, method = timeseries.parse_window({})
+        self.assertEqual(
+            (end - start, points, method), (timeseries.DEFAULT_WINDOW, timeseries.DEFAULT_POINTS, 'minmax'),
+        )
+        for params in (
+            {'start': 'hier'}, {'start': '2026-02-01', 'end': '2026-01-01'},
+            {'points': '1'}, {'points': 'beaucoup'}, {'method': 'mean'},
+        ):
+            with self.assertRaises(ValueError):
+                timeseries.parse_window(params)
+        self.assertEqual(timeseries.parse_parameters({}, ['a', 'b']), ['a', 'b'])
+        with self.assertRaises(ValueError):
+            timeseries.parse_parameters({'parameters': 'a,c'}, ['a', 'b'])
@@ -0,0 +1,181 @@
+"""
+Downsampled measurement series for charts.
+
+Charting months of vital signs used to mean pulling every row.  ``downsample``
+returns, for a time window, at most ``points`` points per parameter in a
+columnar payload (one array per column, no repeated keys):
+
+* ``minmax`` (default): the window is cut into ``points`` equal buckets and
+  the database returns min, max and average of each parameter per bucket in
+  one grouped query, so the raw rows never leave Postgres.  Empty buckets
+  are skipped::
+
+      {"method": "minmax", "start": ..., "end": ..., "bucket_seconds": 3600,
+       "t": [<bucket start, epoch seconds>, ...], "count": [...],
+       "series": {"heart_rate": {"min": [...], "max": [...], "avg": [...]}}}
+
+* ``lttb``: Largest-Triangle-Three-Buckets (Steinarsson, 2013) keeps
+  ``points`` real measurements per parameter that preserve the shape of the
+  curve (peaks included).  It reads the window's values (one query, only
+  the charted columns)::
+
+      {"method": "lttb", "start": ..., "end": ...,
+       "series": {"heart_rate": {"t": [...], "v": [...]}}}
+
+Values are floats (``null`` when a bucket has no value for the parameter).
+"""
+import operator
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import reduce
+
+from django.db.models import Avg, Count, FloatField, Max, Min, Q, Value
+from django.db.models.functions import Extract, Floor
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+METHODS = ('minmax', 'lttb')
+DEFAULT_POINTS = 200
+MAX_POINTS = 2000
+DEFAULT_WINDOW = timedelta(days=30)
+
+
+def _moment(value, end_of_day=False):
+    try:
+        day = parse_date(value)
+        moment = parse_datetime(value) if day is None else None
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    elif moment is None:
+        raise ValueError(f'Date invalide : {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_window(params):
+    """
+    ``(start, end, points, method)`` from query parameters ``start``/``end``
+    (ISO dates or datetimes; a date ``end`` includes that day; default: the
+    last 30 days), ``points`` and ``method``.  Raises ``ValueError``.
+    """
+    end = _moment(params['end'], end_of_day=True) if params.get('end') else timezone.now()
+    start = _moment(params['start']) if params.get('start') else end - DEFAULT_WINDOW
+    if start >= end:
+        raise ValueError('La date de début doit précéder la date de fin')
+    try:
+        points = int(params.get('points', DEFAULT_POINTS))
+    except (TypeError, ValueError):
+        raise ValueError('points doit être un entier')
+    if not 3 <= points <= MAX_POINTS:
+        raise ValueError(f'points doit être compris entre 3 et {MAX_POINTS}')
+    method = params.get('method', METHODS[0])
+    if method not in METHODS:
+        raise ValueError(f'Méthode inconnue : {method} ({", ".join(METHODS)})')
+    return start, end, points, method
+
+
+def parse_parameters(params, allowed):
+    """Charted fields from the comma-separated ``parameters`` query parameter (default: ``allowed``)."""
+    if not params.get('parameters'):
+        return list(allowed)
+    parameters = params['parameters'].split(',')
+    unknown = sorted(set(parameters) - set(allowed))
+    if unknown:
+        raise ValueError(f"Paramètres inconnus : {', '.join(unknown)} ({', '.join(allowed)})")
+    return parameters
+
+
+def _epoch(time_field):
+    # In UTC: EXTRACT(epoch) of a local time would be off by the UTC offset.
+    return Extract(time_field, 'epoch', tzinfo=dt_timezone.utc, output_field=FloatField())
+
+
+def _number(value, digits=2):
+    return None if value is None else round(float(value), digits)
+
+
+def minmax(queryset, time_field, fields, start, end, points):
+    bucket_seconds = max(1, -(-int((end - start).total_seconds()) // points))
+    offset = _epoch(time_field) - Value(start.timestamp())
+    rows = queryset.filter(**{
+        f'{time_field}__gte': start, f'{time_field}__lt': end,
+    }).annotate(
+        bucket=Floor(offset / Value(float(bucket_seconds)), output_field=FloatField()),
+    ).order_by().values('bucket').annotate(
+        count=Count('pk'),
+        **{f'{field}__min': Min(field) for field in fields},
+        **{f'{field}__max': Max(field) for field in fields},
+        **{f'{field}__avg': Avg(field) for field in fields},
+    ).order_by('bucket')
+
+    origin = int(start.timestamp())
+    payload = {
+        'method': 'minmax', 'start': start, 'end': end, 'bucket_seconds': bucket_seconds,
+        't': [], 'count': [],
+        'series': {field: {'min': [], 'max': [], 'avg': []} for field in fields},
+    }
+    for row in rows:
+        payload['t'].append(origin + int(row['bucket']) * bucket_seconds)
+        payload['count'].append(row['count'])
+        for field in fields:
+            series = payload['series'][field]
+            for aggregate in ('min', 'max', 'avg'):
+                series[aggregate].append(_number(row[f'{field}__{aggregate}']))
+    return payload
+
+
+def _triangle_area(a, b, c):
+    return abs((a[0] - c[0]) * (b[1] - a[1]) - (a[0] - b[0]) * (c[1] - a[1]))
+
+
+def lttb_points(data, threshold):
+    """The ``threshold`` points of ``data`` (``(t, v)`` sorted by ``t``) chosen by LTTB."""
+    if threshold >= len(data) or threshold < 3:
+        return list(data)
+    sampled = [data[0]]
+    # First and last points are kept; the others are split into threshold - 2 buckets.
+    every = (len(data) - 2) / (threshold - 2)
+    previous = data[0]
+    for i in range(threshold - 2):
+        bucket_start = int(i * every) + 1
+        bucket_end = int((i + 1) * every) + 1
+        next_start, next_end = bucket_end, min(int((i + 2) * every) + 1, len(data))
+        following = data[next_start:next_end]
+        average = (
+            sum(t for t, _ in following) / len(following),
+            sum(v for _, v in following) / len(following),
+        )
+        chosen = max(data[bucket_start:bucket_end], key=lambda point: _triangle_area(previous, point, average))
+        sampled.append(chosen)
+        previous = chosen
+    sampled.append(data[-1])
+    return sampled
+
+
+def lttb(queryset, time_field, fields, start, end, points):
+    rows = queryset.filter(**{
+        f'{time_field}__gte': start, f'{time_field}__lt': end,
+    }).filter(reduce(operator.or_, (Q(**{f'{field}__isnull': False}) for field in fields))).annotate(
+        epoch=_epoch(time_field),
+    ).order_by(time_field).values_list('epoch', *fields)
+
+    data = {field: [] for field in fields}
+    for epoch, *values in rows.iterator(chunk_size=5000):
+        for field, value in zip(fields, values):
+            if value is not None:
+                data[field].append((float(epoch), float(value)))
+    series = {}
+    for field in fields:
+        sampled = lttb_points(data[field], points)
+        series[field] = {'t': [int(t) for t, _ in sampled], 'v': [_number(v) for _, v in sampled]}
+    return {'method': 'lttb', 'start': start, 'end': end, 'series': series}
+
+
+def downsample(queryset, time_field, fields, start, end, points=DEFAULT_POINTS, method='minmax'):
+    """
+    Series of the ``fields`` of ``queryset`` rows with ``time_field`` in
+    ``[start, end)``, at most ``points`` points each (see module docstring).
+    """
+    return (lttb if method == 'lttb' else minmax)(queryset, time_field, list(fields), start, end, points)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('cache/stats/', views.cache_stats_view, name='cache_stats'),
+    path('ai/stats/', views.ai_stats_view, name='ai_stats'),
+]
@@ -0,0 +1,67 @@
+from rest_framework import permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from . import sync
+from .ai import get_ai_stats, reset_ai_stats
+from .cache import get_cache_stats, reset_cache_stats
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAdminUser])
+def cache_stats_view(request):
+    """Get API cache hit rates per namespace (DELETE resets the counters)"""
+    if request.method == 'DELETE':
+        reset_cache_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(get_cache_stats())
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAdminUser])
+def ai_stats_view(request):
+    """Get AI gateway calls, cache hits, retries, errors and latency per operation (DELETE resets)"""
+    if request.method == 'DELETE':
+        reset_ai_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(get_ai_stats())
+
+
+@api_view(['GET'])
+def sync_view(request):
+    """
+    Delta sync change feed (see apps.core.sync).
+
+    Query params:
+        - since=<sequence> → rows changed after that sequence; omit it to get
+          ``reset: true`` and the current sequence before a full download
+        - models=workers,products → restrict to these models (default: all)
+        - limit=<n> → change rows per batch (default 500, max 2000)
+    """
+    names = [name for name in request.query_params.get('models', '').split(',') if name]
+    available = sync.registered_models()
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        return Response(
+            {'error': f"Unknown models: {', '.join(unknown)}", 'models': available},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    names = names or available
+
+    since = request.query_params.get('since')
+    if since is None or since == '':
+        return Response(sync.reset_payload())
+    try:
+        since = int(since)
+        limit = int(request.query_params.get('limit', sync.DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return Response(
+            {'error': 'since and limit must be integers'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    limit = min(max(limit, 1), sync.MAX_BATCH_SIZE)
+
+    return Response(sync.get_changes(
+        since, names, organization_id=getattr(request.user, 'organization_id', None),
+        limit=limit, context={'request': request},
+    ))
@@ -3,7 +3,8 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import (
-    HospitalEncounter, VitalSigns, HospitalDepartment, HospitalBed
+    HospitalEncounter, VitalSigns, VitalSignReferenceRange, HospitalDepartment, HospitalBed,
+    TranscriptionJob
 )
 
 
@@ -28,7 +29,7 @@ class VitalSignsAdmin(admin.ModelAdmin):
     ]
     readonly_fields = [
         'id', 'body_mass_index', 'bmi_category', 'blood_pressure_reading',
-        'is_abnormal', 'created_at', 'updated_at', 'measured_at'
+        'is_abnormal', 'abnormal_parameters', 'created_at', 'updated_at', 'measured_at'
     ]
     autocomplete_fields = ['patient', 'encounter', 'measured_by', 'verified_by', 'created_by', 'updated_by']
     fieldsets = (
@@ -87,6 +88,13 @@ class VitalSignsAdmin(admin.ModelAdmin):
     abnormal_status.short_description = 'Statut'
 
 
+@admin.register(VitalSignReferenceRange)
+class VitalSignReferenceRangeAdmin(admin.ModelAdmin):
+    list_display = ['parameter', 'sex', 'age_min_years', 'age_max_years', 'low', 'high', 'is_active']
+    list_filter = ['parameter', 'sex', 'is_active']
+    list_editable = ['low', 'high', 'is_active']
+
+
 # ═══════════════════════════════════════════════════════════════
 #  HOSPITAL ENCOUNTER ADMIN
 # ═══════════════════════════════════════════════════════════════
@@ -292,4 +300,17 @@ class HospitalBedAdmin(admin.ModelAdmin):
     features_display.short_description = 'Équipements'
 
 
+# ═══════════════════════════════════════════════════════════════
+#  CONSULTATION TRANSCRIPTION JOBS ADMIN
+# ═══════════════════════════════════════════════════════════════
+
+@admin.register(TranscriptionJob)
+class TranscriptionJobAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'organization', 'encounter', 'status', 'received_size', 'total_size', 'attempts', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['filename', 'encounter__encounter_number']
+    raw_id_fields = ['encounter', 'created_by']
+    readonly_fields = ['received_size', 'attempts', 'started_at', 'completed_at', 'created_at', 'updated_at']
+
+
 # Admin site customizations are handled by Jazzmin in settings.py
\ No newline at end of file
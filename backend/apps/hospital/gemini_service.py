@@ -1,32 +1,50 @@
 """
 Gemini AI Service for consultation note generation from audio recordings
+
+Calls go through the shared AI gateway (apps.core.ai): pooled connections
+and retries within a latency budget.  Both responses are patient data: the
+transcription is only cached for ``TRANSCRIPTION_CACHE_TIMEOUT`` (enough for
+a failed job's retry to skip the audio upload) and the notes, which embed
+the patient context, are never cached.
 """
 import logging
+import mimetypes
 import os
 import json
-import warnings
-import sys
-
-# Suppress all FutureWarnings before importing google.generativeai
-warnings.simplefilter('ignore', FutureWarning)
 
-import google.generativeai as genai
-from decouple import config
+from apps.core.ai import AIError, Blob, get_gateway, register_operation
 
 logger = logging.getLogger(__name__)
 
+MODEL = 'gemini-2.5-flash'
+TRANSCRIPTION = register_operation('consultation_transcription')
+NOTES = register_operation('consultation_notes')
+# Seconds a transcription may take, retries included (background jobs).
+TRANSCRIPTION_BUDGET = 300
+NOTES_BUDGET = 120
+# Seconds a transcription stays cached; covers the retries of a job.
+TRANSCRIPTION_CACHE_TIMEOUT = 60 * 60
+
+AUDIO_MIME_TYPES = {
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mp3',
+    '.m4a': 'audio/mp4',
+    '.ogg': 'audio/ogg',
+    '.opus': 'audio/ogg',
+    '.webm': 'audio/webm',
+    '.flac': 'audio/flac',
+    '.aac': 'audio/aac',
+}
+
+
+def audio_mime_type(path):
+    extension = os.path.splitext(path)[1].lower()
+    return AUDIO_MIME_TYPES.get(extension) or mimetypes.guess_type(path)[0] or 'audio/wav'
+
 
 class GeminiConsultationService:
     """Service for generating consultation notes from audio recordings using Gemini Flash"""
     
-    def __init__(self):
-        """Initialize Gemini client with API key"""
-        self.api_key = config('GEMINI_API_KEY', default=None)
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-        else:
-            logger.warning("GEMINI_API_KEY not configured in environment")
-    
     def transcribe_and_generate_notes(self, audio_file_path: str, consultation_context: dict = None) -> dict:
         """
         Transcribe audio recording and generate structured consultation notes
@@ -40,16 +58,7 @@ class GeminiConsultationService:
             dict with transcription and generated notes structure
         """
         try:
-            if not self.api_key:
-                logger.error("GEMINI_API_KEY environment variable is not set")
-                return {
-                    'success': False,
-                    'error': 'Gemini API key not configured',
-                    'detail': 'GEMINI_API_KEY not set in environment'
-                }
-            
             # Check if file exists
-            import os
             if not os.path.exists(audio_file_path):
                 logger.error(f"Audio file not found: {audio_file_path}")
                 return {
@@ -69,32 +78,7 @@ class GeminiConsultationService:
                     'detail': 'Received empty audio file from frontend'
                 }
             
-            # Upload file to Gemini
-            logger.info(f"Uploading audio file: {audio_file_path} (size: {file_size} bytes)")
-            try:
-                audio_file = genai.upload_file(audio_file_path)
-                logger.info(f"File uploaded successfully: {audio_file.name if hasattr(audio_file, 'name') else audio_file}")
-            except Exception as upload_err:
-                logger.error(f"Failed to upload file to Gemini: {str(upload_err)}")
-                import traceback
-                logger.error(f"Upload traceback: {traceback.format_exc()}")
-                return {
-                    'success': False,
-                    'error': 'Failed to upload audio to Gemini',
-                    'detail': str(upload_err)
-                }
-            
-            # Create model instance
-            try:
-                model = genai.GenerativeModel(model_name="gemini-2.5-flash")
-                logger.info("Gemini model initialized")
-            except Exception as model_err:
-                logger.error(f"Failed to initialize Gemini model: {str(model_err)}")
-                return {
-                    'success': False,
-                    'error': 'Failed to initialize AI model',
-                    'detail': str(model_err)
-                }
+            gateway = get_gateway()
             
             # First, transcribe the audio
             transcription_prompt = """Please transcribe this medical consultation audio recording. 
@@ -103,19 +87,20 @@ class GeminiConsultationService:
             
             logger.info("Generating transcription from audio...")
             try:
-                transcription_response = model.generate_content(
-                    [transcription_prompt, audio_file]
-                )
-                transcription_text = transcription_response.text
+                transcription_text = gateway.generate(
+                    TRANSCRIPTION,
+                    [transcription_prompt, Blob(audio_mime_type(audio_file_path), path=audio_file_path)],
+                    model=MODEL,
+                    budget=TRANSCRIPTION_BUDGET,
+                    cache_timeout=TRANSCRIPTION_CACHE_TIMEOUT,
+                ).text
                 logger.info(f"Transcription completed ({len(transcription_text)} chars)")
-            except Exception as transcribe_err:
-                logger.error(f"Failed to transcribe audio: {str(transcribe_err)}")
-                import traceback
-                logger.error(f"Transcription traceback: {traceback.format_exc()}")
+            except AIError as transcribe_err:
+                logger.error(f"Failed to transcribe audio: {transcribe_err.detail}")
                 return {
                     'success': False,
                     'error': 'Failed to transcribe audio',
-                    'detail': str(transcribe_err)
+                    'detail': transcribe_err.detail
                 }
             
             # Build enhanced prompt with consultation context
@@ -144,25 +129,18 @@ Write the summary as clean, professional medical notes suitable for patient reco
             
             logger.info("Generating consultation summary from transcription...")
             try:
-                notes_response = model.generate_content(notes_prompt)
-                notes_text = notes_response.text
+                notes_text = gateway.generate(
+                    NOTES, [notes_prompt], model=MODEL, budget=NOTES_BUDGET, cache_timeout=0,
+                ).text
                 logger.info(f"Summary generation completed ({len(notes_text)} chars)")
-            except Exception as notes_err:
-                logger.error(f"Failed to generate summary: {str(notes_err)}")
-                import traceback
-                logger.error(f"Summary generation traceback: {traceback.format_exc()}")
+            except AIError as notes_err:
+                logger.error(f"Failed to generate summary: {notes_err.detail}")
                 return {
                     'success': False,
                     'error': 'Failed to generate consultation summary',
-                    'detail': str(notes_err)
+                    'detail': notes_err.detail
                 }
             
-            # Clean up uploaded file
-            try:
-                genai.delete_file(audio_file.name)
-            except Exception as e:
-                logger.warning(f"Could not delete uploaded file: {e}")
-            
             return {
                 'success': True,
                 'transcription': transcription_text,
@@ -277,6 +255,9 @@ Write the summary as clean, professional medical notes suitable for patient reco
             }
 
 
+_service = GeminiConsultationService()
+
+
 def get_gemini_service() -> GeminiConsultationService:
-    """Get configured Gemini consultation service instance"""
-    return GeminiConsultationService()
+    """Get the shared Gemini consultation service (stateless, see apps.core.ai)"""
+    return _service
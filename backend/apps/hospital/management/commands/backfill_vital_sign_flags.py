@@ -0,0 +1,64 @@
+"""
+Recompute the stored abnormality flags of existing vital signs.
+
+Run after migrating (rows created before the flags existed are all
+normal) and after changing the reference ranges.
+
+Usage:
+    python manage.py backfill_vital_sign_flags
+    python manage.py backfill_vital_sign_flags --batch-size 5000 --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.hospital.models import VitalSigns
+from apps.hospital.reference_ranges import FLAGS, abnormal_flags, load_ranges
+
+
+class Command(BaseCommand):
+    help = 'Recompute VitalSigns.abnormal_flags / is_abnormal from the reference ranges'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the rows that would change without updating them',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ranges = load_ranges()
+        columns = ['pk', 'patient', 'measured_at', 'abnormal_flags', 'is_abnormal', *FLAGS]
+        queryset = VitalSigns.objects.select_related('patient').only(
+            *columns, 'patient__date_of_birth', 'patient__gender',
+        ).order_by('pk')
+
+        scanned = changed = 0
+        last_pk = None
+        while True:
+            batch = queryset.filter(pk__gt=last_pk) if last_pk is not None else queryset
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            stale = []
+            for vital_signs in batch:
+                flags = abnormal_flags(vital_signs, ranges)
+                if flags != vital_signs.abnormal_flags or vital_signs.is_abnormal != bool(flags):
+                    vital_signs.abnormal_flags = flags
+                    vital_signs.is_abnormal = bool(flags)
+                    stale.append(vital_signs)
+            changed += len(stale)
+            if stale and not options['dry_run']:
+                with transaction.atomic():
+                    VitalSigns.objects.bulk_update(stale, ['abnormal_flags', 'is_abnormal'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'DRY RUN: {changed} of {scanned} vital signs would be updated'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Updated {changed} of {scanned} vital signs'))
@@ -0,0 +1,41 @@
+"""
+Rebuild the patient medical summaries (apps.hospital.medical_summary).
+
+Run after migrating and after bulk updates that bypass signals; ``--check``
+only lists the summaries that differ from the tables and fails if any does.
+
+Usage:
+    python manage.py rebuild_medical_summaries
+    python manage.py rebuild_medical_summaries --check --organization <uuid>
+"""
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.hospital import medical_summary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or check) the patient medical summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=uuid.UUID, help='Only the patients of this organization id')
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report the summaries that drifted without rebuilding them',
+        )
+
+    def handle(self, *args, **options):
+        organization_id = options['organization']
+        if options['check']:
+            problems = 0
+            for patient_id, summary_organization_id, problem in medical_summary.check(organization_id):
+                problems += 1
+                self.stdout.write(f'{patient_id} @ {summary_organization_id}: {problem}')
+            if problems:
+                raise CommandError(f'{problems} medical summaries out of date')
+            self.stdout.write(self.style.SUCCESS('Medical summaries are up to date'))
+            return
+        patients = medical_summary.rebuild(organization_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the medical summaries of {patients} patients'))
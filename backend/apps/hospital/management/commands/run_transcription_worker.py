@@ -0,0 +1,40 @@
+"""
+Transcribe uploaded consultation recordings in the background.
+
+Run one or more alongside gunicorn, with access to the upload directory
+(``TRANSCRIPTION_UPLOAD_DIR``); workers share the queue through the
+database, each job is taken by one worker.  The Docker image starts
+``TRANSCRIPTION_WORKERS`` of them next to gunicorn (entrypoint.sh).
+
+Usage:
+    python manage.py run_transcription_worker
+    python manage.py run_transcription_worker --once
+    python manage.py run_transcription_worker --poll-interval 5
+"""
+from django.core.management.base import BaseCommand
+
+from apps.hospital.transcription import work
+
+
+class Command(BaseCommand):
+    help = 'Run queued consultation transcription jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds between queue checks when idle',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            done = work(once=options['once'], poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f'Ran {done} transcription jobs'))
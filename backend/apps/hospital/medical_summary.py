@@ -0,0 +1,216 @@
+"""
+Patient medical summary read model.
+
+Opening a patient used to cost ``patient_medical_summary_view`` an access
+check, three "recent" queries, three counts and two item counts per recent
+prescription.  The view now reads one ``PatientMedicalSummary`` row per
+patient and organization, joined with the patient, holding:
+
+* the encounter count and the encounter and prescription counts per status;
+* the last ``RECENT`` encounters, prescriptions and vital signs, serialized
+  like the list endpoints.
+
+A row exists while the patient has encounters in the organization, which is
+also the view's access rule.  Signals in ``signals.py`` call
+``schedule_refresh`` when an encounter, prescription (or item), vital signs
+or patient is saved or deleted: the patient's summaries are recomputed once
+per transaction, after the commit.  Staff names in the serialized records
+follow on the next change of the patient's records.
+
+``python manage.py rebuild_medical_summaries`` rebuilds every summary (after
+migrating, or after bulk updates that bypass signals); ``--check`` only
+reports the summaries that drifted from the tables.
+"""
+import json
+
+from django.db import transaction
+from django.db.models import Count
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import HospitalEncounter, PatientMedicalSummary, VitalSigns
+
+# Encounters, prescriptions and vital signs listed in a summary.
+RECENT = 5
+
+SUMMARY_FIELDS = (
+    'encounter_count', 'encounters_by_status', 'prescriptions_by_status',
+    'recent_encounters', 'recent_prescriptions', 'recent_vital_signs', 'last_vital_signs_at',
+)
+
+
+def _plain(data):
+    # What the API renders (UUIDs, decimals and dates as strings), so stored
+    # and recomputed summaries compare equal.
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def _counts_by_status(queryset):
+    return dict(queryset.order_by().values_list('status').annotate(count=Count('pk')))
+
+
+def _vital_signs(patient_id):
+    from .serializers import VitalSignsListSerializer
+
+    recent = list(VitalSigns.objects.filter(patient_id=patient_id).select_related(
+        'patient', 'measured_by',
+    ).order_by('-measured_at')[:RECENT])
+    return {
+        'recent_vital_signs': _plain(VitalSignsListSerializer(recent, many=True).data),
+        'last_vital_signs_at': recent[0].measured_at if recent else None,
+    }
+
+
+def compute(patient_id, organization_id, vital_signs=None):
+    """
+    Summary fields of a patient in an organization, ``None`` when the patient
+    has no encounter there.  Vital signs are not tied to an organization:
+    pass ``vital_signs`` to reuse them across the patient's organizations.
+    """
+    from apps.prescriptions.models import Prescription
+    from apps.prescriptions.serializers import PrescriptionListSerializer
+    from .serializers import HospitalEncounterListSerializer
+
+    encounters = HospitalEncounter.objects.filter(patient_id=patient_id, organization_id=organization_id)
+    encounters_by_status = _counts_by_status(encounters)
+    if not encounters_by_status:
+        return None
+    prescriptions = Prescription.objects.filter(patient_id=patient_id, organization_id=organization_id)
+
+    recent_encounters = encounters.select_related('patient', 'attending_physician').order_by('-created_at')[:RECENT]
+    recent_prescriptions = prescriptions.select_related(
+        'patient', 'doctor', 'encounter',
+    ).prefetch_related('items').order_by('-created_at')[:RECENT]
+    return {
+        'encounter_count': sum(encounters_by_status.values()),
+        'encounters_by_status': encounters_by_status,
+        'prescriptions_by_status': _counts_by_status(prescriptions),
+        'recent_encounters': _plain(HospitalEncounterListSerializer(recent_encounters, many=True).data),
+        'recent_prescriptions': _plain(PrescriptionListSerializer(recent_prescriptions, many=True).data),
+        **(vital_signs if vital_signs is not None else _vital_signs(patient_id)),
+    }
+
+
+def _organizations_of(patient_id):
+    return set(HospitalEncounter.objects.filter(patient_id=patient_id).order_by().values_list(
+        'organization_id', flat=True,
+    ).distinct()) | set(PatientMedicalSummary.objects.filter(patient_id=patient_id).values_list(
+        'organization_id', flat=True,
+    ))
+
+
+def refresh(patient_id):
+    """
+    Recompute the summaries of a patient in every organization where it has
+    encounters (or had a summary).  Returns the summaries kept.
+    """
+    vital_signs = None
+    summaries, gone = [], []
+    for organization_id in _organizations_of(patient_id):
+        if vital_signs is None:
+            vital_signs = _vital_signs(patient_id)
+        values = compute(patient_id, organization_id, vital_signs)
+        if values is None:
+            gone.append(organization_id)
+        else:
+            summaries.append(PatientMedicalSummary(
+                patient_id=patient_id, organization_id=organization_id, **values,
+            ))
+    if gone:
+        PatientMedicalSummary.objects.filter(patient_id=patient_id, organization_id__in=gone).delete()
+    if summaries:
+        # INSERT ... ON CONFLICT: concurrent refreshes of a new patient do not collide.
+        PatientMedicalSummary.objects.bulk_create(
+            summaries, update_conflicts=True, unique_fields=['patient', 'organization'],
+            update_fields=[*SUMMARY_FIELDS, 'refreshed_at'],
+        )
+    return summaries
+
+
+class _PendingRefresh:
+    """On-commit refresh of a patient's summaries."""
+
+    def __init__(self, patient_id):
+        self.patient_id = patient_id
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        refresh(self.patient_id)
+
+
+def schedule_refresh(patient_id):
+    """Refresh the summaries of a patient after the commit, once per transaction."""
+    if patient_id is None:
+        return
+    for _, callback, *_ in transaction.get_connection().run_on_commit:
+        if isinstance(callback, _PendingRefresh) and callback.patient_id == patient_id and not callback.done:
+            return
+    transaction.on_commit(_PendingRefresh(patient_id))
+
+
+def get_summary(patient_id, organization_id):
+    """
+    Summary of a patient in an organization with its patient, in one query;
+    ``None`` when the patient has no encounter there.  A missing summary
+    (not rebuilt since the migration) is computed on the way.
+    """
+    queryset = PatientMedicalSummary.objects.select_related('patient')
+    summary = queryset.filter(patient_id=patient_id, organization_id=organization_id).first()
+    if summary is None and any(s.organization_id == organization_id for s in refresh(patient_id)):
+        summary = queryset.filter(patient_id=patient_id, organization_id=organization_id).first()
+    return summary
+
+
+# ──────────────────────────────────────────────────────────────
+# Rebuild and consistency check
+# ──────────────────────────────────────────────────────────────
+
+def _patient_ids(organization_id=None):
+    encounters = HospitalEncounter.objects.order_by()
+    summaries = PatientMedicalSummary.objects.order_by()
+    if organization_id is not None:
+        encounters = encounters.filter(organization_id=organization_id)
+        summaries = summaries.filter(organization_id=organization_id)
+    return sorted(
+        set(encounters.values_list('patient_id', flat=True).distinct())
+        | set(summaries.values_list('patient_id', flat=True)),
+        key=str,
+    )
+
+
+def rebuild(organization_id=None):
+    """Refresh the summaries of every patient (of an organization); returns the patient count."""
+    patient_ids = _patient_ids(organization_id)
+    for patient_id in patient_ids:
+        with transaction.atomic():
+            refresh(patient_id)
+    return len(patient_ids)
+
+
+def check(organization_id=None):
+    """
+    Compare the stored summaries with the tables.  Yields ``(patient_id,
+    organization_id, problem)``: ``'missing'``, ``'orphan'`` (no encounter
+    left) or the comma-separated names of the fields that differ.
+    """
+    for patient_id in _patient_ids(organization_id):
+        stored = {
+            summary.organization_id: summary
+            for summary in PatientMedicalSummary.objects.filter(patient_id=patient_id)
+        }
+        organization_ids = _organizations_of(patient_id)
+        if organization_id is not None:
+            organization_ids &= {organization_id}
+        vital_signs = _vital_signs(patient_id)
+        for summary_organization_id in sorted(organization_ids, key=str):
+            values = compute(patient_id, summary_organization_id, vital_signs)
+            summary = stored.get(summary_organization_id)
+            if values is None:
+                if summary is not None:
+                    yield patient_id, summary_organization_id, 'orphan'
+            elif summary is None:
+                yield patient_id, summary_organization_id, 'missing'
+            else:
+                drifted = [name for name in SUMMARY_FIELDS if getattr(summary, name) != values[name]]
+                if drifted:
+                    yield patient_id, summary_organization_id, ', '.join(drifted)
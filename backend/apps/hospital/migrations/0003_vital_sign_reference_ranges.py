@@ -0,0 +1,87 @@
+"""
+Vital sign reference ranges and stored abnormality flags.
+
+Seeds the thresholds previously hard-coded in ``VitalSigns.is_abnormal``
+(blood pressure for adults only) plus pediatric heart and respiratory rate
+bands.  Existing vital signs keep ``abnormal_flags = 0`` until
+``python manage.py backfill_vital_sign_flags`` is run.
+"""
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Q
+
+
+# (parameter, age_min_years, age_max_years, low, high)
+DEFAULT_RANGES = [
+    ('temperature', 0, None, '36.1', '37.2'),
+    ('blood_pressure_systolic', 18, None, '90', '140'),
+    ('blood_pressure_diastolic', 18, None, '60', '90'),
+    ('heart_rate', 0, 1, '100', '160'),
+    ('heart_rate', 1, 3, '90', '150'),
+    ('heart_rate', 3, 6, '80', '140'),
+    ('heart_rate', 6, 12, '70', '120'),
+    ('heart_rate', 12, None, '60', '100'),
+    ('respiratory_rate', 0, 1, '30', '60'),
+    ('respiratory_rate', 1, 3, '24', '40'),
+    ('respiratory_rate', 3, 6, '22', '34'),
+    ('respiratory_rate', 6, 12, '18', '30'),
+    ('respiratory_rate', 12, None, '12', '20'),
+    ('oxygen_saturation', 0, None, '95', None),
+]
+
+
+def seed_reference_ranges(apps, schema_editor):
+    VitalSignReferenceRange = apps.get_model('hospital', 'VitalSignReferenceRange')
+    VitalSignReferenceRange.objects.bulk_create([
+        VitalSignReferenceRange(
+            parameter=parameter, age_min_years=age_min, age_max_years=age_max,
+            low=Decimal(low) if low is not None else None,
+            high=Decimal(high) if high is not None else None,
+        )
+        for parameter, age_min, age_max, low, high in DEFAULT_RANGES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0002_triage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalSignReferenceRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parameter', models.CharField(choices=[('temperature', 'Température'), ('blood_pressure_systolic', 'Tension systolique'), ('blood_pressure_diastolic', 'Tension diastolique'), ('heart_rate', 'Fréquence cardiaque'), ('respiratory_rate', 'Fréquence respiratoire'), ('oxygen_saturation', 'Saturation O₂'), ('blood_glucose', 'Glycémie')], max_length=30, verbose_name='Paramètre')),
+                ('sex', models.CharField(blank=True, choices=[('male', 'Masculin'), ('female', 'Féminin'), ('other', 'Autre')], help_text='Vide : tous les patients', max_length=10, verbose_name='Sexe')),
+                ('age_min_years', models.PositiveSmallIntegerField(default=0, verbose_name='Âge minimum (ans)')),
+                ('age_max_years', models.PositiveSmallIntegerField(blank=True, help_text='Exclu ; vide : sans limite', null=True, verbose_name='Âge maximum (ans)')),
+                ('low', models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True, verbose_name='Valeur minimale normale')),
+                ('high', models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True, verbose_name='Valeur maximale normale')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Actif')),
+            ],
+            options={
+                'verbose_name': 'Valeurs de référence',
+                'verbose_name_plural': 'Valeurs de référence',
+                'db_table': 'vital_sign_reference_ranges',
+                'ordering': ['parameter', 'sex', 'age_min_years'],
+            },
+        ),
+        migrations.RunPython(seed_reference_ranges, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='vitalsigns',
+            name='abnormal_flags',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Masque de bits des paramètres hors valeurs de référence', verbose_name='Paramètres anormaux'),
+        ),
+        migrations.AddField(
+            model_name='vitalsigns',
+            name='is_abnormal',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Anormal'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalsigns',
+            index=models.Index(condition=Q(is_abnormal=True), fields=['-measured_at'], name='vital_signs_abnormal_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Q
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hospital', '0003_vital_sign_reference_ranges'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triage',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='triages', to='hospital.hospitaldepartment', verbose_name='Service'),
+        ),
+        migrations.AddField(
+            model_name='triage',
+            name='escalation',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Nombre de niveaux de priorité gagnés depuis le triage', verbose_name='Escalade'),
+        ),
+        migrations.AddField(
+            model_name='triage',
+            name='queue_priority',
+            field=models.PositiveSmallIntegerField(default=3, editable=False, help_text="Niveau de triage moins l'escalade (1 = en premier)", verbose_name='Priorité dans la file'),
+        ),
+        migrations.AddField(
+            model_name='triage',
+            name='queued_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Entré dans la file le'),
+        ),
+        migrations.AddField(
+            model_name='triage',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_triages', to=settings.AUTH_USER_MODEL, verbose_name='Pris en charge par'),
+        ),
+        migrations.AddField(
+            model_name='triage',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Pris en charge le'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE hospital_triages
+            SET queue_priority = triage_level,
+                queued_at = COALESCE(arrival_time, triage_date)
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='triage',
+            index=models.Index(condition=Q(claimed_by__isnull=True, status__in=['in_progress', 'completed']), fields=['organization', 'queue_priority', 'queued_at', 'id'], name='hospital_triage_worklist_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+import uuid
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hospital', '0004_triage_worklist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('uploading', 'Envoi en cours'), ('queued', 'En attente'), ('processing', 'En cours de transcription'), ('completed', 'Terminé'), ('failed', 'Échec')], default='uploading', max_length=20, verbose_name='Statut')),
+                ('filename', models.CharField(blank=True, max_length=255, verbose_name='Nom du fichier')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Type de contenu')),
+                ('total_size', models.PositiveBigIntegerField(verbose_name='Taille totale (octets)')),
+                ('received_size', models.PositiveBigIntegerField(default=0, verbose_name='Octets reçus')),
+                ('consultation_context', models.JSONField(blank=True, default=dict, verbose_name='Contexte de consultation')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarré le')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+                ('error', models.TextField(blank=True, verbose_name='Erreur')),
+                ('transcription', models.TextField(blank=True, verbose_name='Transcription')),
+                ('structured_notes', models.TextField(blank=True, verbose_name='Notes de consultation')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transcription_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Créé par')),
+                ('encounter', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transcription_jobs', to='hospital.hospitalencounter', verbose_name='Consultation')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transcription_jobs', to='organizations.organization', verbose_name='Établissement')),
+            ],
+            options={
+                'verbose_name': 'Transcription de consultation',
+                'verbose_name_plural': 'Transcriptions de consultation',
+                'db_table': 'hospital_transcription_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [
+                    models.Index(fields=['organization', '-created_at'], name='hospital_tr_organiz_32cae5_idx'),
+                    models.Index(fields=['encounter', '-created_at'], name='hospital_tr_encount_86799f_idx'),
+                    models.Index(condition=models.Q(('status__in', ['queued', 'processing'])), fields=['status', 'created_at'], name='hospital_transcription_todo'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+import uuid
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('patients', '0002_patient_search_index'),
+        ('hospital', '0005_transcription_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientMedicalSummary',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('encounter_count', models.PositiveIntegerField(default=0, verbose_name='Consultations')),
+                ('encounters_by_status', models.JSONField(blank=True, default=dict, verbose_name='Consultations par statut')),
+                ('prescriptions_by_status', models.JSONField(blank=True, default=dict, verbose_name='Ordonnances par statut')),
+                ('recent_encounters', models.JSONField(blank=True, default=list, verbose_name='Dernières consultations')),
+                ('recent_prescriptions', models.JSONField(blank=True, default=list, verbose_name='Dernières ordonnances')),
+                ('recent_vital_signs', models.JSONField(blank=True, default=list, verbose_name='Derniers signes vitaux')),
+                ('last_vital_signs_at', models.DateTimeField(blank=True, null=True, verbose_name='Derniers signes vitaux le')),
+                ('refreshed_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='patient_medical_summaries', to='organizations.organization', verbose_name='Établissement')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medical_summaries', to='patients.patient', verbose_name='Patient')),
+            ],
+            options={
+                'verbose_name': 'Résumé médical',
+                'verbose_name_plural': 'Résumés médicaux',
+                'db_table': 'hospital_patient_medical_summaries',
+                'constraints': [
+                    models.UniqueConstraint(fields=('patient', 'organization'), name='unique_patient_medical_summary'),
+                ],
+            },
+        ),
+    ]
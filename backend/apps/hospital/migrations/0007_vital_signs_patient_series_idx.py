@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0006_patient_medical_summaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vitalsigns',
+            index=models.Index(fields=['patient', 'measured_at'], include=['temperature', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate', 'respiratory_rate', 'oxygen_saturation', 'weight', 'pain_level', 'blood_glucose'], name='vital_signs_patient_series_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0007_vital_signs_patient_series_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='triage',
+            name='claimed_from_status',
+            field=models.CharField(blank=True, choices=[('in_progress', 'En cours'), ('completed', 'En attente'), ('in_treatment', 'En traitement'), ('reassessment_needed', 'Réévaluation'), ('discharged', 'Sorti'), ('admitted', 'Hospitalisé'), ('transferred', 'Transféré'), ('left_before_seen', 'Parti'), ('left_against_advice', 'Parti (AMA)')], help_text='Rétabli si le patient est remis dans la file', max_length=50, verbose_name='Statut avant prise en charge'),
+        ),
+    ]
@@ -222,6 +222,75 @@ class HospitalEncounter(models.Model):
 #  VITAL SIGNS MODELS
 # ═══════════════════════════════════════════════════════════════
 
+class VitalParameter(models.TextChoices):
+    """Vital sign parameters checked against reference ranges"""
+    TEMPERATURE = 'temperature', 'Température'
+    BLOOD_PRESSURE_SYSTOLIC = 'blood_pressure_systolic', 'Tension systolique'
+    BLOOD_PRESSURE_DIASTOLIC = 'blood_pressure_diastolic', 'Tension diastolique'
+    HEART_RATE = 'heart_rate', 'Fréquence cardiaque'
+    RESPIRATORY_RATE = 'respiratory_rate', 'Fréquence respiratoire'
+    OXYGEN_SATURATION = 'oxygen_saturation', 'Saturation O₂'
+    BLOOD_GLUCOSE = 'blood_glucose', 'Glycémie'
+
+
+class VitalSignReferenceRange(models.Model):
+    """
+    Normal range of a vital sign parameter for an age band and sex.
+
+    The most specific active range applies (sex-specific before any sex,
+    then the narrowest age band); a parameter without a matching range is
+    not checked.  See apps.hospital.reference_ranges.
+    """
+    parameter = models.CharField(max_length=30, choices=VitalParameter.choices, verbose_name='Paramètre')
+    sex = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=[('male', 'Masculin'), ('female', 'Féminin'), ('other', 'Autre')],
+        verbose_name='Sexe',
+        help_text='Vide : tous les patients'
+    )
+    age_min_years = models.PositiveSmallIntegerField(default=0, verbose_name='Âge minimum (ans)')
+    age_max_years = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Âge maximum (ans)',
+        help_text='Exclu ; vide : sans limite'
+    )
+    low = models.DecimalField(
+        max_digits=6, decimal_places=1, null=True, blank=True,
+        verbose_name='Valeur minimale normale'
+    )
+    high = models.DecimalField(
+        max_digits=6, decimal_places=1, null=True, blank=True,
+        verbose_name='Valeur maximale normale'
+    )
+    is_active = models.BooleanField(default=True, verbose_name='Actif')
+
+    class Meta:
+        db_table = 'vital_sign_reference_ranges'
+        verbose_name = 'Valeurs de référence'
+        verbose_name_plural = 'Valeurs de référence'
+        ordering = ['parameter', 'sex', 'age_min_years']
+
+    def __str__(self):
+        ages = f"{self.age_min_years}-{self.age_max_years if self.age_max_years is not None else '∞'} ans"
+        return f"{self.get_parameter_display()} ({self.sex or 'tous'}, {ages}): {self.low} - {self.high}"
+
+    def clean(self):
+        super().clean()
+        if self.age_max_years is not None and self.age_max_years <= self.age_min_years:
+            raise ValidationError("L'âge maximum doit être supérieur à l'âge minimum.")
+        if self.low is not None and self.high is not None and self.low > self.high:
+            raise ValidationError('La valeur minimale doit être inférieure à la valeur maximale.')
+
+
+# Numeric vital signs charted by the trend endpoint (apps.core.timeseries).
+TREND_PARAMETERS = [
+    'temperature', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'heart_rate',
+    'respiratory_rate', 'oxygen_saturation', 'weight', 'pain_level', 'blood_glucose',
+]
+
+
 class VitalSigns(models.Model):
     """Patient vital signs record"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -327,6 +396,15 @@ class VitalSigns(models.Model):
         help_text='En mg/dL (20-800)'
     )
     
+    # Reference range checks, computed on save (apps.hospital.reference_ranges)
+    abnormal_flags = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Paramètres anormaux',
+        help_text='Masque de bits des paramètres hors valeurs de référence'
+    )
+    is_abnormal = models.BooleanField(default=False, editable=False, verbose_name='Anormal')
+
     # Additional Measurements
     body_mass_index = models.DecimalField(
         max_digits=4, 
@@ -406,9 +484,17 @@ class VitalSigns(models.Model):
         verbose_name_plural = 'Signes vitaux'
         ordering = ['-measured_at']
         indexes = [
-            models.Index(fields=['patient', '-measured_at']),
+            # Patient history and trends: index-only scans of the charted values.
+            models.Index(
+                fields=['patient', 'measured_at'], name='vital_signs_patient_series_idx',
+                include=TREND_PARAMETERS,
+            ),
             models.Index(fields=['encounter', '-measured_at']),
             models.Index(fields=['measured_by', '-measured_at']),
+            models.Index(
+                fields=['-measured_at'], name='vital_signs_abnormal_idx',
+                condition=models.Q(is_abnormal=True),
+            ),
         ]
         
     def __str__(self):
@@ -421,7 +507,20 @@ class VitalSigns(models.Model):
             self.body_mass_index = round(float(self.weight) / (height_m ** 2), 1)
         else:
             self.body_mass_index = None
+        from .reference_ranges import abnormal_flags
+        self.abnormal_flags = abnormal_flags(self)
+        self.is_abnormal = self.abnormal_flags != 0
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'abnormal_flags', 'is_abnormal'}
         super().save(*args, **kwargs)
+
+    # Columns read by the properties below (sparse fieldsets, apps.core.fieldsets).
+    FIELD_DEPENDENCIES = {
+        'bmi_category': ['body_mass_index'],
+        'blood_pressure_reading': ['blood_pressure_systolic', 'blood_pressure_diastolic'],
+        'abnormal_parameters': ['abnormal_flags'],
+    }
     
     @property
     def bmi_category(self):
@@ -446,32 +545,10 @@ class VitalSigns(models.Model):
         return ""
     
     @property
-    def is_abnormal(self):
-        """Check if any vital signs are outside normal ranges"""
-        abnormal = []
-        
-        if self.temperature:
-            if self.temperature < 36.1 or self.temperature > 37.2:
-                abnormal.append('temperature')
-        
-        if self.blood_pressure_systolic and self.blood_pressure_diastolic:
-            if (self.blood_pressure_systolic < 90 or self.blood_pressure_systolic > 140 or
-                self.blood_pressure_diastolic < 60 or self.blood_pressure_diastolic > 90):
-                abnormal.append('blood_pressure')
-        
-        if self.heart_rate:
-            if self.heart_rate < 60 or self.heart_rate > 100:
-                abnormal.append('heart_rate')
-        
-        if self.respiratory_rate:
-            if self.respiratory_rate < 12 or self.respiratory_rate > 20:
-                abnormal.append('respiratory_rate')
-        
-        if self.oxygen_saturation:
-            if self.oxygen_saturation < 95:
-                abnormal.append('oxygen_saturation')
-                
-        return len(abnormal) > 0
+    def abnormal_parameters(self):
+        """Parameters outside their reference range when measured"""
+        from .reference_ranges import flag_parameters
+        return flag_parameters(self.abnormal_flags)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -627,6 +704,20 @@ class HospitalBed(models.Model):
     def __str__(self):
         return f"{self.department.name} - Chambre {self.room_number} - Lit {self.bed_number}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the signals move the bed between bed board counters (apps.hospital.occupancy).
+        instance._loaded_slot = instance.board_slot if {
+            'department_id', 'status', 'is_active'
+        } <= instance.__dict__.keys() else ...
+        return instance
+
+    @property
+    def board_slot(self):
+        """``(department, status)`` counter of the bed board, ``None`` if inactive"""
+        return (self.department_id, self.status) if self.is_active else None
+
 
 # ═══════════════════════════════════════════════════════════════
 #  TRIAGE MODELS
@@ -654,6 +745,10 @@ class TriageStatus(models.TextChoices):
     LEFT_AGAINST_ADVICE = 'left_against_advice', 'Parti (AMA)'
 
 
+# Triaged patients waiting to be seen (the worklist).
+WAITING_STATUSES = [TriageStatus.IN_PROGRESS, TriageStatus.COMPLETED]
+
+
 class Triage(models.Model):
     """Emergency triage assessment"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -759,6 +854,45 @@ class Triage(models.Model):
     triage_end_time = models.DateTimeField(null=True, blank=True, verbose_name='Fin du triage')
     estimated_wait_time = models.IntegerField(null=True, blank=True, verbose_name='Temps d\'attente estimé (min)')
     
+    # Worklist (apps.hospital.worklist): waiting patients are served by
+    # queue_priority, then queued_at; a clinician claims them one at a time.
+    department = models.ForeignKey(
+        HospitalDepartment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='triages',
+        verbose_name='Service'
+    )
+    escalation = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Escalade',
+        help_text='Nombre de niveaux de priorité gagnés depuis le triage'
+    )
+    queue_priority = models.PositiveSmallIntegerField(
+        default=TriageLevel.URGENT,
+        editable=False,
+        verbose_name='Priorité dans la file',
+        help_text='Niveau de triage moins l\'escalade (1 = en premier)'
+    )
+    queued_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Entré dans la file le')
+    claimed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_triages',
+        verbose_name='Pris en charge par'
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='Pris en charge le')
+    claimed_from_status = models.CharField(
+        max_length=50,
+        choices=TriageStatus.choices,
+        blank=True,
+        verbose_name='Statut avant prise en charge',
+        help_text='Rétabli si le patient est remis dans la file'
+    )
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Modifié le')
@@ -774,7 +908,170 @@ class Triage(models.Model):
             models.Index(fields=['status', '-triage_date']),
             models.Index(fields=['organization', 'triage_level']),
             models.Index(fields=['organization', 'status']),
+            models.Index(
+                fields=['organization', 'queue_priority', 'queued_at', 'id'],
+                name='hospital_triage_worklist_idx',
+                condition=models.Q(status__in=WAITING_STATUSES, claimed_by__isnull=True),
+            ),
         ]
     
     def __str__(self):
-        return f"{self.triage_number} - {self.patient.full_name} (Niveau {self.triage_level})"
\ No newline at end of file
+        return f"{self.triage_number} - {self.patient.full_name} (Niveau {self.triage_level})"
+
+    def save(self, *args, **kwargs):
+        from django.utils import timezone
+        self.queue_priority = max(TriageLevel.RESUSCITATION, self.triage_level - self.escalation)
+        if self.queued_at is None:
+            self.queued_at = self.arrival_time or timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'queue_priority', 'queued_at'}
+        super().save(*args, **kwargs)
+
+# ═══════════════════════════════════════════════════════════════
+#  CONSULTATION TRANSCRIPTION JOBS
+# ═══════════════════════════════════════════════════════════════
+
+class TranscriptionJobStatus(models.TextChoices):
+    """Status of a consultation recording transcription job"""
+    UPLOADING = 'uploading', 'Envoi en cours'
+    QUEUED = 'queued', 'En attente'
+    PROCESSING = 'processing', 'En cours de transcription'
+    COMPLETED = 'completed', 'Terminé'
+    FAILED = 'failed', 'Échec'
+
+
+class TranscriptionJob(models.Model):
+    """
+    Consultation recording uploaded in chunks and transcribed in the
+    background by ``python manage.py run_transcription_worker``.
+    See apps.hospital.transcription.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='transcription_jobs',
+        verbose_name='Établissement'
+    )
+    encounter = models.ForeignKey(
+        HospitalEncounter,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transcription_jobs',
+        verbose_name='Consultation'
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transcription_jobs',
+        verbose_name='Créé par'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=TranscriptionJobStatus.choices,
+        default=TranscriptionJobStatus.UPLOADING,
+        verbose_name='Statut'
+    )
+
+    # Upload
+    filename = models.CharField(max_length=255, blank=True, verbose_name='Nom du fichier')
+    content_type = models.CharField(max_length=100, blank=True, verbose_name='Type de contenu')
+    total_size = models.PositiveBigIntegerField(verbose_name='Taille totale (octets)')
+    received_size = models.PositiveBigIntegerField(default=0, verbose_name='Octets reçus')
+    consultation_context = models.JSONField(default=dict, blank=True, verbose_name='Contexte de consultation')
+
+    # Processing
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Démarré le')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminé le')
+    error = models.TextField(blank=True, verbose_name='Erreur')
+
+    # Result
+    transcription = models.TextField(blank=True, verbose_name='Transcription')
+    structured_notes = models.TextField(blank=True, verbose_name='Notes de consultation')
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Créé le')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Modifié le')
+
+    class Meta:
+        db_table = 'hospital_transcription_jobs'
+        verbose_name = 'Transcription de consultation'
+        verbose_name_plural = 'Transcriptions de consultation'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', '-created_at']),
+            models.Index(fields=['encounter', '-created_at']),
+            models.Index(
+                fields=['status', 'created_at'],
+                name='hospital_transcription_todo',
+                condition=models.Q(status__in=['queued', 'processing']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.filename or self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_uploaded(self):
+        return self.received_size >= self.total_size
+
+
+# ═══════════════════════════════════════════════════════════════
+#  PATIENT MEDICAL SUMMARY (read model)
+# ═══════════════════════════════════════════════════════════════
+
+class PatientMedicalSummary(models.Model):
+    """
+    Medical summary of a patient in an organization, served as is by
+    ``patient_medical_summary_view``.  Derived data: maintained by the
+    signals of apps.hospital.medical_summary, rebuilt with
+    ``python manage.py rebuild_medical_summaries``.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    patient = models.ForeignKey(
+        'patients.Patient',
+        on_delete=models.CASCADE,
+        related_name='medical_summaries',
+        verbose_name='Patient'
+    )
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='patient_medical_summaries',
+        verbose_name='Établissement'
+    )
+
+    # Counts
+    encounter_count = models.PositiveIntegerField(default=0, verbose_name='Consultations')
+    encounters_by_status = models.JSONField(default=dict, blank=True, verbose_name='Consultations par statut')
+    prescriptions_by_status = models.JSONField(default=dict, blank=True, verbose_name='Ordonnances par statut')
+
+    # Latest records, serialized like the list endpoints
+    recent_encounters = models.JSONField(default=list, blank=True, verbose_name='Dernières consultations')
+    recent_prescriptions = models.JSONField(default=list, blank=True, verbose_name='Dernières ordonnances')
+    recent_vital_signs = models.JSONField(default=list, blank=True, verbose_name='Derniers signes vitaux')
+    last_vital_signs_at = models.DateTimeField(null=True, blank=True, verbose_name='Derniers signes vitaux le')
+
+    refreshed_at = models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')
+
+    class Meta:
+        db_table = 'hospital_patient_medical_summaries'
+        verbose_name = 'Résumé médical'
+        verbose_name_plural = 'Résumés médicaux'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['patient', 'organization'], name='unique_patient_medical_summary',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Résumé médical - {self.patient_id} ({self.organization_id})"
+
+    @property
+    def prescription_count(self):
+        return sum(self.prescriptions_by_status.values())
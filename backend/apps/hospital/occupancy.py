@@ -0,0 +1,250 @@
+"""
+In-memory bed board.
+
+Ward screens show, per department, how many active beds are in each status.
+Each API process keeps that board per organization instead of counting
+``HospitalBed`` rows on every poll:
+
+* signals in ``signals.py`` call ``bed_changed`` after the commit of a bed
+  save or delete (``assign_bed_view``, ``release_bed_view``, the encounter
+  signals, the admin...) with the bed's ``(department, status)`` before and
+  after.  The local board applies the move to its counters and the
+  organization version of the ``'bed_board'`` namespace is bumped (see
+  apps.core.cache);
+* a move is only applied when the board was counted before the bed was
+  written: a board counted later may already include it (its count ran
+  after the commit, or read the version before the bump), and is rebuilt;
+* other processes re-check the shared version at most every
+  ``BED_BOARD_LOCAL_TTL`` seconds and rebuild the organization board (one
+  grouped count) when it moved.  Department changes always rebuild.
+
+Screens poll ``bed_occupancy_view``; a poll is a dict lookup.  The board
+version is its ETag: a poll sending it back in ``If-None-Match`` gets a 304,
+and with ``?wait=`` the poll is held until the board changes (``wait_for_change``),
+at most ``BED_BOARD_MAX_WAIT`` seconds.  Changes recorded by this process wake
+the waiting polls at once, those of other processes within
+``BED_BOARD_LOCAL_TTL`` seconds.  A held poll keeps a worker thread busy: no
+more than ``BED_BOARD_MAX_WAITERS`` are held per process, the others are
+answered at once.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils.http import parse_etags
+
+from apps.core.cache import get_versions, invalidate
+
+NAMESPACE = 'bed_board'
+
+STATUSES = ('available', 'occupied', 'reserved', 'out_of_order', 'cleaning')
+
+# organization id → Board
+_boards = {}
+_boards_lock = threading.Lock()
+_waiters = 0
+
+
+def _local_ttl():
+    return getattr(settings, 'BED_BOARD_LOCAL_TTL', 2)
+
+
+def max_wait():
+    return getattr(settings, 'BED_BOARD_MAX_WAIT', 25)
+
+
+def _max_waiters():
+    return getattr(settings, 'BED_BOARD_MAX_WAITERS', 1)
+
+
+def _empty_counts():
+    return dict.fromkeys(STATUSES, 0)
+
+
+class Board:
+    """Bed counts per department and status of one organization."""
+
+    def __init__(self, organization_id):
+        self.organization_id = organization_id
+        self.departments = {}
+        self.versions = None
+        # time.monotonic() once the counts were read.
+        self.counted_at = None
+        self.checked_until = 0
+        self.lock = threading.RLock()
+        # Notified when the board changed or must be rebuilt.
+        self.changed = threading.Condition(self.lock)
+
+    @property
+    def version(self):
+        return '.'.join(map(str, self.versions)) if self.versions else ''
+
+    @property
+    def etag(self):
+        return make_etag(self.version)
+
+    def build(self, versions):
+        """Count every bed; ``versions`` must be read before the counts."""
+        from .models import HospitalBed, HospitalDepartment
+
+        departments = {
+            pk: {'id': str(pk), 'name': name, 'counts': _empty_counts()}
+            for pk, name in HospitalDepartment.objects.filter(
+                organization_id=self.organization_id, is_active=True,
+            ).order_by('name').values_list('pk', 'name')
+        }
+        rows = list(HospitalBed.objects.filter(
+            department__in=departments, is_active=True,
+        ).order_by().values_list('department_id', 'status').annotate(count=Count('pk')))
+        counted_at = time.monotonic()
+        for department_id, bed_status, count in rows:
+            counts = departments[department_id]['counts']
+            counts[bed_status] = counts.get(bed_status, 0) + count
+        with self.lock:
+            self.departments = departments
+            self.versions = versions
+            self.counted_at = counted_at
+            self.changed.notify_all()
+
+    def move(self, before, after):
+        """Apply a bed move between ``(department, status)`` slots; ``False`` if unknown here."""
+        for slot in (before, after):
+            if slot is not None and slot[0] not in self.departments:
+                return False
+        if before is not None:
+            counts = self.departments[before[0]]['counts']
+            counts[before[1]] = counts.get(before[1], 0) - 1
+        if after is not None:
+            counts = self.departments[after[0]]['counts']
+            counts[after[1]] = counts.get(after[1], 0) + 1
+        return True
+
+    def as_dict(self):
+        """Board payload, in the shape of ``bed_occupancy_view``."""
+        with self.lock:
+            departments = []
+            totals = _empty_counts()
+            for department in self.departments.values():
+                counts = department['counts']
+                for bed_status, count in counts.items():
+                    totals[bed_status] = totals.get(bed_status, 0) + count
+                departments.append({
+                    'id': department['id'],
+                    'name': department['name'],
+                    'total_beds': sum(counts.values()),
+                    'occupied_beds': counts['occupied'],
+                    'available_beds': counts['available'],
+                    'counts': dict(counts),
+                })
+            version = self.version
+        total_beds = sum(totals.values())
+        return {
+            'total_beds': total_beds,
+            'occupied_beds': totals['occupied'],
+            'available_beds': totals['available'],
+            'occupancy_rate': round(totals['occupied'] / total_beds * 100, 1) if total_beds else 0,
+            'counts': totals,
+            'departments': departments,
+            'version': version,
+        }
+
+
+def _board(organization_id):
+    with _boards_lock:
+        board = _boards.get(organization_id)
+        if board is None:
+            board = _boards[organization_id] = Board(organization_id)
+    return board
+
+
+def get_board(organization_id):
+    """Up-to-date bed board of an organization."""
+    board = _board(organization_id)
+    if board.checked_until > time.monotonic():
+        return board
+    with board.lock:
+        if board.checked_until > time.monotonic():
+            return board
+        versions = get_versions(NAMESPACE, f'org:{organization_id}')
+        if board.versions != versions:
+            board.build(versions)
+        board.checked_until = time.monotonic() + _local_ttl()
+    return board
+
+
+def wait_for_change(organization_id, etag, timeout):
+    """
+    Bed board of an organization once its ETag differs from ``etag``, or
+    after ``timeout`` seconds (at once when too many polls are held).
+    """
+    global _waiters
+    with _boards_lock:
+        if _waiters >= _max_waiters():
+            timeout = 0
+        else:
+            _waiters += 1
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            board = get_board(organization_id)
+            remaining = deadline - time.monotonic()
+            if not etag_matches(etag, board.etag) or remaining <= 0:
+                return board
+            with board.lock:
+                if etag_matches(etag, board.etag):
+                    # Woken by a local change, else re-checks other processes' after the TTL.
+                    board.changed.wait(min(remaining, max(board.checked_until - time.monotonic(), 0.05)))
+    finally:
+        if timeout:
+            with _boards_lock:
+                _waiters -= 1
+
+
+def make_etag(version):
+    return f'W/"bed-board-{version}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison (RFC 7232 §2.3.2) of an ``If-None-Match`` header with ``etag``."""
+    tags = parse_etags(if_none_match or '')
+    return '*' in tags or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in tags)
+
+
+def bed_changed(organization_id, before, after, written_at):
+    """
+    Record a bed moving from the ``before`` to the ``after`` ``(department, status)``
+    slot (``None``: inactive or not existing); call after the transaction commits,
+    with the ``time.monotonic()`` of the bed write (before the commit).
+    """
+    version = invalidate(NAMESPACE, organization=organization_id)
+    board = _boards.get(organization_id)
+    if board is None:
+        return
+    with board.lock:
+        consecutive = board.versions is not None and board.versions[1] == version - 1
+        # Counted before the write, hence before the commit: the move is not in the counts yet.
+        counted_before = board.counted_at is not None and board.counted_at < written_at
+        if consecutive and counted_before and board.move(before, after):
+            board.versions = (board.versions[0], version)
+        else:
+            # Another process changed the organization too, the counts may
+            # include the move already, or a department is new: rebuild.
+            board.checked_until = 0
+        board.changed.notify_all()
+
+
+def departments_changed(organization_id):
+    """Record a department change; call after the transaction commits."""
+    invalidate(NAMESPACE, organization=organization_id)
+    board = _boards.get(organization_id)
+    if board is None:
+        return
+    with board.lock:
+        board.checked_until = 0
+        board.changed.notify_all()
+
+
+def clear_local_boards():
+    with _boards_lock:
+        _boards.clear()
@@ -0,0 +1,127 @@
+"""
+Vital sign reference ranges and abnormality flags.
+
+Normal ranges live in ``VitalSignReferenceRange`` (seeded with the adult
+thresholds used so far and pediatric heart and respiratory rates, editable
+in the admin).  ``VitalSigns.save`` stores which parameters fall outside
+the range matching the patient's age and sex as a bitmask
+(``abnormal_flags``, one bit per ``VitalParameter``) plus ``is_abnormal``,
+so abnormal lists and counts are plain indexed SQL::
+
+    VitalSigns.objects.filter(is_abnormal=True)
+    with_flag(VitalSigns.objects.all(), VitalParameter.HEART_RATE)
+    abnormal_counts(VitalSigns.objects.filter(measured_at__gte=start))
+
+Flags record the ranges in force when the vital signs were saved; run
+``python manage.py backfill_vital_sign_flags`` after changing the ranges
+to re-evaluate existing rows.
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .models import VitalParameter, VitalSignReferenceRange
+
+# One bit per parameter; never renumber (stored in vital_signs.abnormal_flags).
+FLAGS = {
+    VitalParameter.TEMPERATURE: 1 << 0,
+    VitalParameter.BLOOD_PRESSURE_SYSTOLIC: 1 << 1,
+    VitalParameter.BLOOD_PRESSURE_DIASTOLIC: 1 << 2,
+    VitalParameter.HEART_RATE: 1 << 3,
+    VitalParameter.RESPIRATORY_RATE: 1 << 4,
+    VitalParameter.OXYGEN_SATURATION: 1 << 5,
+    VitalParameter.BLOOD_GLUCOSE: 1 << 6,
+}
+
+CACHE_KEY = 'hospital:vital_reference_ranges'
+
+Range = namedtuple('Range', 'parameter sex age_min age_max low high')
+
+
+def load_ranges():
+    """Active reference ranges, cached until one changes (see signals)."""
+    ranges = cache.get(CACHE_KEY)
+    if ranges is None:
+        ranges = [
+            Range(*row) for row in VitalSignReferenceRange.objects.filter(is_active=True).values_list(
+                'parameter', 'sex', 'age_min_years', 'age_max_years', 'low', 'high',
+            )
+        ]
+        cache.set(CACHE_KEY, ranges, None)
+    return ranges
+
+
+def clear_ranges_cache():
+    cache.delete(CACHE_KEY)
+
+
+def age_in_years(date_of_birth, on):
+    return on.year - date_of_birth.year - ((on.month, on.day) < (date_of_birth.month, date_of_birth.day))
+
+
+def select_range(ranges, parameter, sex, age):
+    """Most specific range of ``parameter`` for a patient, or ``None``."""
+    matching = [
+        candidate for candidate in ranges
+        if candidate.parameter == parameter
+        and candidate.sex in ('', sex)
+        and candidate.age_min <= age
+        and (candidate.age_max is None or age < candidate.age_max)
+    ]
+    if not matching:
+        return None
+    return min(matching, key=lambda candidate: (
+        candidate.sex == '',
+        (candidate.age_max if candidate.age_max is not None else 200) - candidate.age_min,
+    ))
+
+
+def abnormal_flags(vital_signs, ranges=None):
+    """Bitmask of the parameters of ``vital_signs`` outside their reference range."""
+    patient = vital_signs.patient if vital_signs.patient_id else None
+    if patient is None or patient.date_of_birth is None:
+        return 0
+    if ranges is None:
+        ranges = load_ranges()
+    measured_on = timezone.localdate(vital_signs.measured_at) if vital_signs.measured_at else timezone.localdate()
+    age = age_in_years(patient.date_of_birth, measured_on)
+
+    flags = 0
+    for parameter, bit in FLAGS.items():
+        value = getattr(vital_signs, parameter)
+        if value is None:
+            continue
+        reference = select_range(ranges, parameter, patient.gender, age)
+        if reference is None:
+            continue
+        if (reference.low is not None and value < reference.low) or (
+            reference.high is not None and value > reference.high
+        ):
+            flags |= bit
+    return flags
+
+
+def flag_parameters(flags):
+    """Parameter names set in ``flags``."""
+    return [parameter.value for parameter, bit in FLAGS.items() if flags & bit]
+
+
+def has_flag(parameter):
+    """Filter expression: ``parameter`` is flagged abnormal."""
+    bit = FLAGS[parameter]
+    return Exact(F('abnormal_flags').bitand(bit), bit)
+
+
+def with_flag(queryset, parameter):
+    return queryset.filter(has_flag(parameter))
+
+
+def abnormal_counts(queryset):
+    """``{'total': n, parameter: n, ...}`` abnormal counts of ``queryset``, in one query."""
+    return queryset.aggregate(
+        total=Count('pk', filter=Q(is_abnormal=True)),
+        **{parameter.value: Count('pk', filter=has_flag(parameter)) for parameter in FLAGS},
+    )
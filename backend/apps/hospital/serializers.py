@@ -1,11 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone as tz
+from apps.core.annotations import AnnotatedIntegerField, RelatedCount
 from .models import (
     HospitalEncounter, VitalSigns, HospitalDepartment, 
     HospitalBed, EncounterType, EncounterStatus, BedStatus,
-    Triage, TriageLevel, TriageStatus
+    Triage, TriageLevel, TriageStatus, TranscriptionJob
 )
+from .transcription import max_upload_bytes
+from .worklist import waiting_minutes
 
 User = get_user_model()
 
@@ -28,6 +31,7 @@ class VitalSignsSerializer(serializers.ModelSerializer):
     bmi_category = serializers.CharField(read_only=True)
     blood_pressure_reading = serializers.CharField(read_only=True)
     is_abnormal = serializers.BooleanField(read_only=True)
+    abnormal_parameters = serializers.ListField(child=serializers.CharField(), read_only=True)
     
     class Meta:
         model = VitalSigns
@@ -40,7 +44,7 @@ class VitalSignsSerializer(serializers.ModelSerializer):
             'bmi_category', 'pain_level', 'blood_glucose',
             'measurement_location', 'measurement_method', 'clinical_notes',
             'measured_by', 'measured_by_name', 'verified_by', 'verified_by_name',
-            'is_abnormal', 'measured_at',
+            'is_abnormal', 'abnormal_parameters', 'measured_at',
             'created_by', 'created_by_name', 'updated_by', 'updated_by_name',
             'created_at', 'updated_at'
         ]
@@ -100,6 +104,7 @@ class VitalSignsListSerializer(serializers.ModelSerializer):
     blood_pressure_reading = serializers.CharField(read_only=True)
     bmi_category = serializers.CharField(read_only=True)
     is_abnormal = serializers.BooleanField(read_only=True)
+    abnormal_parameters = serializers.ListField(child=serializers.CharField(), read_only=True)
     
     class Meta:
         model = VitalSigns
@@ -108,7 +113,7 @@ class VitalSignsListSerializer(serializers.ModelSerializer):
             'temperature', 'blood_pressure_reading', 'heart_rate',
             'respiratory_rate', 'oxygen_saturation', 'weight', 'height',
             'body_mass_index', 'bmi_category', 'pain_level',
-            'measured_by_name', 'is_abnormal', 'measured_at'
+            'measured_by_name', 'is_abnormal', 'abnormal_parameters', 'measured_at'
         ]
 
 
@@ -126,17 +131,10 @@ class HospitalEncounterSerializer(serializers.ModelSerializer):
     updated_by_name = serializers.CharField(source='updated_by.full_name', read_only=True)
     
     # Related data counts
-    vital_signs_count = serializers.SerializerMethodField()
-    prescriptions_count = serializers.SerializerMethodField()
+    vital_signs_count = AnnotatedIntegerField(RelatedCount('vital_signs'), source='vital_signs.count')
+    prescriptions_count = AnnotatedIntegerField(RelatedCount('prescriptions'), source='prescriptions.count')
     nursing_staff_names = serializers.SerializerMethodField()
     
-    def get_vital_signs_count(self, obj):
-        return obj.vital_signs_set.count() if hasattr(obj, 'vital_signs_set') else 0
-    
-    def get_prescriptions_count(self, obj):
-        # Assuming relationship to prescriptions app exists
-        return getattr(obj, 'prescriptions_count', 0)
-    
     def get_nursing_staff_names(self, obj):
         return [staff.get_full_name() for staff in obj.nursing_staff.all()]
     
@@ -157,14 +155,6 @@ class HospitalEncounterSerializer(serializers.ModelSerializer):
             'id', 'encounter_number', 'created_by', 'updated_by',
             'created_at', 'updated_at'
         ]
-    
-    def get_vital_signs_count(self, obj):
-        """Get count of vital signs for this encounter"""
-        return obj.vital_signs.count()
-    
-    def get_prescriptions_count(self, obj):
-        """Get count of prescriptions for this encounter"""
-        return obj.prescriptions.count()
 
 
 class HospitalEncounterCreateSerializer(serializers.ModelSerializer):
@@ -327,9 +317,15 @@ class HospitalDepartmentSerializer(serializers.ModelSerializer):
     department_head_name = serializers.CharField(source='department_head.full_name', read_only=True)
     
     # Department statistics
-    total_beds = serializers.SerializerMethodField()
-    occupied_beds = serializers.SerializerMethodField()
-    available_beds = serializers.SerializerMethodField()
+    total_beds = AnnotatedIntegerField(
+        RelatedCount('beds', is_active=True), method_name='get_total_beds'
+    )
+    occupied_beds = AnnotatedIntegerField(
+        RelatedCount('beds', is_active=True, status=BedStatus.OCCUPIED), method_name='get_occupied_beds'
+    )
+    available_beds = AnnotatedIntegerField(
+        RelatedCount('beds', is_active=True, status=BedStatus.AVAILABLE), method_name='get_available_beds'
+    )
     occupancy_rate = serializers.SerializerMethodField()
     
     class Meta:
@@ -363,10 +359,10 @@ class HospitalDepartmentSerializer(serializers.ModelSerializer):
         
     def get_occupancy_rate(self, obj):
         """Get occupancy rate as percentage"""
-        total = self.get_total_beds(obj)
+        total = self.fields['total_beds'].get_attribute(obj)
         if total == 0:
             return 0
-        occupied = self.get_occupied_beds(obj)
+        occupied = self.fields['occupied_beds'].get_attribute(obj)
         return round((occupied / total) * 100, 1)
 
 
@@ -464,11 +460,13 @@ class TriageSerializer(serializers.ModelSerializer):
             'status',
             'arrival_time', 'triage_start_time', 'triage_end_time',
             'estimated_wait_time',
+            'department', 'escalation', 'queue_priority', 'queued_at',
+            'claimed_by', 'claimed_at',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'triage_number', 'triage_date', 'created_at', 'updated_at',
-            'organization', 'nurse'
+            'organization', 'nurse', 'escalation', 'claimed_by', 'claimed_at'
         ]
     
     def create(self, validated_data):
@@ -505,4 +503,60 @@ class TriageListSerializer(serializers.ModelSerializer):
             'pain_level', 'status',
             'assigned_area', 'assigned_doctor_name',
             'nurse_name'
-        ]
\ No newline at end of file
+        ]
+
+
+class TriageWorklistSerializer(TriageListSerializer):
+    """Waiting patient of the triage worklist (apps.hospital.worklist)"""
+    department_name = serializers.CharField(source='department.name', read_only=True, allow_null=True)
+    waiting_minutes = serializers.SerializerMethodField()
+    claimed_by_name = serializers.CharField(source='claimed_by.full_name', read_only=True, allow_null=True)
+
+    class Meta(TriageListSerializer.Meta):
+        fields = TriageListSerializer.Meta.fields + [
+            'department', 'department_name', 'escalation', 'queue_priority',
+            'queued_at', 'waiting_minutes', 'claimed_by', 'claimed_by_name', 'claimed_at'
+        ]
+
+    def get_waiting_minutes(self, obj):
+        return waiting_minutes(obj, self.context.get('now'))
+
+
+
+# ═══════════════════════════════════════════════════════════════
+#  CONSULTATION TRANSCRIPTION JOB SERIALIZERS
+# ═══════════════════════════════════════════════════════════════
+
+class TranscriptionJobSerializer(serializers.ModelSerializer):
+    """Consultation recording transcription job (apps.hospital.transcription)"""
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = TranscriptionJob
+        fields = [
+            'id', 'encounter', 'status', 'status_display', 'filename', 'content_type',
+            'total_size', 'received_size', 'consultation_context', 'attempts', 'error',
+            'transcription', 'structured_notes', 'started_at', 'completed_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'received_size', 'attempts', 'error', 'transcription',
+            'structured_notes', 'started_at', 'completed_at', 'created_at', 'updated_at'
+        ]
+
+    def validate_total_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("L'enregistrement est vide.")
+        if value > max_upload_bytes():
+            raise serializers.ValidationError(
+                f"L'enregistrement dépasse la taille maximale ({max_upload_bytes()} octets)."
+            )
+        return value
+
+    def validate_encounter(self, encounter):
+        request = self.context.get('request')
+        if request and encounter and encounter.organization_id != request.user.organization_id:
+            raise serializers.ValidationError(
+                "Cette consultation n'appartient pas à votre établissement."
+            )
+        return encounter
@@ -1,8 +1,16 @@
+import time
+from functools import partial
+
 from django.db.models.signals import post_save, post_delete
 from django.db import transaction
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import VitalSigns, HospitalEncounter, HospitalBed
+from apps.patients.models import Patient
+from apps.prescriptions.models import Prescription, PrescriptionItem
+from .medical_summary import schedule_refresh
+from .models import VitalSigns, VitalSignReferenceRange, HospitalEncounter, HospitalBed, HospitalDepartment
+from .occupancy import bed_changed, departments_changed
+from .reference_ranges import clear_ranges_cache
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -36,6 +44,13 @@ def vital_signs_post_save(sender, instance, created, **kwargs):
         instance.encounter.save(update_fields=['status'])
 
 
+@receiver(post_save, sender=VitalSignReferenceRange)
+@receiver(post_delete, sender=VitalSignReferenceRange)
+def reference_range_changed(sender, instance, **kwargs):
+    """New vital signs are checked against the updated ranges."""
+    transaction.on_commit(clear_ranges_cache)
+
+
 # ═══════════════════════════════════════════════════════════════
 #  HOSPITAL ENCOUNTER SIGNALS
 # ═══════════════════════════════════════════════════════════════
@@ -140,4 +155,77 @@ def bed_post_save(sender, instance, created, **kwargs):
     # This could be enhanced with a celery task for automated cleanup
     if instance.status == 'cleaning' and instance.last_cleaned:
         # For now, we'll just log this - in production you'd want a scheduled task
-        pass
\ No newline at end of file
+        pass
+
+
+# ═══════════════════════════════════════════════════════════════
+#  BED BOARD (apps.hospital.occupancy)
+# ═══════════════════════════════════════════════════════════════
+
+def _organization_of(department_id):
+    return HospitalDepartment.objects.filter(pk=department_id).values_list('organization_id', flat=True).first()
+
+
+@receiver(post_save, sender=HospitalBed)
+def bed_board_on_save(sender, instance, created, **kwargs):
+    """Move the bed between bed board counters once committed."""
+    before = None if created else getattr(instance, '_loaded_slot', ...)
+    after = instance.board_slot
+    instance._loaded_slot = after
+    if before == after:
+        return
+    if before is ... or (before is not None and before[0] != instance.department_id):
+        # Previous slot unknown, or bed moved to another department: recount.
+        departments = {instance.department_id} | ({before[0]} if before is not ... else set())
+        for organization_id in {_organization_of(department_id) for department_id in departments}:
+            transaction.on_commit(partial(departments_changed, organization_id))
+        return
+    transaction.on_commit(partial(
+        bed_changed, _organization_of(instance.department_id), before, after, time.monotonic(),
+    ))
+
+
+@receiver(post_delete, sender=HospitalBed)
+def bed_board_on_delete(sender, instance, **kwargs):
+    before = getattr(instance, '_loaded_slot', ...)
+    if before is ...:
+        before = instance.board_slot
+    if before is not None:
+        transaction.on_commit(partial(bed_changed, _organization_of(before[0]), before, None, time.monotonic()))
+
+
+@receiver(post_save, sender=HospitalDepartment)
+@receiver(post_delete, sender=HospitalDepartment)
+def bed_board_on_department_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(departments_changed, instance.organization_id))
+
+
+# ═══════════════════════════════════════════════════════════════
+#  PATIENT MEDICAL SUMMARY (apps.hospital.medical_summary)
+# ═══════════════════════════════════════════════════════════════
+
+@receiver(post_save, sender=HospitalEncounter)
+@receiver(post_delete, sender=HospitalEncounter)
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=VitalSigns)
+@receiver(post_delete, sender=VitalSigns)
+def medical_summary_on_change(sender, instance, **kwargs):
+    """Recompute the patient's medical summaries once committed."""
+    schedule_refresh(instance.patient_id)
+
+
+@receiver(post_save, sender=PrescriptionItem)
+@receiver(post_delete, sender=PrescriptionItem)
+def medical_summary_on_prescription_item_change(sender, instance, **kwargs):
+    """Item counts are part of the recent prescriptions."""
+    schedule_refresh(
+        Prescription.objects.filter(pk=instance.prescription_id).values_list('patient_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Patient)
+def medical_summary_on_patient_change(sender, instance, created, **kwargs):
+    """Patient names are part of the recent records."""
+    if not created:
+        schedule_refresh(instance.pk)
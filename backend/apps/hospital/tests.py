@@ -1,15 +1,29 @@
 """
 Unit tests for the Hospital module — models, serializers, views, and signals.
 Covers: encounter lifecycle, vital signs validation, bed assignment/release,
-triage workflow, status transitions, org isolation, race-safe number generation.
+triage workflow, status transitions, org isolation, race-safe number generation,
+stored vital sign abnormality flags and reference ranges, the in-memory bed board,
+the persisted triage worklist, chunked upload and background transcription jobs.
 """
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import wave
 from decimal import Decimal
+from io import StringIO
 from datetime import date, timedelta
+from unittest import mock
 
 from django.test import TestCase, TransactionTestCase
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db import IntegrityError
+from django.test import override_settings
 from rest_framework.test import APIRequestFactory, force_authenticate, APITestCase
 from rest_framework import status as http_status
 
@@ -19,14 +33,19 @@ from apps.patients.models import Patient
 from apps.hospital.models import (
     HospitalEncounter, VitalSigns, HospitalDepartment,
     HospitalBed, Triage, EncounterType, EncounterStatus,
-    BedStatus, TriageLevel, TriageStatus,
+    BedStatus, TriageLevel, TriageStatus, VitalParameter, VitalSignReferenceRange,
+    TranscriptionJob, TranscriptionJobStatus, PatientMedicalSummary,
 )
 from apps.hospital.serializers import (
     VitalSignsCreateSerializer,
     HospitalEncounterCreateSerializer,
     TriageSerializer,
 )
-from apps.hospital import views as hospital_views
+from apps.hospital import medical_summary, occupancy, transcription, views as hospital_views
+from apps.hospital.reference_ranges import abnormal_counts, clear_ranges_cache
+from apps.audit.utils import clear_request_from_thread
+from apps.core.querybudget import QueryRecorder
+from apps.prescriptions.models import Prescription, PrescriptionStatus
 
 
 # ──────────────────────────────────────────────────────────────
@@ -47,14 +66,19 @@ def _org(suffix="1"):
 
 
 def _user(org, role="doctor", suffix="1"):
-    return User.objects.create_user(
+    # User has no manager of its own: UserManager.create_user() needs a username.
+    # The audit log records the acting user's email.
+    user = User(
         phone=f"+243820000{suffix.zfill(3)}",
-        password="testpass123",
+        email=f"hospital.user{suffix}@test.cd",
         first_name="User",
         last_name=f"Test{suffix}",
         primary_role=role,
         organization=org,
     )
+    user.set_password("testpass123")
+    user.save()
+    return user
 
 
 def _patient(org, suffix="1"):
@@ -900,4 +924,745 @@ class OrgIsolationTest(APITestCase):
         response = hospital_views.TriageListCreateAPIView.as_view()(request)
         results = response.data.get("results", response.data)
         if isinstance(results, list):
-            self.assertEqual(len(results), 1)
\ No newline at end of file
+            self.assertEqual(len(results), 1)
+
+
+# ══════════════════════════════════════════════════════════════
+# VITAL SIGN ABNORMALITY FLAGS
+# ══════════════════════════════════════════════════════════════
+
+
+def _flagged_patient(suffix="1", gender="male", date_of_birth=date(1990, 1, 1)):
+    return Patient.objects.create(
+        first_name=f"Patient{suffix}",
+        last_name=f"Test{suffix}",
+        date_of_birth=date_of_birth,
+        gender=gender,
+        patient_number=f"PT-VF-{suffix}",
+    )
+
+
+class VitalSignFlagsTest(APITestCase):
+    """Abnormality flags stored on save and served by SQL filters."""
+
+    def setUp(self):
+        self.org = _org(suffix="vf1")
+        self.user = _user(self.org, suffix="vf1")
+        self.patient = _flagged_patient("vf1")
+        _encounter(self.patient, self.org, self.user)
+        self.client.force_authenticate(self.user)
+        # Ranges are cached across test transactions.
+        clear_ranges_cache()
+        self.addCleanup(clear_ranges_cache)
+
+    def _vitals(self, patient=None, **values):
+        return VitalSigns.objects.create(
+            patient=patient or self.patient, measured_by=self.user, created_by=self.user, **values
+        )
+
+    def test_flags_per_parameter(self):
+        vs = self._vitals(temperature=Decimal("39.5"), heart_rate=72, oxygen_saturation=88)
+        self.assertTrue(vs.is_abnormal)
+        self.assertEqual(vs.abnormal_parameters, ["temperature", "oxygen_saturation"])
+        normal = self._vitals(
+            temperature=Decimal("36.8"), blood_pressure_systolic=120, blood_pressure_diastolic=80,
+            heart_rate=72, respiratory_rate=16, oxygen_saturation=98,
+        )
+        self.assertFalse(normal.is_abnormal)
+        self.assertEqual(normal.abnormal_flags, 0)
+
+        normal.heart_rate = 130
+        normal.save(update_fields=["heart_rate"])
+        normal.refresh_from_db()
+        self.assertEqual(normal.abnormal_parameters, ["heart_rate"])
+
+    def test_age_specific_ranges(self):
+        child = _flagged_patient("child", gender="female", date_of_birth=date.today() - timedelta(days=3 * 365))
+        self.assertFalse(self._vitals(patient=child, heart_rate=130, respiratory_rate=28).is_abnormal)
+        self.assertEqual(
+            self._vitals(heart_rate=130, respiratory_rate=28).abnormal_parameters,
+            ["heart_rate", "respiratory_rate"],
+        )
+
+    def test_sex_specific_range_takes_precedence(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            VitalSignReferenceRange.objects.create(
+                parameter=VitalParameter.HEART_RATE, sex="male", age_min_years=18,
+                low=Decimal("50"), high=Decimal("100"),
+            )
+        self.assertFalse(self._vitals(heart_rate=55).is_abnormal)
+        female = _flagged_patient("vf2", gender="female")
+        self.assertTrue(self._vitals(patient=female, heart_rate=55).is_abnormal)
+
+    def test_abnormal_list_is_one_query(self):
+        self._vitals(temperature=Decimal("40.0"))
+        self._vitals(heart_rate=45)
+        self._vitals(temperature=Decimal("36.8"))
+        other_org = _org(suffix="vf3")
+        outsider = _flagged_patient("vf3")
+        _encounter(outsider, other_org, _user(other_org, suffix="vf3"))
+        self._vitals(patient=outsider, temperature=Decimal("40.0"))
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get("/api/v1/hospital/vital-signs/abnormal/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 2)
+        vital_queries = [sql for sql, _ in recorder.queries if 'FROM "vital_signs"' in sql]
+        self.assertEqual(len(vital_queries), 1)
+        self.assertNotIn("DISTINCT", vital_queries[0])
+
+        response = self.client.get("/api/v1/hospital/vital-signs/abnormal/", {"parameter": "heart_rate"})
+        self.assertEqual([row["heart_rate"] for row in response.data["results"]], [45])
+        self.assertEqual(
+            self.client.get("/api/v1/hospital/vital-signs/abnormal/", {"parameter": "poids"}).status_code, 400,
+        )
+
+    def test_counts_and_dashboard(self):
+        self._vitals(temperature=Decimal("40.0"), heart_rate=130)
+        self._vitals(heart_rate=45)
+        self._vitals(heart_rate=80)
+        counts = abnormal_counts(VitalSigns.objects.all())
+        self.assertEqual(counts["total"], 2)
+        self.assertEqual(counts["heart_rate"], 2)
+        self.assertEqual(counts["temperature"], 1)
+
+        response = self.client.get("/api/v1/hospital/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["today_vitals"], 3)
+        self.assertEqual(response.data["abnormal_vitals_today"], 2)
+        self.assertEqual(response.data["abnormal_vitals_by_parameter"]["heart_rate"], 2)
+
+    def test_backfill_command(self):
+        fever = self._vitals(temperature=Decimal("40.0"))
+        normal = self._vitals(temperature=Decimal("36.8"))
+        VitalSigns.objects.update(abnormal_flags=0, is_abnormal=False)
+        VitalSigns.objects.filter(pk=normal.pk).update(abnormal_flags=1, is_abnormal=True)
+
+        call_command("backfill_vital_sign_flags", dry_run=True, stdout=StringIO())
+        self.assertFalse(VitalSigns.objects.get(pk=fever.pk).is_abnormal)
+        call_command("backfill_vital_sign_flags", batch_size=1, stdout=StringIO())
+        fever.refresh_from_db()
+        normal.refresh_from_db()
+        self.assertEqual(fever.abnormal_parameters, ["temperature"])
+        self.assertFalse(normal.is_abnormal)
+
+
+
+# ══════════════════════════════════════════════════════════════
+# BED BOARD
+# ══════════════════════════════════════════════════════════════
+
+
+@override_settings(BED_BOARD_LOCAL_TTL=60)
+class BedBoardTest(APITestCase):
+    """In-memory bed counts kept up to date by bed changes."""
+
+    url = "/api/v1/hospital/beds/occupancy/"
+
+    def setUp(self):
+        occupancy.clear_local_boards()
+        self.addCleanup(occupancy.clear_local_boards)
+        self.org = _org(suffix="bb1")
+        self.user = _user(self.org, suffix="bb1")
+        self.client.force_authenticate(self.user)
+        self.cardio = _department(self.org, "Cardiologie", "CARD")
+        self.pediatrie = _department(self.org, "Pédiatrie", "PED")
+        self.beds = [_bed(self.cardio, "101", label) for label in "ABC"] + [_bed(self.pediatrie, "201", "A")]
+        HospitalBed.objects.filter(pk=self.beds[2].pk).update(status=BedStatus.OCCUPIED)
+        self.patient = _flagged_patient("bb1")
+        self.encounter = _encounter(self.patient, self.org, self.user)
+        other = _org(suffix="bb2")
+        _bed(_department(other, "Autre", "OTH"), "1", "A")
+
+    def _board(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_board_counts(self):
+        board = self._board()
+        self.assertEqual(
+            (board["total_beds"], board["occupied_beds"], board["available_beds"], board["occupancy_rate"]),
+            (4, 1, 3, 25.0),
+        )
+        self.assertEqual(
+            [(d["name"], d["total_beds"], d["occupied_beds"]) for d in board["departments"]],
+            [("Cardiologie", 3, 1), ("Pédiatrie", 1, 0)],
+        )
+        recorder = QueryRecorder()
+        with recorder.record():
+            self._board()
+        self.assertFalse([sql for sql, _ in recorder.queries if "hospital_beds" in sql])
+
+    def test_assign_and_release_update_counters(self):
+        version = self._board()["version"]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/v1/hospital/beds/{self.beds[0].pk}/assign/",
+                {"patient_id": str(self.patient.pk), "encounter_id": str(self.encounter.pk)},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        recorder = QueryRecorder()
+        with recorder.record():
+            board = self._board()
+        self.assertFalse([sql for sql, _ in recorder.queries if "hospital_beds" in sql])
+        self.assertEqual((board["occupied_beds"], board["available_beds"]), (2, 2))
+        self.assertNotEqual(board["version"], version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/v1/hospital/beds/{self.beds[0].pk}/release/")
+        board = self._board()
+        self.assertEqual((board["occupied_beds"], board["available_beds"]), (1, 2))
+        self.assertEqual(board["departments"][0]["counts"]["cleaning"], 1)
+
+    def test_changes_of_other_processes_rebuild(self):
+        self._board()
+        HospitalBed.objects.filter(pk=self.beds[3].pk).update(status=BedStatus.OCCUPIED)
+        # Another process recorded the change: its version bump is seen after the TTL.
+        occupancy.invalidate(occupancy.NAMESPACE, organization=self.org.pk)
+        self.assertEqual(self._board()["occupied_beds"], 1)
+        occupancy.get_board(self.org.pk).checked_until = 0
+        self.assertEqual(self._board()["occupied_beds"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.beds[1].delete()
+            _department(self.org, "Urgences", "URG")
+        board = self._board()
+        self.assertEqual(board["total_beds"], 3)
+        self.assertEqual(len(board["departments"]), 3)
+
+    def test_board_counted_after_the_write_is_not_moved_twice(self):
+        self._board()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bed = HospitalBed.objects.get(pk=self.beds[3].pk)
+            bed.status = BedStatus.OCCUPIED
+            bed.save()
+        # Rebuilt by another request between the write and the version bump:
+        # the counts already hold the move.
+        board = occupancy.get_board(self.org.pk)
+        board.versions, board.checked_until = None, 0
+        self.assertEqual(self._board()["occupied_beds"], 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._board()["occupied_beds"], 2)
+
+    def test_unchanged_board_is_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/v1/hospital/beds/{self.beds[2].pk}/release/")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(self.url, {"wait": "soon"}).status_code, 400)
+
+    def test_held_poll_returns_once_the_board_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+        # Recorded by another request of this process while the poll waits.
+        change = threading.Timer(0.2, lambda: occupancy.bed_changed(
+            self.org.pk, (self.cardio.pk, BedStatus.AVAILABLE), (self.cardio.pk, BedStatus.OCCUPIED), time.monotonic(),
+        ))
+        change.start()
+        self.addCleanup(change.cancel)
+        started = time.monotonic()
+        response = self.client.get(self.url, {"wait": 20}, HTTP_IF_NONE_MATCH=etag)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["occupied_beds"], 2)
+
+        etag = response["ETag"]
+        with override_settings(BED_BOARD_MAX_WAITERS=0):
+            started = time.monotonic()
+            response = self.client.get(self.url, {"wait": 20}, HTTP_IF_NONE_MATCH=etag)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(response.status_code, 304)
+
+
+class TriageWorklistTest(APITestCase):
+    """Persisted triage queue: peek, next, claim, release and escalate."""
+
+    url = "/api/v1/hospital/triage/"
+
+    def setUp(self):
+        self.org = _org(suffix="tw1")
+        self.user = _user(self.org, suffix="tw1")
+        self.colleague = _user(self.org, suffix="tw2")
+        self.client.force_authenticate(self.user)
+        self.urgences = _department(self.org, "Urgences", "URG")
+        now = timezone.now()
+        # (level, minutes waiting, department)
+        queue = [(3, 30, None), (2, 5, self.urgences), (3, 60, self.urgences), (5, 90, None), (2, 20, None)]
+        self.triages = [
+            self._triage(f"tw{i}", level, now - timedelta(minutes=minutes), department)
+            for i, (level, minutes, department) in enumerate(queue)
+        ]
+        self._triage("tw-seen", 1, now, None, status=TriageStatus.DISCHARGED)
+        other = _org(suffix="tw2")
+        Triage.objects.create(
+            triage_number="TR-TW-OTHER", patient=_flagged_patient("tw-other"), organization=other,
+            chief_complaint="Autre", triage_level=1, pain_level=5,
+        )
+
+    def _triage(self, suffix, level, arrival_time, department, status=TriageStatus.COMPLETED):
+        return Triage.objects.create(
+            triage_number=f"TR-{suffix}", patient=_flagged_patient(suffix), organization=self.org,
+            department=department,
+            chief_complaint="Douleur", triage_level=level, pain_level=5,
+            arrival_time=arrival_time, status=status,
+        )
+
+    def _order(self, indexes):
+        return [str(self.triages[i].pk) for i in indexes]
+
+    def test_peek_in_priority_order(self):
+        response = self.client.get(self.url + "worklist/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual([row["id"] for row in response.data["results"]], self._order([4, 1, 2, 0, 3]))
+        self.assertEqual([row["position"] for row in response.data["results"]], [1, 2, 3, 4, 5])
+        self.assertGreaterEqual(response.data["results"][0]["waiting_minutes"], 19)
+
+        response = self.client.get(self.url + "worklist/", {"department": self.urgences.pk, "limit": 1})
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([row["id"] for row in response.data["results"]], self._order([1]))
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            self.client.get(self.url + "worklist/")
+        self.assertEqual(len([sql for sql, _ in recorder.queries if "hospital_triage" in sql]), 1)
+
+    def test_next_claims_the_head(self):
+        response = self.client.post(self.url + "worklist/next/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(self.triages[4].pk))
+        self.assertEqual(response.data["status"], TriageStatus.IN_TREATMENT)
+        triage = Triage.objects.get(pk=self.triages[4].pk)
+        self.assertEqual((triage.claimed_by, triage.assigned_doctor), (self.user, self.user))
+
+        for _ in range(4):
+            self.assertEqual(self.client.post(self.url + "worklist/next/").status_code, 200)
+        self.assertEqual(self.client.post(self.url + "worklist/next/").status_code, 204)
+
+    def test_claim_conflict_and_release(self):
+        url = f"{self.url}{self.triages[3].pk}/"
+        self.assertEqual(self.client.post(url + "claim/").status_code, 200)
+        self.client.force_authenticate(self.colleague)
+        self.assertEqual(self.client.post(url + "claim/").status_code, 409)
+        self.assertEqual(self.client.post(url + "release/").status_code, 404)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.post(url + "release/").status_code, 200)
+        self.assertEqual(self.client.get(self.url + "worklist/").data["count"], 5)
+        self.assertEqual(self.client.post(f"{self.url}{self.triages[0].pk}/claim/").status_code, 200)
+        self.assertEqual(self.client.post(f"{self.url}{self.triages[0].pk}/escalate/").status_code, 409)
+
+    def test_release_restores_status_before_claim(self):
+        triage = self.triages[0]
+        Triage.objects.filter(pk=triage.pk).update(status=TriageStatus.IN_PROGRESS)
+        url = f"{self.url}{triage.pk}/"
+        self.assertEqual(self.client.post(url + "claim/").data["status"], TriageStatus.IN_TREATMENT)
+        response = self.client.post(url + "release/")
+        self.assertEqual(response.data["status"], TriageStatus.IN_PROGRESS)
+        triage.refresh_from_db()
+        self.assertEqual((triage.status, triage.claimed_from_status), (TriageStatus.IN_PROGRESS, ""))
+
+    def test_escalate(self):
+        url = f"{self.url}{self.triages[3].pk}/escalate/"
+        self.assertEqual(self.client.post(url, {"levels": 0}, format="json").status_code, 400)
+        response = self.client.post(url, {"levels": 3}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["escalation"], response.data["queue_priority"]), (3, 2))
+        # Level 2 now, waiting the longest.
+        ids = [row["id"] for row in self.client.get(self.url + "worklist/").data["results"]]
+        self.assertEqual(ids, self._order([3, 4, 1, 2, 0]))
+
+        response = self.client.post(url, {"levels": 5}, format="json")
+        self.assertEqual(response.data["queue_priority"], TriageLevel.RESUSCITATION)
+
+
+class TriageWorklistConcurrencyTest(TransactionTestCase):
+    """Concurrent ``next_patient`` calls never hand out the same triage twice."""
+
+    def setUp(self):
+        # Committed audit rows must not pick up a request left over by an earlier test.
+        clear_request_from_thread()
+
+    def test_no_double_claims(self):
+        import threading
+        from django.db import connection
+        from apps.hospital import worklist
+
+        org = _org(suffix="twc")
+        clinicians = [_user(org, suffix=f"twc{i}") for i in range(4)]
+        for i in range(20):
+            Triage.objects.create(
+                triage_number=f"TR-TWC{i}", patient=_flagged_patient(f"twc{i}"), organization=org,
+                chief_complaint="Douleur", triage_level=1 + i % 5, pain_level=5,
+                status=TriageStatus.COMPLETED,
+            )
+        claims = []
+        barrier = threading.Barrier(len(clinicians))
+
+        def take(user):
+            try:
+                barrier.wait()
+                while (triage := worklist.next_patient(org, user)) is not None:
+                    claims.append(triage.pk)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=take, args=(user,)) for user in clinicians]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(claims), 20)
+        self.assertEqual(len(set(claims)), 20)
+        self.assertFalse(worklist.waiting(org).exists())
+
+
+def _wav(seconds=1, rate=44100, channels=2):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(b"\x10\x00\xf0\xff" * (rate * seconds * channels // 2))
+    return buffer.getvalue()
+
+
+class TranscriptionJobTest(APITestCase):
+    """Chunked recording upload and background transcription with the stub service."""
+
+    url = "/api/v1/hospital/transcriptions/"
+
+    def setUp(self):
+        upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, upload_dir, True)
+        overrides = override_settings(
+            TRANSCRIPTION_UPLOAD_DIR=upload_dir,
+            TRANSCRIPTION_SERVICE="apps.hospital.transcription.StubTranscriptionService",
+            TRANSCRIPTION_MAX_ATTEMPTS=2,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.org = _org(suffix="tj1")
+        self.user = _user(self.org, suffix="tj1")
+        self.client.force_authenticate(self.user)
+        self.encounter = _encounter(_flagged_patient("tj1"), self.org, self.user)
+        self.audio = _wav()
+
+    def _create(self, **extra):
+        response = self.client.post(self.url, {
+            "total_size": len(self.audio), "filename": "consultation.wav",
+            "content_type": "audio/wav", "encounter": str(self.encounter.pk), **extra,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data["id"]
+
+    def _put(self, job_id, first, last):
+        return self.client.generic(
+            "PUT", f"{self.url}{job_id}/upload/", self.audio[first:last + 1],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {first}-{last}/{len(self.audio)}",
+        )
+
+    def _upload(self, job_id):
+        size = len(self.audio)
+        for first in range(0, size, 100000):
+            self.assertEqual(self._put(job_id, first, min(first + 100000, size) - 1).status_code, 200)
+
+    def test_chunked_upload_resumes_and_queues(self):
+        job_id = self._create()
+        response = self._put(job_id, 0, 49999)
+        self.assertEqual((response.data["received_size"], response.data["status"]), (50000, "uploading"))
+
+        # A retried chunk is refused with the offset to resume from.
+        response = self._put(job_id, 0, 49999)
+        self.assertEqual((response.status_code, response.data["received_size"]), (409, 50000))
+        response = self.client.generic("PUT", f"{self.url}{job_id}/upload/", b"x")
+        self.assertEqual(response.status_code, 400)
+
+        response = self._put(job_id, 50000, len(self.audio) - 1)
+        self.assertEqual(response.data["status"], TranscriptionJobStatus.QUEUED)
+        with open(transcription.spool_path(TranscriptionJob.objects.get(pk=job_id)), "rb") as spool:
+            self.assertEqual(spool.read(), self.audio)
+        self.assertEqual(self._put(job_id, 0, 9).status_code, 409)
+
+        self.client.force_authenticate(_user(_org(suffix="tj2"), suffix="tj2"))
+        self.assertEqual(self._put(job_id, 0, 9).status_code, 404)
+
+    def test_worker_transcribes_and_stores_result(self):
+        job_id = self._create()
+        self._upload(job_id)
+        self.assertEqual(transcription.work(once=True), 1)
+
+        response = self.client.get(f"{self.url}{job_id}/")
+        self.assertEqual(response.data["status"], TranscriptionJobStatus.COMPLETED)
+        self.assertTrue(response.data["transcription"].startswith("Transcription de test"))
+        self.assertEqual(response.data["structured_notes"], "Notes de consultation de test.")
+        job = TranscriptionJob.objects.get(pk=job_id)
+        self.assertFalse(os.path.exists(transcription.spool_path(job)))
+        self.assertEqual(list(self.encounter.transcription_jobs.all()), [job])
+        response = self.client.get(self.url, {"encounter": str(self.encounter.pk)})
+        self.assertEqual(response.data["count"], 1)
+
+    def test_gemini_service_through_ai_gateway(self):
+        from apps.core import ai
+
+        ai.reset_gateway()
+        self.addCleanup(ai.reset_gateway)
+        gateway = ai.get_gateway()
+        gateway.responses.update({
+            "consultation_transcription": "Patient: j'ai mal à la tête.",
+            "consultation_notes": "Céphalées depuis deux jours.",
+        })
+        job_id = self._create()
+        self._upload(job_id)
+        with override_settings(TRANSCRIPTION_SERVICE="apps.hospital.gemini_service.get_gemini_service"), \
+                mock.patch.object(gateway, "generate", wraps=gateway.generate) as generate:
+            transcription.work(once=True)
+        job = TranscriptionJob.objects.get(pk=job_id)
+        self.assertEqual(
+            (job.status, job.transcription, job.structured_notes),
+            ("completed", "Patient: j'ai mal à la tête.", "Céphalées depuis deux jours."),
+        )
+        # Patient data: short-lived transcription cache, notes never cached.
+        self.assertEqual([call.kwargs["cache_timeout"] for call in generate.call_args_list], [3600, 0])
+        audio = gateway.calls[0][2][1]
+        self.assertEqual((audio.mime_type, audio.path.endswith(".16k.wav")), ("audio/wav", True))
+
+    def test_failures_are_retried_then_fail(self):
+        job_id = self._create(consultation_context={"stubError": "Service indisponible"})
+        self._upload(job_id)
+        transcription.work(once=True)
+        job = TranscriptionJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts, job.error), ("failed", 2, "Service indisponible"))
+
+        # A job left processing by a dead worker is taken again after the timeout.
+        retry = TranscriptionJob.objects.create(
+            organization=self.org, total_size=1, received_size=1, attempts=1,
+            status=TranscriptionJobStatus.PROCESSING, started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertEqual(transcription.claim_next_job(), retry)
+
+    def test_downsample_wav(self):
+        source = os.path.join(tempfile.mkdtemp(), "source.wav")
+        self.addCleanup(shutil.rmtree, os.path.dirname(source), True)
+        with open(source, "wb") as f:
+            f.write(_wav(seconds=2))
+        target = transcription.downsample_wav(source, source + ".16k.wav")
+        with wave.open(target, "rb") as reader:
+            self.assertEqual((reader.getnchannels(), reader.getsampwidth(), reader.getframerate()), (1, 2, 16000))
+            self.assertAlmostEqual(reader.getnframes(), 32000, delta=10)
+        self.assertLess(os.path.getsize(target), os.path.getsize(source) / 5)
+        # Already 16 kHz mono: nothing to do.
+        self.assertIsNone(transcription.downsample_wav(target, target + ".again.wav"))
+        # Python 3.13 has no audioop: the recording is sent as is.
+        with mock.patch.object(transcription, "audioop", None):
+            self.assertIsNone(transcription.downsample_wav(source, source + ".nope.wav"))
+
+
+class PatientMedicalSummaryTest(APITestCase):
+    """Medical summary served from the signal-maintained read model."""
+
+    def setUp(self):
+        self.org = _org(suffix="ms1")
+        self.user = _user(self.org, suffix="ms1")
+        self.client.force_authenticate(self.user)
+        self.patient = _flagged_patient("ms1")
+        self.url = f"/api/v1/hospital/patients/{self.patient.pk}/medical-summary/"
+
+    def _prescription(self, number, status=PrescriptionStatus.PENDING, encounter=None):
+        return Prescription.objects.create(
+            organization=self.org, doctor=self.user, patient=self.patient, created_by=self.user,
+            encounter=encounter, prescription_number=f"RX-MS-{number}", date=date.today(),
+            status=status, facility_id="hospital-main",
+        )
+
+    def _records(self):
+        encounter = _encounter(self.patient, self.org, self.user)
+        _encounter(self.patient, self.org, self.user, status="completed")
+        self._prescription(1, encounter=encounter)
+        self._prescription(2, status=PrescriptionStatus.CANCELLED)
+        VitalSigns.objects.create(
+            patient=self.patient, encounter=encounter, temperature=Decimal("39.5"),
+            measured_by=self.user, created_by=self.user,
+        )
+        return encounter
+
+    def test_summary_read_in_one_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._records()
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        statistics = response.data["statistics"]
+        self.assertEqual(
+            (statistics["total_encounters"], statistics["total_prescriptions"], statistics["active_prescriptions"]),
+            (2, 2, 1),
+        )
+        self.assertEqual(statistics["prescriptions_by_status"], {"pending": 1, "cancelled": 1})
+        self.assertEqual(len(response.data["recent_encounters"]), 2)
+        self.assertEqual(response.data["recent_vital_signs"][0]["temperature"], "39.5")
+        self.assertEqual(response.data["recent_vital_signs"][0]["abnormal_parameters"], ["temperature"])
+        self.assertEqual(response.data["patient"]["patient_number"], "PT-VF-ms1")
+        tables = ("hospital_encounters", "prescriptions", "vital_signs", "hospital_patient_medical_summaries")
+        self.assertEqual([sql for sql, _ in recorder.queries if any(f'"{t}"' in sql for t in tables)], [
+            sql for sql, _ in recorder.queries if '"hospital_patient_medical_summaries"' in sql
+        ])
+        self.assertEqual(len([sql for sql, _ in recorder.queries if "hospital_patient_medical_summaries" in sql]), 1)
+
+    def test_summary_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            encounter = self._records()
+        prescription = Prescription.objects.get(prescription_number="RX-MS-1")
+        with self.captureOnCommitCallbacks(execute=True):
+            prescription.items.create(
+                medication_name="Paracétamol", dosage="500mg", frequency="3x/jour", duration="5 jours", quantity=10,
+            )
+            prescription.status = PrescriptionStatus.EXPIRED
+            prescription.save()
+        summary = PatientMedicalSummary.objects.get(patient=self.patient, organization=self.org)
+        self.assertEqual(summary.prescriptions_by_status, {"expired": 1, "cancelled": 1})
+        self.assertEqual(
+            {p["prescription_number"]: p["items_count"] for p in summary.recent_prescriptions},
+            {"RX-MS-1": 1, "RX-MS-2": 0},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.last_name = "Renamed"
+            self.patient.save()
+        summary.refresh_from_db()
+        self.assertEqual({e["patient_name"] for e in summary.recent_encounters}, {"Patientms1 Renamed"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Prescription.objects.filter(patient=self.patient).delete()
+            VitalSigns.objects.filter(patient=self.patient).delete()
+            HospitalEncounter.objects.filter(patient=self.patient).exclude(pk=encounter.pk).delete()
+        summary.refresh_from_db()
+        self.assertEqual(
+            (summary.encounter_count, summary.prescriptions_by_status, summary.recent_vital_signs),
+            (1, {}, []),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            encounter.delete()
+        self.assertFalse(PatientMedicalSummary.objects.filter(patient=self.patient).exists())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_one_refresh_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._records()
+        self.assertEqual(
+            [getattr(callback, "patient_id", None) for callback in callbacks].count(self.patient.pk), 1,
+        )
+
+    def test_other_organization_gets_404(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._records()
+        other = _user(_org(suffix="ms2"), suffix="ms2")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(self.user)
+        stranger = _flagged_patient("ms2")
+        self.assertEqual(
+            self.client.get(f"/api/v1/hospital/patients/{stranger.pk}/medical-summary/").status_code, 404,
+        )
+
+    def test_check_and_rebuild(self):
+        # Records written without their signals' refresh, as by a bulk import.
+        self._records()
+        self.assertEqual(
+            list(medical_summary.check()), [(self.patient.pk, self.org.pk, "missing")],
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_medical_summaries", "--check", stdout=StringIO())
+
+        out = StringIO()
+        call_command("rebuild_medical_summaries", stdout=out)
+        self.assertIn("1 patients", out.getvalue())
+        self.assertEqual(list(medical_summary.check()), [])
+
+        PatientMedicalSummary.objects.update(encounter_count=7, recent_vital_signs=[])
+        self.assertEqual(
+            list(medical_summary.check(self.org.pk)),
+            [(self.patient.pk, self.org.pk, "encounter_count, recent_vital_signs")],
+        )
+
+    def test_missing_summary_built_on_read(self):
+        self._records()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["statistics"]["total_encounters"], 2)
+        self.assertTrue(PatientMedicalSummary.objects.filter(patient=self.patient, organization=self.org).exists())
+
+
+class VitalSignTrendsTest(APITestCase):
+    """Downsampled, columnar vital sign series of a patient."""
+
+    def setUp(self):
+        self.org = _org(suffix="vt1")
+        self.user = _user(self.org, suffix="vt1")
+        self.client.force_authenticate(self.user)
+        self.patient = _flagged_patient("vt1")
+        _encounter(self.patient, self.org, self.user)
+        self.url = f"/api/v1/hospital/vital-signs/patient/{self.patient.pk}/trends/"
+        self.start = timezone.now().replace(microsecond=0) - timedelta(days=10)
+        # One measurement per hour for 10 days, with a fever spike at hour 100.
+        for hour in range(240):
+            vital_signs = VitalSigns.objects.create(
+                patient=self.patient, heart_rate=60 + hour % 20,
+                temperature=Decimal("40.5") if hour == 100 else Decimal("37.0"),
+                measured_by=self.user, created_by=self.user,
+            )
+            VitalSigns.objects.filter(pk=vital_signs.pk).update(measured_at=self.start + timedelta(hours=hour))
+
+    def _get(self, **params):
+        return self.client.get(self.url, {
+            "start": self.start.isoformat(), "end": (self.start + timedelta(days=10)).isoformat(), **params,
+        })
+
+    def test_minmax_buckets(self):
+        response = self._get(points=10, parameters="heart_rate,temperature")
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data["bucket_seconds"], 24 * 3600)
+        self.assertEqual(len(data["t"]), 10)
+        self.assertEqual(data["count"], [24] * 10)
+        self.assertEqual(data["t"][0], int(self.start.timestamp()))
+        self.assertEqual(set(data["series"]), {"heart_rate", "temperature"})
+        self.assertEqual(data["series"]["heart_rate"]["min"][0], 60.0)
+        self.assertEqual(data["series"]["heart_rate"]["max"][0], 79.0)
+        self.assertEqual(max(data["series"]["temperature"]["max"]), 40.5)
+        self.assertEqual(data["series"]["temperature"]["max"].index(40.5), 4)
+
+    def test_lttb_keeps_the_spike(self):
+        response = self._get(points=30, method="lttb", parameters="temperature")
+        self.assertEqual(response.status_code, 200)
+        series = response.data["series"]["temperature"]
+        self.assertEqual(len(series["t"]), 30)
+        self.assertIn(40.5, series["v"])
+        self.assertEqual(series["t"][0], int(self.start.timestamp()))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self._get(parameters="mood").status_code, 400)
+        self.assertEqual(self._get(method="median").status_code, 400)
+        other = _user(_org(suffix="vt2"), suffix="vt2")
+        self.client.force_authenticate(other)
+        self.assertEqual(self._get().status_code, 404)
+        history = self.client.get(f"/api/v1/hospital/vital-signs/patient/{self.patient.pk}/history/")
+        self.assertEqual(history.data["count"], 0)
+
+    def test_history_reads_the_latest_rows(self):
+        response = self.client.get(f"/api/v1/hospital/vital-signs/patient/{self.patient.pk}/history/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 20)
+        self.assertEqual(response.data["results"][0]["heart_rate"], 60 + 239 % 20)
@@ -0,0 +1,317 @@
+"""
+Background transcription of consultation recordings.
+
+A 30-minute recording used to be spooled and sent to the model inside the
+request, holding a gunicorn worker for minutes.  Now:
+
+1. the client creates a ``TranscriptionJob`` with the recording size and
+   uploads it in chunks (``write_chunk``); an interrupted upload resumes
+   from ``received_size``;
+2. the last chunk queues the job;
+3. ``python manage.py run_transcription_worker`` claims queued jobs
+   (``SELECT ... FOR UPDATE SKIP LOCKED``, so several workers can run),
+   downsamples the audio to 16 kHz mono (``prepare_audio``: Opus through
+   ffmpeg when installed, 16-bit PCM WAV otherwise) and calls the
+   transcription service.  Workers read the chunks written by the API, so
+   they run in the API container or process (``entrypoint.sh``, the
+   Procfile ``web`` process) or share its ``TRANSCRIPTION_UPLOAD_DIR`` volume;
+4. the client polls the job until it is ``completed`` (transcription and
+   notes stored on the job, linked to the encounter) or ``failed``.
+
+The service is ``TRANSCRIPTION_SERVICE``, a dotted path to a callable
+returning an object with ``transcribe_and_generate_notes(path,
+consultation_context)`` (the Gemini service by default,
+``StubTranscriptionService`` in tests and local development).
+"""
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+import warnings
+import wave
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TranscriptionJob, TranscriptionJobStatus
+
+try:
+    with warnings.catch_warnings():
+        # Deprecated since Python 3.11 and removed in 3.13: ffmpeg is used
+        # first, the WAV fallback is skipped without it.
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop
+except ImportError:
+    audioop = None
+
+logger = logging.getLogger(__name__)
+
+# Speech models work on 16 kHz mono audio: anything above is upload weight.
+TARGET_RATE = 16000
+OPUS_BITRATE = '24k'
+# Largest chunk accepted by one upload request.
+MAX_CHUNK_BYTES = 8 * 1024 * 1024
+READ_BLOCK = 64 * 1024
+
+
+def _upload_dir():
+    return str(getattr(settings, 'TRANSCRIPTION_UPLOAD_DIR', settings.MEDIA_ROOT / 'transcriptions'))
+
+
+def max_upload_bytes():
+    return getattr(settings, 'TRANSCRIPTION_MAX_BYTES', 500 * 1024 * 1024)
+
+
+def _max_attempts():
+    return getattr(settings, 'TRANSCRIPTION_MAX_ATTEMPTS', 3)
+
+
+def _job_timeout():
+    return getattr(settings, 'TRANSCRIPTION_JOB_TIMEOUT', 1800)
+
+
+def get_service():
+    path = getattr(settings, 'TRANSCRIPTION_SERVICE', 'apps.hospital.gemini_service.get_gemini_service')
+    return import_string(path)()
+
+
+class StubTranscriptionService:
+    """Local stand-in for the Gemini service: no network, canned result."""
+
+    def transcribe_and_generate_notes(self, audio_file_path, consultation_context=None):
+        if consultation_context and consultation_context.get('stubError'):
+            return {'success': False, 'error': consultation_context['stubError']}
+        size = os.path.getsize(audio_file_path)
+        return {
+            'success': True,
+            'transcription': f'Transcription de test ({size} octets)',
+            'structured_notes': 'Notes de consultation de test.',
+        }
+
+
+# ──────────────────────────────────────────────────────────────
+# Chunked upload
+# ──────────────────────────────────────────────────────────────
+
+class ChunkError(Exception):
+    """The chunk does not continue the upload."""
+
+
+def spool_path(job):
+    # Keep the extension: ffmpeg and the service use it to tell the format.
+    extension = os.path.splitext(job.filename)[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,5}', extension):
+        extension = '.upload'
+    return os.path.join(_upload_dir(), f'{job.pk}{extension}')
+
+
+def write_chunk(job, start, length, stream):
+    """
+    Append ``length`` bytes read from ``stream`` at offset ``start`` of the
+    upload of ``job`` (locked by the caller).  Returns ``True`` once the
+    whole recording is received; the job is then queued.
+    """
+    if job.status != TranscriptionJobStatus.UPLOADING:
+        raise ChunkError('Envoi déjà terminé')
+    if start != job.received_size:
+        raise ChunkError(f'Reprendre à l\'octet {job.received_size}')
+    if start + length > job.total_size:
+        raise ChunkError('Le fragment dépasse la taille annoncée')
+
+    os.makedirs(_upload_dir(), exist_ok=True)
+    with open(spool_path(job), 'ab') as spool:
+        # Drop bytes of a previous attempt that failed mid-chunk.
+        spool.truncate(start)
+        spool.seek(start)
+        remaining = length
+        while remaining:
+            block = stream.read(min(READ_BLOCK, remaining))
+            if not block:
+                spool.truncate(start)
+                raise ChunkError('Fragment incomplet')
+            spool.write(block)
+            remaining -= len(block)
+
+    job.received_size = start + length
+    update_fields = ['received_size', 'updated_at']
+    if job.is_uploaded:
+        job.status = TranscriptionJobStatus.QUEUED
+        update_fields.append('status')
+    job.save(update_fields=update_fields)
+    return job.is_uploaded
+
+
+def discard_upload(job):
+    path = spool_path(job)
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+# ──────────────────────────────────────────────────────────────
+# Audio preparation
+# ──────────────────────────────────────────────────────────────
+
+def _ffmpeg_to_opus(ffmpeg, source):
+    target = f'{source}.ogg'
+    result = subprocess.run(
+        [
+            ffmpeg, '-nostdin', '-loglevel', 'error', '-y', '-i', source,
+            '-ac', '1', '-ar', str(TARGET_RATE), '-c:a', 'libopus', '-b:a', OPUS_BITRATE, target,
+        ],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        logger.warning('ffmpeg could not convert %s: %s', source, result.stderr.decode(errors='replace')[-500:])
+        if os.path.exists(target):
+            os.unlink(target)
+        return None
+    return target
+
+
+def downsample_wav(source, target):
+    """
+    Write ``source`` (PCM WAV) as 16-bit mono ``TARGET_RATE`` WAV to
+    ``target``, block by block.  ``None`` if it is not a WAV file, is
+    already that small, or ``audioop`` is not available.
+    """
+    if audioop is None:
+        return None
+    try:
+        reader = wave.open(source, 'rb')
+    except (wave.Error, EOFError):
+        return None
+    with reader:
+        channels, width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+        if channels > 2 or (channels == 1 and width <= 2 and rate <= TARGET_RATE):
+            return None
+        with wave.open(target, 'wb') as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(min(rate, TARGET_RATE))
+            state = None
+            while True:
+                fragment = reader.readframes(rate)
+                if not fragment:
+                    break
+                if width == 1:
+                    # 8-bit WAV samples are unsigned.
+                    fragment = audioop.bias(fragment, 1, -128)
+                if width != 2:
+                    fragment = audioop.lin2lin(fragment, width, 2)
+                if channels == 2:
+                    fragment = audioop.tomono(fragment, 2, 0.5, 0.5)
+                if rate > TARGET_RATE:
+                    fragment, state = audioop.ratecv(fragment, 2, 1, rate, TARGET_RATE, state)
+                writer.writeframes(fragment)
+    return target
+
+
+def prepare_audio(source):
+    """
+    Path of the audio to send for ``source``: 16 kHz mono Opus when ffmpeg is
+    installed, else 16 kHz mono WAV for WAV recordings, else ``source``.
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    prepared = _ffmpeg_to_opus(ffmpeg, source) if ffmpeg else None
+    if prepared is None:
+        prepared = downsample_wav(source, f'{source}.16k.wav')
+    if prepared is None:
+        return source
+    logger.info(
+        'Transcription audio downsampled from %s to %s bytes',
+        os.path.getsize(source), os.path.getsize(prepared),
+    )
+    return prepared
+
+
+# ──────────────────────────────────────────────────────────────
+# Worker
+# ──────────────────────────────────────────────────────────────
+
+def claim_next_job():
+    """
+    Lock and start the oldest queued job (or a job whose worker died more
+    than ``TRANSCRIPTION_JOB_TIMEOUT`` seconds ago); ``None`` if there is none.
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = TranscriptionJob.objects.filter(
+                Q(status=TranscriptionJobStatus.QUEUED)
+                | Q(status=TranscriptionJobStatus.PROCESSING,
+                    started_at__lt=now - timedelta(seconds=_job_timeout()))
+            ).order_by('created_at').select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            if job.attempts >= _max_attempts():
+                _finish(job, TranscriptionJobStatus.FAILED, error='Délai de traitement dépassé')
+                continue
+            job.status = TranscriptionJobStatus.PROCESSING
+            job.attempts += 1
+            job.started_at = now
+            job.save(update_fields=['status', 'attempts', 'started_at', 'updated_at'])
+            return job
+
+
+def _finish(job, status, error='', transcription='', structured_notes=''):
+    job.status = status
+    job.error = error
+    job.transcription = transcription
+    job.structured_notes = structured_notes
+    job.completed_at = timezone.now()
+    job.save(update_fields=[
+        'status', 'error', 'transcription', 'structured_notes', 'completed_at', 'updated_at',
+    ])
+    discard_upload(job)
+
+
+def run_job(job, service=None):
+    """Transcribe a claimed job; failures are retried up to ``TRANSCRIPTION_MAX_ATTEMPTS`` times."""
+    source = spool_path(job)
+    prepared = None
+    try:
+        prepared = prepare_audio(source)
+        service = service or get_service()
+        result = service.transcribe_and_generate_notes(
+            prepared, consultation_context=job.consultation_context or None,
+        )
+    except Exception as exc:
+        logger.exception('Transcription job %s failed', job.pk)
+        result = {'success': False, 'error': str(exc)}
+    finally:
+        if prepared and prepared != source and os.path.exists(prepared):
+            os.unlink(prepared)
+
+    if result.get('success'):
+        _finish(
+            job, TranscriptionJobStatus.COMPLETED,
+            transcription=result.get('transcription') or '',
+            structured_notes=result.get('structured_notes') or '',
+        )
+    elif job.attempts >= _max_attempts():
+        _finish(job, TranscriptionJobStatus.FAILED, error=result.get('error') or 'Échec de la transcription')
+    else:
+        job.status = TranscriptionJobStatus.QUEUED
+        job.error = result.get('error') or ''
+        job.save(update_fields=['status', 'error', 'updated_at'])
+    return job
+
+
+def work(once=False, poll_interval=2.0, service=None):
+    """Run jobs until interrupted (or until the queue is empty with ``once``); returns the count."""
+    done = 0
+    while True:
+        job = claim_next_job()
+        if job is None:
+            if once:
+                return done
+            time.sleep(poll_interval)
+            continue
+        run_job(job, service)
+        done += 1
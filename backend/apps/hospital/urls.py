@@ -16,6 +16,9 @@ urlpatterns = [
     path('vital-signs/patient/<uuid:patient_id>/history/', 
          views.vital_signs_patient_history_view, 
          name='vital_signs_patient_history'),
+    path('vital-signs/patient/<uuid:patient_id>/trends/',
+         views.vital_signs_patient_trends_view,
+         name='vital_signs_patient_trends'),
     path('vital-signs/abnormal/', 
          views.vital_signs_abnormal_view, 
          name='vital_signs_abnormal'),
@@ -69,6 +72,11 @@ urlpatterns = [
     # Main CRUD endpoints
     path('triage/', views.TriageListCreateAPIView.as_view(), name='triage_list_create'),
     path('triage/<uuid:pk>/', views.TriageDetailAPIView.as_view(), name='triage_detail'),
+    path('triage/worklist/', views.triage_worklist_view, name='triage_worklist'),
+    path('triage/worklist/next/', views.triage_worklist_next_view, name='triage_worklist_next'),
+    path('triage/<uuid:pk>/claim/', views.triage_claim_view, name='triage_claim'),
+    path('triage/<uuid:pk>/release/', views.triage_release_view, name='triage_release'),
+    path('triage/<uuid:pk>/escalate/', views.triage_escalate_view, name='triage_escalate'),
     
     # Specialized endpoints
     path('triage/patient/<uuid:patient_id>/', 
@@ -98,4 +106,7 @@ urlpatterns = [
     
     path('transcribe-recording/', views.ConsultationRecordingTranscriptionView.as_view(), name='transcribe_recording'),
     path('test-gemini/', views.test_gemini_config_view, name='test_gemini'),
+    path('transcriptions/', views.TranscriptionJobListCreateAPIView.as_view(), name='transcription_job_list_create'),
+    path('transcriptions/<uuid:pk>/', views.TranscriptionJobDetailAPIView.as_view(), name='transcription_job_detail'),
+    path('transcriptions/<uuid:pk>/upload/', views.transcription_job_upload_view, name='transcription_job_upload'),
 ]
\ No newline at end of file
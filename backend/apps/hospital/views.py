@@ -5,24 +5,38 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
+from datetime import timedelta
+import re
 from rest_framework.parsers import MultiPartParser, FormParser
 
 from .models import (
     HospitalEncounter, VitalSigns, HospitalDepartment,
     HospitalBed, EncounterType, EncounterStatus, BedStatus,
-    Triage, TriageLevel, TriageStatus
+    Triage, TriageLevel, TriageStatus, VitalParameter,
+    TranscriptionJob, TranscriptionJobStatus, TREND_PARAMETERS
 )
+from . import medical_summary
+from . import occupancy
+from . import transcription
+from . import worklist
+from .reference_ranges import abnormal_counts, with_flag
 from .serializers import (
     HospitalEncounterSerializer, HospitalEncounterCreateSerializer, HospitalEncounterListSerializer,
     HospitalEncounterDetailSerializer, VitalSignsSerializer, VitalSignsCreateSerializer, VitalSignsListSerializer,
     HospitalDepartmentSerializer, HospitalBedSerializer, HospitalBedListSerializer,
     EncounterTypeChoicesSerializer, EncounterStatusChoicesSerializer, BedStatusChoicesSerializer,
-    TriageSerializer, TriageListSerializer
+    TriageSerializer, TriageListSerializer, TriageWorklistSerializer, TranscriptionJobSerializer
 )
 from apps.audit.decorators import audit_critical_action
+from apps.prescriptions.models import PrescriptionStatus
+from apps.core.annotations import AnnotatedFieldsMixin
+from apps.core.fieldsets import SparseFieldsetsMixin
+from apps.core.cache import cached_response, CHOICES_CACHE_TIMEOUT
+from apps.core import timeseries
 
 
 class StandardPagination(PageNumberPagination):
@@ -35,7 +49,7 @@ class StandardPagination(PageNumberPagination):
 #  VITAL SIGNS API VIEWS
 # ═══════════════════════════════════════════════════════════════
 
-class VitalSignsListCreateAPIView(generics.ListCreateAPIView):
+class VitalSignsListCreateAPIView(SparseFieldsetsMixin, generics.ListCreateAPIView):
     """List and create vital signs"""
     permission_classes = [IsAuthenticated]
     pagination_class = StandardPagination
@@ -66,7 +80,7 @@ class VitalSignsListCreateAPIView(generics.ListCreateAPIView):
         )
 
 
-class VitalSignsDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class VitalSignsDetailAPIView(SparseFieldsetsMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete vital signs"""
     permission_classes = [IsAuthenticated]
     serializer_class = VitalSignsSerializer
@@ -91,39 +105,79 @@ class VitalSignsDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 @permission_classes([IsAuthenticated])
 def vital_signs_patient_history_view(request, patient_id):
     """Get vital signs history for a specific patient"""
+    if not _patient_seen_by(patient_id, request.user.organization):
+        return Response({'count': 0, 'results': []})
+    # Backward scan of vital_signs_patient_series_idx, no join
+    vital_signs = list(VitalSigns.objects.filter(
+        patient_id=patient_id
+    ).select_related('patient', 'measured_by').order_by('-measured_at')[:20])
+
+    serializer = VitalSignsListSerializer(vital_signs, many=True)
+    return Response({
+        'count': len(vital_signs),
+        'results': serializer.data
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vital_signs_patient_trends_view(request, patient_id):
+    """
+    Downsampled vital sign series of a patient for charts (apps.core.timeseries):
+    ``?start=&end=`` (default: last 30 days), ``points``, ``method`` (minmax, lttb)
+    and ``parameters`` (comma-separated, default: all charted parameters)
+    """
     try:
-        vital_signs = VitalSigns.objects.filter(
-            patient_id=patient_id,
-            patient__hospital_encounters__organization=request.user.organization
-        ).select_related('measured_by', 'encounter').order_by('-measured_at').distinct()[:20]
-        
-        serializer = VitalSignsListSerializer(vital_signs, many=True)
-        return Response({
-            'count': vital_signs.count(),
-            'results': serializer.data
-        })
-    except Exception as e:
-        return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        start, end, points, method = timeseries.parse_window(request.query_params)
+        parameters = timeseries.parse_parameters(request.query_params, TREND_PARAMETERS)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if not _patient_seen_by(patient_id, request.user.organization):
+        return Response({'error': 'Patient non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(timeseries.downsample(
+        VitalSigns.objects.filter(patient_id=patient_id), 'measured_at', parameters,
+        start, end, points=points, method=method,
+    ))
+
+
+def _patient_seen_by(patient_id, organization):
+    return HospitalEncounter.objects.filter(patient_id=patient_id, organization=organization).exists()
+
+
+def _today_range():
+    start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+def _organization_vital_signs(organization):
+    """Vital signs of the patients seen by ``organization`` (EXISTS, no distinct join)."""
+    return VitalSigns.objects.filter(Exists(HospitalEncounter.objects.filter(
+        patient=OuterRef('patient'), organization=organization,
+    )))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def vital_signs_abnormal_view(request):
-    """Get all abnormal vital signs"""
-    abnormal_vitals = VitalSigns.objects.filter(
-        measured_at__date=timezone.now().date(),
-        patient__hospital_encounters__organization=request.user.organization
-    ).select_related('patient', 'measured_by').distinct()
-    
-    # Filter for abnormal values
-    abnormal_list = [v for v in abnormal_vitals if v.is_abnormal]
-    
-    serializer = VitalSignsListSerializer(abnormal_list, many=True)
+    """Get today's abnormal vital signs, optionally for one ``?parameter=``"""
+    start, end = _today_range()
+    abnormal_vitals = _organization_vital_signs(request.user.organization).filter(
+        is_abnormal=True, measured_at__gte=start, measured_at__lt=end,
+    ).select_related('patient', 'measured_by').order_by('-measured_at')
+
+    parameter = request.query_params.get('parameter')
+    if parameter:
+        if parameter not in VitalParameter.values:
+            return Response(
+                {'error': f'Paramètre inconnu : {parameter}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        abnormal_vitals = with_flag(abnormal_vitals, parameter)
+
+    serializer = VitalSignsListSerializer(abnormal_vitals, many=True)
     return Response({
-        'count': len(abnormal_list),
+        'count': len(serializer.data),
         'results': serializer.data
     })
 
@@ -132,7 +186,7 @@ def vital_signs_abnormal_view(request):
 #  HOSPITAL ENCOUNTER API VIEWS
 # ═══════════════════════════════════════════════════════════════
 
-class HospitalEncounterListCreateAPIView(generics.ListCreateAPIView):
+class HospitalEncounterListCreateAPIView(SparseFieldsetsMixin, generics.ListCreateAPIView):
     """List and create hospital encounters"""
     permission_classes = [IsAuthenticated]
     pagination_class = StandardPagination
@@ -165,7 +219,7 @@ class HospitalEncounterListCreateAPIView(generics.ListCreateAPIView):
         )
 
 
-class HospitalEncounterDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class HospitalEncounterDetailAPIView(SparseFieldsetsMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete hospital encounter"""
     permission_classes = [IsAuthenticated]
     serializer_class = HospitalEncounterDetailSerializer
@@ -263,7 +317,7 @@ def encounter_prescriptions_view(request, encounter_id):
 #  HOSPITAL DEPARTMENT API VIEWS
 # ═══════════════════════════════════════════════════════════════
 
-class HospitalDepartmentListCreateAPIView(generics.ListCreateAPIView):
+class HospitalDepartmentListCreateAPIView(AnnotatedFieldsMixin, generics.ListCreateAPIView):
     """List and create hospital departments"""
     permission_classes = [IsAuthenticated]
     pagination_class = StandardPagination
@@ -279,14 +333,14 @@ class HospitalDepartmentListCreateAPIView(generics.ListCreateAPIView):
             organization=self.request.user.organization
         ).select_related(
             'organization', 'department_head'
-        ).prefetch_related('beds')
+        )
 
     @audit_critical_action(description="Création de service hospitalier")
     def perform_create(self, serializer):
         serializer.save(organization=self.request.user.organization)
 
 
-class HospitalDepartmentDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class HospitalDepartmentDetailAPIView(AnnotatedFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete hospital department"""
     permission_classes = [IsAuthenticated]
     serializer_class = HospitalDepartmentSerializer
@@ -296,7 +350,7 @@ class HospitalDepartmentDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
             organization=self.request.user.organization
         ).select_related(
             'organization', 'department_head'
-        ).prefetch_related('beds')
+        )
 
     @audit_critical_action(description="Modification de service hospitalier")
     def perform_update(self, serializer):
@@ -460,44 +514,29 @@ def release_bed_view(request, bed_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def bed_occupancy_view(request):
-    """Get bed occupancy statistics"""
-    org = request.user.organization
-    total_beds = HospitalBed.objects.filter(
-        is_active=True, department__organization=org
-    ).count()
-    occupied_beds = HospitalBed.objects.filter(
-        is_active=True, department__organization=org,
-        status=BedStatus.OCCUPIED
-    ).count()
-    available_beds = HospitalBed.objects.filter(
-        is_active=True, department__organization=org,
-        status=BedStatus.AVAILABLE
-    ).count()
-    
-    # Department breakdown
-    department_stats = HospitalDepartment.objects.filter(
-        is_active=True, organization=org
-    ).annotate(
-        total_beds=Count('beds', filter=Q(beds__is_active=True)),
-        occupied_beds=Count('beds', filter=Q(
-            beds__is_active=True,
-            beds__status=BedStatus.OCCUPIED
-        )),
-        available_beds=Count('beds', filter=Q(
-            beds__is_active=True,
-            beds__status=BedStatus.AVAILABLE
-        ))
-    ).values('name', 'total_beds', 'occupied_beds', 'available_beds')
-    
-    occupancy_rate = round((occupied_beds / total_beds * 100), 1) if total_beds > 0 else 0
-    
-    return Response({
-        'total_beds': total_beds,
-        'occupied_beds': occupied_beds,
-        'available_beds': available_beds,
-        'occupancy_rate': occupancy_rate,
-        'departments': list(department_stats)
-    })
+    """
+    Get bed occupancy statistics, from the in-memory bed board
+
+    - If-None-Match: <etag>   → 304 when the board did not change
+    - ?wait=<seconds>         → with If-None-Match, hold the poll until the
+                                board changes (at most BED_BOARD_MAX_WAIT)
+    """
+    try:
+        wait = min(max(int(request.query_params.get('wait', 0)), 0), occupancy.max_wait())
+    except ValueError:
+        return Response({'error': 'wait doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+
+    organization_id = request.user.organization_id
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and wait:
+        board = occupancy.wait_for_change(organization_id, if_none_match, wait)
+    else:
+        board = occupancy.get_board(organization_id)
+    data = board.as_dict()
+    headers = {'ETag': occupancy.make_etag(data['version']), 'Cache-Control': 'no-cache'}
+    if occupancy.etag_matches(if_none_match, headers['ETag']):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -505,6 +544,7 @@ def bed_occupancy_view(request):
 # ═══════════════════════════════════════════════════════════════
 
 @api_view(['GET'])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def encounter_type_choices_view(request):
     """Get encounter type choices"""
     choices = [
@@ -515,6 +555,7 @@ def encounter_type_choices_view(request):
 
 
 @api_view(['GET'])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def encounter_status_choices_view(request):
     """Get encounter status choices"""
     choices = [
@@ -525,6 +566,7 @@ def encounter_status_choices_view(request):
 
 
 @api_view(['GET'])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def bed_status_choices_view(request):
     """Get bed status choices"""
     choices = [
@@ -549,10 +591,9 @@ def hospital_dashboard_view(request):
     today_encounters = HospitalEncounter.objects.filter(
         organization=org, created_at__date=today
     ).count()
-    today_vitals = VitalSigns.objects.filter(
-        measured_at__date=today,
-        patient__hospital_encounters__organization=org
-    ).distinct().count()
+    start, end = _today_range()
+    vitals_today = _organization_vital_signs(org).filter(measured_at__gte=start, measured_at__lt=end)
+    today_vitals = vitals_today.count()
     
     # Active statistics
     active_encounters = HospitalEncounter.objects.filter(
@@ -567,21 +608,14 @@ def hospital_dashboard_view(request):
     ).count()
     
     # Bed occupancy
-    total_beds = HospitalBed.objects.filter(
-        is_active=True, department__organization=org
-    ).count()
-    occupied_beds = HospitalBed.objects.filter(
-        is_active=True, department__organization=org,
-        status=BedStatus.OCCUPIED
-    ).count()
-    occupancy_rate = round((occupied_beds / total_beds * 100), 1) if total_beds > 0 else 0
+    board = occupancy.get_board(org.pk).as_dict()
+    total_beds = board['total_beds']
+    occupied_beds = board['occupied_beds']
+    occupancy_rate = board['occupancy_rate']
     
-    # Abnormal vitals today
-    abnormal_vitals = VitalSigns.objects.filter(
-        measured_at__date=today,
-        patient__hospital_encounters__organization=org
-    ).distinct()
-    abnormal_count = len([v for v in abnormal_vitals if v.is_abnormal])
+    # Abnormal vitals today, per parameter
+    abnormal = abnormal_counts(vitals_today)
+    abnormal_count = abnormal.pop('total')
     
     return Response({
         'today_encounters': today_encounters,
@@ -593,6 +627,7 @@ def hospital_dashboard_view(request):
         'available_beds': total_beds - occupied_beds,
         'occupancy_rate': occupancy_rate,
         'abnormal_vitals_today': abnormal_count,
+        'abnormal_vitals_by_parameter': abnormal,
         'departments_count': HospitalDepartment.objects.filter(
             is_active=True, organization=org
         ).count()
@@ -602,78 +637,43 @@ def hospital_dashboard_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def patient_medical_summary_view(request, patient_id):
-    """Get comprehensive medical summary for a patient"""
-    try:
-        from apps.patients.models import Patient
-        from apps.prescriptions.models import Prescription, PrescriptionStatus
-        from apps.prescriptions.serializers import PrescriptionListSerializer
-        
-        org = request.user.organization
-        patient = Patient.objects.get(id=patient_id)
-
-        # Verify patient belongs to this org via encounters
-        if not HospitalEncounter.objects.filter(patient=patient, organization=org).exists():
-            return Response(
-                {'error': 'Patient non trouvé'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Get recent encounters — org-scoped
-        recent_encounters = HospitalEncounter.objects.filter(
-            patient=patient, organization=org
-        ).select_related('attending_physician').order_by('-created_at')[:5]
-        
-        # Get recent prescriptions — org-scoped
-        recent_prescriptions = Prescription.objects.filter(
-            patient=patient, organization=org
-        ).select_related('doctor', 'encounter').order_by('-created_at')[:5]
-        
-        # Get recent vital signs
-        recent_vitals = VitalSigns.objects.filter(
-            patient=patient
-        ).select_related('measured_by', 'encounter').order_by('-measured_at')[:5]
-        
-        encounter_serializer = HospitalEncounterListSerializer(recent_encounters, many=True)
-        prescription_serializer = PrescriptionListSerializer(recent_prescriptions, many=True)
-        vitals_serializer = VitalSignsListSerializer(recent_vitals, many=True)
-        
-        return Response({
-            'patient': {
-                'id': str(patient.id),
-                'full_name': patient.full_name,
-                'patient_number': patient.patient_number,
-                'age': patient.age,
-                'gender': patient.get_gender_display(),
-                'blood_type': patient.blood_type,
-                'allergies': patient.allergies,
-                'chronic_conditions': patient.chronic_conditions
-            },
-            'recent_encounters': encounter_serializer.data,
-            'recent_prescriptions': prescription_serializer.data,
-            'recent_vital_signs': vitals_serializer.data,
-            'statistics': {
-                'total_encounters': HospitalEncounter.objects.filter(
-                    patient=patient, organization=org
-                ).count(),
-                'total_prescriptions': Prescription.objects.filter(
-                    patient=patient, organization=org
-                ).count(),
-                'active_prescriptions': Prescription.objects.filter(
-                    patient=patient, organization=org,
-                    status=PrescriptionStatus.PENDING
-                ).count()
-            }
-        })
-    except Patient.DoesNotExist:
+    """
+    Get comprehensive medical summary for a patient, read from its
+    ``PatientMedicalSummary`` (see apps.hospital.medical_summary)
+    """
+    summary = medical_summary.get_summary(patient_id, request.user.organization_id)
+    # No summary: the patient has no encounter in this organization
+    if summary is None:
         return Response(
-            {'error': 'Patient not found'}, 
+            {'error': 'Patient non trouvé'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_400_BAD_REQUEST
-        )
+
+    patient = summary.patient
+    return Response({
+        'patient': {
+            'id': str(patient.id),
+            'full_name': patient.full_name,
+            'patient_number': patient.patient_number,
+            'age': patient.age,
+            'gender': patient.get_gender_display(),
+            'blood_type': patient.blood_type,
+            'allergies': patient.allergies,
+            'chronic_conditions': patient.chronic_conditions
+        },
+        'recent_encounters': summary.recent_encounters,
+        'recent_prescriptions': summary.recent_prescriptions,
+        'recent_vital_signs': summary.recent_vital_signs,
+        'statistics': {
+            'total_encounters': summary.encounter_count,
+            'total_prescriptions': summary.prescription_count,
+            'active_prescriptions': summary.prescriptions_by_status.get(PrescriptionStatus.PENDING, 0),
+            'encounters_by_status': summary.encounters_by_status,
+            'prescriptions_by_status': summary.prescriptions_by_status,
+            'last_vital_signs_at': summary.last_vital_signs_at,
+        },
+        'refreshed_at': summary.refreshed_at,
+    })
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -768,13 +768,13 @@ def triage_by_level_view(request, level):
             TriageStatus.IN_PROGRESS, TriageStatus.COMPLETED
         ]).select_related(
             'patient', 'encounter', 'nurse', 'assigned_doctor', 'organization'
-        ).order_by('-triage_date')
+        ).order_by(*worklist.QUEUE_ORDER)
         
         serializer = TriageListSerializer(triages, many=True)
         return Response({
             'success': True,
             'level': level,
-            'count': triages.count(),
+            'count': len(serializer.data),
             'results': serializer.data
         })
     except Exception as e:
@@ -783,6 +783,105 @@ def triage_by_level_view(request, level):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+
+# ═══════════════════════════════════════════════════════════════
+#  TRIAGE WORKLIST (apps.hospital.worklist)
+# ═══════════════════════════════════════════════════════════════
+
+def _worklist_department(request):
+    """``(department, error response)`` of the optional ``department`` parameter"""
+    department_id = request.query_params.get('department') or request.data.get('department')
+    if not department_id:
+        return None, None
+    try:
+        return HospitalDepartment.objects.get(pk=department_id, organization=request.user.organization), None
+    except (HospitalDepartment.DoesNotExist, ValueError, DjangoValidationError):
+        return None, Response({'error': 'Service non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def triage_worklist_view(request):
+    """Peek at the head of the triage queue, in priority order"""
+    department, error = _worklist_department(request)
+    if error:
+        return error
+    try:
+        limit = min(max(int(request.query_params.get('limit', worklist.DEFAULT_PEEK)), 1), worklist.MAX_PEEK)
+    except ValueError:
+        return Response({'error': 'limit doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+
+    head = worklist.peek(request.user.organization, department, limit)
+    serializer = TriageWorklistSerializer(head, many=True, context={'now': timezone.now()})
+    results = serializer.data
+    for position, row in enumerate(results, start=1):
+        row['position'] = position
+    return Response({
+        'count': head[0].waiting_count if head else 0,
+        'results': results,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@audit_critical_action(description="Prise en charge du patient suivant (triage)")
+def triage_worklist_next_view(request):
+    """Claim the next waiting patient; 204 when the queue is empty"""
+    department, error = _worklist_department(request)
+    if error:
+        return error
+    triage = worklist.next_patient(request.user.organization, request.user, department)
+    if triage is None:
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(TriageWorklistSerializer(triage).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@audit_critical_action(description="Prise en charge d'un patient trié")
+def triage_claim_view(request, pk):
+    """Claim a given waiting patient; 409 if already claimed"""
+    try:
+        triage = worklist.claim(request.user.organization, pk, request.user)
+    except Triage.DoesNotExist:
+        return Response({'error': 'Triage non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    except worklist.AlreadyClaimed:
+        return Response({'error': 'Patient déjà pris en charge'}, status=status.HTTP_409_CONFLICT)
+    return Response(TriageWorklistSerializer(triage).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@audit_critical_action(description="Remise en file d'un patient trié")
+def triage_release_view(request, pk):
+    """Put a patient claimed by the current user back in the queue"""
+    try:
+        triage = worklist.release(request.user.organization, pk, request.user)
+    except Triage.DoesNotExist:
+        return Response({'error': 'Triage non pris en charge par vous'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(TriageWorklistSerializer(triage).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@audit_critical_action(description="Escalade de priorité d'un patient trié")
+def triage_escalate_view(request, pk):
+    """Move a waiting patient up by ``levels`` (default 1) priority levels"""
+    try:
+        levels = int(request.data.get('levels', 1))
+    except (TypeError, ValueError):
+        levels = 0
+    if levels < 1:
+        return Response({'error': 'levels doit être un entier positif'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        triage = worklist.escalate(request.user.organization, pk, levels)
+    except Triage.DoesNotExist:
+        return Response({'error': 'Triage non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+    except worklist.AlreadyClaimed:
+        return Response({'error': 'Patient déjà pris en charge'}, status=status.HTTP_409_CONFLICT)
+    return Response(TriageWorklistSerializer(triage).data)
+
+
 # ═══════════════════════════════════════════════════════════════
 #  CONSULTATION RECORDING TRANSCRIPTION API
 # ═══════════════════════════════════════════════════════════════
@@ -795,18 +894,17 @@ def test_gemini_config_view(request):
     GET /api/v1/hospital/test-gemini/
     """
     try:
-        from .gemini_service import get_gemini_service
-        import google.generativeai as genai
-        from decouple import config
+        from django.conf import settings
+        from apps.core.ai import get_gateway
         
-        api_key = config('GEMINI_API_KEY', default=None)
-        logger = __import__('logging').getLogger(__name__)
+        api_key = settings.GEMINI_API_KEY
         
         return Response({
             'success': True,
             'api_key_configured': bool(api_key),
             'api_key_preview': f"{api_key[:10]}...{api_key[-10:]}" if api_key else None,
             'gemini_service_available': True,
+            'gateway': type(get_gateway()).__name__,
             'message': 'Gemini configuration appears to be set up correctly'
         }, status=status.HTTP_200_OK)
     except Exception as e:
@@ -828,6 +926,9 @@ class ConsultationRecordingTranscriptionView(generics.CreateAPIView):
     - Accepts audio file upload
     - Uses Gemini Flash to transcribe and generate clinical notes
     - Returns structured consultation notes
+    
+    Synchronous: the request waits for the model. Long recordings go through
+    transcription jobs (transcriptions/) instead.
     """
     parser_classes = (MultiPartParser, FormParser)
     
@@ -886,4 +987,96 @@ class ConsultationRecordingTranscriptionView(generics.CreateAPIView):
                     'detail': 'Audio transcription failed. Check server logs for details.'
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+# ═══════════════════════════════════════════════════════════════
+#  CONSULTATION TRANSCRIPTION JOBS (apps.hospital.transcription)
+# ═══════════════════════════════════════════════════════════════
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class TranscriptionJobListCreateAPIView(generics.ListCreateAPIView):
+    """
+    List transcription jobs, or create one before uploading its recording
+    POST /api/v1/hospital/transcriptions/
+    {total_size, filename, content_type, encounter, consultation_context}
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TranscriptionJobSerializer
+    pagination_class = StandardPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['encounter', 'status']
+
+    def get_queryset(self):
+        return TranscriptionJob.objects.filter(organization=self.request.user.organization)
+
+    def perform_create(self, serializer):
+        serializer.save(organization=self.request.user.organization, created_by=self.request.user)
+
+
+class TranscriptionJobDetailAPIView(generics.RetrieveDestroyAPIView):
+    """Poll a transcription job, or cancel it (not while it is being transcribed)"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = TranscriptionJobSerializer
+
+    def get_queryset(self):
+        return TranscriptionJob.objects.filter(organization=self.request.user.organization)
+
+    def destroy(self, request, *args, **kwargs):
+        job = self.get_object()
+        if job.status == TranscriptionJobStatus.PROCESSING:
+            return Response({'error': 'Transcription en cours'}, status=status.HTTP_409_CONFLICT)
+        transcription.discard_upload(job)
+        job.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def transcription_job_upload_view(request, pk):
+    """
+    Upload one chunk of a recording
+    PUT /api/v1/hospital/transcriptions/{id}/upload/
+    Body: the raw bytes; header ``Content-Range: bytes <first>-<last>/<total>``.
+    A chunk that does not continue the upload gets a 409 with ``received_size``,
+    the offset to resume from. The last chunk queues the job.
+    """
+    match = CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return Response(
+            {'error': 'En-tête Content-Range requis : bytes <début>-<fin>/<total>'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    first, last, total = map(int, match.groups())
+    length = last - first + 1
+    if length < 1:
+        return Response({'error': 'Content-Range invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    if length > transcription.MAX_CHUNK_BYTES:
+        return Response(
+            {'error': f'Fragment trop volumineux (max {transcription.MAX_CHUNK_BYTES} octets)'},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+    with transaction.atomic():
+        # The row lock serializes concurrent chunks of the same upload.
+        try:
+            job = TranscriptionJob.objects.select_for_update().get(
+                pk=pk, organization=request.user.organization
+            )
+        except TranscriptionJob.DoesNotExist:
+            return Response({'error': 'Transcription non trouvée'}, status=status.HTTP_404_NOT_FOUND)
+        if total != job.total_size:
+            return Response(
+                {'error': f'Taille totale attendue : {job.total_size} octets'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            transcription.write_chunk(job, first, length, request.stream)
+        except transcription.ChunkError as e:
+            return Response(
+                {'error': str(e), 'received_size': job.received_size, 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+    return Response(TranscriptionJobSerializer(job).data)
@@ -13,6 +13,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.db.models import Count, Q, Prefetch
 from django.utils import timezone
+from datetime import timedelta
 
 from .models import HospitalEncounter, VitalSigns, HospitalDepartment, HospitalBed
 from .serializers import (
@@ -22,6 +23,7 @@ from .serializers import (
     HospitalDepartmentSerializer, HospitalBedSerializer
 )
 from apps.audit.decorators import audit_critical_action
+from apps.core.annotations import AnnotatedFieldsMixin
 
 
 class StandardPagination(PageNumberPagination):
@@ -30,7 +32,7 @@ class StandardPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class HospitalEncounterViewSet(viewsets.ModelViewSet):
+class HospitalEncounterViewSet(AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """
     Enhanced Hospital Encounter ViewSet with comprehensive relationship handling
     """
@@ -58,9 +60,6 @@ class HospitalEncounterViewSet(viewsets.ModelViewSet):
             'nursing_staff',
             Prefetch('vital_signs', queryset=VitalSigns.objects.select_related('measured_by')),
             # Add prescription prefetch if available
-        ).annotate(
-            vital_signs_count=Count('vital_signs', distinct=True),
-            prescriptions_count=Count('prescriptions', distinct=True)
         )
 
     def get_serializer_class(self):
@@ -219,17 +218,14 @@ class VitalSignsViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def abnormal(self, request):
         """Get all abnormal vital signs for today"""
-        today = timezone.now().date()
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
         abnormal_vitals = self.get_queryset().filter(
-            measured_at__date=today
+            is_abnormal=True, measured_at__gte=start, measured_at__lt=start + timedelta(days=1)
         )
         
-        # Filter for abnormal values (this assumes is_abnormal property exists)
-        abnormal_list = [v for v in abnormal_vitals if hasattr(v, 'is_abnormal') and v.is_abnormal]
-        
-        serializer = VitalSignsListSerializer(abnormal_list, many=True)
+        serializer = VitalSignsListSerializer(abnormal_vitals, many=True)
         return Response({
-            'count': len(abnormal_list),
+            'count': len(serializer.data),
             'results': serializer.data
         })
 
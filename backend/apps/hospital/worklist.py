@@ -0,0 +1,123 @@
+"""
+Emergency department triage worklist.
+
+The queue is the ``Triage`` table itself, so it survives restarts and is
+shared by every API process: a triage is *waiting* while its status is in
+``WAITING_STATUSES`` and nobody claimed it.  Waiting triages are served in
+queue order::
+
+    queue_priority (triage level minus escalation, 1 first), queued_at, id
+
+which the partial index ``hospital_triage_worklist_idx`` returns without
+sorting.  Clinicians
+
+* ``peek`` at the head of the queue (organization, optionally department);
+* take the ``next`` patient: the head row is locked with
+  ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent clinicians each get a
+  different patient instead of waiting on (or double-claiming) the same row;
+* ``claim`` a given patient, which fails with ``AlreadyClaimed`` if someone
+  else got there first;
+* ``release`` a claimed patient back to the queue, with the status it had
+  before the claim, or ``escalate`` a waiting one ahead of the patients of
+  its level.
+"""
+from django.db import transaction
+from django.db.models import Count, Window
+from django.utils import timezone
+
+from .models import Triage, TriageLevel, TriageStatus, WAITING_STATUSES
+
+QUEUE_ORDER = ('queue_priority', 'queued_at', 'id')
+
+DEFAULT_PEEK = 10
+MAX_PEEK = 100
+
+
+class AlreadyClaimed(Exception):
+    """The triage is no longer waiting."""
+
+
+def waiting(organization, department=None):
+    """Waiting triages of ``organization`` in queue order."""
+    queue = Triage.objects.filter(
+        organization=organization, status__in=WAITING_STATUSES, claimed_by__isnull=True,
+    )
+    if department is not None:
+        queue = queue.filter(department=department)
+    return queue.order_by(*QUEUE_ORDER)
+
+
+def peek(organization, department=None, limit=DEFAULT_PEEK):
+    """
+    The first ``limit`` waiting triages, without locking them.  Each carries
+    ``waiting_count``, the length of the whole queue: the window count is
+    computed before LIMIT, so it comes with the same query.
+    """
+    return list(waiting(organization, department).select_related(
+        'patient', 'nurse', 'assigned_doctor', 'department',
+    ).annotate(waiting_count=Window(Count('pk')))[:limit])
+
+
+def _take(triage, user):
+    now = timezone.now()
+    triage.claimed_by = user
+    triage.claimed_at = now
+    triage.claimed_from_status = triage.status
+    triage.status = TriageStatus.IN_TREATMENT
+    if triage.assigned_doctor_id is None:
+        triage.assigned_doctor = user
+    triage.save(update_fields=[
+        'claimed_by', 'claimed_at', 'claimed_from_status', 'status', 'assigned_doctor', 'updated_at',
+    ])
+    return triage
+
+
+def next_patient(organization, user, department=None):
+    """Claim the head of the queue for ``user``; ``None`` when nobody is waiting."""
+    with transaction.atomic():
+        triage = waiting(organization, department).select_for_update(
+            skip_locked=True, of=('self',),
+        ).first()
+        if triage is None:
+            return None
+        return _take(triage, user)
+
+
+def claim(organization, triage_id, user):
+    """Claim a given waiting triage for ``user``."""
+    with transaction.atomic():
+        triage = Triage.objects.select_for_update().get(pk=triage_id, organization=organization)
+        if triage.claimed_by_id is not None or triage.status not in WAITING_STATUSES:
+            raise AlreadyClaimed(triage)
+        return _take(triage, user)
+
+
+def release(organization, triage_id, user):
+    """Put a triage claimed by ``user`` back in the queue, at its original place."""
+    with transaction.atomic():
+        triage = Triage.objects.select_for_update().get(
+            pk=triage_id, organization=organization, claimed_by=user,
+        )
+        triage.claimed_by = None
+        triage.claimed_at = None
+        # Claims recorded before claimed_from_status existed were waiting as COMPLETED.
+        triage.status = triage.claimed_from_status or TriageStatus.COMPLETED
+        triage.claimed_from_status = ''
+        triage.save(update_fields=['claimed_by', 'claimed_at', 'claimed_from_status', 'status', 'updated_at'])
+        return triage
+
+
+def escalate(organization, triage_id, levels=1):
+    """Move a waiting triage ``levels`` priority levels up (never above level 1)."""
+    with transaction.atomic():
+        triage = Triage.objects.select_for_update().get(pk=triage_id, organization=organization)
+        if triage.claimed_by_id is not None or triage.status not in WAITING_STATUSES:
+            raise AlreadyClaimed(triage)
+        triage.escalation = min(triage.escalation + levels, triage.triage_level - TriageLevel.RESUSCITATION)
+        triage.save(update_fields=['escalation', 'updated_at'])
+        return triage
+
+
+def waiting_minutes(triage, now=None):
+    now = now or timezone.now()
+    return int((now - triage.queued_at).total_seconds() // 60) if triage.queued_at else None
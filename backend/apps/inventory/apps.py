@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.inventory'
-    verbose_name = 'Gestion Inventaire'
\ No newline at end of file
+    verbose_name = 'Gestion Inventaire'
+
+    def ready(self):
+        import apps.inventory.signals
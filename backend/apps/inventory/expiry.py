@@ -0,0 +1,170 @@
+"""
+Expiring products report.
+
+A batch expires at the earliest of its own expiry date and its product's
+expiration date.  That date is stored on the batch as ``effective_expiry``
+(kept up to date by ``InventoryBatch.save`` and by the product signal in
+``signals.py``) and indexed for the rows the report reads, so every scope
+is one ordered SQL query:
+
+* available batches with stock and an expiry date, by ``effective_expiry``;
+* UNION ALL the stock items of products with an expiration date but no
+  such batch (reported as a ``GENERAL`` batch of the product).
+
+``expiring_rows`` returns that query; ``format_row`` builds the report
+entry of one of its rows.
+"""
+from django.db.models import (
+    BooleanField, CharField, DateField, DateTimeField, Exists, F, OuterRef, UUIDField, Value,
+)
+
+from .models import InventoryBatch, InventoryItem
+
+SCOPE_WINDOW = 'window'
+SCOPE_EXPIRED = 'expired'
+SCOPE_ALL = 'all'
+
+BATCH_ROW = 'batch'
+PRODUCT_ROW = 'product'
+
+
+def _null(field):
+    return Value(None, output_field=field)
+
+
+def _batch_columns():
+    return {
+        'row_kind': Value(BATCH_ROW, output_field=CharField()),
+        'row_id': F('id'),
+        'row_item': F('inventory_item_id'),
+        'row_product_name': F('inventory_item__product__name'),
+        'row_product_sku': F('inventory_item__product__sku'),
+        'row_batch_number': F('batch_number'),
+        'row_serial_number': F('serial_number'),
+        'row_manufacture_date': F('manufacture_date'),
+        'row_expiry': F('effective_expiry'),
+        'row_product_expiry': F('inventory_item__product__expiration_date'),
+        'row_batch_expiry': F('expiry_date'),
+        'row_received_date': F('received_date'),
+        'row_supplier': F('supplier_id'),
+        'row_supplier_name': F('supplier__name'),
+        'row_purchase_order_id': F('purchase_order_id'),
+        'row_initial_quantity': F('initial_quantity'),
+        'row_current_quantity': F('current_quantity'),
+        'row_reserved_quantity': F('reserved_quantity'),
+        'row_unit_cost': F('unit_cost'),
+        'row_status': F('status'),
+        'row_quality_checked': F('quality_checked'),
+        'row_quality_notes': F('quality_notes'),
+        'row_created_at': F('created_at'),
+        'row_updated_at': F('updated_at'),
+    }
+
+
+def _product_columns():
+    # Same names, in the same order, as _batch_columns (UNION is positional).
+    return {
+        'row_kind': Value(PRODUCT_ROW, output_field=CharField()),
+        'row_id': F('product_id'),
+        'row_item': F('id'),
+        'row_product_name': F('product__name'),
+        'row_product_sku': F('product__sku'),
+        'row_batch_number': Value('GENERAL', output_field=CharField()),
+        'row_serial_number': Value('', output_field=CharField()),
+        'row_manufacture_date': _null(DateField()),
+        'row_expiry': F('product__expiration_date'),
+        'row_product_expiry': F('product__expiration_date'),
+        'row_batch_expiry': _null(DateField()),
+        'row_received_date': _null(DateField()),
+        'row_supplier': _null(UUIDField()),
+        'row_supplier_name': _null(CharField()),
+        'row_purchase_order_id': Value('', output_field=CharField()),
+        'row_initial_quantity': F('quantity_on_hand'),
+        'row_current_quantity': F('quantity_on_hand'),
+        'row_reserved_quantity': F('quantity_reserved'),
+        'row_unit_cost': F('average_cost'),
+        'row_status': Value('AVAILABLE', output_field=CharField()),
+        'row_quality_checked': Value(False, output_field=BooleanField()),
+        'row_quality_notes': Value('', output_field=CharField()),
+        'row_created_at': _null(DateTimeField()),
+        'row_updated_at': _null(DateTimeField()),
+    }
+
+
+COLUMNS = list(_batch_columns())
+
+
+def expiring_rows(organization, scope, today, cutoff_date):
+    """Ordered ``values_list`` query (``COLUMNS``) of the report rows."""
+    # Same predicates as the partial index inv_batch_effective_expiry_idx.
+    batches = InventoryBatch.objects.filter(
+        status='AVAILABLE',
+        current_quantity__gt=0,
+        expiry_date__isnull=False,
+    )
+    items = InventoryItem.objects.filter(
+        quantity_on_hand__gt=0,
+        product__is_active=True,
+        product__expiration_date__isnull=False,
+    ).filter(~Exists(
+        InventoryBatch.objects.filter(
+            inventory_item=OuterRef('pk'),
+            expiry_date__isnull=False,
+            current_quantity__gt=0,
+        )
+    ))
+
+    if organization is not None:
+        batches = batches.filter(inventory_item__organization=organization)
+        items = items.filter(organization=organization)
+
+    if scope == SCOPE_EXPIRED:
+        batches = batches.filter(effective_expiry__lt=today)
+        items = items.filter(product__expiration_date__lt=today)
+    elif scope != SCOPE_ALL:
+        batches = batches.filter(effective_expiry__lte=cutoff_date)
+        items = items.filter(product__expiration_date__lte=cutoff_date)
+
+    batches = batches.order_by().annotate(**_batch_columns()).values_list(*COLUMNS)
+    items = items.order_by().annotate(**_product_columns()).values_list(*COLUMNS)
+    return batches.union(items, all=True).order_by('row_expiry', 'row_kind', 'row_id')
+
+
+def format_row(row, today):
+    """Report entry of an ``expiring_rows`` row."""
+    values = dict(zip(COLUMNS, row))
+    expiry = values['row_expiry']
+    entry = {
+        'id': str(values['row_id']),
+        'inventory_item': str(values['row_item']),
+        'product_name': values['row_product_name'],
+        'product_sku': values['row_product_sku'],
+        'batch_number': values['row_batch_number'],
+        'serial_number': values['row_serial_number'],
+        'manufacture_date': values['row_manufacture_date'],
+        'expiry_date': expiry,
+    }
+    if values['row_kind'] == BATCH_ROW:
+        entry['product_expiration_date'] = values['row_product_expiry']
+        entry['batch_expiry_date'] = values['row_batch_expiry']
+    else:
+        entry['id'] = f"product-{values['row_id']}"
+    supplier = values['row_supplier']
+    entry.update({
+        'received_date': values['row_received_date'],
+        'supplier': str(supplier) if supplier else None,
+        'supplier_name': values['row_supplier_name'],
+        'purchase_order_id': values['row_purchase_order_id'],
+        'initial_quantity': int(values['row_initial_quantity'] or 0),
+        'current_quantity': int(values['row_current_quantity'] or 0),
+        'reserved_quantity': int(values['row_reserved_quantity'] or 0),
+        'unit_cost': str(values['row_unit_cost'] or 0),
+        'status': values['row_status'],
+        'quality_checked': bool(values['row_quality_checked']),
+        'quality_notes': values['row_quality_notes'],
+        'is_expired': bool(expiry < today),
+        'days_to_expiry': (expiry - today).days,
+        'created_at': values['row_created_at'],
+        'updated_at': values['row_updated_at'],
+    })
+    return entry
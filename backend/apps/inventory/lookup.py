@@ -0,0 +1,241 @@
+"""
+In-memory product lookup for the point of sale.
+
+Cashiers type a few letters of a name, a SKU or scan a barcode on every
+sale.  Instead of a filtered, fully serialized ``Product`` list, each API
+process keeps a per-organization prefix index: a sorted list of
+``(key, product_id)`` pairs where the keys of a product are its normalized
+name, each further word of the name, its SKU and its barcode.  A lookup is
+a binary search followed by a short scan, without touching the database.
+
+The index is refreshed incrementally:
+
+* signals in ``signals.py`` call ``product_changed`` after the commit of any
+  product or stock change, which reloads that one product in the local
+  index, bumps the organization version of the ``'product_lookup'``
+  namespace (see apps.core.cache) and records the changed product under the
+  new version in the shared cache;
+* other processes re-check the shared version at most every
+  ``PRODUCT_LOOKUP_LOCAL_TTL`` seconds and replay the recorded changes they
+  missed, or rebuild the organization index if too many were missed or the
+  records expired.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from apps.core.cache import get_versions, invalidate
+from apps.core.search import normalize
+
+NAMESPACE = 'product_lookup'
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+# Changes older than this, or more than MAX_REPLAYED_CHANGES behind, are not
+# replayed: the organization index is rebuilt instead.
+_CHANGE_TIMEOUT = 60 * 60
+MAX_REPLAYED_CHANGES = 200
+
+# organization id → OrganizationIndex
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _local_ttl():
+    return getattr(settings, 'PRODUCT_LOOKUP_LOCAL_TTL', 5)
+
+
+def _change_key(organization_id, version):
+    return f'{NAMESPACE}:org:{organization_id}:change:{version}'
+
+
+def normalize_query(text):
+    return ' '.join(normalize(text).split())
+
+
+class ProductEntry:
+    """Compact projection of a product served by the lookup."""
+    __slots__ = ('id', 'name', 'sku', 'barcode', 'price', 'quantity_available', 'keys')
+
+    def __init__(self, id, name, sku, barcode, price, quantity_available):
+        # Strings sort much faster than UUIDs when building the index.
+        self.id = str(id)
+        self.name = name
+        self.sku = sku
+        self.barcode = barcode
+        self.price = price
+        self.quantity_available = quantity_available
+        self.keys = self._keys()
+
+    def _keys(self):
+        words = normalize(self.name).split()
+        keys = set(words[1:])  # "250" finds "Amoxicilline 250mg"
+        if words:
+            keys.add(' '.join(words))
+        for code in (self.sku, self.barcode):
+            code = normalize_query(code or '')
+            if code:
+                keys.add(code)
+        return sorted(keys)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'sku': self.sku,
+            'barcode': self.barcode,
+            'price': None if self.price is None else str(self.price),
+            'quantity_available': self.quantity_available,
+        }
+
+
+def load_entries(organization_id, product_ids=None):
+    """Active products of an organization with their available stock."""
+    from .models import Product, InventoryItem
+
+    products = Product.objects.filter(organization_id=organization_id, is_active=True)
+    stock = InventoryItem.objects.filter(organization_id=organization_id)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+        stock = stock.filter(product_id__in=product_ids)
+
+    quantities = dict(
+        stock.order_by().values('product_id')
+        .annotate(total=Sum('quantity_available'))
+        .values_list('product_id', 'total')
+    )
+    rows = products.order_by().values_list('pk', 'name', 'sku', 'barcode', 'selling_price')
+    return [
+        ProductEntry(pk, name, sku, barcode, price, quantities.get(pk) or 0)
+        for pk, name, sku, barcode, price in rows
+    ]
+
+
+class OrganizationIndex:
+    """Sorted prefix keys of the active products of one organization."""
+
+    def __init__(self, organization_id):
+        self.organization_id = organization_id
+        self.entries = {}
+        self.keys = []
+        self.versions = None
+        self.checked_until = 0
+        self.lock = threading.RLock()
+
+    def _insert(self, entry):
+        self.entries[entry.id] = entry
+        for key in entry.keys:
+            bisect.insort(self.keys, (key, entry.id))
+
+    def _remove(self, product_id):
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            position = bisect.bisect_left(self.keys, (key, product_id))
+            if position < len(self.keys) and self.keys[position] == (key, product_id):
+                del self.keys[position]
+
+    def build(self, versions):
+        """Load every product; ``versions`` must be read before the load."""
+        entries = load_entries(self.organization_id)
+        with self.lock:
+            self.entries = {entry.id: entry for entry in entries}
+            self.keys = sorted(
+                (key, entry.id) for entry in entries for key in entry.keys
+            )
+            self.versions = versions
+
+    def refresh(self, product_ids):
+        """Reload ``product_ids``, dropping those deleted or deactivated."""
+        entries = {entry.id: entry for entry in load_entries(self.organization_id, product_ids)}
+        with self.lock:
+            for product_id in map(str, product_ids):
+                self._remove(product_id)
+                if product_id in entries:
+                    self._insert(entries[product_id])
+
+    def catch_up(self, versions):
+        """Replay the changes recorded since ``self.versions``, if possible."""
+        known = self.versions
+        if known is None or known[0] != versions[0]:
+            return False
+        missed = versions[1] - known[1]
+        if missed <= 0 or missed > MAX_REPLAYED_CHANGES:
+            return False
+        keys = [_change_key(self.organization_id, v) for v in range(known[1] + 1, versions[1] + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        self.refresh(set(changes.values()))
+        self.versions = versions
+        return True
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Products having a key starting with the normalized ``query``."""
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        with self.lock:
+            position = bisect.bisect_left(self.keys, (prefix,))
+            while position < len(self.keys) and len(results) < limit:
+                key, product_id = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if product_id not in seen:
+                    seen.add(product_id)
+                    results.append(self.entries[product_id])
+                position += 1
+        return results
+
+
+def get_index(organization_id):
+    """Up-to-date lookup index of an organization."""
+    with _indexes_lock:
+        index = _indexes.get(organization_id)
+        if index is None:
+            index = _indexes[organization_id] = OrganizationIndex(organization_id)
+
+    if index.checked_until > time.monotonic():
+        return index
+    with index.lock:
+        if index.checked_until > time.monotonic():
+            return index
+        versions = get_versions(NAMESPACE, f'org:{organization_id}')
+        if index.versions != versions and not index.catch_up(versions):
+            index.build(versions)
+        index.checked_until = time.monotonic() + _local_ttl()
+    return index
+
+
+def lookup(organization_id, query, limit=DEFAULT_LIMIT):
+    return get_index(organization_id).search(query, limit)
+
+
+def product_changed(organization_id, product_id):
+    """Record a product or stock change; call after the transaction commits."""
+    version = invalidate(NAMESPACE, organization=organization_id)
+    cache.set(_change_key(organization_id, version), product_id, _CHANGE_TIMEOUT)
+
+    index = _indexes.get(organization_id)
+    if index is None:
+        return
+    with index.lock:
+        index.refresh([product_id])
+        if index.versions is not None and index.versions[1] == version - 1:
+            index.versions = (index.versions[0], version)
+        else:
+            # Another process changed the organization too: replay on next lookup.
+            index.checked_until = 0
+
+
+def clear_local_indexes():
+    with _indexes_lock:
+        _indexes.clear()
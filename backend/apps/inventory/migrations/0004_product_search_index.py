@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from apps.core.search import SearchDocument, create_search_index, drop_search_index
+
+# Frozen copy of PRODUCT_SEARCH in apps/inventory/models.py.
+SEARCH = SearchDocument(
+    ['name', 'generic_name', 'sku', 'barcode'],
+    index_name='inv_product_search_trgm',
+)
+
+
+def create_index(apps, schema_editor):
+    create_search_index(apps.get_model('inventory', 'Product'), SEARCH, schema_editor)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(apps.get_model('inventory', 'Product'), SEARCH, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_search_extensions'),
+        ('inventory', '0003_unit_selling_breakdown'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Q
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorybatch',
+            name='effective_expiry',
+            field=models.DateField(
+                blank=True, editable=False, null=True,
+                help_text="Plus proche des dates d'expiration du lot et du produit",
+            ),
+        ),
+        # LEAST ignores NULLs on PostgreSQL, like apps.inventory.models.effective_expiry.
+        migrations.RunSQL(
+            """
+            UPDATE inventory_batches AS batch
+            SET effective_expiry = LEAST(batch.expiry_date, product.expiration_date)
+            FROM inventory_items AS item
+            JOIN products AS product ON product.id = item.product_id
+            WHERE item.id = batch.inventory_item_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='inventorybatch',
+            index=models.Index(
+                condition=Q(status='AVAILABLE', current_quantity__gt=0, expiry_date__isnull=False),
+                fields=['effective_expiry', 'id'], name='inv_batch_effective_expiry_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                condition=Q(expiration_date__isnull=False),
+                fields=['expiration_date'], name='inv_product_expiry_idx',
+            ),
+        ),
+    ]
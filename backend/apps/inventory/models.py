@@ -1,8 +1,11 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator
 import uuid
 from decimal import Decimal
 
+from apps.core.search import SearchDocument
+
 
 class ProductCategory(models.TextChoices):
     MEDICATION = 'MEDICATION', 'Médicament'
@@ -270,12 +273,29 @@ class Product(models.Model):
             models.Index(fields=['is_active']),
             models.Index(fields=['organization', 'is_active', 'category']),
             models.Index(fields=['organization', 'name']),
+            models.Index(
+                fields=['expiration_date'], name='inv_product_expiry_idx',
+                condition=Q(expiration_date__isnull=False),
+            ),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the signals tell whether the expiration date changed on save.
+        instance._loaded_expiration_date = instance.__dict__.get('expiration_date')
+        return instance
+
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
 
+PRODUCT_SEARCH = SearchDocument(
+    ['name', 'generic_name', 'sku', 'barcode'],
+    index_name='inv_product_search_trgm',
+)
+
+
 class ProductSupplier(models.Model):
     """Through model for Product-Supplier many-to-many relationship"""
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -399,6 +419,10 @@ class InventoryBatch(models.Model):
     manufacture_date = models.DateField(null=True, blank=True)
     expiry_date = models.DateField(null=True, blank=True)
     received_date = models.DateField(help_text='Date de réception')
+    effective_expiry = models.DateField(
+        null=True, blank=True, editable=False,
+        help_text='Plus proche des dates d\'expiration du lot et du produit',
+    )
     
     # Quantities
     initial_quantity = models.PositiveIntegerField(help_text='Quantité initiale')
@@ -471,12 +495,37 @@ class InventoryBatch(models.Model):
             models.Index(fields=['expiry_date']),
             models.Index(fields=['status']),
             models.Index(fields=['inventory_item', 'status', 'expiry_date']),
+            # Expiring products report (apps.inventory.expiry).
+            models.Index(
+                fields=['effective_expiry', 'id'], name='inv_batch_effective_expiry_idx',
+                condition=Q(status='AVAILABLE', current_quantity__gt=0, expiry_date__isnull=False),
+            ),
         ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'expiry_date' in update_fields:
+            inventory_item = self._meta.get_field('inventory_item')
+            if inventory_item.is_cached(self) and InventoryItem.product.field.is_cached(self.inventory_item):
+                product_expiry = self.inventory_item.product.expiration_date
+            else:
+                product_expiry = InventoryItem.objects.filter(pk=self.inventory_item_id).values_list(
+                    'product__expiration_date', flat=True,
+                ).first()
+            self.effective_expiry = effective_expiry(self.expiry_date, product_expiry)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'effective_expiry'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.inventory_item.product.name} - Lot {self.batch_number}"
 
 
+def effective_expiry(batch_expiry, product_expiry):
+    """Earliest of the batch and product expiration dates (``None`` if neither is set)."""
+    return min([day for day in (batch_expiry, product_expiry) if day], default=None)
+
+
 class StockMovementType(models.TextChoices):
     PURCHASE_RECEIPT = 'PURCHASE_RECEIPT', 'Réception achat'
     SALE = 'SALE', 'Vente'
@@ -0,0 +1,57 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import DateField, Value
+from django.db.models.functions import Least
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core import sync
+from .lookup import product_changed
+from .models import Product, InventoryItem, InventoryBatch
+
+
+# ═══════════════════════════════════════════════════════════════
+#  POS PRODUCT LOOKUP INDEX
+# ═══════════════════════════════════════════════════════════════
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_lookup_on_product_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(product_changed, instance.organization_id, instance.pk))
+
+
+@receiver(post_save, sender=InventoryItem)
+@receiver(post_delete, sender=InventoryItem)
+def refresh_product_lookup_on_stock_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(product_changed, instance.organization_id, instance.product_id))
+
+
+# ═══════════════════════════════════════════════════════════════
+#  BATCH EFFECTIVE EXPIRY
+# ═══════════════════════════════════════════════════════════════
+
+@receiver(post_save, sender=Product)
+def refresh_batch_effective_expiry(sender, instance, created, **kwargs):
+    """Batches expire at the latest with their product."""
+    if created:
+        return
+    loaded = getattr(instance, '_loaded_expiration_date', ...)
+    if loaded == instance.expiration_date:
+        return
+    # LEAST ignores NULLs on PostgreSQL: a missing date does not win.
+    InventoryBatch.objects.filter(inventory_item__product=instance).update(
+        effective_expiry=Least('expiry_date', Value(instance.expiration_date, output_field=DateField())),
+    )
+    instance._loaded_expiration_date = instance.expiration_date
+
+
+# ═══════════════════════════════════════════════════════════════
+#  DELTA SYNC (apps.core.sync)
+# ═══════════════════════════════════════════════════════════════
+
+sync.register(
+    'products', Product, 'apps.inventory.serializers.ProductSerializer',
+    select_related=['organization', 'primary_supplier', 'created_by', 'updated_by'],
+    organization_field='organization_id',
+)
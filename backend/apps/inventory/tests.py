@@ -1,17 +1,26 @@
 """
 Unit tests for the Inventory module — edge cases and critical flows.
 Covers: InventoryItem stock status calculation, batch expiry management,
-product soft-delete, org isolation, alert auto-generation, price validators.
+product soft-delete, org isolation, alert auto-generation, price validators,
+the POS lookup index, sparse fieldsets, the expiring products report and the
+AI product scan.
 """
+import base64
+import json
 from decimal import Decimal
 from datetime import date, timedelta
+from unittest import mock
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from rest_framework.test import APITestCase
 
 from apps.accounts.models import User
+from apps.core import ai
+from apps.core.querybudget import QueryRecorder
+from apps.inventory import lookup
 from apps.organizations.models import Organization
 from apps.inventory.models import (
     Product, InventoryItem, InventoryBatch, StockMovement, InventoryAlert,
@@ -35,15 +44,19 @@ def _org(suffix="1"):
     )
 
 
-def _user(org, suffix="1"):
-    return User.objects.create_user(
+def _user(org, suffix="1", role="inventory_manager"):
+    # Built directly: create_user() expects a username (see apps.hospital.tests).
+    user = User(
         phone=f"+243840000{suffix.zfill(3)}",
-        password="testpass123",
+        email=f"inventory.user{suffix}@test.cd",
         first_name="Inv",
         last_name=f"User{suffix}",
-        primary_role="inventory_manager",
+        primary_role=role,
         organization=org,
     )
+    user.set_password("testpass123")
+    user.save()
+    return user
 
 
 def _product(org, name="Amoxicilline 250mg", sku=None, price="800.00",
@@ -359,20 +372,20 @@ class ExpiringProductsAPITests(APITestCase):
 
     def test_expiring_soon_batch_returned(self):
         _batch(self.inv, qty=10, expiry_days=15, batch_number="EXP-SOON")
-        resp = self.client.get("/api/v1/inventory/expiring/", {"days": 30})
+        resp = self.client.get("/api/v1/inventory/reports/expiring/", {"days": 30})
         self.assertEqual(resp.status_code, 200)
         self.assertGreaterEqual(resp.data["count"], 1)
 
     def test_far_future_batch_excluded(self):
         _batch(self.inv, qty=10, expiry_days=365, batch_number="FAR-FUTURE")
-        resp = self.client.get("/api/v1/inventory/expiring/", {"days": 30})
+        resp = self.client.get("/api/v1/inventory/reports/expiring/", {"days": 30})
         self.assertEqual(resp.status_code, 200)
         batch_numbers = [r["batch_number"] for r in resp.data.get("results", [])]
         self.assertNotIn("FAR-FUTURE", batch_numbers)
 
     def test_expired_batch_with_scope_expired(self):
         _batch(self.inv, qty=10, expiry_days=-5, batch_number="ALREADY-EXP")
-        resp = self.client.get("/api/v1/inventory/expiring/", {"scope": "expired"})
+        resp = self.client.get("/api/v1/inventory/reports/expiring/", {"scope": "expired"})
         self.assertEqual(resp.status_code, 200)
         batch_numbers = [r["batch_number"] for r in resp.data.get("results", [])]
         self.assertIn("ALREADY-EXP", batch_numbers)
@@ -396,7 +409,272 @@ class InventoryStatsAPITests(APITestCase):
         _inventory(p2, self.org, qty=0)
 
     def test_stats_returns_counts(self):
-        resp = self.client.get("/api/v1/inventory/stats/")
+        resp = self.client.get("/api/v1/inventory/reports/stats/")
         self.assertEqual(resp.status_code, 200)
         self.assertGreaterEqual(resp.data["total_products"], 2)
         self.assertGreaterEqual(resp.data["out_of_stock_count"], 1)
+
+
+# ──────────────────────────────────────────────────────────────
+# POS PRODUCT LOOKUP — in-memory prefix index
+# ──────────────────────────────────────────────────────────────
+
+class ProductLookupTests(APITestCase):
+    url = "/api/v1/inventory/products/lookup/"
+
+    def setUp(self):
+        lookup.clear_local_indexes()
+        self.addCleanup(lookup.clear_local_indexes)
+        self.org = _org("lk1")
+        self.other_org = _org("lk2")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.amox = _product(self.org, name="Amoxicilline 250mg", sku="AMX-250")
+            self.amox.barcode = "6151234567890"
+            self.amox.save()
+            self.para = _product(self.org, name="Paracétamol 500mg", sku="PARA-500", price="300.00")
+            _inventory(self.amox, self.org, qty=30)
+            _inventory(self.amox, self.org, qty=12, facility="pharmacy-annex")
+            _product(self.other_org, name="Amodiaquine", sku="AMD-1")
+        self.client.force_authenticate(user=_user(self.org, "lk1", role="cashier"))
+
+    def _names(self, query, organization=None):
+        return [entry.name for entry in lookup.lookup((organization or self.org).pk, query)]
+
+    def test_prefix_matches_name_words_sku_and_barcode(self):
+        self.assertEqual(self._names("amox"), ["Amoxicilline 250mg"])
+        self.assertEqual(self._names("PARACETAMOL"), ["Paracétamol 500mg"])
+        self.assertEqual(self._names("500"), ["Paracétamol 500mg"])
+        self.assertEqual(self._names("amx-2"), ["Amoxicilline 250mg"])
+        self.assertEqual(self._names("615123"), ["Amoxicilline 250mg"])
+        self.assertEqual(self._names("mg"), [])
+        self.assertEqual(self._names("  "), [])
+
+    def test_lookup_is_scoped_to_the_organization(self):
+        self.assertEqual(self._names("am"), ["Amoxicilline 250mg"])
+        self.assertEqual(self._names("am", self.other_org), ["Amodiaquine"])
+
+    def test_endpoint_returns_compact_projection(self):
+        response = self.client.get(self.url, {"q": "amo"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            "id": str(self.amox.pk),
+            "name": "Amoxicilline 250mg",
+            "sku": "AMX-250",
+            "barcode": "6151234567890",
+            "price": "800.00",
+            "quantity_available": 42,
+        }])
+
+    def test_warm_lookup_does_not_query_products(self):
+        self.client.get(self.url, {"q": "a"})
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(self.url, {"q": "para", "limit": 5})
+        self.assertEqual(len(response.data), 1)
+        tables = " ".join(sql for sql, _ in recorder.queries)
+        self.assertNotIn('"products"', tables)
+        self.assertNotIn('"inventory_items"', tables)
+
+    def test_product_and_stock_changes_update_the_index_incrementally(self):
+        index = lookup.get_index(self.org.pk)
+        with mock.patch.object(lookup.OrganizationIndex, "build") as build:
+            with self.captureOnCommitCallbacks(execute=True):
+                _product(self.org, name="Ibuprofène 400mg", sku="IBU-400")
+                self.para.is_active = False
+                self.para.save()
+                item = InventoryItem.objects.get(product=self.amox, facility_id="pharmacy-annex")
+                item.quantity_reserved = 2
+                item.save()
+            entries = lookup.lookup(self.org.pk, "i")
+            build.assert_not_called()
+        self.assertIs(lookup.get_index(self.org.pk), index)
+        self.assertEqual([entry.name for entry in entries], ["Ibuprofène 400mg"])
+        self.assertEqual(self._names("para"), [])
+        self.assertEqual(lookup.lookup(self.org.pk, "amox")[0].quantity_available, 40)
+
+    def test_changes_from_other_processes_are_replayed(self):
+        index = lookup.get_index(self.org.pk)
+        # Another process changes a product: only the shared cache is updated.
+        lookup.clear_local_indexes()
+        self.para.name = "Paracétamol 1g"
+        self.para.save()
+        lookup.product_changed(self.org.pk, self.para.pk)
+        lookup._indexes[self.org.pk] = index
+        self.assertEqual(self._names("para"), ["Paracétamol 500mg"])  # within the local TTL
+
+        index.checked_until = 0
+        with mock.patch.object(lookup.OrganizationIndex, "build") as build:
+            self.assertEqual(self._names("para"), ["Paracétamol 1g"])
+            build.assert_not_called()
+
+
+# ──────────────────────────────────────────────────────────────
+# SPARSE FIELDSETS — ?fields= on stock lists
+# ──────────────────────────────────────────────────────────────
+
+class InventorySparseFieldsetTests(APITestCase):
+    url = "/api/v1/inventory/items/"
+
+    def setUp(self):
+        self.org = _org("sf1")
+        self.client.force_authenticate(_user(self.org, "sf1", role="cashier"))
+        for index in range(3):
+            product = _product(self.org, name=f"Paracétamol {index}", sku=f"SF-{index}")
+            _inventory(product, self.org, qty=10 + index)
+
+    def _get(self, **params):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        items_sql = next(
+            sql for sql, _ in recorder.queries
+            if sql.startswith("SELECT") and 'FROM "inventory_items"' in sql and "COUNT(" not in sql
+        )
+        return response.data.get("results", response.data), items_sql
+
+    def test_nested_product_dropped_from_query(self):
+        full, full_sql = self._get()
+        rows, sql = self._get(fields="id,product_name,quantity_available")
+        self.assertEqual({tuple(sorted(row)) for row in rows}, {("id", "product_name", "quantity_available")})
+        by_id = {row["id"]: row for row in full}
+        for row in rows:
+            self.assertEqual(row["product_name"], by_id[row["id"]]["product_name"])
+        self.assertIn('JOIN "organizations"', full_sql)
+        self.assertNotIn('JOIN "organizations"', sql)
+        self.assertNotIn('"manufacturer"', sql)
+        self.assertIn('"quantity_available"', sql)
+
+
+
+# ──────────────────────────────────────────────────────────────
+# EXPIRING PRODUCTS REPORT — stored effective expiry
+# ──────────────────────────────────────────────────────────────
+
+class EffectiveExpiryReportTests(APITestCase):
+    url = "/api/v1/inventory/reports/expiring/"
+
+    def setUp(self):
+        self.org = _org("ee1")
+        self.client.force_authenticate(_user(self.org, "ee1", role="cashier"))
+        today = date.today()
+        self.amox = _product(self.org, name="Amoxicilline", sku="EE-AMX")
+        self.amox_stock = _inventory(self.amox, self.org)
+        self.soon = _batch(self.amox_stock, expiry_days=10, batch_number="EE-SOON")
+        self.later = _batch(self.amox_stock, expiry_days=200, batch_number="EE-LATER")
+        self.expired = _batch(self.amox_stock, expiry_days=-3, batch_number="EE-EXPIRED")
+        _batch(self.amox_stock, expiry_days=5, batch_number="EE-RECALLED", status="RECALLED")
+        # No dated batch: reported through the product expiration date.
+        self.para = _product(self.org, name="Paracétamol", sku="EE-PARA")
+        self.para.expiration_date = today + timedelta(days=20)
+        self.para.save()
+        _inventory(self.para, self.org, qty=7)
+        other = _org("ee2")
+        _batch(_inventory(_product(other, sku="EE-OTHER"), other), expiry_days=1, batch_number="EE-OTHER")
+
+    def _report(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_effective_expiry_follows_product(self):
+        self.assertEqual(self.later.effective_expiry, self.later.expiry_date)
+        self.amox.expiration_date = date.today() + timedelta(days=30)
+        self.amox.save()
+        self.later.refresh_from_db()
+        self.soon.refresh_from_db()
+        self.assertEqual(self.later.effective_expiry, self.amox.expiration_date)
+        self.assertEqual(self.soon.effective_expiry, self.soon.expiry_date)
+
+        self.later.expiry_date = date.today() + timedelta(days=25)
+        self.later.save(update_fields=["expiry_date"])
+        self.later.refresh_from_db()
+        self.assertEqual(self.later.effective_expiry, self.later.expiry_date)
+
+        # Saves that leave the expiry date alone do not look up the product.
+        batch = InventoryBatch.objects.get(pk=self.soon.pk)
+        batch.current_quantity -= 1
+        with self.assertNumQueries(1):
+            batch.save(update_fields=["current_quantity"])
+
+    def test_window_scope_is_ordered_and_merges_product_rows(self):
+        data = self._report(days=30)
+        self.assertEqual(
+            [row["batch_number"] for row in data["results"]], ["EE-EXPIRED", "EE-SOON", "GENERAL"],
+        )
+        self.assertEqual(data["count"], 3)
+        general = data["results"][-1]
+        self.assertEqual(general["id"], f"product-{self.para.pk}")
+        self.assertEqual(general["current_quantity"], 7)
+        self.assertNotIn("batch_expiry_date", general)
+        soon = data["results"][1]
+        self.assertEqual(soon["days_to_expiry"], 10)
+        self.assertFalse(soon["is_expired"])
+        self.assertEqual(soon["batch_expiry_date"], str(self.soon.expiry_date))
+
+    def test_expired_and_all_scopes(self):
+        self.assertEqual(
+            [row["batch_number"] for row in self._report(scope="expired")["results"]], ["EE-EXPIRED"],
+        )
+        self.assertEqual(
+            [row["batch_number"] for row in self._report(scope="all")["results"]],
+            ["EE-EXPIRED", "EE-SOON", "GENERAL", "EE-LATER"],
+        )
+
+    def test_product_expiry_brings_batch_into_window(self):
+        self.amox.expiration_date = date.today() + timedelta(days=15)
+        self.amox.save()
+        numbers = [row["batch_number"] for row in self._report(days=30)["results"]]
+        self.assertEqual(numbers, ["EE-EXPIRED", "EE-SOON", "EE-LATER", "GENERAL"])
+
+    def test_paginated_single_query(self):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(self.url, {"scope": "all", "limit": 2, "offset": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual([row["batch_number"] for row in response.data["results"]], ["EE-SOON", "GENERAL"])
+        report_queries = [sql for sql, _ in recorder.queries if "UNION ALL" in sql]
+        self.assertEqual(len(report_queries), 2)  # page + count
+        self.assertEqual(len([sql for sql, _ in recorder.queries if "inventory_batches" in sql]), 2)
+        self.assertEqual(self.client.get(self.url, {"limit": "x"}).status_code, 400)
+
+    def test_full_report_supports_sparse_fields(self):
+        data = self._report(days=30, fields="batch_number,days_to_expiry")
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(set(data["results"][0]), {"batch_number", "days_to_expiry"})
+
+
+class ProductImageScanTests(APITestCase):
+    """AI product scan through the shared gateway (FakeGateway in tests)."""
+
+    url = "/api/v1/inventory/products/ai-extract/"
+
+    def setUp(self):
+        cache.clear()
+        ai.reset_gateway()
+        self.addCleanup(ai.reset_gateway)
+        ai.get_gateway().responses["product_scan"] = json.dumps({
+            "name": "Amoxicilline 500mg", "dosage_form": "capsule", "pack_size": "12",
+            "expiration_date": "2027-03-31", "lot_number": "LOT42",
+        })
+        self.client.force_authenticate(_user(_org("ai1"), "ai1", role="cashier"))
+
+    def test_rescan_served_from_cache(self):
+        image = base64.b64encode(b"photo of the box").decode()
+        response = self.client.post(self.url, {"image_base64": image}, format="json")
+        self.assertEqual(response.status_code, 200)
+        extracted = response.data["extracted"]
+        self.assertEqual((extracted["name"], extracted["pack_size"], extracted["batch_number"]),
+                         ("Amoxicilline 500mg", 12, "LOT42"))
+        self.assertFalse(response.data["cached"])
+
+        response = self.client.post(self.url, {"image_base64": f"data:image/jpeg;base64,{image}"}, format="json")
+        self.assertTrue(response.data["cached"])
+        self.assertEqual(len(ai.get_gateway().calls), 1)
+
+    def test_errors(self):
+        self.assertEqual(self.client.post(self.url, {"image_base64": "%%%"}, format="json").status_code, 400)
+        ai.get_gateway().responses["product_scan"] = ai.AIError("Requête IA refusée", 400, "bad image")
+        response = self.client.post(self.url, {"image_base64": "cGhvdG8="}, format="json")
+        self.assertEqual((response.status_code, response.data["provider_status"]), (502, 400))
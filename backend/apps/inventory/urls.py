@@ -8,6 +8,7 @@ app_name = 'inventory'
 urlpatterns = [
     # Products
     path('products/', views.ProductListCreateAPIView.as_view(), name='product_list_create'),
+    path('products/lookup/', views.product_lookup_view, name='product_lookup'),
     path('products/<uuid:pk>/', views.ProductDetailAPIView.as_view(), name='product_detail'),
     
     # Bulk Import
@@ -1,25 +1,30 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Exists, OuterRef
+from django.db.models import Q, Sum
 from django.utils import timezone
 from datetime import timedelta
-from decouple import config
-import requests
+import binascii
 import json
 import re
+from base64 import b64decode
 from datetime import datetime
 from .models import (
     Product, InventoryItem, InventoryBatch, StockMovement, InventoryAlert,
-    ProductCategory, DosageForm, UnitOfMeasure
+    ProductCategory, DosageForm, UnitOfMeasure, PRODUCT_SEARCH
 )
 from .serializers import (
     ProductSerializer, InventoryItemSerializer, InventoryBatchSerializer,
     StockMovementSerializer, InventoryAlertSerializer
 )
 from apps.audit.decorators import audit_inventory_change, audit_critical_action
+from apps.core.ai import AIError, Blob, TransientAIError, get_gateway, register_operation
+from apps.core.cache import cached_response, CHOICES_CACHE_TIMEOUT
+from apps.core.fieldsets import SparseFieldsetsMixin
+from apps.core.pagination import OptionalKeysetPagination
+from apps.core.search import DocumentSearchFilter
+from . import expiry, lookup
 
 
 AUTO_ALERT_PREFIX = 'AUTO:'
@@ -128,12 +133,12 @@ def _sync_auto_inventory_alerts_for_organization(organization):
             alert.save(update_fields=['is_active', 'resolved_at'])
 
 
-class ProductListCreateAPIView(generics.ListCreateAPIView):
+class ProductListCreateAPIView(SparseFieldsetsMixin, generics.ListCreateAPIView):
     queryset = Product.objects.select_related('organization', 'primary_supplier', 'created_by', 'updated_by')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, DocumentSearchFilter]
     filterset_fields = ['category', 'is_active', 'requires_prescription']
-    search_fields = ['name', 'sku', 'barcode', 'generic_name']
+    search_document = PRODUCT_SEARCH
     ordering = ['name']
 
     def get_queryset(self):
@@ -154,7 +159,7 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
         serializer.save(updated_by=self.request.user)
 
 
-class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailAPIView(SparseFieldsetsMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.select_related('organization', 'primary_supplier', 'created_by', 'updated_by')
     serializer_class = ProductSerializer
 
@@ -187,7 +192,24 @@ class ProductDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         instance.save()
 
 
-class InventoryItemListAPIView(generics.ListCreateAPIView):
+@api_view(['GET'])
+def product_lookup_view(request):
+    """
+    POS typeahead: products whose name, a word of the name, SKU or barcode
+    starts with ``?q=``, served from the in-memory index (apps.inventory.lookup).
+    """
+    organization_id = getattr(request.user, 'organization_id', None)
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', lookup.DEFAULT_LIMIT)), 1), lookup.MAX_LIMIT)
+    except ValueError:
+        limit = lookup.DEFAULT_LIMIT
+    if organization_id is None:
+        return Response([])
+    return Response([entry.as_dict() for entry in lookup.lookup(organization_id, query, limit)])
+
+
+class InventoryItemListAPIView(SparseFieldsetsMixin, generics.ListCreateAPIView):
     queryset = InventoryItem.objects.select_related('product', 'organization').order_by('-last_movement', 'id')
     serializer_class = InventoryItemSerializer
     filter_backends = [DjangoFilterBackend]
@@ -205,7 +227,7 @@ class InventoryItemListAPIView(generics.ListCreateAPIView):
         serializer.save(organization=self.request.user.organization)
 
 
-class InventoryItemDetailAPIView(generics.RetrieveUpdateAPIView):
+class InventoryItemDetailAPIView(SparseFieldsetsMixin, generics.RetrieveUpdateAPIView):
     queryset = InventoryItem.objects.select_related('product', 'organization').order_by('id')
     serializer_class = InventoryItemSerializer
 
@@ -256,6 +278,7 @@ class StockMovementListAPIView(generics.ListCreateAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['movement_type', 'direction', 'inventory_item']
     ordering = ['-movement_date']
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -332,9 +355,20 @@ class InventoryAlertDetailAPIView(generics.RetrieveUpdateAPIView):
         return queryset
 
 
+EXPIRING_MAX_PAGE_SIZE = 500
+
+
 @api_view(['GET'])
 @audit_inventory_change(description="Consultation produits expirant")
 def expiring_products_view(request):
+    """
+    Batches (and products without dated batches) expiring within ``?days=``,
+    already expired (``?scope=expired``) or all of them (``?scope=all``),
+    soonest first — one indexed query (apps.inventory.expiry).
+
+    With ``?limit=`` (and ``?offset=``) one page is returned; otherwise the
+    whole report.
+    """
     days = request.GET.get('days', 30)
     try:
         days = int(days)
@@ -345,114 +379,28 @@ def expiring_products_view(request):
     today = timezone.now().date()
     cutoff_date = today + timedelta(days=days)
 
-    batches = InventoryBatch.objects.filter(
-        status='AVAILABLE',
-        expiry_date__isnull=False,
-        current_quantity__gt=0,
-    ).select_related('inventory_item__product')
-
     user = getattr(request, 'user', None)
     organization = getattr(user, 'organization', None)
-    if organization is not None:
-        batches = batches.filter(inventory_item__organization=organization)
-
-    batch_results = []
-    for batch in batches:
-        product_expiry = getattr(batch.inventory_item.product, 'expiration_date', None)
-        batch_expiry = batch.expiry_date
-        effective_expiry = min([d for d in [batch_expiry, product_expiry] if d], default=None)
-        if not effective_expiry:
-            continue
-
-        if scope == 'expired' and not (effective_expiry < today):
-            continue
-        if scope not in ['all', 'expired'] and not (effective_expiry <= cutoff_date):
-            continue
-
-        batch_results.append({
-            'id': str(batch.id),
-            'inventory_item': str(batch.inventory_item_id),
-            'product_name': batch.inventory_item.product.name,
-            'product_sku': batch.inventory_item.product.sku,
-            'batch_number': batch.batch_number,
-            'serial_number': batch.serial_number,
-            'manufacture_date': batch.manufacture_date,
-            'expiry_date': effective_expiry,
-            'product_expiration_date': product_expiry,
-            'batch_expiry_date': batch_expiry,
-            'received_date': batch.received_date,
-            'supplier': str(batch.supplier_id) if batch.supplier_id else None,
-            'supplier_name': getattr(batch.supplier, 'name', None) if batch.supplier_id else None,
-            'purchase_order_id': batch.purchase_order_id,
-            'initial_quantity': int(batch.initial_quantity or 0),
-            'current_quantity': int(batch.current_quantity or 0),
-            'reserved_quantity': int(batch.reserved_quantity or 0),
-            'unit_cost': str(batch.unit_cost or 0),
-            'status': batch.status,
-            'quality_checked': bool(batch.quality_checked),
-            'quality_notes': batch.quality_notes,
-            'is_expired': bool(effective_expiry < today),
-            'days_to_expiry': (effective_expiry - today).days,
-            'created_at': batch.created_at,
-            'updated_at': batch.updated_at,
-        })
-
-    fallback_items = InventoryItem.objects.select_related('product').filter(
-        quantity_on_hand__gt=0,
-        product__is_active=True,
-        product__expiration_date__isnull=False,
-    )
-
-    if organization is not None:
-        fallback_items = fallback_items.filter(organization=organization)
-
-    fallback_items = fallback_items.annotate(
-        has_expiry_batches=Exists(
-            InventoryBatch.objects.filter(
-                inventory_item=OuterRef('pk'),
-                expiry_date__isnull=False,
-                current_quantity__gt=0,
-            )
-        )
-    ).filter(has_expiry_batches=False)
-
-    if scope == 'expired':
-        fallback_items = fallback_items.filter(product__expiration_date__lt=today)
-    elif scope != 'all':
-        fallback_items = fallback_items.filter(product__expiration_date__lte=cutoff_date)
-
-    fallback_results = [
-        {
-            'id': f'product-{item.product_id}',
-            'inventory_item': str(item.id),
-            'product_name': item.product.name,
-            'product_sku': item.product.sku,
-            'batch_number': 'GENERAL',
-            'serial_number': '',
-            'manufacture_date': None,
-            'expiry_date': item.product.expiration_date,
-            'received_date': None,
-            'supplier': None,
-            'supplier_name': None,
-            'purchase_order_id': '',
-            'initial_quantity': int(item.quantity_on_hand or 0),
-            'current_quantity': int(item.quantity_on_hand or 0),
-            'reserved_quantity': int(item.quantity_reserved or 0),
-            'unit_cost': str(item.average_cost or 0),
-            'status': 'AVAILABLE',
-            'quality_checked': False,
-            'quality_notes': '',
-            'is_expired': bool(item.product.expiration_date and item.product.expiration_date < today),
-            'days_to_expiry': (item.product.expiration_date - today).days if item.product.expiration_date else None,
-            'created_at': None,
-            'updated_at': None,
-        }
-        for item in fallback_items
-    ]
+    rows = expiry.expiring_rows(organization, scope, today, cutoff_date)
 
-    results = batch_results + fallback_results
-    results.sort(key=lambda row: row.get('expiry_date') or '9999-12-31')
+    if 'limit' in request.GET:
+        try:
+            limit = min(max(int(request.GET['limit']), 1), EXPIRING_MAX_PAGE_SIZE)
+            offset = max(int(request.GET.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'detail': 'limit et offset doivent être des entiers.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'count': rows.count(),
+            'days': days,
+            'scope': scope,
+            'limit': limit,
+            'offset': offset,
+            'results': [expiry.format_row(row, today) for row in rows[offset:offset + limit]],
+        })
 
+    # Rendered by the regular renderer, so ?fields=/?columnar= and response
+    # compression apply, and errors surface as a proper error response.
+    results = [expiry.format_row(row, today) for row in rows.iterator(chunk_size=2000)]
     return Response({
         'count': len(results),
         'days': days,
@@ -579,6 +527,11 @@ def _normalize_date_string(date_value):
     return ''
 
 
+PRODUCT_SCAN = register_operation('product_scan')
+# Seconds a scan may take, retries included: the user waits at the counter.
+PRODUCT_SCAN_BUDGET = 30
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def ai_extract_product_from_image_view(request):
@@ -587,10 +540,12 @@ def ai_extract_product_from_image_view(request):
 
     if not image_base64 or not isinstance(image_base64, str):
         return Response({'detail': 'image_base64 is required'}, status=status.HTTP_400_BAD_REQUEST)
-
-    gemini_api_key = getattr(settings, 'GEMINI_API_KEY', None) or config('GEMINI_API_KEY', default='')
-    if not gemini_api_key:
-        return Response({'detail': 'GEMINI_API_KEY is not configured on server'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if image_base64.startswith('data:') and ',' in image_base64:
+        image_base64 = image_base64.split(',', 1)[1]
+    try:
+        image = b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        return Response({'detail': 'image_base64 is not valid base64'}, status=status.HTTP_400_BAD_REQUEST)
 
     prompt = (
         "Analyze this product package image and extract product details for a pharmacy inventory form. "
@@ -605,43 +560,19 @@ def ai_extract_product_from_image_view(request):
     )
 
     try:
-        gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={gemini_api_key}"
-        gemini_payload = {
-            'contents': [
-                {
-                    'parts': [
-                        {'text': prompt},
-                        {'inline_data': {'mime_type': mime_type, 'data': image_base64}},
-                    ]
-                }
-            ],
-            'generationConfig': {
+        # Same photo, same answer: the gateway serves re-scans from its cache.
+        result = get_gateway().generate(
+            PRODUCT_SCAN,
+            [prompt, Blob(mime_type, data=image)],
+            model='gemini-1.5-flash',
+            config={
                 'temperature': 0.1,
                 'maxOutputTokens': 512,
                 'responseMimeType': 'application/json',
-            }
-        }
-
-        response = requests.post(gemini_url, json=gemini_payload, timeout=30)
-        if response.status_code >= 400:
-            return Response(
-                {
-                    'detail': 'Gemini request failed',
-                    'provider_status': response.status_code,
-                    'provider_body': response.text[:500],
-                },
-                status=status.HTTP_502_BAD_GATEWAY
-            )
-
-        body = response.json()
-        generated_text = ''
-        candidates = body.get('candidates') or []
-        if candidates:
-            parts = ((candidates[0].get('content') or {}).get('parts') or [])
-            if parts:
-                generated_text = parts[0].get('text') or ''
-
-        extracted = _extract_json_from_gemini_text(generated_text)
+            },
+            budget=PRODUCT_SCAN_BUDGET,
+        )
+        extracted = _extract_json_from_gemini_text(result.text)
 
         normalized = {
             'name': extracted.get('name') or '',
@@ -684,15 +615,27 @@ def ai_extract_product_from_image_view(request):
         except Exception:
             normalized['pack_size'] = 1
 
-        return Response({'extracted': normalized, 'raw': extracted})
-    except requests.RequestException as exc:
-        return Response({'detail': f'Gemini network error: {exc}'}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response({'extracted': normalized, 'raw': extracted, 'cached': result.cached})
+    except TransientAIError as exc:
+        return Response({'detail': f'Gemini network error: {exc.detail}'}, status=status.HTTP_502_BAD_GATEWAY)
+    except AIError as exc:
+        if exc.status == 503:
+            return Response({'detail': exc.detail}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(
+            {
+                'detail': 'Gemini request failed',
+                'provider_status': exc.status,
+                'provider_body': exc.body,
+            },
+            status=status.HTTP_502_BAD_GATEWAY
+        )
     except Exception as exc:
         return Response({'detail': f'Unexpected scan error: {exc}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def product_category_choices_view(request):
     """Get product category choices"""
     from .models import ProductCategory
@@ -705,6 +648,7 @@ def product_category_choices_view(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def dosage_form_choices_view(request):
     """Get dosage form choices"""
     from .models import DosageForm
@@ -717,6 +661,7 @@ def dosage_form_choices_view(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def unit_of_measure_choices_view(request):
     """Get unit of measure choices"""
     from .models import UnitOfMeasure
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class LicensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.licenses'
-    verbose_name = 'Licenses'
\ No newline at end of file
+    verbose_name = 'Licenses'
+
+    def ready(self):
+        import apps.licenses.signals
@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.core.cache import invalidate
+from apps.organizations.models import Organization
+from .models import License
+from .views import LICENSE_LISTS_CACHE, LICENSE_VALIDATION_CACHE
+
+
+@receiver(post_save, sender=License)
+@receiver(post_delete, sender=License)
+@receiver(post_save, sender=Organization)
+def invalidate_license_caches(sender, **kwargs):
+    """License lists and validation results embed license and organization data"""
+    invalidate(LICENSE_LISTS_CACHE)
+    invalidate(LICENSE_VALIDATION_CACHE)
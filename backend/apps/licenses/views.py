@@ -1,8 +1,11 @@
+import hashlib
+
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
+from django.core.cache import cache
 from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
@@ -13,6 +16,16 @@ from .serializers import (
     LicenseTypeChoicesSerializer, LicenseStatusChoicesSerializer,
     ExpiringLicensesSerializer
 )
+from apps.core.cache import cached_response, get_versions, CHOICES_CACHE_TIMEOUT
+
+# Cache namespaces, invalidated by signals on License/Organization changes
+LICENSE_LISTS_CACHE = 'license_lists'
+LICENSE_VALIDATION_CACHE = 'license_validation'
+LICENSE_VALIDATION_TIMEOUT = 300
+
+
+def _today(request):
+    return timezone.now().date().isoformat()
 
 
 class LicenseFilter(filters.FilterSet):
@@ -127,6 +140,7 @@ class LicenseRenewalDetailAPIView(generics.RetrieveAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def license_type_choices_view(request):
     """Get license type choices"""
     choices = [
@@ -138,6 +152,7 @@ def license_type_choices_view(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def license_status_choices_view(request):
     """Get license status choices"""
     choices = [
@@ -148,6 +163,7 @@ def license_status_choices_view(request):
 
 
 @api_view(['GET'])
+@cached_response(LICENSE_LISTS_CACHE, vary_on=_today)
 def expiring_licenses_view(request):
     """Get licenses expiring soon"""
     days = request.GET.get('days', 30)
@@ -191,6 +207,7 @@ def expiring_licenses_view(request):
 
 
 @api_view(['GET'])
+@cached_response(LICENSE_LISTS_CACHE, vary_on=_today)
 def expired_licenses_view(request):
     """Get expired licenses"""
     today = timezone.now().date()
@@ -312,6 +329,22 @@ def validate_license(request):
             'errors': ['License key is required']
         }, status=status.HTTP_400_BAD_REQUEST)
     
+    # Devices re-validate on every launch: serve repeated checks from cache
+    version = get_versions(LICENSE_VALIDATION_CACHE)[0]
+    key_digest = hashlib.md5(license_key.encode('utf-8'), usedforsecurity=False).hexdigest()
+    cache_key = f'{LICENSE_VALIDATION_CACHE}:v{version}:{_today(request)}:{key_digest}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        data, status_code = cached
+        return Response(data, status=status_code)
+    
+    response = _validate_license_key(license_key)
+    cache.set(cache_key, (response.data, response.status_code), LICENSE_VALIDATION_TIMEOUT)
+    return response
+
+
+def _validate_license_key(license_key):
+    """Validation result of a license key (uncached)"""
     errors = []
     
     try:
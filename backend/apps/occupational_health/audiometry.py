@@ -0,0 +1,320 @@
+"""
+Audiometry analytics at population scale (NumPy).
+
+``load`` reads the audiograms of a queryset (one query) into arrays of shape
+``(tests, 2 ears, 7 frequencies)``; ``analyze`` then computes, for every test
+at once:
+
+* the **standard threshold shift** (STS, OSHA 29 CFR 1910.95(g)(10)): the
+  change of the 2, 3 and 4 kHz average against the worker's baseline (first
+  audiogram with these thresholds in both ears), less the presbycusis
+  expected between the two ages (Appendix F, tables F-1/F-2).  10 dB or more
+  in an ear is an STS; it is *recordable* (29 CFR 1904.10) when that ear's
+  2-3-4 kHz average is also 25 dB HL or more;
+* the **noise notch** (Coles et al., 2000): a threshold at 3, 4 or 6 kHz at
+  least 10 dB worse than at 1 or 2 kHz and than at a higher frequency (6 or
+  8 kHz), stored as ``noise_induced_probable``;
+* the **percent hearing impairment** (AAO-HNS 1979): 1.5 % per dB of the
+  0.5-1-2-3 kHz average above 25 dB HL per ear, binaural
+  ``(5 × better ear + worse ear) / 6``;
+* the **classification** of the better ear's 0.5-1-2-4 kHz average (WHO
+  grades, the ``hearing_loss_classification`` choices).
+
+``write_back`` stores the changed results with ``bulk_update``;
+``cohort_summary`` groups the latest test of each worker by work site and
+job category.  Audiograms saved through the API are analyzed with the other
+tests of their worker after the commit (``signals.py``); run
+``python manage.py analyze_audiometry`` after imports.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AudiometryResult, JOB_CATEGORIES, WorkSite
+
+FREQUENCIES = (500, 1000, 2000, 3000, 4000, 6000, 8000)
+EARS = ('right', 'left')
+THRESHOLD_COLUMNS = [f'{ear}_ear_{frequency}hz' for ear in EARS for frequency in FREQUENCIES]
+
+# Indexes in FREQUENCIES
+STS_FREQUENCIES = [2, 3, 4]          # 2, 3, 4 kHz
+IMPAIRMENT_FREQUENCIES = [0, 1, 2, 3]  # 0.5, 1, 2, 3 kHz
+GRADE_FREQUENCIES = [0, 1, 2, 4]     # 0.5, 1, 2, 4 kHz
+
+STS_DB = 10
+RECORDABLE_DB = 25
+NOTCH_DB = 10
+IMPAIRMENT_LOW_FENCE = 25
+IMPAIRMENT_PER_DB = 1.5
+
+# Upper bounds (dB HL) of the hearing_loss_classification grades.
+GRADES = ('normal', 'mild', 'moderate', 'severe', 'profound')
+GRADE_LIMITS = (25, 40, 60, 80)
+
+# OSHA 29 CFR 1910.95 Appendix F: presbycusis (dB) at 2, 3 and 4 kHz by age,
+# from 20 (or younger) to 60 (or older).
+PRESBYCUSIS_AGES = (20, 60)
+PRESBYCUSIS_MALE = np.array([
+    [3, 4, 5], [3, 4, 5], [3, 4, 5], [3, 4, 6], [3, 5, 6], [3, 5, 7], [4, 5, 7], [4, 6, 7],
+    [4, 6, 8], [4, 6, 8], [4, 6, 9], [4, 7, 9], [5, 7, 10], [5, 7, 10], [5, 8, 11], [5, 8, 11],
+    [5, 9, 12], [6, 9, 12], [6, 9, 13], [6, 10, 14], [6, 10, 14], [6, 10, 14], [7, 11, 16],
+    [7, 12, 16], [7, 12, 17], [7, 13, 18], [8, 13, 19], [8, 14, 19], [8, 14, 20], [9, 15, 21],
+    [9, 16, 22], [9, 16, 23], [10, 17, 24], [10, 18, 25], [10, 18, 26], [11, 19, 27],
+    [11, 20, 28], [11, 21, 29], [12, 22, 31], [12, 22, 32], [13, 23, 33],
+], dtype=float)
+PRESBYCUSIS_FEMALE = np.array([
+    [4, 3, 3], [4, 4, 4], [4, 4, 4], [5, 4, 4], [5, 4, 4], [5, 4, 4], [5, 5, 4], [5, 5, 5],
+    [5, 5, 5], [5, 5, 5], [6, 5, 5], [6, 6, 5], [6, 6, 6], [6, 6, 6], [6, 6, 6], [6, 7, 7],
+    [7, 7, 7], [7, 7, 7], [7, 7, 7], [7, 8, 8], [7, 8, 8], [8, 8, 8], [8, 9, 9], [8, 9, 9],
+    [8, 9, 9], [8, 10, 10], [9, 10, 10], [9, 10, 11], [9, 11, 11], [9, 11, 11], [10, 11, 12],
+    [10, 12, 12], [10, 12, 13], [10, 13, 13], [11, 13, 14], [11, 14, 14], [11, 14, 15],
+    [11, 15, 15], [12, 15, 16], [12, 16, 16], [12, 16, 17],
+], dtype=float)
+
+# Fields written by write_back.
+RESULT_FIELDS = [
+    'is_baseline', 'sts_right_db', 'sts_left_db', 'standard_threshold_shift',
+    'recordable_hearing_loss', 'hearing_impairment_percent', 'noise_induced_probable',
+    'hearing_loss_classification',
+]
+
+
+@dataclass
+class Audiograms:
+    """Audiograms sorted by worker and date, one row per test."""
+    ids: np.ndarray            # AudiometryResult pks
+    workers: np.ndarray        # worker code (0..number of workers - 1)
+    worker_ids: np.ndarray     # Worker pk of each code
+    ages: np.ndarray           # whole years at the test
+    female: np.ndarray
+    sites: np.ndarray          # WorkSite pk or None
+    job_categories: np.ndarray
+    thresholds: np.ndarray     # (tests, ears, FREQUENCIES), NaN when not measured
+    stored: dict               # RESULT_FIELDS as stored, for write_back
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load(queryset):
+    """Audiograms of ``queryset`` (AudiometryResult) as arrays, in one query."""
+    rows = list(queryset.order_by(
+        'examination__worker_id', 'examination__exam_date', 'test_date', 'pk',
+    ).values_list(
+        'pk', 'examination__worker_id', 'examination__exam_date',
+        'examination__worker__date_of_birth', 'examination__worker__gender',
+        'examination__worker__work_site_id', 'examination__worker__job_category',
+        *RESULT_FIELDS, *THRESHOLD_COLUMNS,
+    ))
+    columns = list(zip(*rows)) if rows else [()] * (7 + len(RESULT_FIELDS) + len(THRESHOLD_COLUMNS))
+    pks, worker_ids, exam_dates, births, genders, sites, job_categories = columns[:7]
+    stored = dict(zip(RESULT_FIELDS, (list(column) for column in columns[7:7 + len(RESULT_FIELDS)])))
+
+    worker_ids, workers = np.unique(np.array(worker_ids, dtype=object), return_inverse=True)
+    # Exam dates and birth dates as day numbers: whole years of age at the test.
+    exam_days = np.array(exam_dates, dtype='datetime64[D]').astype(np.int64)
+    birth_days = np.array(births, dtype='datetime64[D]').astype(np.int64)
+    thresholds = np.array(columns[7 + len(RESULT_FIELDS):], dtype=float).T.reshape(len(rows), len(EARS), len(FREQUENCIES))
+    return Audiograms(
+        ids=np.array(pks, dtype=object),
+        workers=workers.reshape(-1),
+        worker_ids=worker_ids,
+        ages=np.floor((exam_days - birth_days) / 365.25).astype(int),
+        female=np.array(genders, dtype=object) == 'female',
+        sites=np.array(sites, dtype=object),
+        job_categories=np.array(job_categories, dtype=object),
+        thresholds=thresholds,
+        stored=stored,
+    )
+
+
+@dataclass
+class Analysis:
+    audiograms: Audiograms
+    baseline: np.ndarray       # row of the worker's baseline, -1 without one
+    is_baseline: np.ndarray
+    sts_db: np.ndarray         # (tests, ears) age-corrected shift, NaN without baseline
+    sts: np.ndarray
+    recordable: np.ndarray
+    notch: np.ndarray
+    impairment: np.ndarray     # binaural %, NaN when a frequency is missing
+    grades: np.ndarray         # hearing_loss_classification, '' when not gradable
+    measured: np.ndarray       # at least one threshold
+
+
+def presbycusis(ages, female):
+    """Expected presbycusis (dB) at 2, 3, 4 kHz, shape ``(tests, 3)``."""
+    rows = np.clip(ages, *PRESBYCUSIS_AGES) - PRESBYCUSIS_AGES[0]
+    return np.where(female[:, None], PRESBYCUSIS_FEMALE[rows], PRESBYCUSIS_MALE[rows])
+
+
+def baselines(audiograms):
+    """Row of each test's baseline: the first test of its worker with 2-4 kHz in both ears."""
+    complete = ~np.isnan(audiograms.thresholds[:, :, STS_FREQUENCIES]).any(axis=(1, 2))
+    candidates = np.flatnonzero(complete)
+    first = np.full(len(audiograms.worker_ids), -1)
+    # Rows are sorted by worker then date: the first candidate of a worker is its baseline.
+    codes, positions = np.unique(audiograms.workers[candidates], return_index=True)
+    first[codes] = candidates[positions]
+    return first[audiograms.workers] if len(audiograms) else np.array([], dtype=int)
+
+
+def notches(thresholds):
+    """Noise notch per test and ear."""
+    low = np.fmin(thresholds[..., 1], thresholds[..., 2])  # 1 or 2 kHz
+    high = np.fmin(thresholds[..., 5], thresholds[..., 6])  # 6 or 8 kHz
+    notch = np.zeros(thresholds.shape[:2], dtype=bool)
+    for index, above in ((3, high), (4, high), (5, thresholds[..., 6])):
+        threshold = thresholds[..., index]
+        notch |= (threshold - low >= NOTCH_DB) & (threshold - above >= NOTCH_DB)
+    return notch
+
+
+def impairment(thresholds):
+    """Binaural percent hearing impairment per test."""
+    average = thresholds[:, :, IMPAIRMENT_FREQUENCIES].mean(axis=2)
+    monaural = np.clip(IMPAIRMENT_PER_DB * (average - IMPAIRMENT_LOW_FENCE), 0, 100)
+    better, worse = monaural.min(axis=1), monaural.max(axis=1)
+    return (5 * better + worse) / 6
+
+
+def grades(thresholds):
+    """``hearing_loss_classification`` of the better ear."""
+    better = np.fmin(*np.moveaxis(thresholds[:, :, GRADE_FREQUENCIES].mean(axis=2), 1, 0))
+    graded = np.array(GRADES, dtype=object)[np.digitize(np.nan_to_num(better), GRADE_LIMITS, right=True)]
+    graded[np.isnan(better)] = ''
+    return graded
+
+
+def analyze(audiograms):
+    thresholds = audiograms.thresholds
+    baseline = baselines(audiograms)
+    has_baseline = baseline >= 0
+    reference = np.where(has_baseline, baseline, np.arange(len(audiograms)))
+
+    shift = thresholds[:, :, STS_FREQUENCIES] - thresholds[reference][:, :, STS_FREQUENCIES]
+    aging = presbycusis(audiograms.ages, audiograms.female) - presbycusis(audiograms.ages[reference], audiograms.female)
+    sts_db = (shift - aging[:, None, :]).mean(axis=2)
+    is_baseline = has_baseline & (baseline == np.arange(len(audiograms)))
+    sts_db[~has_baseline | is_baseline] = np.nan
+
+    with np.errstate(invalid='ignore'):
+        ear_sts = sts_db >= STS_DB
+        recordable = ear_sts & (thresholds[:, :, STS_FREQUENCIES].mean(axis=2) >= RECORDABLE_DB)
+    return Analysis(
+        audiograms=audiograms,
+        baseline=baseline,
+        is_baseline=is_baseline,
+        sts_db=sts_db,
+        sts=ear_sts.any(axis=1),
+        recordable=recordable.any(axis=1),
+        notch=notches(thresholds).any(axis=1),
+        impairment=impairment(thresholds),
+        grades=grades(thresholds),
+        measured=~np.isnan(thresholds).all(axis=(1, 2)),
+    )
+
+
+def _decimal(value):
+    return None if np.isnan(value) else Decimal(f'{value:.1f}')
+
+
+def results(analysis, index):
+    """RESULT_FIELDS values of a test; tests without thresholds keep their manual interpretation."""
+    stored = analysis.audiograms.stored
+    measured = analysis.measured[index]
+    return {
+        'is_baseline': bool(analysis.is_baseline[index]),
+        'sts_right_db': _decimal(analysis.sts_db[index, 0]),
+        'sts_left_db': _decimal(analysis.sts_db[index, 1]),
+        'standard_threshold_shift': bool(analysis.sts[index]),
+        'recordable_hearing_loss': bool(analysis.recordable[index]),
+        'hearing_impairment_percent': _decimal(analysis.impairment[index]),
+        'noise_induced_probable': bool(analysis.notch[index]) if measured else stored['noise_induced_probable'][index],
+        'hearing_loss_classification': analysis.grades[index] or stored['hearing_loss_classification'][index],
+    }
+
+
+def write_back(analysis, batch_size=2000):
+    """Store the results that changed (``bulk_update``); returns the number of tests updated."""
+    audiograms = analysis.audiograms
+    now = timezone.now()
+    changed = []
+    for index in range(len(audiograms)):
+        values = results(analysis, index)
+        if any(audiograms.stored[field][index] != value for field, value in values.items()):
+            changed.append(AudiometryResult(pk=audiograms.ids[index], analyzed_at=now, **values))
+    with transaction.atomic():
+        AudiometryResult.objects.bulk_update(changed, [*RESULT_FIELDS, 'analyzed_at'], batch_size=batch_size)
+    return len(changed)
+
+
+def analyze_queryset(queryset, write=True):
+    """Load, analyze and (unless ``write`` is false) store; returns ``(analysis, updated)``."""
+    analysis = analyze(load(queryset))
+    return analysis, (write_back(analysis) if write else 0)
+
+
+def analyze_worker(worker_id):
+    """Analyze and store the audiograms of one worker (STS depends on its baseline)."""
+    return analyze_queryset(AudiometryResult.objects.filter(examination__worker_id=worker_id))
+
+
+def cohort_summary(analysis):
+    """
+    Latest test of each worker grouped by work site and job category: number
+    of workers, STS, recordable and notch counts, mean impairment, grades.
+    """
+    audiograms = analysis.audiograms
+    if not len(audiograms):
+        return []
+    # Rows are sorted by worker then date: the last row of a worker is its latest test.
+    latest = np.flatnonzero(np.r_[audiograms.workers[1:] != audiograms.workers[:-1], True])
+
+    # Group code: work site code × job category code.
+    sites = list(dict.fromkeys(audiograms.sites[latest]))
+    jobs = list(dict.fromkeys(audiograms.job_categories[latest]))
+    site_codes = np.array([sites.index(site) for site in audiograms.sites[latest]])
+    job_codes = np.array([jobs.index(job) for job in audiograms.job_categories[latest]])
+    groups, group_of = np.unique(site_codes * len(jobs) + job_codes, return_inverse=True)
+    count = len(groups)
+
+    def total(values):
+        return np.bincount(group_of, weights=values.astype(float), minlength=count)
+
+    impairment_values = analysis.impairment[latest]
+    impairment_measured = ~np.isnan(impairment_values)
+    workers = np.bincount(group_of, minlength=count)
+    sts = total(analysis.sts[latest])
+    recordable = total(analysis.recordable[latest])
+    notch = total(analysis.notch[latest])
+    impairment_sum = total(np.nan_to_num(impairment_values))
+    impairment_count = total(impairment_measured)
+    grade_counts = {grade: total(analysis.grades[latest] == grade) for grade in GRADES}
+
+    site_names = dict(WorkSite.objects.filter(
+        pk__in=[site for site in sites if site is not None],
+    ).values_list('pk', 'name'))
+    job_names = dict(JOB_CATEGORIES)
+    summary = []
+    for index, group in enumerate(groups):
+        site, job_category = sites[group // len(jobs)], jobs[group % len(jobs)]
+        summary.append({
+            'work_site': site,
+            'work_site_name': site_names.get(site, ''),
+            'job_category': job_category,
+            'job_category_display': str(job_names.get(job_category, job_category)),
+            'workers': int(workers[index]),
+            'sts': int(sts[index]),
+            'sts_rate': round(float(sts[index] / workers[index] * 100), 1),
+            'recordable': int(recordable[index]),
+            'noise_notch': int(notch[index]),
+            'mean_impairment_percent': (
+                round(float(impairment_sum[index] / impairment_count[index]), 1) if impairment_count[index] else None
+            ),
+            'classification': {grade: int(grade_counts[grade][index]) for grade in GRADES},
+        })
+    return summary
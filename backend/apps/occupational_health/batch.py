@@ -0,0 +1,152 @@
+"""
+Batched writes for field clinics.
+
+A clinic visit (examination, vital signs, physical exam, audiometry,
+spirometry, vision test, fitness certificate) used to be ten or more
+requests over a poor connection.  ``POST .../occupational-health/batch/``
+takes them as one ordered list::
+
+    {"operations": [
+        {"op": "create", "resource": "examinations", "temp_id": "exam",
+         "data": {"worker": 12, "exam_type": "periodic", "exam_date": "2026-10-19"}},
+        {"op": "create", "resource": "vital-signs", "data": {"examination": "$exam", ...}},
+        {"op": "update", "resource": "fitness-certificates", "id": 7, "data": {...}},
+        {"op": "delete", "resource": "vision-test-results", "id": 3}
+    ]}
+
+Each operation goes through the viewset of its resource — same serializer,
+same ``perform_create``/``perform_update``/``perform_destroy`` hooks, same
+permissions — as if it had been sent alone (updates are partial, like
+PATCH).  ``"$<temp_id>"`` values, anywhere in ``data`` or as ``id``, are
+replaced by the primary key created by an earlier operation.
+
+All operations run in one transaction: the first failing operation rolls
+everything back and its error is returned with its index.
+"""
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import Http404
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.views import exception_handler
+
+MAX_OPERATIONS = 100
+TEMP_ID_PREFIX = '$'
+
+# Batch operation → viewset action.
+OPERATIONS = {'create': 'create', 'update': 'partial_update', 'delete': 'destroy'}
+
+
+def get_resources():
+    """Resources accepted by the batch endpoint, named as in the router."""
+    from . import views
+
+    return {
+        'examinations': views.MedicalExaminationViewSet,
+        'vital-signs': views.VitalSignsViewSet,
+        'physical-examinations': views.PhysicalExaminationViewSet,
+        'audiometry-results': views.AudiometryResultViewSet,
+        'spirometry-results': views.SpirometryResultViewSet,
+        'vision-test-results': views.VisionTestResultViewSet,
+        'fitness-certificates': views.FitnessCertificateViewSet,
+    }
+
+
+class _OperationRequest:
+    """The batch request, seen by a viewset as if it only carried ``data``."""
+
+    def __init__(self, request, data):
+        self._batch_request = request
+        self.data = data
+
+    def __getattr__(self, name):
+        return getattr(self._batch_request, name)
+
+
+class _OperationFailed(Exception):
+    def __init__(self, index, response):
+        self.index = index
+        self.response = response
+
+
+def resolve_temp_ids(value, ids):
+    """Replace ``"$<temp_id>"`` references to created objects by their pk."""
+    if isinstance(value, dict):
+        return {key: resolve_temp_ids(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_temp_ids(item, ids) for item in value]
+    if isinstance(value, str) and value.startswith(TEMP_ID_PREFIX) and value[1:] in ids:
+        return ids[value[1:]]
+    return value
+
+
+def _run(request, resources, index, operation, ids):
+    if not isinstance(operation, dict):
+        raise ValidationError({'operation': 'Each operation must be an object.'})
+    op, resource = operation.get('op'), operation.get('resource')
+    if op not in OPERATIONS:
+        raise ValidationError({'op': f"Expected one of: {', '.join(OPERATIONS)}."})
+    if resource not in resources:
+        raise ValidationError({'resource': f"Unknown resource '{resource}'."})
+
+    data = resolve_temp_ids(operation.get('data') or {}, ids)
+    op_request = _OperationRequest(request, data)
+    viewset = resources[resource](
+        request=op_request, args=(), kwargs={}, format_kwarg=None, action=OPERATIONS[op],
+    )
+    viewset.check_permissions(op_request)
+    result = {'index': index, 'op': op, 'resource': resource}
+
+    if op == 'create':
+        serializer = viewset.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        viewset.perform_create(serializer)
+        temp_id = operation.get('temp_id')
+        if temp_id:
+            ids[str(temp_id)] = serializer.instance.pk
+            result['temp_id'] = temp_id
+        result.update(status=201, id=serializer.instance.pk, data=serializer.data)
+        return result
+
+    lookup_kwarg = viewset.lookup_url_kwarg or viewset.lookup_field
+    viewset.kwargs = {lookup_kwarg: resolve_temp_ids(operation.get('id'), ids)}
+    instance = viewset.get_object()
+    if op == 'update':
+        serializer = viewset.get_serializer(instance, data=data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        viewset.perform_update(serializer)
+        result.update(status=200, id=instance.pk, data=serializer.data)
+    else:
+        result.update(status=204, id=instance.pk)
+        viewset.perform_destroy(instance)
+    return result
+
+
+def execute(request, operations):
+    """
+    Run ``operations`` in one transaction.
+
+    Returns ``(status_code, payload)``: 200 with the result of every
+    operation, or the status of the first failing operation with its errors.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValidationError({'operations': 'A non-empty list of operations is required.'})
+    if len(operations) > MAX_OPERATIONS:
+        raise ValidationError({'operations': f'At most {MAX_OPERATIONS} operations per batch.'})
+
+    resources = get_resources()
+    ids = {}
+    results = []
+    try:
+        with transaction.atomic():
+            for index, operation in enumerate(operations):
+                try:
+                    results.append(_run(request, resources, index, operation, ids))
+                except (APIException, Http404, PermissionDenied) as exc:
+                    raise _OperationFailed(index, exception_handler(exc, {'request': request}))
+    except _OperationFailed as failure:
+        return failure.response.status_code, {
+            'committed': False,
+            'failed_index': failure.index,
+            'errors': failure.response.data,
+        }
+    return 200, {'committed': True, 'ids': ids, 'results': results}
@@ -0,0 +1,48 @@
+"""
+Compare every audiogram with its worker's baseline and store the results
+(apps.occupational_health.audiometry): STS, recordable hearing loss, noise
+notch, percent hearing impairment and classification.
+
+Run after migrating and after importing audiograms (bulk imports skip the
+per-save analysis).
+
+Usage:
+    python manage.py analyze_audiometry
+    python manage.py analyze_audiometry --enterprise 3 --dry-run
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.occupational_health import audiometry
+from apps.occupational_health.models import AudiometryResult
+
+
+class Command(BaseCommand):
+    help = 'Compute STS, noise notch and hearing impairment of the audiograms and store them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enterprise', type=int, help='Only the workers of this enterprise id')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Analyze and report without updating the audiograms',
+        )
+
+    def handle(self, *args, **options):
+        queryset = AudiometryResult.objects.all()
+        if options['enterprise']:
+            queryset = queryset.filter(examination__worker__enterprise_id=options['enterprise'])
+
+        started = time.perf_counter()
+        analysis, updated = audiometry.analyze_queryset(queryset, write=not options['dry_run'])
+        elapsed = time.perf_counter() - started
+        summary = (
+            f'{len(analysis.audiograms)} audiograms of {len(analysis.audiograms.worker_ids)} workers '
+            f'in {elapsed:.1f}s: {int(analysis.sts.sum())} STS, '
+            f'{int(analysis.recordable.sum())} recordable, {int(analysis.notch.sum())} noise notches'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {summary}'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'{summary}; {updated} updated'))
@@ -0,0 +1,49 @@
+"""
+Compute the reference values of every spirometry and the FEV1 decline of
+each worker, and store them (apps.occupational_health.spirometry):
+predicted values, LLN, z-scores, LLN pattern and excessive decline.
+
+Run after migrating and after importing spirometries or heights (bulk
+imports skip the per-save analysis).
+
+Usage:
+    python manage.py analyze_spirometry
+    python manage.py analyze_spirometry --enterprise 3 --dry-run
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from apps.occupational_health import spirometry
+from apps.occupational_health.models import SpirometryResult
+
+
+class Command(BaseCommand):
+    help = 'Compute predicted values, z-scores, LLN and FEV1 decline of the spirometries and store them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enterprise', type=int, help='Only the workers of this enterprise id')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Analyze and report without updating the spirometries',
+        )
+
+    def handle(self, *args, **options):
+        queryset = SpirometryResult.objects.all()
+        if options['enterprise']:
+            queryset = queryset.filter(examination__worker__enterprise_id=options['enterprise'])
+
+        started = time.perf_counter()
+        analysis, updated = spirometry.analyze_queryset(queryset, write=not options['dry_run'])
+        elapsed = time.perf_counter() - started
+        summary = (
+            f'{len(analysis.spirometries)} spirometries of {len(analysis.spirometries.worker_ids)} workers '
+            f'in {elapsed:.1f}s: {int((~np.isnan(analysis.predicted[:, spirometry.FEV1])).sum())} with reference values, '
+            f'{int(analysis.excessive_decline.sum())} excessive FEV1 declines'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {summary}'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'{summary}; {updated} updated'))
@@ -0,0 +1,45 @@
+"""
+Precompute the heavy metals trend snapshots of every enterprise with
+results (apps.occupational_health.metal_trends), so the trends endpoint
+answers from the table.  Snapshots are otherwise computed on first request
+and dropped when a result changes.
+
+Usage:
+    python manage.py refresh_heavy_metal_trends
+    python manage.py refresh_heavy_metal_trends --period 2025-Q2 --enterprise 3
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.occupational_health import metal_trends
+from apps.occupational_health.models import HeavyMetalsTest
+
+
+class Command(BaseCommand):
+    help = 'Compute and store the heavy metals trend snapshots of a period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='2025, 2025-Q2 or 2025-06 (default: the current year)')
+        parser.add_argument('--enterprise', type=int, help='Only this enterprise id')
+
+    def handle(self, *args, **options):
+        try:
+            period = metal_trends.parse_period(options['period'])[0]
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['enterprise']:
+            enterprise_ids = [options['enterprise']]
+        else:
+            enterprise_ids = HeavyMetalsTest.objects.order_by().values_list(
+                'examination__worker__enterprise_id', flat=True,
+            ).distinct()
+
+        started = time.perf_counter()
+        count = 0
+        for enterprise_id in enterprise_ids:
+            metal_trends.refresh(enterprise_id, period)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} heavy metals trend snapshots for {period} in {time.perf_counter() - started:.1f}s'
+        ))
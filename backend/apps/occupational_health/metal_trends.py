@@ -0,0 +1,262 @@
+"""
+Heavy metals trends per worker and cohort distributions (NumPy).
+
+``elevated`` and ``exceeding_osha`` judge each result alone.  For an
+enterprise and a period, ``compute`` reads the results up to the end of the
+period (one query) and derives, for every worker, metal, specimen and unit
+at once:
+
+* the **baseline** (first result ever) and the **last** result of the
+  period, and the change from one to the other;
+* the least-squares **slope** (unit/year) of the period's results;
+* the **rolling maximum** of the last ``ROLLING_TESTS`` results and the
+  maximum of the period;
+* **alerts**: ``above_reference`` (last result above the reference upper
+  limit), ``rise`` (last result ``RISE_PERCENT`` % or more above the
+  baseline) and ``rate_of_rise`` (slope of ``RATE_OF_RISE`` × the reference
+  upper limit per year or more).
+
+The last results are then distributed per work site, metal, specimen and
+unit (percentiles, mean, maximum).  Results are kept in
+``HeavyMetalsTrendSnapshot`` per enterprise and period (``2025``,
+``2025-Q2`` or ``2025-06``): ``get_snapshot`` computes a missing one, and
+``signals.py`` drops the snapshots a saved or deleted result (or a worker
+moved to another site or enterprise) makes stale.  ``python manage.py
+refresh_heavy_metal_trends`` precomputes them.
+"""
+import re
+from calendar import monthrange
+from datetime import date
+
+import numpy as np
+from django.utils import timezone
+
+from .models import HeavyMetalsTest, HeavyMetalsTrendSnapshot, Worker, WorkSite
+
+ROLLING_TESTS = 3
+RISE_PERCENT = 50
+RATE_OF_RISE = 0.25
+PERCENTILES = (50, 75, 90, 95)
+
+
+def parse_period(value=None):
+    """
+    ``(period, start, end)`` of a year (``2025``), quarter (``2025-Q2``) or
+    month (``2025-06``); the current year by default.  Raises ``ValueError``.
+    """
+    value = value or str(timezone.localdate().year)
+    match = re.fullmatch(r'(\d{4})(?:-Q([1-4])|-(\d{2}))?', value)
+    if not match or (match.group(3) and not 1 <= int(match.group(3)) <= 12):
+        raise ValueError(f'Période invalide : {value} (2025, 2025-Q2 ou 2025-06)')
+    year = int(match.group(1))
+    if match.group(2):
+        first_month, last_month = 3 * int(match.group(2)) - 2, 3 * int(match.group(2))
+    elif match.group(3):
+        first_month = last_month = int(match.group(3))
+    else:
+        first_month, last_month = 1, 12
+    return value, date(year, first_month, 1), date(year, last_month, monthrange(year, last_month)[1])
+
+
+def _codes(values):
+    uniques, codes = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+    return uniques, codes.reshape(-1)
+
+
+def _number(value, digits=4):
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+def _features(enterprise_id, start, end):
+    rows = list(HeavyMetalsTest.objects.filter(
+        examination__worker__enterprise_id=enterprise_id, test_date__lte=end,
+    ).order_by().values_list(
+        'examination__worker_id', 'heavy_metal', 'specimen_type', 'unit',
+        'test_date', 'level_value', 'reference_upper', 'examination__worker__work_site_id',
+    ))
+    if not rows:
+        return None
+    workers, metals, specimens, units, dates, levels, references, sites = zip(*rows)
+
+    # One series per worker, metal, specimen and unit, rows sorted by date inside.
+    keys = [_codes(column) for column in (workers, metals, specimens, units)]
+    series = np.zeros(len(rows), dtype=np.int64)
+    for uniques, codes in keys:
+        series = series * len(uniques) + codes
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    order = np.lexsort((days, series))
+    series, days = series[order], days[order]
+    levels = np.array(levels, dtype=float)[order]
+    references = np.array(references, dtype=float)[order]
+    starts = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+    ends = np.r_[starts[1:], len(series)] - 1
+
+    in_period = days >= np.datetime64(start, 'D').astype(np.int64)
+    # Least-squares slope over the period's results, in years from the period start.
+    years = (days - np.datetime64(start, 'D').astype(np.int64)) / 365.25
+    weight = in_period.astype(float)
+    n, t, v, tt, tv = (np.add.reduceat(column, starts) for column in (
+        weight, weight * years, weight * levels, weight * years ** 2, weight * years * levels,
+    ))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * tv - t * v) / (n * tt - t ** 2)
+    period_max = np.maximum.reduceat(np.where(in_period, levels, -np.inf), starts)
+
+    # Series with results in the period only.
+    kept = n > 0
+    starts, ends, count, slope, period_max = starts[kept], ends[kept], n[kept], slope[kept], period_max[kept]
+    slope[count < 2] = np.nan
+
+    baseline, last = levels[starts], levels[ends]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where((ends > starts) & (baseline > 0), 100 * (last - baseline) / baseline, np.nan)
+    rolling_max = np.full(len(starts), -np.inf)
+    for back in range(ROLLING_TESTS):
+        rows_back = ends - back
+        rolling_max = np.maximum(rolling_max, np.where(rows_back >= starts, levels[np.maximum(rows_back, 0)], -np.inf))
+    reference = references[ends]
+
+    with np.errstate(invalid='ignore'):
+        alerts = {
+            'above_reference': last > reference,
+            'rise': change >= RISE_PERCENT,
+            'rate_of_rise': slope >= RATE_OF_RISE * reference,
+        }
+    first = order[starts]
+    return {
+        'worker': np.array(workers, dtype=object)[first],
+        'heavy_metal': np.array(metals, dtype=object)[first],
+        'specimen_type': np.array(specimens, dtype=object)[first],
+        'unit': np.array(units, dtype=object)[first],
+        'work_site': np.array(sites, dtype=object)[first],
+        'tests': count, 'baseline': baseline, 'baseline_date': days[starts],
+        'last': last, 'last_date': days[ends], 'change': change, 'slope': slope,
+        'rolling_max': rolling_max, 'period_max': period_max, 'reference': reference,
+        'alerts': alerts,
+    }
+
+
+def percentiles(values, groups, count):
+    """Linear-interpolated PERCENTILES of ``values`` per group code (0..count - 1), ``(count, len(PERCENTILES))``."""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    positions = starts[:, None] + np.array(PERCENTILES) / 100 * (sizes[:, None] - 1)
+    low = np.floor(positions).astype(int)
+    high = np.ceil(positions).astype(int)
+    return ordered[low] + (positions - low) * (ordered[high] - ordered[low])
+
+
+def _cohorts(features):
+    keys = [_codes(features[name]) for name in ('work_site', 'heavy_metal', 'specimen_type', 'unit')]
+    combined = np.zeros(len(features['last']), dtype=np.int64)
+    for uniques, codes in keys:
+        combined = combined * len(uniques) + codes
+    groups, group_of = np.unique(combined, return_inverse=True)
+    group_of = group_of.reshape(-1)
+    count = len(groups)
+
+    last = features['last']
+    workers = np.bincount(group_of, minlength=count)
+    mean = np.bincount(group_of, weights=last, minlength=count) / workers
+    maximum = np.full(count, -np.inf)
+    np.maximum.at(maximum, group_of, last)
+    distribution = percentiles(last, group_of, count)
+    above = np.bincount(group_of, weights=features['alerts']['above_reference'].astype(float), minlength=count)
+    flagged = np.zeros(len(last), dtype=bool)
+    for alert in features['alerts'].values():
+        flagged |= alert
+    alerted = np.bincount(group_of, weights=flagged.astype(float), minlength=count)
+
+    site_names = dict(WorkSite.objects.filter(
+        pk__in={site for site in features['work_site'] if site is not None},
+    ).values_list('pk', 'name'))
+    metal_names = dict(HeavyMetalsTest.METAL_CHOICES)
+    # First series of each group carries its keys.
+    first = np.unique(group_of, return_index=True)[1]
+    cohorts = []
+    for index, row in enumerate(first):
+        site, metal = features['work_site'][row], features['heavy_metal'][row]
+        cohorts.append({
+            'work_site': site,
+            'work_site_name': site_names.get(site, ''),
+            'heavy_metal': metal,
+            'heavy_metal_display': metal_names.get(metal, metal),
+            'specimen_type': features['specimen_type'][row],
+            'unit': features['unit'][row],
+            'workers': int(workers[index]),
+            'mean': _number(mean[index]),
+            'max': _number(maximum[index]),
+            **{f'p{q}': _number(distribution[index, column]) for column, q in enumerate(PERCENTILES)},
+            'above_reference': int(above[index]),
+            'alerts': int(alerted[index]),
+        })
+    return cohorts
+
+
+def compute(enterprise_id, start, end):
+    """``{'series': [...], 'cohorts': [...]}`` of an enterprise's results in ``[start, end]``."""
+    features = _features(enterprise_id, start, end)
+    if features is None:
+        return {'series': [], 'cohorts': []}
+
+    names = {
+        worker['pk']: worker for worker in Worker.objects.filter(
+            pk__in=set(features['worker']),
+        ).values('pk', 'first_name', 'last_name', 'employee_id')
+    }
+    series = []
+    for index, worker_id in enumerate(features['worker']):
+        worker = names[worker_id]
+        series.append({
+            'worker': worker_id,
+            'worker_name': f"{worker['first_name']} {worker['last_name']}",
+            'employee_id': worker['employee_id'],
+            'work_site': features['work_site'][index],
+            'heavy_metal': features['heavy_metal'][index],
+            'specimen_type': features['specimen_type'][index],
+            'unit': features['unit'][index],
+            'tests': int(features['tests'][index]),
+            'baseline': _number(features['baseline'][index]),
+            'baseline_date': str(features['baseline_date'][index].astype('datetime64[D]')),
+            'last': _number(features['last'][index]),
+            'last_date': str(features['last_date'][index].astype('datetime64[D]')),
+            'change_percent': _number(features['change'][index], 1),
+            'slope_per_year': _number(features['slope'][index]),
+            'rolling_max': _number(features['rolling_max'][index]),
+            'period_max': _number(features['period_max'][index]),
+            'reference_upper': _number(features['reference'][index]),
+            'alerts': [name for name, flags in features['alerts'].items() if flags[index]],
+        })
+    return {'series': series, 'cohorts': _cohorts(features)}
+
+
+def refresh(enterprise_id, period=None):
+    """Compute and store the snapshot of an enterprise and period."""
+    period, start, end = parse_period(period)
+    snapshot = HeavyMetalsTrendSnapshot(
+        enterprise_id=enterprise_id, period=period, period_start=start, period_end=end,
+        **compute(enterprise_id, start, end),
+    )
+    # INSERT ... ON CONFLICT: concurrent refreshes of the same period do not collide.
+    HeavyMetalsTrendSnapshot.objects.bulk_create(
+        [snapshot], update_conflicts=True, unique_fields=['enterprise', 'period'],
+        update_fields=['period_start', 'period_end', 'series', 'cohorts', 'computed_at'],
+    )
+    return snapshot
+
+
+def get_snapshot(enterprise_id, period=None):
+    """Stored snapshot of an enterprise and period, computed on a miss."""
+    period = parse_period(period)[0]
+    snapshot = HeavyMetalsTrendSnapshot.objects.filter(enterprise_id=enterprise_id, period=period).first()
+    return snapshot or refresh(enterprise_id, period)
+
+
+def invalidate(enterprise_id, test_date=None):
+    """Drop the snapshots of an enterprise (those ending on or after ``test_date``)."""
+    snapshots = HeavyMetalsTrendSnapshot.objects.filter(enterprise_id=enterprise_id)
+    if test_date is not None:
+        snapshots = snapshots.filter(period_end__gte=test_date)
+    snapshots.delete()
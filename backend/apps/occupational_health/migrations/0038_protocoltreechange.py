@@ -0,0 +1,28 @@
+# Generated by Django 4.2.28 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('occupational_health', '0037_regulatoryrequirement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProtocolTreeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_type', models.CharField(choices=[('sector', 'Secteur'), ('department', 'Département'), ('position', 'Poste'), ('protocol', 'Protocole')], max_length=20, verbose_name='Type de Nœud')),
+                ('node_id', models.BigIntegerField(verbose_name='ID du Nœud')),
+                ('deleted', models.BooleanField(default=False, verbose_name='Supprimé')),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': "Modification de l'Arbre des Protocoles",
+                'verbose_name_plural': "Modifications de l'Arbre des Protocoles",
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('occupational_health', '0038_protocoltreechange'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicalexamination',
+            index=models.Index(fields=['exam_date', 'id'], name='occ_medexam_date_id_idx'),
+        ),
+    ]
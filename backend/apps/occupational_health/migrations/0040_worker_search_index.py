@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from apps.core.search import SearchDocument, create_search_index, drop_search_index
+
+# Frozen copy of WORKER_SEARCH in apps/occupational_health/models.py.
+SEARCH = SearchDocument(
+    ['first_name', 'last_name', 'employee_id', 'job_title'],
+    index_name='occ_worker_search_trgm',
+)
+
+
+def create_index(apps, schema_editor):
+    create_search_index(apps.get_model('occupational_health', 'Worker'), SEARCH, schema_editor)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(apps.get_model('occupational_health', 'Worker'), SEARCH, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_search_extensions'),
+        ('occupational_health', '0039_medicalexamination_date_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
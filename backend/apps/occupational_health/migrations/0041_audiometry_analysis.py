@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('occupational_health', '0040_worker_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='is_baseline',
+            field=models.BooleanField(default=False, verbose_name='Audiogramme de Référence'),
+        ),
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='sts_right_db',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True, verbose_name='Décalage OD 2-3-4 kHz (dB)'),
+        ),
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='sts_left_db',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True, verbose_name='Décalage OG 2-3-4 kHz (dB)'),
+        ),
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='standard_threshold_shift',
+            field=models.BooleanField(default=False, verbose_name='Décalage Significatif (STS)'),
+        ),
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='recordable_hearing_loss',
+            field=models.BooleanField(default=False, verbose_name='Perte Auditive à Déclarer'),
+        ),
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='hearing_impairment_percent',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True, verbose_name='Handicap Auditif (%)'),
+        ),
+        migrations.AddField(
+            model_name='audiometryresult',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Analysé le'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('occupational_health', '0041_audiometry_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_predicted',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='VEMS Prédit (L)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_lln',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='VEMS LIN (L)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_percent_predicted',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True, verbose_name='VEMS % Prédit'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_z_score',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='VEMS Z-score'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fvc_predicted',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='CVF Prédite (L)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fvc_lln',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='CVF LIN (L)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fvc_percent_predicted',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True, verbose_name='CVF % Prédite'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fvc_z_score',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='CVF Z-score'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_fvc_lln',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=5, null=True, verbose_name='VEMS/CVF LIN (%)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_fvc_z_score',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='VEMS/CVF Z-score'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='lln_pattern',
+            field=models.CharField(blank=True, choices=[('normal', 'Normal'), ('obstructive', 'Syndrome Obstructif'), ('restrictive', 'Profil Restrictif'), ('mixed', 'Mixte')], max_length=20, verbose_name='Profil (LIN)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_decline_percent',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=5, null=True, verbose_name='Déclin VEMS depuis Référence (%)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='fev1_decline_ml_year',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True, verbose_name='Déclin VEMS (mL/an)'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='excessive_fev1_decline',
+            field=models.BooleanField(default=False, verbose_name='Déclin VEMS Excessif'),
+        ),
+        migrations.AddField(
+            model_name='spirometryresult',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Analysé le'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('occupational_health', '0042_spirometry_reference_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeavyMetalsTrendSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=10)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('series', models.JSONField(default=list)),
+                ('cohorts', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('enterprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='heavy_metals_trend_snapshots', to='occupational_health.enterprise')),
+            ],
+            options={
+                'verbose_name': 'Heavy Metals Trend Snapshot',
+                'verbose_name_plural': 'Heavy Metals Trend Snapshots',
+                'unique_together': {('enterprise', 'period')},
+            },
+        ),
+    ]
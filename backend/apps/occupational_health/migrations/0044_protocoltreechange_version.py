@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    # Existing rows keep their id as version, so clients' versions stay valid.
+    ProtocolTreeChange = apps.get_model('occupational_health', 'ProtocolTreeChange')
+    CommitSequence = apps.get_model('core', 'CommitSequence')
+    ProtocolTreeChange.objects.update(version=F('id'))
+    CommitSequence.objects.update_or_create(
+        name='occ_protocol_tree',
+        defaults={'value': ProtocolTreeChange.objects.aggregate(value=Max('id'))['value'] or 0},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_commit_sequence'),
+        ('occupational_health', '0043_heavy_metals_trend_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='protocoltreechange',
+            name='version',
+            field=models.PositiveBigIntegerField(blank=True, null=True, unique=True, verbose_name='Version'),
+        ),
+        migrations.AddIndex(
+            model_name='protocoltreechange',
+            index=models.Index(condition=models.Q(('version__isnull', True)), fields=['id'], name='occ_tree_change_pending_idx'),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
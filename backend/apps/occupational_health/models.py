@@ -15,6 +15,8 @@ from decimal import Decimal
 from datetime import date
 import uuid
 
+from apps.core.search import SearchDocument
+
 User = get_user_model()
 
 # ==================== PROTOCOL / SECTOR HIERARCHY MODELS ====================
@@ -297,6 +299,44 @@ class ProtocolRequiredExam(models.Model):
         return f"{self.protocol} → {self.exam.code} (#{self.order})"
 
 
+class ProtocolTreeChange(models.Model):
+    """
+    Append-only change log of the Sector → Department → Position → Protocol tree.
+    ``version`` is numbered in commit order once the writer's transaction
+    commits (apps.core.sequence): it only ever grows, so clients can ask for
+    the nodes changed since the version they hold (see protocol_tree.py).
+    Rows are written by signals, never edited by hand.
+    """
+    NODE_SECTOR = 'sector'
+    NODE_DEPARTMENT = 'department'
+    NODE_POSITION = 'position'
+    NODE_PROTOCOL = 'protocol'
+    NODE_TYPE_CHOICES = [
+        (NODE_SECTOR, _("Secteur")),
+        (NODE_DEPARTMENT, _("Département")),
+        (NODE_POSITION, _("Poste")),
+        (NODE_PROTOCOL, _("Protocole")),
+    ]
+
+    node_type = models.CharField(_("Type de Nœud"), max_length=20, choices=NODE_TYPE_CHOICES)
+    node_id = models.BigIntegerField(_("ID du Nœud"))
+    deleted = models.BooleanField(_("Supprimé"), default=False)
+    version = models.PositiveBigIntegerField(_("Version"), null=True, blank=True, unique=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Modification de l'Arbre des Protocoles")
+        verbose_name_plural = _("Modifications de l'Arbre des Protocoles")
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(version__isnull=True), name='occ_tree_change_pending_idx'),
+        ]
+
+    def __str__(self):
+        action = 'supprimé' if self.deleted else 'modifié'
+        return f"v{self.version}: {self.node_type} #{self.node_id} {action}"
+
+
 # ==================== SECTOR DEFINITIONS ====================
 
 INDUSTRY_SECTORS = [
@@ -495,12 +535,20 @@ class Enterprise(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.get_sector_display()})"
+
+    # Columns read by the properties below (sparse fieldsets, apps.core.fieldsets).
+    FIELD_DEPENDENCIES = {'risk_level': ['sector']}
     
     @property
     def risk_level(self):
         """Get sector risk level"""
         return SECTOR_RISK_LEVELS.get(self.sector, 'moderate')
     
+    @property
+    def active_worker_count(self):
+        """Number of workers currently employed"""
+        return self.workers.filter(employment_status='active').count()
+    
     @property
     def exam_frequency_months(self):
         """Required medical examination frequency based on sector"""
@@ -624,6 +672,27 @@ class Worker(models.Model):
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.employee_id})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the signals drop the heavy metals trends of a worker who moved (metal_trends).
+        instance._loaded_placement = instance.placement if {
+            'enterprise_id', 'work_site_id'
+        } <= instance.__dict__.keys() else ...
+        return instance
+
+    @property
+    def placement(self):
+        """``(enterprise, work site)`` the worker's results are grouped under"""
+        return self.enterprise_id, self.work_site_id
+
+    # Columns read by the properties below (sparse fieldsets, apps.core.fieldsets).
+    FIELD_DEPENDENCIES = {
+        'full_name': ['first_name', 'last_name'],
+        'age': ['date_of_birth'],
+        'sector_risk_level': ['enterprise__risk_level'],
+    }
     
     @property
     def full_name(self):
@@ -653,6 +722,12 @@ class Worker(models.Model):
         }
         return sector_ppe_mapping.get(self.enterprise.sector, ['none_required'])
 
+
+WORKER_SEARCH = SearchDocument(
+    ['first_name', 'last_name', 'employee_id', 'job_title'],
+    index_name='occ_worker_search_trgm',
+)
+
 # ==================== MEDICAL EXAMINATION MODELS ====================
 
 class MedicalExamination(models.Model):
@@ -740,6 +815,10 @@ class MedicalExamination(models.Model):
         verbose_name = _("Examen Médical")
         verbose_name_plural = _("Examens Médicaux")
         ordering = ['-exam_date']
+        indexes = [
+            # Serves ORDER BY exam_date DESC, id DESC of keyset pagination.
+            models.Index(fields=['exam_date', 'id'], name='occ_medexam_date_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.exam_number} - {self.worker.full_name} ({self.get_exam_type_display()})"
@@ -937,6 +1016,15 @@ class AudiometryResult(models.Model):
     noise_induced_probable = models.BooleanField(_("NIHL Probable"), default=False)
     recommendations = models.TextField(_("Recommandations"), blank=True)
     
+    # Computed by apps.occupational_health.audiometry (baseline comparison)
+    is_baseline = models.BooleanField(_("Audiogramme de Référence"), default=False)
+    sts_right_db = models.DecimalField(_("Décalage OD 2-3-4 kHz (dB)"), max_digits=4, decimal_places=1, null=True, blank=True)
+    sts_left_db = models.DecimalField(_("Décalage OG 2-3-4 kHz (dB)"), max_digits=4, decimal_places=1, null=True, blank=True)
+    standard_threshold_shift = models.BooleanField(_("Décalage Significatif (STS)"), default=False)
+    recordable_hearing_loss = models.BooleanField(_("Perte Auditive à Déclarer"), default=False)
+    hearing_impairment_percent = models.DecimalField(_("Handicap Auditif (%)"), max_digits=4, decimal_places=1, null=True, blank=True)
+    analyzed_at = models.DateTimeField(_("Analysé le"), null=True, blank=True)
+    
     # Audit fields
     tested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     test_date = models.DateTimeField(auto_now_add=True)
@@ -976,6 +1064,28 @@ class SpirometryResult(models.Model):
     occupational_lung_disease_suspected = models.BooleanField(_("Pneumopathie Professionnelle Suspectée"), default=False)
     recommendations = models.TextField(_("Recommandations"), blank=True)
     
+    # Computed by apps.occupational_health.spirometry (reference values, FEV1 decline)
+    fev1_predicted = models.DecimalField(_("VEMS Prédit (L)"), max_digits=5, decimal_places=2, null=True, blank=True)
+    fev1_lln = models.DecimalField(_("VEMS LIN (L)"), max_digits=5, decimal_places=2, null=True, blank=True)
+    fev1_percent_predicted = models.DecimalField(_("VEMS % Prédit"), max_digits=6, decimal_places=1, null=True, blank=True)
+    fev1_z_score = models.DecimalField(_("VEMS Z-score"), max_digits=5, decimal_places=2, null=True, blank=True)
+    fvc_predicted = models.DecimalField(_("CVF Prédite (L)"), max_digits=5, decimal_places=2, null=True, blank=True)
+    fvc_lln = models.DecimalField(_("CVF LIN (L)"), max_digits=5, decimal_places=2, null=True, blank=True)
+    fvc_percent_predicted = models.DecimalField(_("CVF % Prédite"), max_digits=6, decimal_places=1, null=True, blank=True)
+    fvc_z_score = models.DecimalField(_("CVF Z-score"), max_digits=5, decimal_places=2, null=True, blank=True)
+    fev1_fvc_lln = models.DecimalField(_("VEMS/CVF LIN (%)"), max_digits=5, decimal_places=1, null=True, blank=True)
+    fev1_fvc_z_score = models.DecimalField(_("VEMS/CVF Z-score"), max_digits=5, decimal_places=2, null=True, blank=True)
+    lln_pattern = models.CharField(_("Profil (LIN)"), max_length=20, choices=[
+        ('normal', _('Normal')),
+        ('obstructive', _('Syndrome Obstructif')),
+        ('restrictive', _('Profil Restrictif')),
+        ('mixed', _('Mixte')),
+    ], blank=True)
+    fev1_decline_percent = models.DecimalField(_("Déclin VEMS depuis Référence (%)"), max_digits=5, decimal_places=1, null=True, blank=True)
+    fev1_decline_ml_year = models.DecimalField(_("Déclin VEMS (mL/an)"), max_digits=6, decimal_places=1, null=True, blank=True)
+    excessive_fev1_decline = models.BooleanField(_("Déclin VEMS Excessif"), default=False)
+    analyzed_at = models.DateTimeField(_("Analysé le"), null=True, blank=True)
+    
     # Audit fields
     tested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     test_date = models.DateTimeField(auto_now_add=True)
@@ -2959,6 +3069,26 @@ class HeavyMetalsTest(models.Model):
         super().save(*args, **kwargs)
 
 
+class HeavyMetalsTrendSnapshot(models.Model):
+    """Heavy metals trends of an enterprise over a period (computed by apps.occupational_health.metal_trends)"""
+    
+    enterprise = models.ForeignKey(Enterprise, on_delete=models.CASCADE, related_name='heavy_metals_trend_snapshots')
+    period = models.CharField(max_length=10)  # 2025, 2025-Q2 or 2025-06
+    period_start = models.DateField()
+    period_end = models.DateField()
+    series = models.JSONField(default=list)
+    cohorts = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Heavy Metals Trend Snapshot'
+        verbose_name_plural = 'Heavy Metals Trend Snapshots'
+        unique_together = ['enterprise', 'period']
+    
+    def __str__(self):
+        return f"Heavy metals trends {self.period}"
+
+
 class DrugAlcoholScreening(models.Model):
     """Drug and alcohol screening test results"""
     
@@ -0,0 +1,159 @@
+"""
+Versioned snapshot of the Sector → Department → Position → Protocol tree.
+
+The frontend keeps a local copy of the tree (GET .../protocols/sectors/tree/).
+Instead of re-serializing the whole hierarchy on every sync:
+
+* every change to a node is appended to ``ProtocolTreeChange`` by signals,
+  in the writer's transaction; once committed the changes are numbered in
+  commit order (``apps.core.sequence``) and the highest number is the tree
+  *version*.  Insert ids are not used: a long transaction (e.g.
+  ``load_occ_protocols``) commits its low ids after a concurrent edit's
+  higher one, and clients holding that version would never get them;
+* the rendered JSON of the full tree is built once per version and kept in
+  the shared cache, so repeated syncs only cost a counter lookup;
+* the version is exposed as an ETag, clients sending ``If-None-Match`` get a
+  304 when nothing changed;
+* ``?since_version=N`` returns only the nodes changed after version N, plus
+  the ids of deleted nodes.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from apps.core import sequence
+from apps.core.renderers import FastJSONRenderer
+
+from .models import (
+    OccSector, OccDepartment, OccPosition, ExamVisitProtocol, ProtocolTreeChange,
+)
+from .serializers import OccSectorNestedSerializer, ExamVisitProtocolListSerializer
+
+_PAYLOAD_CACHE_KEY = 'occ_tree:payload:{version}:{scope}'
+_PAYLOAD_TIMEOUT = 60 * 60 * 24
+SEQUENCE = 'occ_protocol_tree'
+
+_NODE_MODELS = {
+    ProtocolTreeChange.NODE_SECTOR: OccSector,
+    ProtocolTreeChange.NODE_DEPARTMENT: OccDepartment,
+    ProtocolTreeChange.NODE_POSITION: OccPosition,
+    ProtocolTreeChange.NODE_PROTOCOL: ExamVisitProtocol,
+}
+
+
+def record_change(node_type, node_ids, deleted=False):
+    """Append one change row per node id; they get a version once committed."""
+    if not node_ids:
+        return
+    ProtocolTreeChange.objects.bulk_create([
+        ProtocolTreeChange(node_type=node_type, node_id=node_id, deleted=deleted)
+        for node_id in node_ids
+    ])
+    sequence.schedule_stamp(ProtocolTreeChange, 'version', SEQUENCE)
+
+
+def current_version():
+    return sequence.current(SEQUENCE)
+
+
+def make_etag(version, include_inactive=False):
+    scope = 'all' if include_inactive else 'active'
+    return f'W/"occ-tree-{version}-{scope}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison (RFC 7232 §2.3.2): ignore the W/ prefix.
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return '*' in candidates or any(
+        (tag[2:] if tag.startswith('W/') else tag) == bare for tag in candidates
+    )
+
+
+def _tree_queryset(include_inactive):
+    # Protocol nodes only expose required_exam_count, exams need not be loaded.
+    qs = OccSector.objects.prefetch_related(
+        'departments__positions__protocols__protocolrequiredexam_set',
+    )
+    if not include_inactive:
+        qs = qs.filter(is_active=True)
+    return qs
+
+
+def get_full_payload(version, include_inactive=False):
+    """Rendered JSON (bytes) of the full tree at ``version``, built once per version."""
+    key = _PAYLOAD_CACHE_KEY.format(version=version, scope='all' if include_inactive else 'active')
+    payload = cache.get(key)
+    if payload is None:
+        data = OccSectorNestedSerializer(_tree_queryset(include_inactive), many=True).data
+        payload = FastJSONRenderer().render(data)
+        cache.set(key, payload, _PAYLOAD_TIMEOUT)
+    return payload
+
+
+def _serialize_sector(sector):
+    return {
+        'id': sector.id, 'code': sector.code, 'name': sector.name,
+        'industry_sector_key': sector.industry_sector_key, 'is_active': sector.is_active,
+    }
+
+
+def _serialize_department(department):
+    return {
+        'id': department.id, 'sector': department.sector_id, 'code': department.code,
+        'name': department.name, 'is_active': department.is_active,
+    }
+
+
+def _serialize_position(position):
+    return {
+        'id': position.id, 'department': position.department_id, 'code': position.code,
+        'name': position.name, 'typical_exposures': position.typical_exposures,
+        'recommended_ppe': position.recommended_ppe, 'is_active': position.is_active,
+        'protocol_count': position.protocol_count,
+    }
+
+
+def get_delta(since_version, version):
+    """
+    Nodes changed in (since_version, version].
+
+    Nodes are returned flat with their parent id; inactive nodes are included
+    (with ``is_active: false``) so clients can drop them from their copy.
+    """
+    changes = ProtocolTreeChange.objects.filter(
+        version__gt=since_version, version__lte=version,
+    ).values_list('node_type', 'node_id', 'deleted').order_by('version')
+
+    # Only the last change of each node matters.
+    latest = {}
+    for node_type, node_id, deleted in changes:
+        latest[(node_type, node_id)] = deleted
+
+    changed = {node_type: set() for node_type in _NODE_MODELS}
+    deleted = {node_type: set() for node_type in _NODE_MODELS}
+    for (node_type, node_id), is_deleted in latest.items():
+        (deleted if is_deleted else changed)[node_type].add(node_id)
+
+    sectors = OccSector.objects.filter(id__in=changed[ProtocolTreeChange.NODE_SECTOR])
+    departments = OccDepartment.objects.filter(id__in=changed[ProtocolTreeChange.NODE_DEPARTMENT])
+    positions = OccPosition.objects.filter(
+        id__in=changed[ProtocolTreeChange.NODE_POSITION]
+    ).annotate(protocol_count=Count('protocols'))
+    protocols = ExamVisitProtocol.objects.filter(
+        id__in=changed[ProtocolTreeChange.NODE_PROTOCOL]
+    ).select_related('position__department__sector').prefetch_related('protocolrequiredexam_set')
+
+    return {
+        'version': version,
+        'since_version': since_version,
+        'full': False,
+        'sectors': [_serialize_sector(s) for s in sectors],
+        'departments': [_serialize_department(d) for d in departments],
+        'positions': [_serialize_position(p) for p in positions],
+        'protocols': ExamVisitProtocolListSerializer(protocols, many=True).data,
+        'deleted': {
+            f'{node_type}s': sorted(ids) for node_type, ids in deleted.items()
+        },
+    }
@@ -7,6 +7,7 @@ occupational medicine management system.
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from apps.core.annotations import AnnotatedDateField, AnnotatedIntegerField, RelatedCount, RelatedMax
 from .models import (
     # Protocol hierarchy models
     MedicalExamCatalog, OccSector, OccDepartment, OccPosition,
@@ -57,7 +58,7 @@ class MedicalExamCatalogSerializer(serializers.ModelSerializer):
 
 class OccSectorSerializer(serializers.ModelSerializer):
     """Sector — list / detail / create / update."""
-    department_count = serializers.IntegerField(source='departments.count', read_only=True)
+    department_count = AnnotatedIntegerField(RelatedCount('departments'), source='departments.count')
 
     class Meta:
         model = OccSector
@@ -72,7 +73,7 @@ class OccDepartmentSerializer(serializers.ModelSerializer):
     """Department — full CRUD."""
     sector_name = serializers.CharField(source='sector.name', read_only=True)
     sector_code = serializers.CharField(source='sector.code', read_only=True)
-    position_count = serializers.IntegerField(source='positions.count', read_only=True)
+    position_count = AnnotatedIntegerField(RelatedCount('positions'), source='positions.count')
 
     class Meta:
         model = OccDepartment
@@ -90,7 +91,7 @@ class OccPositionSerializer(serializers.ModelSerializer):
     sector_name = serializers.CharField(source='department.sector.name', read_only=True)
     sector_code = serializers.CharField(source='department.sector.code', read_only=True)
     breadcrumb = serializers.ReadOnlyField()
-    protocol_count = serializers.IntegerField(source='protocols.count', read_only=True)
+    protocol_count = AnnotatedIntegerField(RelatedCount('protocols'), source='protocols.count')
 
     class Meta:
         model = OccPosition
@@ -220,7 +221,7 @@ class EnterpriseListSerializer(serializers.ModelSerializer):
     
     risk_level = serializers.ReadOnlyField()
     exam_frequency_months = serializers.ReadOnlyField()
-    worker_count = serializers.IntegerField(source='workers.count', read_only=True)
+    worker_count = AnnotatedIntegerField(RelatedCount('workers'), source='workers.count')
     sector_display = serializers.CharField(source='get_sector_display', read_only=True)
     
     class Meta:
@@ -237,8 +238,10 @@ class EnterpriseDetailSerializer(serializers.ModelSerializer):
     
     risk_level = serializers.ReadOnlyField()
     exam_frequency_months = serializers.ReadOnlyField()
-    worker_count = serializers.IntegerField(source='workers.count', read_only=True)
-    active_workers = serializers.IntegerField(source='workers.filter(employment_status="active").count', read_only=True)
+    worker_count = AnnotatedIntegerField(RelatedCount('workers'), source='workers.count')
+    active_workers = AnnotatedIntegerField(
+        RelatedCount('workers', employment_status='active'), source='active_worker_count'
+    )
     sector_display = serializers.CharField(source='get_sector_display', read_only=True)
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     
@@ -251,7 +254,7 @@ class WorkSiteSerializer(serializers.ModelSerializer):
     
     enterprise_name = serializers.CharField(source='enterprise.name', read_only=True)
     enterprise_sector = serializers.CharField(source='enterprise.sector', read_only=True)
-    worker_count = serializers.IntegerField(source='workers.count', read_only=True)
+    worker_count = AnnotatedIntegerField(RelatedCount('workers'), source='workers.count')
     
     class Meta:
         model = WorkSite
@@ -300,10 +303,18 @@ class WorkerDetailSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     
     # Health stats
-    exam_count = serializers.IntegerField(source='medical_examinations.count', read_only=True)
-    last_exam_date = serializers.DateField(source='medical_examinations.first.exam_date', read_only=True)
-    incident_count = serializers.IntegerField(source='incidents_involved.count', read_only=True)
-    disease_count = serializers.IntegerField(source='occupational_diseases.count', read_only=True)
+    exam_count = AnnotatedIntegerField(
+        RelatedCount('medical_examinations'), source='medical_examinations.count'
+    )
+    last_exam_date = AnnotatedDateField(
+        RelatedMax('medical_examinations', 'exam_date'), source='medical_examinations.first.exam_date'
+    )
+    incident_count = AnnotatedIntegerField(
+        RelatedCount('incidents_involved'), source='incidents_involved.count'
+    )
+    disease_count = AnnotatedIntegerField(
+        RelatedCount('occupational_diseases'), source='occupational_diseases.count'
+    )
     
     class Meta:
         model = Worker
@@ -362,6 +373,11 @@ class AudiometryResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = AudiometryResult
         fields = '__all__'
+        # Computed by apps.occupational_health.audiometry
+        read_only_fields = [
+            'is_baseline', 'sts_right_db', 'sts_left_db', 'standard_threshold_shift',
+            'recordable_hearing_loss', 'hearing_impairment_percent', 'analyzed_at',
+        ]
         extra_kwargs = {
             'examination': {'required': False}
         }
@@ -422,6 +438,13 @@ class SpirometryResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = SpirometryResult
         fields = '__all__'
+        # Computed by apps.occupational_health.spirometry
+        read_only_fields = [
+            'fev1_predicted', 'fev1_lln', 'fev1_percent_predicted', 'fev1_z_score',
+            'fvc_predicted', 'fvc_lln', 'fvc_percent_predicted', 'fvc_z_score',
+            'fev1_fvc_lln', 'fev1_fvc_z_score', 'lln_pattern',
+            'fev1_decline_percent', 'fev1_decline_ml_year', 'excessive_fev1_decline', 'analyzed_at',
+        ]
         extra_kwargs = {
             'examination': {'required': False}
         }
@@ -1220,6 +1243,10 @@ class OverexposureAlertSerializer(serializers.ModelSerializer):
         """Number of previous alerts of same exposure type for this worker"""
         if not obj.worker_id:
             return 0
+        # Annotated by OverexposureAlertViewSet.get_queryset
+        annotated = getattr(obj, 'other_alert_count', None)
+        if annotated is not None:
+            return annotated
         return OverexposureAlert.objects.filter(
             worker_id=obj.worker_id,
             exposure_type=obj.exposure_type,
@@ -1992,12 +2019,21 @@ class RiskHeatmapDataSerializer(serializers.ModelSerializer):
         read_only_fields = ['created', 'updated', 'risk_score', 'risk_zone']
     
     def get_hazards_list(self, obj):
-        """Get list of related hazards"""
-        return list(obj.related_hazards.values('id', 'hazard_type', 'severity'))
+        """Get list of related hazards (uses the prefetch when present)"""
+        return [
+            {'id': hazard.id, 'hazard_type': hazard.hazard_type, 'severity': hazard.severity}
+            for hazard in obj.related_hazards.all()
+        ]
     
     def get_workers_list(self, obj):
-        """Get list of exposed workers"""
-        return list(obj.workers_exposed.values('id', 'first_name', 'last_name', 'employee_id'))
+        """Get list of exposed workers (uses the prefetch when present)"""
+        return [
+            {
+                'id': worker.id, 'first_name': worker.first_name,
+                'last_name': worker.last_name, 'employee_id': worker.employee_id,
+            }
+            for worker in obj.workers_exposed.all()
+        ]
     
     def get_trend_indicator(self, obj):
         """Get visual trend indicator"""
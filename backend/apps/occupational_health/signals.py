@@ -5,21 +5,28 @@ Django signals for automated processing of occupational health data
 including audit logging, exam scheduling, and business rule enforcement.
 """
 from decimal import Decimal
+from functools import partial
 import logging
 
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
 
+from apps.core import sync
+
 logger = logging.getLogger(__name__)
 
 from .models import (
+    OccSector, OccDepartment, OccPosition,
+    ExamVisitProtocol, ProtocolRequiredExam, ProtocolTreeChange,
     Worker, MedicalExamination, VitalSigns, FitnessCertificate,
     WorkplaceIncident, OccupationalDisease,
     WorkerRiskProfile, HazardIdentification, ExposureReading, OverexposureAlert,
-    RiskProfileAuditLog,
+    RiskProfileAuditLog, AudiometryResult, SpirometryResult, HeavyMetalsTest,
 )
+from . import audiometry, metal_trends, spirometry
 
 # ==================== WORKER SIGNALS ====================
 
@@ -1024,4 +1031,164 @@ def trigger_compliance_risk_on_disease(sender, instance, created, **kwargs):
                 reason=reason,
             )
     except Exception:
-        pass
\ No newline at end of file
+        pass
+
+
+# ==================== PROTOCOL TREE VERSIONING ====================
+# Every change to the Sector → Department → Position → Protocol tree is
+# appended to ProtocolTreeChange, numbered in commit order once committed;
+# the highest number is the tree version served as ETag by
+# OccSectorViewSet.tree (see protocol_tree.py).
+
+def _record_tree_change(node_type, node_ids, deleted=False):
+    from .protocol_tree import record_change
+    record_change(node_type, list(node_ids), deleted=deleted)
+
+
+@receiver(post_save, sender=OccSector)
+@receiver(post_delete, sender=OccSector)
+def version_tree_on_sector_change(sender, instance, created=False, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    _record_tree_change(ProtocolTreeChange.NODE_SECTOR, [instance.pk], deleted=deleted)
+    if not created and not deleted:
+        # Protocol nodes embed the sector name.
+        _record_tree_change(
+            ProtocolTreeChange.NODE_PROTOCOL,
+            ExamVisitProtocol.objects.filter(
+                position__department__sector=instance
+            ).values_list('pk', flat=True),
+        )
+
+
+@receiver(post_save, sender=OccDepartment)
+@receiver(post_delete, sender=OccDepartment)
+def version_tree_on_department_change(sender, instance, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    _record_tree_change(ProtocolTreeChange.NODE_DEPARTMENT, [instance.pk], deleted=deleted)
+
+
+@receiver(post_save, sender=OccPosition)
+@receiver(post_delete, sender=OccPosition)
+def version_tree_on_position_change(sender, instance, created=False, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    _record_tree_change(ProtocolTreeChange.NODE_POSITION, [instance.pk], deleted=deleted)
+    if not created and not deleted:
+        # Protocol nodes embed the position code and name.
+        _record_tree_change(
+            ProtocolTreeChange.NODE_PROTOCOL,
+            instance.protocols.values_list('pk', flat=True),
+        )
+
+
+@receiver(post_save, sender=ExamVisitProtocol)
+@receiver(post_delete, sender=ExamVisitProtocol)
+def version_tree_on_protocol_change(sender, instance, created=False, **kwargs):
+    deleted = kwargs['signal'] is post_delete
+    _record_tree_change(ProtocolTreeChange.NODE_PROTOCOL, [instance.pk], deleted=deleted)
+    if created or deleted:
+        # The position node carries protocol_count.
+        _record_tree_change(ProtocolTreeChange.NODE_POSITION, [instance.position_id])
+
+
+@receiver(post_save, sender=ProtocolRequiredExam)
+@receiver(post_delete, sender=ProtocolRequiredExam)
+def version_tree_on_required_exam_change(sender, instance, **kwargs):
+    # The protocol node carries required_exam_count.
+    _record_tree_change(ProtocolTreeChange.NODE_PROTOCOL, [instance.protocol_id])
+
+
+# ==================== AUDIOMETRY ANALYTICS ====================
+
+def _analyze_worker_audiometry(examination_id):
+    worker_id = MedicalExamination.objects.filter(pk=examination_id).values_list('worker_id', flat=True).first()
+    if worker_id is not None:
+        audiometry.analyze_worker(worker_id)
+
+
+@receiver(post_save, sender=AudiometryResult)
+@receiver(post_delete, sender=AudiometryResult)
+def analyze_audiometry_on_change(sender, instance, **kwargs):
+    """Shifts are relative to the worker's baseline: re-analyze all its audiograms once committed."""
+    transaction.on_commit(partial(_analyze_worker_audiometry, instance.examination_id))
+
+
+# ==================== SPIROMETRY ANALYTICS ====================
+
+def _worker_of(examination_id):
+    # Looked up now: a deleted examination is gone after the commit.
+    return MedicalExamination.objects.filter(pk=examination_id).values_list('worker_id', flat=True).first()
+
+
+@receiver(post_save, sender=SpirometryResult)
+@receiver(post_delete, sender=SpirometryResult)
+def analyze_spirometry_on_change(sender, instance, **kwargs):
+    """Decline is relative to the worker's baseline: re-analyze once committed."""
+    worker_id = _worker_of(instance.examination_id)
+    if worker_id is not None:
+        transaction.on_commit(partial(spirometry.analyze_worker, worker_id))
+
+
+@receiver(post_save, sender=VitalSigns)
+@receiver(post_delete, sender=VitalSigns)
+def analyze_spirometry_on_vital_signs_change(sender, instance, **kwargs):
+    """Predictions use the height: re-analyze the worker's spirometries, if any, once committed."""
+    worker_id = _worker_of(instance.examination_id)
+    if worker_id is not None and SpirometryResult.objects.filter(examination__worker_id=worker_id).exists():
+        transaction.on_commit(partial(spirometry.analyze_worker, worker_id))
+
+
+# ==================== HEAVY METALS TRENDS ====================
+
+@receiver(pre_save, sender=HeavyMetalsTest)
+def remember_metal_test_before_change(sender, instance, **kwargs):
+    """The snapshots covering the result's previous date and enterprise are stale too."""
+    instance._trends_before = HeavyMetalsTest.objects.filter(pk=instance.pk).values_list(
+        'examination__worker__enterprise_id', 'test_date',
+    ).first() if instance.pk else None
+
+
+@receiver(post_save, sender=HeavyMetalsTest)
+@receiver(post_delete, sender=HeavyMetalsTest)
+def invalidate_metal_trends_on_change(sender, instance, **kwargs):
+    """Drop the trend snapshots of the worker's enterprise covering the result once committed."""
+    # Looked up now: a deleted examination is gone after the commit.
+    enterprise_id = MedicalExamination.objects.filter(pk=instance.examination_id).values_list(
+        'worker__enterprise_id', flat=True,
+    ).first()
+    before = getattr(instance, '_trends_before', None) or (None, None)
+    instance._trends_before = None
+    # From the earlier of the previous and new dates, per enterprise.
+    stale = {}
+    for enterprise, test_date in ((enterprise_id, instance.test_date), before):
+        if enterprise is not None:
+            stale[enterprise] = min(test_date, stale.get(enterprise, test_date))
+    for enterprise, test_date in stale.items():
+        transaction.on_commit(partial(metal_trends.invalidate, enterprise, test_date))
+
+
+@receiver(post_save, sender=Worker)
+def invalidate_metal_trends_on_worker_change(sender, instance, created, **kwargs):
+    """Cohorts are grouped by enterprise and work site: a worker moving changes them."""
+    before = None if created else getattr(instance, '_loaded_placement', ...)
+    after = instance.placement
+    instance._loaded_placement = after
+    if created or before == after:
+        return
+    # Previous placement unknown: only the current enterprise can be dropped.
+    enterprises = {after[0]} | ({before[0]} if before is not ... else set())
+    for enterprise_id in enterprises:
+        transaction.on_commit(partial(metal_trends.invalidate, enterprise_id))
+
+
+# ==================== DELTA SYNC ====================
+# Workers and examinations are kept offline by the mobile app, which pulls
+# their changes from GET /api/v1/sync/ (see apps.core.sync).
+
+sync.register(
+    'workers', Worker, 'apps.occupational_health.serializers.WorkerListSerializer',
+    select_related=['enterprise', 'work_site'],
+)
+sync.register(
+    'exams', MedicalExamination, 'apps.occupational_health.serializers.MedicalExaminationListSerializer',
+    select_related=['worker__enterprise', 'examining_doctor'],
+)
@@ -0,0 +1,313 @@
+"""
+Spirometry reference values and FEV1 decline at population scale (NumPy).
+
+``load`` reads the spirometries of a queryset (one query, with the height
+measured at the same examination) into arrays; ``analyze`` then computes,
+for every test at once:
+
+* **predicted values and LLN** of FEV1, FVC (L) and FEV1/FVC (%) from the
+  NHANES III equations (Hankinson et al., 1999): ``b0 + b1·age + b2·age² +
+  c·height²``, with a lower limit of normal (LLN, 5th percentile) equation
+  per parameter.  Results are expressed the GLI way: percent predicted and
+  z-score, the standard deviation being ``(predicted - LLN) / 1.645``;
+* the **LLN pattern**: obstructive (FEV1/FVC < LLN), restrictive pattern
+  (FVC < LLN) or mixed;
+* the **FEV1 decline** of each test against the worker's baseline (first
+  test with FEV1 and predicted value), beyond the decline expected from
+  ageing, and the least-squares FEV1 slope (mL/year) over the worker's tests
+  up to that one.  A decline of 15 % or more (ACOEM 2014), or a slope of
+  60 mL/year or more over at least 2 years and 3 tests, is *excessive*.
+
+The height is the one of the examination's vital signs, else the worker's
+average measured height; without height there are no predicted values.
+``write_back`` stores the changed results with ``bulk_update``.  Tests saved
+through the API are analyzed with the other tests of their worker after the
+commit (``signals.py``); run ``python manage.py analyze_spirometry`` after
+imports.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SpirometryResult
+
+PARAMETERS = ('fev1', 'fvc', 'fev1_fvc')
+MEASURED_FIELDS = ['fev1_pre', 'fvc_pre', 'fev1_fvc_ratio_pre']
+FEV1, FVC, RATIO = range(3)
+
+Z_LLN = 1.645
+DECLINE_PERCENT = 15
+DECLINE_ML_YEAR = 60
+SLOPE_MIN_TESTS = 3
+SLOPE_MIN_YEARS = 2
+
+# NHANES III (Hankinson 1999), Caucasian: per sex and age group, per
+# parameter (FEV1, FVC, FEV1/FVC): b0, b1, b2, c predicted, c LLN, LLN offset.
+# Adult equations from 20 years (men) and 18 years (women).
+ADULT_AGE = {'male': 20, 'female': 18}
+COEFFICIENTS = np.array([
+    [  # male
+        [  # < 20 years
+            [-0.7453, -0.04106, 0.004477, 0.00014098, 0.00011607, 0],
+            [-0.2584, -0.20415, 0.010133, 0.00018642, 0.00015695, 0],
+            [88.066, -0.2066, 0, 0, 0, 9.678],
+        ],
+        [
+            [0.5536, -0.01303, -0.000172, 0.00014098, 0.00011607, 0],
+            [-0.1933, 0.00064, -0.000269, 0.00018642, 0.00015695, 0],
+            [88.066, -0.2066, 0, 0, 0, 9.678],
+        ],
+    ],
+    [  # female
+        [  # < 18 years
+            [-0.8710, 0.06537, 0, 0.00011496, 0.00009283, 0],
+            [-1.2082, 0.05916, 0, 0.00014815, 0.00012198, 0],
+            [90.809, -0.2125, 0, 0, 0, 9.502],
+        ],
+        [
+            [0.4333, -0.00361, -0.000194, 0.00011496, 0.00009283, 0],
+            [-0.3560, 0.01870, -0.000382, 0.00014815, 0.00012198, 0],
+            [90.809, -0.2125, 0, 0, 0, 9.502],
+        ],
+    ],
+])
+
+# Fields written by write_back.
+RESULT_FIELDS = [
+    'fev1_predicted', 'fev1_lln', 'fev1_percent_predicted', 'fev1_z_score',
+    'fvc_predicted', 'fvc_lln', 'fvc_percent_predicted', 'fvc_z_score',
+    'fev1_fvc_lln', 'fev1_fvc_z_score', 'lln_pattern',
+    'fev1_decline_percent', 'fev1_decline_ml_year', 'excessive_fev1_decline',
+]
+
+
+@dataclass
+class Spirometries:
+    """Spirometries sorted by worker and date, one row per test."""
+    ids: np.ndarray            # SpirometryResult pks
+    workers: np.ndarray        # worker code (0..number of workers - 1)
+    worker_ids: np.ndarray     # Worker pk of each code
+    days: np.ndarray           # exam date, days since 1970-01-01
+    ages: np.ndarray           # decimal years at the test
+    female: np.ndarray
+    heights: np.ndarray        # cm, NaN when unknown
+    measured: np.ndarray       # (tests, PARAMETERS), NaN when not measured
+    stored: dict               # RESULT_FIELDS as stored, for write_back
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load(queryset):
+    """Spirometries of ``queryset`` (SpirometryResult) as arrays, in one query."""
+    rows = list(queryset.order_by(
+        'examination__worker_id', 'examination__exam_date', 'test_date', 'pk',
+    ).values_list(
+        'pk', 'examination__worker_id', 'examination__exam_date',
+        'examination__worker__date_of_birth', 'examination__worker__gender',
+        'examination__vital_signs__height', *MEASURED_FIELDS, *RESULT_FIELDS,
+    ))
+    columns = list(zip(*rows)) if rows else [()] * (6 + len(MEASURED_FIELDS) + len(RESULT_FIELDS))
+    pks, worker_ids, exam_dates, births, genders, heights = columns[:6]
+    stored = dict(zip(RESULT_FIELDS, (list(column) for column in columns[6 + len(MEASURED_FIELDS):])))
+
+    worker_ids, workers = np.unique(np.array(worker_ids, dtype=object), return_inverse=True)
+    workers = workers.reshape(-1)
+    days = np.array(exam_dates, dtype='datetime64[D]').astype(np.int64)
+    birth_days = np.array(births, dtype='datetime64[D]').astype(np.int64)
+    measured = np.array(columns[6:6 + len(MEASURED_FIELDS)], dtype=float).T.reshape(len(rows), len(PARAMETERS))
+    # FEV1/FVC from the volumes when it was not entered.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = 100 * measured[:, FEV1] / measured[:, FVC]
+    measured[:, RATIO] = np.where(np.isnan(measured[:, RATIO]), ratio, measured[:, RATIO])
+
+    heights = np.array(heights, dtype=float)
+    known = ~np.isnan(heights)
+    # Tests without height: the worker's average measured height.
+    totals = np.bincount(workers[known], weights=heights[known], minlength=len(worker_ids))
+    counts = np.bincount(workers[known], minlength=len(worker_ids))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average = totals / counts
+    heights = np.where(known, heights, average[workers])
+    return Spirometries(
+        ids=np.array(pks, dtype=object),
+        workers=workers,
+        worker_ids=worker_ids,
+        days=days,
+        ages=(days - birth_days) / 365.25,
+        female=np.array(genders, dtype=object) == 'female',
+        heights=heights,
+        measured=measured,
+        stored=stored,
+    )
+
+
+@dataclass
+class Analysis:
+    spirometries: Spirometries
+    predicted: np.ndarray      # (tests, PARAMETERS), NaN without height
+    lln: np.ndarray
+    z_scores: np.ndarray
+    percent_predicted: np.ndarray
+    patterns: np.ndarray       # lln_pattern, '' when not computable
+    baseline: np.ndarray       # row of the worker's baseline, -1 without one
+    decline_percent: np.ndarray
+    decline_ml_year: np.ndarray
+    excessive_decline: np.ndarray
+
+
+def reference(ages, female, heights):
+    """Predicted values and LLN of PARAMETERS, each ``(tests, PARAMETERS)``."""
+    adult = ages >= np.where(female, ADULT_AGE['female'], ADULT_AGE['male'])
+    b0, b1, b2, c_predicted, c_lln, offset = np.moveaxis(
+        COEFFICIENTS[female.astype(int), adult.astype(int)], 2, 0,
+    )
+    age, height_squared = ages[:, None], (heights ** 2)[:, None]
+    base = b0 + b1 * age + b2 * age ** 2
+    predicted = base + c_predicted * height_squared
+    lln = base + c_lln * height_squared - offset
+    # Heights or ages far outside the equations' range.
+    invalid = (predicted <= 0) | (lln <= 0) | (lln >= predicted)
+    return np.where(invalid, np.nan, predicted), np.where(invalid, np.nan, lln)
+
+
+def patterns(measured, lln):
+    """``lln_pattern`` of each test, '' when FEV1/FVC or FVC cannot be compared."""
+    with np.errstate(invalid='ignore'):
+        obstructive = measured[:, RATIO] < lln[:, RATIO]
+        restrictive = measured[:, FVC] < lln[:, FVC]
+    labels = np.array(['normal', 'obstructive', 'restrictive', 'mixed'], dtype=object)
+    result = labels[obstructive.astype(int) + 2 * restrictive.astype(int)]
+    result[np.isnan(measured[:, [FVC, RATIO]]).any(axis=1) | np.isnan(lln[:, [FVC, RATIO]]).any(axis=1)] = ''
+    return result
+
+
+def _first_rows(workers, candidates):
+    """Row of the first candidate of each test's worker, -1 without one (rows sorted by worker)."""
+    first = np.full(workers.max() + 1 if len(workers) else 0, -1)
+    rows = np.flatnonzero(candidates)
+    codes, positions = np.unique(workers[rows], return_index=True)
+    first[codes] = rows[positions]
+    return first[workers]
+
+
+def slopes(spirometries, valid):
+    """
+    Least-squares FEV1 slope (mL/year) over the worker's ``valid`` tests up to
+    each test, and the number of tests and years it spans.
+    """
+    workers, fev1 = spirometries.workers, spirometries.measured[:, FEV1]
+    starts = _first_rows(workers, np.ones(len(workers), dtype=bool))
+    years = (spirometries.days - spirometries.days[starts]) / 365.25
+    weight = valid.astype(float)
+    y = np.where(valid, fev1, 0.0)
+    # Running sums per worker: cumulative sums less those before the worker's first row.
+    sums = np.vstack([weight, weight * years, weight * y, weight * years ** 2, weight * years * y])
+    cumulative = np.hstack([np.zeros((5, 1)), np.cumsum(sums, axis=1)])
+    n, t, v, tt, tv = cumulative[:, 1:] - cumulative[:, starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * tv - t * v) / (n * tt - t ** 2)
+    first = _first_rows(workers, valid)
+    span = np.where(first >= 0, years - years[np.maximum(first, 0)], 0)
+    return slope * 1000, n, span
+
+
+def analyze(spirometries):
+    measured = spirometries.measured
+    predicted, lln = reference(spirometries.ages, spirometries.female, spirometries.heights)
+    deviation = (predicted - lln) / Z_LLN
+    z_scores = (measured - predicted) / deviation
+    percent_predicted = 100 * measured / predicted
+
+    # Decline against the baseline, beyond the expected (predicted) decline.
+    valid = ~np.isnan(measured[:, FEV1]) & ~np.isnan(predicted[:, FEV1])
+    baseline = _first_rows(spirometries.workers, valid)
+    reference_row = np.maximum(baseline, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = measured[reference_row, FEV1] * predicted[:, FEV1] / predicted[reference_row, FEV1]
+        decline_percent = 100 * (expected - measured[:, FEV1]) / expected
+    decline_percent[~valid | (baseline == np.arange(len(spirometries)))] = np.nan
+
+    slope, tests, span = slopes(spirometries, ~np.isnan(measured[:, FEV1]))
+    decline_ml_year = -slope
+    decline_ml_year[np.isnan(measured[:, FEV1]) | (tests < SLOPE_MIN_TESTS) | (span < SLOPE_MIN_YEARS)] = np.nan
+
+    with np.errstate(invalid='ignore'):
+        excessive = (decline_percent >= DECLINE_PERCENT) | (decline_ml_year >= DECLINE_ML_YEAR)
+    return Analysis(
+        spirometries=spirometries,
+        predicted=predicted,
+        lln=lln,
+        z_scores=z_scores,
+        percent_predicted=percent_predicted,
+        patterns=patterns(measured, lln),
+        baseline=baseline,
+        decline_percent=decline_percent,
+        decline_ml_year=decline_ml_year,
+        excessive_decline=excessive,
+    )
+
+
+def _decimal(value, field):
+    """``value`` rounded for the model ``field``; ``None`` when missing or too large to store."""
+    if not np.isfinite(value):
+        return None
+    field = SpirometryResult._meta.get_field(field)
+    value = Decimal(f'{value:.{field.decimal_places}f}')
+    return value if len(value.as_tuple().digits) <= field.max_digits else None
+
+
+def results(analysis, index):
+    """RESULT_FIELDS values of a test."""
+    values = {}
+    for parameter, name in enumerate(PARAMETERS):
+        values[f'{name}_lln'] = analysis.lln[index, parameter]
+        values[f'{name}_z_score'] = analysis.z_scores[index, parameter]
+        if parameter != RATIO:
+            values[f'{name}_predicted'] = analysis.predicted[index, parameter]
+            values[f'{name}_percent_predicted'] = analysis.percent_predicted[index, parameter]
+    values['fev1_decline_percent'] = analysis.decline_percent[index]
+    values['fev1_decline_ml_year'] = analysis.decline_ml_year[index]
+    values = {field: _decimal(value, field) for field, value in values.items()}
+    values['lln_pattern'] = analysis.patterns[index]
+    values['excessive_fev1_decline'] = bool(analysis.excessive_decline[index])
+    return values
+
+
+def write_back(analysis, batch_size=2000):
+    """Store the results that changed (``bulk_update``); returns the number of tests updated."""
+    spirometries = analysis.spirometries
+    now = timezone.now()
+    changed = []
+    for index in range(len(spirometries)):
+        values = results(analysis, index)
+        if any(spirometries.stored[field][index] != value for field, value in values.items()):
+            changed.append(SpirometryResult(pk=spirometries.ids[index], analyzed_at=now, **values))
+    with transaction.atomic():
+        SpirometryResult.objects.bulk_update(changed, [*RESULT_FIELDS, 'analyzed_at'], batch_size=batch_size)
+    return len(changed)
+
+
+def analyze_queryset(queryset, write=True):
+    """Load, analyze and (unless ``write`` is false) store; returns ``(analysis, updated)``."""
+    analysis = analyze(load(queryset))
+    return analysis, (write_back(analysis) if write else 0)
+
+
+def analyze_worker(worker_id):
+    """Analyze and store the spirometries of one worker (decline depends on its baseline)."""
+    return analyze_queryset(SpirometryResult.objects.filter(examination__worker_id=worker_id))
+
+
+def decline_alerts(queryset):
+    """Latest test of each worker of ``queryset`` when it shows an excessive FEV1 decline."""
+    latest = queryset.order_by(
+        'examination__worker_id', '-examination__exam_date', '-test_date', '-pk',
+    ).distinct('examination__worker_id').values('pk')
+    return SpirometryResult.objects.filter(pk__in=latest, excessive_fev1_decline=True).select_related(
+        'examination__worker',
+    ).order_by(F('fev1_decline_percent').desc(nulls_last=True), 'examination__worker__last_name')
@@ -10,16 +10,19 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase
+from apps.core.querybudget import QueryBudgetTestMixin, QueryRecorder
 from rest_framework import status
 from datetime import date, timedelta
 from decimal import Decimal
+from unittest import mock
 
 from .models import (
     Enterprise, WorkSite, Worker, MedicalExamination, 
     VitalSigns, FitnessCertificate, WorkplaceIncident,
     OccupationalDisease, OccupationalDiseaseType,
-    SiteHealthMetrics
+    SiteHealthMetrics, AudiometryResult, SpirometryResult, HeavyMetalsTest, HeavyMetalsTrendSnapshot
 )
+from . import audiometry, metal_trends, spirometry
 
 User = get_user_model()
 
@@ -547,4 +550,992 @@ class SiteHealthMetricsTests(TestCase):
         
         # Fitness rate = (fit + fit_with_restrictions) / total * 100
         expected_rate = (80 + 15) / 100 * 100  # = 95.0%
-        self.assertEqual(metrics.fitness_rate, expected_rate)
\ No newline at end of file
+        self.assertEqual(metrics.fitness_rate, expected_rate)
+
+# ==================== PROTOCOL TREE SYNC TESTS ====================
+
+def _api_user(suffix="1"):
+    """Active user attached to an organization (audit logging needs an email)."""
+    from apps.organizations.models import Organization
+
+    organization = Organization.objects.create(
+        name=f"Clinique OH {suffix}",
+        type="hospital",
+        registration_number=f"OH-REG-{suffix}-{timezone.now().timestamp()}",
+        address="Avenue de la Mine",
+        city="Kolwezi",
+        phone=f"+243870000{suffix.zfill(3)}",
+        email=f"oh{suffix}@test.cd",
+        director_name="Dr Travail",
+    )
+    user = User.objects.create(
+        phone=f"+243880000{suffix.zfill(3)}",
+        email=f"oh.user{suffix}@test.cd",
+        first_name="Médecin",
+        last_name=f"Travail{suffix}",
+        primary_role="occupational_doctor",
+        organization=organization,
+    )
+    user.set_password('testpass123')
+    user.save()
+    return user
+
+
+class ProtocolTreeSyncTests(APITestCase):
+    """Versioned protocol tree: ETag, 304 and since_version deltas"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import OccSector, OccDepartment, OccPosition, ExamVisitProtocol
+
+        cache.clear()
+        self.client.force_authenticate(user=_api_user())
+        self.url = '/api/v1/occupational-health/protocols/sectors/tree/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sector = OccSector.objects.create(code='MIN', name='Minier', industry_sector_key='mining')
+            self.department = OccDepartment.objects.create(
+                sector=self.sector, code='MIN_UNDER', name='Mine Souterraine'
+            )
+            self.position = OccPosition.objects.create(
+                department=self.department, code='FOREUR', name='Foreur'
+            )
+            self.protocol = ExamVisitProtocol.objects.create(
+                position=self.position, visit_type='pre_employment'
+            )
+
+    def test_full_tree_carries_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        tree = response.json()
+        self.assertEqual(tree[0]['code'], 'MIN')
+        position = tree[0]['departments'][0]['positions'][0]
+        self.assertEqual(position['protocol_count'], 1)
+        self.assertEqual(position['protocols'][0]['id'], self.protocol.id)
+
+    def test_if_none_match_returns_304_until_tree_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.position.name = 'Foreur / Dynamiteur'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.position.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_since_version_returns_only_changed_nodes(self):
+        from .models import OccPosition
+
+        version = int(self.client.get(self.url)['X-Tree-Version'])
+        with self.captureOnCommitCallbacks(execute=True):
+            new_position = OccPosition.objects.create(
+                department=self.department, code='MINEUR', name='Mineur Souterrain'
+            )
+        protocol_id = self.protocol.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.protocol.delete()
+
+        delta = self.client.get(self.url, {'since_version': version}).json()
+        self.assertFalse(delta['full'])
+        self.assertEqual(delta['sectors'], [])
+        self.assertEqual(delta['departments'], [])
+        self.assertEqual(
+            sorted(p['id'] for p in delta['positions']),
+            sorted([self.position.id, new_position.id]),
+        )
+        self.assertEqual(delta['deleted']['protocols'], [protocol_id])
+
+    def test_since_current_version_is_empty(self):
+        version = int(self.client.get(self.url)['X-Tree-Version'])
+        delta = self.client.get(self.url, {'since_version': version}).json()
+        self.assertEqual(delta['positions'], [])
+        self.assertEqual(delta['deleted']['sectors'], [])
+
+    def test_invalid_since_version_is_rejected(self):
+        response = self.client.get(self.url, {'since_version': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_snapshot_is_rebuilt_after_change(self):
+        self.client.get(self.url)
+        self.sector.name = 'Secteur Minier'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sector.save()
+        self.assertEqual(self.client.get(self.url).json()[0]['name'], 'Secteur Minier')
+
+    def test_changes_are_versioned_once_committed(self):
+        from . import protocol_tree
+
+        version = protocol_tree.current_version()
+        self.sector.name = 'Secteur Minier'
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.sector.save()
+        # Not committed yet: invisible to clients holding the current version.
+        self.assertEqual(protocol_tree.current_version(), version)
+        self.assertEqual(protocol_tree.get_delta(version, version)['sectors'], [])
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(protocol_tree.current_version(), version)
+        delta = protocol_tree.get_delta(version, protocol_tree.current_version())
+        self.assertEqual([s['id'] for s in delta['sectors']], [self.sector.id])
+
+
+def _enterprise(user, suffix="1"):
+    return Enterprise.objects.create(
+        name=f"Minière Budget {suffix}",
+        sector="mining",
+        rccm=f"RCCM-QB-{suffix}",
+        nif=f"NIF-QB-{suffix}",
+        address="Route de Likasi",
+        contact_person="Jean Mukendi",
+        phone="+243123456789",
+        email=f"budget{suffix}@mine.cd",
+        contract_start_date=date.today(),
+        created_by=user,
+    )
+
+
+def _worker(enterprise, user, index):
+    return Worker.objects.create(
+        employee_id=f"QB{index:03d}",
+        first_name="Ouvrier",
+        last_name=f"Budget{index}",
+        date_of_birth=date(1985, 5, 15),
+        gender="male",
+        enterprise=enterprise,
+        job_category="machine_operator",
+        job_title="Opérateur",
+        hire_date=date.today(),
+        phone="+243123456789",
+        address="Cité Gécamines",
+        emergency_contact_name="Contact",
+        emergency_contact_phone="+243987654321",
+        created_by=user,
+    )
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, APITestCase):
+    """List endpoints must not issue per-row queries."""
+
+    def setUp(self):
+        from .models import ExposureReading, OverexposureAlert
+
+        self.user = _api_user("qb")
+        self.client.force_authenticate(self.user)
+        enterprise = _enterprise(self.user)
+        for index in range(6):
+            worker = _worker(enterprise, self.user, index)
+            for _ in range(2):
+                OverexposureAlert.objects.create(
+                    worker=worker, exposure_type='silica_dust',
+                    exposure_level=Decimal('0.08'), exposure_threshold=Decimal('0.05'),
+                    unit_measurement='mg/m³',
+                )
+            ExposureReading.objects.create(
+                worker=worker, enterprise=enterprise, exposure_type='noise',
+                exposure_value=Decimal('80'), unit_measurement='dB(A)',
+                source_type='manual_entry', measured_by=self.user,
+            )
+            MedicalExamination.objects.create(
+                worker=worker, exam_type='periodic', exam_date=date.today(),
+                examining_doctor=self.user,
+            )
+
+    def test_overexposure_alert_list(self):
+        response = self.assertWithinQueryBudget('get', '/api/v1/occupational-health/overexposure-alerts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(row['recurrence_count'] == 1 for row in response.data['results']))
+
+    def test_exposure_reading_list(self):
+        response = self.assertWithinQueryBudget('get', '/api/v1/occupational-health/exposure-readings/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_medical_examination_list(self):
+        response = self.assertWithinQueryBudget('get', '/api/v1/occupational-health/examinations/')
+        self.assertEqual(response.status_code, 200)
+
+
+class AnnotatedFieldTests(QueryBudgetTestMixin, APITestCase):
+    """Per-row counts come from queryset annotations, not per-row queries."""
+
+    def setUp(self):
+        self.user = _api_user("an")
+        self.client.force_authenticate(self.user)
+        self.enterprises = []
+        for number in range(4):
+            enterprise = _enterprise(self.user, f"an{number}")
+            for index in range(number + 1):
+                worker = _worker(enterprise, self.user, number * 10 + index)
+                MedicalExamination.objects.create(
+                    worker=worker, exam_type='periodic',
+                    exam_date=date.today() - timedelta(days=index), examining_doctor=self.user,
+                )
+            self.enterprises.append(enterprise)
+        self.worker = Worker.objects.get(employee_id="QB031")
+        self.worker.employment_status = 'terminated'
+        self.worker.save()
+
+    def test_enterprise_list_worker_counts(self):
+        response = self.assertWithinQueryBudget('get', '/api/v1/occupational-health/enterprises/')
+        self.assertEqual(response.status_code, 200)
+        counts = {row['id']: row['worker_count'] for row in response.data['results']}
+        for number, enterprise in enumerate(self.enterprises):
+            self.assertEqual(counts[enterprise.id], number + 1)
+
+    def test_enterprise_detail_counts(self):
+        enterprise = self.enterprises[3]
+        response = self.assertWithinQueryBudget(
+            'get', f'/api/v1/occupational-health/enterprises/{enterprise.id}/'
+        )
+        self.assertEqual(response.data['worker_count'], 4)
+        self.assertEqual(response.data['active_workers'], 3)
+
+    def test_worker_detail_counts(self):
+        response = self.assertWithinQueryBudget(
+            'get', f'/api/v1/occupational-health/workers/{self.worker.id}/'
+        )
+        self.assertEqual(response.data['exam_count'], 1)
+        self.assertEqual(response.data['last_exam_date'], str(date.today() - timedelta(days=1)))
+        self.assertEqual(response.data['incident_count'], 0)
+
+    def test_worker_list(self):
+        response = self.assertWithinQueryBudget('get', '/api/v1/occupational-health/workers/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unannotated_instance_falls_back_to_source(self):
+        from .serializers import EnterpriseDetailSerializer
+
+        data = EnterpriseDetailSerializer(self.enterprises[3]).data
+        self.assertEqual(data['worker_count'], 4)
+        self.assertEqual(data['active_workers'], 3)
+
+
+def _fetched_bytes(queryset):
+    """Size of the column values ``queryset`` reads for its main query."""
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(len(str(value)) for row in cursor.fetchall() for value in row)
+
+
+class QuerysetProfileTests(QueryBudgetTestMixin, APITestCase):
+    """Per-action queryset profiles shrink list queries, not list payloads."""
+
+    def setUp(self):
+        from .models import ExposureReading, RiskHeatmapData
+
+        self.user = _api_user("qp")
+        self.client.force_authenticate(self.user)
+        enterprise = _enterprise(self.user, "qp")
+        workers = [_worker(enterprise, self.user, 100 + index) for index in range(5)]
+        for worker in workers:
+            worker.allergies = "Pénicilline " * 20
+            worker.medications = "Paracétamol " * 20
+            worker.save()
+            MedicalExamination.objects.create(
+                worker=worker, exam_type='periodic', exam_date=date.today(),
+                examining_doctor=self.user,
+            )
+            ExposureReading.objects.create(
+                worker=worker, enterprise=enterprise, exposure_type='noise',
+                exposure_value=Decimal('87'), unit_measurement='dB(A)',
+                source_type='manual_entry', measured_by=self.user,
+            )
+        for probability in (2, 4):
+            heatmap = RiskHeatmapData.objects.create(
+                enterprise=enterprise, probability_level=probability, severity_level=3,
+            )
+            heatmap.workers_exposed.set(workers[:probability])
+
+    def _assert_same_payload(self, viewset, url):
+        response = self.assertWithinQueryBudget('get', url)
+        self.assertEqual(response.status_code, 200)
+        with mock.patch.object(viewset, 'queryset_profiles', {}):
+            unprofiled = self.client.get(url)
+        # Rows tied on the ordering may come back in either order.
+        by_id = lambda payload: {row['id']: row for row in payload['results']}
+        self.assertEqual(by_id(response.json()), by_id(unprofiled.json()))
+        return response
+
+    def test_list_payloads_unchanged(self):
+        from . import views
+
+        self._assert_same_payload(views.WorkerViewSet, '/api/v1/occupational-health/workers/')
+        self._assert_same_payload(views.MedicalExaminationViewSet, '/api/v1/occupational-health/examinations/')
+        self._assert_same_payload(views.ExposureReadingViewSet, '/api/v1/occupational-health/exposure-readings/')
+        response = self._assert_same_payload(
+            views.RiskHeatmapDataViewSet, '/api/v1/occupational-health/risk-heatmap-data/'
+        )
+        self.assertEqual(
+            sorted(len(row['workers_list']) for row in response.data['results']), [2, 4]
+        )
+
+    def test_list_profiles_fetch_fewer_bytes(self):
+        from .models import ExposureReading
+        from . import views
+
+        cases = [
+            (views.WorkerViewSet, Worker.objects.select_related('enterprise', 'work_site', 'created_by')),
+            (views.MedicalExaminationViewSet, MedicalExamination.objects.select_related(
+                'worker', 'worker__enterprise', 'worker__work_site', 'examining_doctor')),
+            (views.ExposureReadingViewSet, ExposureReading.objects.select_related(
+                'worker__enterprise', 'measured_by', 'reviewed_by', 'related_alert')),
+        ]
+        for viewset, queryset in cases:
+            profiled = viewset.queryset_profiles['list'].apply(queryset)
+            self.assertLess(_fetched_bytes(profiled), _fetched_bytes(queryset), viewset.__name__)
+
+
+class WorkerSearchTests(APITestCase):
+
+    def setUp(self):
+        self.user = _api_user("ws")
+        self.client.force_authenticate(self.user)
+        enterprise = _enterprise(self.user, "ws")
+        self.workers = [_worker(enterprise, self.user, 200 + index) for index in range(3)]
+
+    def test_search_by_employee_id_and_name(self):
+        url = '/api/v1/occupational-health/workers/'
+        response = self.client.get(url, {'search': 'QB201'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.workers[1].id])
+        response = self.client.get(url, {'search': 'budget202', 'ordering': '-hire_date'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.workers[2].id])
+        response = self.client.get(url, {'search': 'Ouvrier'})
+        self.assertEqual(response.data['count'], 3)
+
+
+def _main_select(recorder, table):
+    """SQL of the first SELECT reading rows of ``table``."""
+    return next(
+        sql for sql, _ in recorder.queries
+        if sql.startswith('SELECT') and f'FROM "{table}"' in sql and 'COUNT(' not in sql
+    )
+
+
+class SparseFieldsetTests(APITestCase):
+    """?fields= / ?omit= prune the serializer and the list query."""
+
+    def setUp(self):
+        from .models import VitalSigns
+
+        self.user = _api_user("sf")
+        self.client.force_authenticate(self.user)
+        enterprise = _enterprise(self.user, "sf")
+        self.workers = [_worker(enterprise, self.user, 300 + index) for index in range(3)]
+        self.exam = MedicalExamination.objects.create(
+            worker=self.workers[0], exam_type='periodic', exam_date=date.today(),
+            examining_doctor=self.user,
+        )
+        VitalSigns.objects.create(
+            examination=self.exam, systolic_bp=120, diastolic_bp=80, heart_rate=70,
+            height=Decimal('175'), weight=Decimal('72'), recorded_by=self.user,
+        )
+
+    def _get(self, url, **params):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response, recorder
+
+    def test_worker_list_loads_requested_columns_only(self):
+        url = '/api/v1/occupational-health/workers/'
+        full, full_queries = self._get(url)
+        sparse, sparse_queries = self._get(url, fields='id,full_name,enterprise_name,sector_risk_level')
+
+        full_rows = {row['id']: row for row in full.json()['results']}
+        for row in sparse.json()['results']:
+            self.assertEqual(set(row), {'id', 'full_name', 'enterprise_name', 'sector_risk_level'})
+            self.assertEqual(row, {key: full_rows[row['id']][key] for key in row})
+
+        full_sql = _main_select(full_queries, 'occupational_health_worker')
+        sparse_sql = _main_select(sparse_queries, 'occupational_health_worker')
+        self.assertIn('occupational_health_worksite', full_sql)
+        self.assertNotIn('occupational_health_worksite', sparse_sql)
+        self.assertNotIn('"job_title"', sparse_sql)
+        self.assertLess(len(sparse_sql), len(full_sql))
+        self.assertLessEqual(sparse_queries.count, full_queries.count)
+
+    def test_omit_drops_fields(self):
+        url = '/api/v1/occupational-health/examinations/'
+        response, recorder = self._get(url, omit='worker_name,enterprise_name,examining_doctor_name')
+        row = response.json()['results'][0]
+        self.assertNotIn('worker_name', row)
+        self.assertEqual(row['exam_number'], self.exam.exam_number)
+        sql = _main_select(recorder, 'occupational_health_medicalexamination')
+        self.assertNotIn('JOIN "users"', sql)
+        self.assertNotIn('occupational_health_enterprise', sql)
+
+    def test_detail_drops_unused_prefetches(self):
+        url = f'/api/v1/occupational-health/examinations/{self.exam.pk}/'
+        full, full_queries = self._get(url)
+        sparse, sparse_queries = self._get(url, fields='id,worker_name,vital_signs')
+        self.assertEqual(set(sparse.data), {'id', 'worker_name', 'vital_signs'})
+        self.assertEqual(sparse.data['vital_signs'], full.data['vital_signs'])
+        self.assertLess(sparse_queries.count, full_queries.count)
+
+    def test_unresolvable_fields_keep_full_query(self):
+        from apps.core import fieldsets
+        from .serializers import AudiometryResultSerializer
+        from .models import AudiometryResult
+
+        # SerializerMethodField: the columns it reads are unknown.
+        self.assertIsNone(fieldsets.serializer_paths(AudiometryResultSerializer(), AudiometryResult))
+        serializer = fieldsets.prune_serializer(AudiometryResultSerializer(), fields=['id', 'tested_by_name'])
+        self.assertEqual(
+            fieldsets.serializer_paths(serializer, AudiometryResult),
+            {'id', 'tested_by__first_name', 'tested_by__last_name'},
+        )
+
+    def test_writes_ignore_fieldsets(self):
+        url = '/api/v1/occupational-health/examinations/?fields=id'
+        response = self.client.post(url, {
+            'worker': self.workers[1].pk, 'exam_type': 'periodic', 'exam_date': str(date.today()),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertIn('exam_type', response.data)
+
+
+class BatchOperationsTests(APITestCase):
+    """A clinic visit posted as one transactional batch."""
+
+    url = '/api/v1/occupational-health/batch/'
+
+    def setUp(self):
+        self.user = _api_user("bt")
+        self.client.force_authenticate(self.user)
+        self.worker = _worker(_enterprise(self.user, "bt"), self.user, 1)
+
+    def _exam_operation(self):
+        return {
+            'op': 'create', 'resource': 'examinations', 'temp_id': 'exam',
+            'data': {'worker': self.worker.pk, 'exam_type': 'periodic', 'exam_date': str(date.today())},
+        }
+
+    def _vitals_operation(self, **data):
+        return {
+            'op': 'create', 'resource': 'vital-signs', 'temp_id': 'vitals',
+            'data': {
+                'examination': '$exam', 'systolic_bp': 125, 'diastolic_bp': 80,
+                'heart_rate': 72, 'height': '172.0', 'weight': '70.0', **data,
+            },
+        }
+
+    def test_clinic_visit_in_one_request(self):
+        response = self.client.post(self.url, {'operations': [
+            self._exam_operation(),
+            self._vitals_operation(),
+            {'op': 'create', 'resource': 'physical-examinations',
+             'data': {'examination': '$exam', 'physical_exam_normal': True}},
+            {'op': 'update', 'resource': 'vital-signs', 'id': '$vitals', 'data': {'heart_rate': 80}},
+            {'op': 'update', 'resource': 'examinations', 'id': '$exam',
+             'data': {'results_summary': 'RAS'}},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertTrue(response.data['committed'])
+        self.assertEqual([r['status'] for r in response.data['results']], [201, 201, 201, 200, 200])
+        exam = MedicalExamination.objects.get(pk=response.data['ids']['exam'])
+        self.assertEqual(exam.worker, self.worker)
+        self.assertEqual(exam.results_summary, 'RAS')
+        # The viewsets' perform_create hooks still apply.
+        self.assertEqual(exam.vital_signs.recorded_by, self.user)
+        self.assertEqual(exam.vital_signs.heart_rate, 80)
+        self.assertEqual(exam.physical_exam.performed_by, self.user)
+
+    def test_failing_operation_rolls_back_the_batch(self):
+        response = self.client.post(self.url, {'operations': [
+            self._exam_operation(),
+            self._vitals_operation(systolic_bp=None),
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['committed'])
+        self.assertEqual(response.data['failed_index'], 1)
+        self.assertIn('systolic_bp', response.data['errors'])
+        self.assertFalse(MedicalExamination.objects.filter(worker=self.worker).exists())
+
+    def test_delete_and_missing_objects(self):
+        exam = MedicalExamination.objects.create(
+            worker=self.worker, exam_type='periodic', exam_date=date.today(),
+        )
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'delete', 'resource': 'examinations', 'id': exam.pk},
+            {'op': 'delete', 'resource': 'vital-signs', 'id': 999999},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['failed_index'], 1)
+        self.assertTrue(MedicalExamination.objects.filter(pk=exam.pk).exists())
+
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'delete', 'resource': 'examinations', 'id': exam.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['status'], 204)
+        self.assertFalse(MedicalExamination.objects.filter(pk=exam.pk).exists())
+
+    def test_invalid_operations(self):
+        self.assertEqual(self.client.post(self.url, {'operations': []}, format='json').status_code, 400)
+        response = self.client.post(self.url, {'operations': [
+            {'op': 'create', 'resource': 'workers', 'data': {}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('resource', response.data['errors'])
+
+
+class VitalSignTrendsTests(APITestCase):
+    """Vital sign series of a worker across examinations."""
+
+    url = '/api/v1/occupational-health/vital-signs/trends/'
+
+    def setUp(self):
+        self.user = _api_user("vt")
+        self.client.force_authenticate(self.user)
+        self.worker = _worker(_enterprise(self.user, "vt"), self.user, 1)
+        for systolic in (120, 135, 150):
+            examination = MedicalExamination.objects.create(
+                worker=self.worker, exam_type='periodic', exam_date=date.today(), examining_doctor=self.user,
+            )
+            VitalSigns.objects.create(
+                examination=examination, systolic_bp=systolic, diastolic_bp=80, heart_rate=70,
+                height=Decimal('170.0'), weight=Decimal('70.0'), recorded_by=self.user,
+            )
+
+    def test_worker_series(self):
+        response = self.client.get(self.url, {
+            'worker': self.worker.pk, 'method': 'lttb', 'parameters': 'systolic_bp',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['series']['systolic_bp']['v'], [120.0, 135.0, 150.0])
+
+        response = self.client.get(self.url, {'worker': self.worker.pk, 'points': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(response.data['count']), 3)
+        self.assertEqual(max(response.data['series']['systolic_bp']['max']), 150.0)
+
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'worker': 'abc'}).status_code, 400)
+
+
+def _audiogram(worker, user, exam_date, right, left):
+    """Audiogram of ``worker`` on ``exam_date``; ``right``/``left`` are the 7 thresholds (0.5 to 8 kHz)."""
+    from .audiometry import THRESHOLD_COLUMNS
+
+    examination = MedicalExamination.objects.create(
+        worker=worker, exam_type='periodic', exam_date=exam_date, examining_doctor=user,
+    )
+    return AudiometryResult.objects.create(
+        examination=examination, tested_by=user, **dict(zip(THRESHOLD_COLUMNS, [*right, *left])),
+    )
+
+
+class AudiometryAnalyticsTests(APITestCase):
+    """Baseline comparison, noise notch, impairment and cohort summaries of audiograms."""
+
+    url = '/api/v1/occupational-health/audiometry/'
+    flat = [10] * 7
+
+    def setUp(self):
+        self.user = _api_user("au")
+        self.client.force_authenticate(self.user)
+        self.enterprise = _enterprise(self.user, "au")
+        # Born 1985-05-15: 30 at the baseline, 40 at the follow-up.
+        self.worker = _worker(self.enterprise, self.user, 1)
+        self.baseline = _audiogram(self.worker, self.user, date(2015, 6, 1), self.flat, self.flat)
+        self.follow_up = _audiogram(
+            self.worker, self.user, date(2025, 6, 1), [10, 10, 20, 30, 40, 20, 20], self.flat,
+        )
+
+    def test_sts_against_baseline_with_age_correction(self):
+        analysis, updated = audiometry.analyze_worker(self.worker.pk)
+        self.assertEqual(updated, 2)
+        self.baseline.refresh_from_db()
+        self.follow_up.refresh_from_db()
+
+        self.assertTrue(self.baseline.is_baseline)
+        self.assertIsNone(self.baseline.sts_right_db)
+        self.assertFalse(self.baseline.standard_threshold_shift)
+        self.assertIsNotNone(self.baseline.analyzed_at)
+
+        # Right: +10/+20/+30 dB at 2/3/4 kHz less presbycusis 30 -> 40 (2/4/5 dB).
+        self.assertFalse(self.follow_up.is_baseline)
+        self.assertEqual(self.follow_up.sts_right_db, Decimal('16.3'))
+        self.assertEqual(self.follow_up.sts_left_db, Decimal('-3.7'))
+        self.assertTrue(self.follow_up.standard_threshold_shift)
+        self.assertTrue(self.follow_up.recordable_hearing_loss)
+        self.assertTrue(self.follow_up.noise_induced_probable)
+        self.assertEqual(self.follow_up.hearing_loss_classification, 'normal')
+        self.assertEqual(self.follow_up.hearing_impairment_percent, Decimal('0.0'))
+
+        # Nothing changed: nothing written.
+        self.assertEqual(audiometry.analyze_worker(self.worker.pk)[1], 0)
+
+    def test_impairment_and_grades(self):
+        import numpy as np
+
+        thresholds = np.array([
+            [[45] * 7, [45] * 7],                 # 30 % each ear
+            [[20] * 7, [65] * 7],                 # better ear 0 %, worse 60 %
+            [[np.nan] * 7, [np.nan] * 7],
+        ], dtype=float)
+        np.testing.assert_allclose(audiometry.impairment(thresholds), [30, 10, np.nan])
+        self.assertEqual(list(audiometry.grades(thresholds)), ['moderate', 'normal', ''])
+
+    def test_audiogram_without_thresholds_keeps_manual_interpretation(self):
+        other = _worker(self.enterprise, self.user, 2)
+        examination = MedicalExamination.objects.create(
+            worker=other, exam_type='periodic', exam_date=date(2025, 1, 1), examining_doctor=self.user,
+        )
+        manual = AudiometryResult.objects.create(
+            examination=examination, hearing_loss_classification='mild', noise_induced_probable=True,
+        )
+        audiometry.analyze_worker(other.pk)
+        manual.refresh_from_db()
+        self.assertEqual(manual.hearing_loss_classification, 'mild')
+        self.assertTrue(manual.noise_induced_probable)
+        self.assertFalse(manual.is_baseline)
+
+    def test_saved_audiogram_is_analyzed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            later = _audiogram(self.worker, self.user, date(2026, 6, 1), [10, 10, 30, 40, 50, 30, 30], self.flat)
+        later.refresh_from_db()
+        self.assertTrue(later.standard_threshold_shift)
+        self.baseline.refresh_from_db()
+        self.assertTrue(self.baseline.is_baseline)
+
+    def test_cohort_by_site_and_job_category(self):
+        site = WorkSite.objects.create(
+            enterprise=self.enterprise, name="Puits Nord", address="Kolwezi", site_manager="Chef", phone="+243111",
+        )
+        driver = _worker(self.enterprise, self.user, 3)
+        driver.job_category = 'driver'
+        driver.work_site = site
+        driver.save()
+        _audiogram(driver, self.user, date(2024, 1, 1), [45] * 7, [45] * 7)
+
+        response = self.client.get(f'{self.url}cohort/', {'enterprise': self.enterprise.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tests'], 3)
+        self.assertEqual(response.data['workers'], 2)
+        self.assertEqual(response.data['sts'], 1)
+        groups = {(group['work_site'], group['job_category']): group for group in response.data['groups']}
+        operators = groups[(None, 'machine_operator')]
+        self.assertEqual((operators['workers'], operators['sts'], operators['noise_notch']), (1, 1, 1))
+        drivers = groups[(site.pk, 'driver')]
+        self.assertEqual(drivers['work_site_name'], "Puits Nord")
+        self.assertEqual(drivers['mean_impairment_percent'], 30.0)
+        self.assertEqual(drivers['classification']['moderate'], 1)
+
+        self.assertEqual(self.client.get(f'{self.url}cohort/').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}cohort/', {'enterprise': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.post(f'{self.url}analyze/', {'enterprise': 'abc'}).status_code, 400)
+
+    def test_analyze_endpoint_and_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('analyze_audiometry', '--dry-run', stdout=out)
+        self.assertIn('DRY RUN', out.getvalue())
+        self.assertFalse(AudiometryResult.objects.filter(is_baseline=True).exists())
+
+        response = self.client.post(f'{self.url}analyze/', {'enterprise': self.enterprise.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['tests'], response.data['updated'], response.data['sts']), (2, 2, 1))
+
+        out = StringIO()
+        call_command('analyze_audiometry', '--enterprise', str(self.enterprise.pk), stdout=out)
+        self.assertIn('0 updated', out.getvalue())
+
+    def test_computed_fields_are_read_only(self):
+        response = self.client.patch(
+            f'{self.url}{self.follow_up.pk}/', {'standard_threshold_shift': True}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.follow_up.refresh_from_db()
+        self.assertFalse(self.follow_up.standard_threshold_shift)
+
+
+class SpirometryAnalyticsTests(APITestCase):
+    """Reference values, z-scores, LLN pattern and FEV1 decline of spirometries."""
+
+    url = '/api/v1/occupational-health/spirometry/'
+
+    def setUp(self):
+        self.user = _api_user("sp")
+        self.client.force_authenticate(self.user)
+        self.enterprise = _enterprise(self.user, "sp")
+        # Man born 1985-05-15, 175 cm (measured at the first examination only).
+        self.worker = _worker(self.enterprise, self.user, 1)
+        self.tests = [
+            self._spirometry(date(2015, 6, 1), '4.20', '5.20', height=Decimal('175.0')),
+            self._spirometry(date(2018, 6, 1), '4.10', '5.10'),
+            self._spirometry(date(2021, 6, 1), '3.40', '4.90'),
+        ]
+
+    def _spirometry(self, exam_date, fev1, fvc, height=None, worker=None):
+        examination = MedicalExamination.objects.create(
+            worker=worker or self.worker, exam_type='periodic', exam_date=exam_date, examining_doctor=self.user,
+        )
+        if height is not None:
+            VitalSigns.objects.create(
+                examination=examination, systolic_bp=120, diastolic_bp=80, heart_rate=70,
+                height=height, weight=Decimal('75.0'), recorded_by=self.user,
+            )
+        return SpirometryResult.objects.create(
+            examination=examination, fev1_pre=Decimal(fev1), fvc_pre=Decimal(fvc), tested_by=self.user,
+        )
+
+    def test_reference_values_and_decline(self):
+        analysis, updated = spirometry.analyze_worker(self.worker.pk)
+        self.assertEqual(updated, 3)
+        baseline, middle, latest = (SpirometryResult.objects.get(pk=test.pk) for test in self.tests)
+
+        # NHANES III, man of 30 and 175 cm: FEV1 4.32 L predicted, LLN 3.56 L.
+        self.assertEqual(baseline.fev1_predicted, Decimal('4.32'))
+        self.assertEqual(baseline.fev1_lln, Decimal('3.56'))
+        self.assertEqual(baseline.fev1_percent_predicted, Decimal('97.1'))
+        self.assertEqual(baseline.fev1_z_score, Decimal('-0.27'))
+        self.assertEqual(baseline.lln_pattern, 'normal')
+        self.assertIsNone(baseline.fev1_decline_percent)
+        self.assertIsNotNone(baseline.analyzed_at)
+
+        # Height of the first examination reused; too few tests for a slope.
+        self.assertIsNotNone(middle.fvc_predicted)
+        self.assertIsNone(middle.fev1_decline_ml_year)
+        self.assertFalse(middle.excessive_fev1_decline)
+
+        # FEV1/FVC 69 % below its LLN (71 %) with a normal FVC.
+        self.assertEqual(latest.lln_pattern, 'obstructive')
+        self.assertLess(latest.fev1_fvc_z_score, Decimal('-1.64'))
+        self.assertAlmostEqual(float(latest.fev1_decline_percent), 16.2, delta=0.1)
+        self.assertAlmostEqual(float(latest.fev1_decline_ml_year), 133.3, delta=0.5)
+        self.assertTrue(latest.excessive_fev1_decline)
+
+        # Nothing changed: nothing written.
+        self.assertEqual(spirometry.analyze_worker(self.worker.pk)[1], 0)
+
+    def test_without_height_there_are_no_predicted_values(self):
+        other = _worker(self.enterprise, self.user, 2)
+        result = self._spirometry(date(2020, 1, 1), '3.00', '4.00', worker=other)
+        spirometry.analyze_worker(other.pk)
+        result.refresh_from_db()
+        self.assertIsNone(result.fev1_predicted)
+        self.assertEqual(result.lln_pattern, '')
+        self.assertFalse(result.excessive_fev1_decline)
+
+    def test_saved_spirometry_is_analyzed_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            later = self._spirometry(date(2024, 6, 1), '3.30', '4.80')
+        later.refresh_from_db()
+        self.assertTrue(later.excessive_fev1_decline)
+        self.assertIsNotNone(later.fev1_decline_ml_year)
+
+    def test_vital_signs_changes_reanalyze_workers_with_spirometry(self):
+        spirometry.analyze_worker(self.worker.pk)
+        vitals = VitalSigns.objects.get(examination__worker=self.worker)
+        with self.captureOnCommitCallbacks(execute=True):
+            vitals.delete()
+        self.assertIsNone(SpirometryResult.objects.get(pk=self.tests[0].pk).fev1_predicted)
+
+        # No spirometry: nothing to re-analyze.
+        other = _worker(self.enterprise, self.user, 2)
+        examination = MedicalExamination.objects.create(
+            worker=other, exam_type='periodic', exam_date=date(2024, 1, 1), examining_doctor=self.user,
+        )
+        with mock.patch.object(spirometry, 'analyze_worker') as analyze_worker, \
+                self.captureOnCommitCallbacks(execute=True):
+            VitalSigns.objects.create(
+                examination=examination, systolic_bp=120, diastolic_bp=80, heart_rate=70,
+                height=Decimal('170.0'), weight=Decimal('70.0'), recorded_by=self.user,
+            )
+        analyze_worker.assert_not_called()
+
+    def test_decline_alerts_and_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        healthy = _worker(self.enterprise, self.user, 2)
+        self._spirometry(date(2020, 1, 1), '4.00', '5.00', height=Decimal('175.0'), worker=healthy)
+
+        out = StringIO()
+        call_command('analyze_spirometry', '--dry-run', stdout=out)
+        self.assertIn('DRY RUN: 4 spirometries of 2 workers', out.getvalue())
+        self.assertEqual(self.client.get(f'{self.url}decline-alerts/', {'enterprise': self.enterprise.pk}).data['count'], 0)
+
+        out = StringIO()
+        call_command('analyze_spirometry', '--enterprise', str(self.enterprise.pk), stdout=out)
+        self.assertIn('1 excessive FEV1 declines; 4 updated', out.getvalue())
+
+        response = self.client.get(f'{self.url}decline-alerts/', {'enterprise': self.enterprise.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        alert = response.data['results'][0]
+        self.assertEqual((alert['id'], alert['worker']), (self.tests[-1].pk, self.worker.pk))
+        self.assertEqual(alert['lln_pattern'], 'obstructive')
+        self.assertEqual(self.client.get(f'{self.url}decline-alerts/').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}decline-alerts/', {'enterprise': 'abc'}).status_code, 400)
+
+        response = self.client.patch(
+            f'{self.url}{self.tests[0].pk}/', {'excessive_fev1_decline': True}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(SpirometryResult.objects.get(pk=self.tests[0].pk).excessive_fev1_decline)
+
+
+class HeavyMetalTrendsTests(APITestCase):
+    """Per-worker heavy metals trends and site cohorts, kept per enterprise and period."""
+
+    url = '/api/v1/occupational-health/heavy-metals-tests/trends/'
+
+    def setUp(self):
+        self.user = _api_user("hm")
+        self.client.force_authenticate(self.user)
+        self.enterprise = _enterprise(self.user, "hm")
+        self.site = WorkSite.objects.create(
+            enterprise=self.enterprise, name="Concentrateur", address="Kolwezi", site_manager="Chef", phone="+243111",
+        )
+        self.exposed, self.colleague = (_worker(self.enterprise, self.user, index) for index in (1, 2))
+        for worker in (self.exposed, self.colleague):
+            worker.work_site = self.site
+            worker.save()
+        self._lead(self.exposed, date(2024, 3, 1), '10')
+        self._lead(self.exposed, date(2025, 2, 1), '14')
+        self._lead(self.exposed, date(2025, 8, 1), '22')
+        self._lead(self.colleague, date(2025, 5, 1), '8')
+        self._result(_worker(self.enterprise, self.user, 3), date(2025, 3, 1), 'cobalt', 'urine', '5', 'µg/L')
+
+    def _result(self, worker, test_date, metal, specimen, level, unit, reference_upper=None):
+        examination = MedicalExamination.objects.create(
+            worker=worker, exam_type='periodic', exam_date=test_date, examining_doctor=self.user,
+        )
+        return HeavyMetalsTest.objects.create(
+            examination=examination, heavy_metal=metal, specimen_type=specimen, test_date=test_date,
+            level_value=Decimal(level), unit=unit, reference_upper=reference_upper,
+        )
+
+    def _lead(self, worker, test_date, level):
+        return self._result(worker, test_date, 'lead', 'blood', level, 'µg/dL', reference_upper=Decimal('20'))
+
+    def test_parse_period(self):
+        self.assertEqual(metal_trends.parse_period('2025'), ('2025', date(2025, 1, 1), date(2025, 12, 31)))
+        self.assertEqual(metal_trends.parse_period('2024-Q1'), ('2024-Q1', date(2024, 1, 1), date(2024, 3, 31)))
+        self.assertEqual(metal_trends.parse_period('2024-02'), ('2024-02', date(2024, 2, 1), date(2024, 2, 29)))
+        for invalid in ('2025-13', '2025-Q5', 'last year'):
+            with self.assertRaises(ValueError):
+                metal_trends.parse_period(invalid)
+
+    def test_worker_series_and_alerts(self):
+        response = self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2025'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['computed_at'])
+        series = {(item['worker'], item['heavy_metal']): item for item in response.data['series']}
+        self.assertEqual(len(series), 3)
+
+        exposed = series[(self.exposed.pk, 'lead')]
+        self.assertEqual((exposed['tests'], exposed['baseline'], exposed['last']), (2, 10.0, 22.0))
+        self.assertEqual((exposed['baseline_date'], exposed['last_date']), ('2024-03-01', '2025-08-01'))
+        self.assertEqual(exposed['change_percent'], 120.0)
+        # 14 -> 22 µg/dL in 181 days.
+        self.assertAlmostEqual(exposed['slope_per_year'], 8 / (181 / 365.25), places=3)
+        self.assertEqual((exposed['rolling_max'], exposed['period_max']), (22.0, 22.0))
+        self.assertEqual(exposed['alerts'], ['above_reference', 'rise', 'rate_of_rise'])
+
+        colleague = series[(self.colleague.pk, 'lead')]
+        self.assertEqual(colleague['alerts'], [])
+        self.assertIsNone(colleague['slope_per_year'])
+        self.assertIsNone(colleague['change_percent'])
+        self.assertEqual([item['worker'] for item in response.data['alerts']], [self.exposed.pk])
+
+        # Before 2025 only the baseline exists.
+        response = self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2024-Q1'})
+        self.assertEqual([item['last'] for item in response.data['series']], [10.0])
+
+    def test_site_cohorts(self):
+        response = self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2025', 'heavy_metal': 'lead'})
+        self.assertEqual(len(response.data['cohorts']), 1)
+        cohort = response.data['cohorts'][0]
+        self.assertEqual((cohort['work_site'], cohort['work_site_name']), (self.site.pk, "Concentrateur"))
+        self.assertEqual((cohort['workers'], cohort['mean'], cohort['max']), (2, 15.0, 22.0))
+        self.assertEqual((cohort['p50'], cohort['p90']), (15.0, 20.6))
+        self.assertEqual((cohort['above_reference'], cohort['alerts']), (1, 1))
+
+        import numpy as np
+        values = np.array([5.0, 1.0, 3.0, 10.0, 7.0])
+        groups = np.array([0, 0, 0, 1, 1])
+        np.testing.assert_allclose(
+            metal_trends.percentiles(values, groups, 2),
+            [np.percentile(values[:3], metal_trends.PERCENTILES), np.percentile(values[3:], metal_trends.PERCENTILES)],
+        )
+
+    def test_snapshot_is_reused_then_dropped_on_change(self):
+        self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2025'})
+        self.assertEqual(HeavyMetalsTrendSnapshot.objects.filter(enterprise=self.enterprise).count(), 1)
+        with mock.patch.object(metal_trends, 'compute') as compute:
+            response = self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2025'})
+        compute.assert_not_called()
+        self.assertEqual(len(response.data['series']), 3)
+
+        # A 2023 result cannot change the 2022 snapshot.
+        self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2022'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self._lead(self.colleague, date(2025, 11, 1), '30')
+        self.assertEqual(
+            list(HeavyMetalsTrendSnapshot.objects.filter(enterprise=self.enterprise).values_list('period', flat=True)),
+            ['2022'],
+        )
+        response = self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2025'})
+        self.assertEqual([item['worker'] for item in response.data['alerts']], [self.exposed.pk, self.colleague.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.colleague.work_site = None
+            self.colleague.save()
+        self.assertFalse(HeavyMetalsTrendSnapshot.objects.filter(enterprise=self.enterprise).exists())
+
+    def test_snapshots_of_previous_date_and_enterprise_are_dropped(self):
+        result = self._lead(self.colleague, date(2022, 6, 1), '9')
+        for period in ('2022', '2025'):
+            self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': period})
+        # Moved from 2022 to 2025: the 2022 snapshot included it.
+        with self.captureOnCommitCallbacks(execute=True):
+            result.test_date = date(2025, 9, 1)
+            result.save()
+        self.assertFalse(HeavyMetalsTrendSnapshot.objects.filter(enterprise=self.enterprise).exists())
+
+        other = _enterprise(self.user, "hm2")
+        for enterprise in (self.enterprise, other):
+            self.client.get(self.url, {'enterprise': enterprise.pk, 'period': '2025'})
+        # A worker edit that leaves the enterprise and work site alone keeps them.
+        colleague = Worker.objects.get(pk=self.colleague.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            colleague.phone = '+243999999'
+            # The update and its sync change: no lookup of the previous placement.
+            with self.assertNumQueries(2):
+                colleague.save()
+        self.assertEqual(HeavyMetalsTrendSnapshot.objects.filter(enterprise__in=[self.enterprise, other]).count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            colleague.enterprise = other
+            colleague.work_site = None
+            colleague.save()
+        self.assertFalse(HeavyMetalsTrendSnapshot.objects.filter(enterprise__in=[self.enterprise, other]).exists())
+        response = self.client.get(self.url, {'enterprise': other.pk, 'period': '2025'})
+        self.assertEqual({item['worker'] for item in response.data['series']}, {self.colleague.pk})
+
+    def test_command_and_validation(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('refresh_heavy_metal_trends', '--period', '2025', stdout=out)
+        self.assertIn('1 heavy metals trend snapshots for 2025', out.getvalue())
+        self.assertTrue(HeavyMetalsTrendSnapshot.objects.filter(enterprise=self.enterprise, period='2025').exists())
+
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'enterprise': self.enterprise.pk, 'period': '2025-13'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'enterprise': 987654, 'period': '2025'}).status_code, 404)
+        self.assertFalse(HeavyMetalsTrendSnapshot.objects.filter(enterprise_id=987654).exists())
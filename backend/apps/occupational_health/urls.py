@@ -190,6 +190,9 @@ urlpatterns = [
     # ==================== SURVEILLANCE PROGRAMS ====================
     path('surveillance/', include('apps.occupational_health.urls_surveillance')),
     
+    # ==================== BATCH WRITES ====================
+    path('batch/', views.batch_operations, name='batch-operations'),
+
     # ==================== DASHBOARD & ANALYTICS ====================
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
     path('choices/', views.choices_data, name='choices-data'),
@@ -271,6 +274,7 @@ MEDICAL EXAMINATIONS:
    GET    /api/vital-signs/{id}/                - Get vital signs details
    PUT    /api/vital-signs/{id}/                - Update vital signs
    DELETE /api/vital-signs/{id}/                - Delete vital signs
+   GET    /api/vital-signs/trends/?worker={id}  - Downsampled series of a worker
 
 6. FITNESS CERTIFICATES  
    GET    /api/fitness-certificates/            - List all certificates
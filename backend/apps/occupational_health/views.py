@@ -10,14 +10,20 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Count, Q, Sum, Avg, F
+from django.db.models import Count, Q, Sum, Avg, F, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 import calendar
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse
 
+from apps.core import timeseries
+
+from . import audiometry, metal_trends, spirometry
+
 from .models import (
+    WORKER_SEARCH,
     # Protocol hierarchy models
     MedicalExamCatalog, OccSector, OccDepartment, OccPosition,
     ExamVisitProtocol, ProtocolRequiredExam,
@@ -49,7 +55,7 @@ from .models import (
 from .serializers import (
     # Protocol hierarchy serializers
     MedicalExamCatalogSerializer,
-    OccSectorSerializer, OccSectorNestedSerializer,
+    OccSectorSerializer,
     OccDepartmentSerializer,
     OccPositionSerializer,
     ExamVisitProtocolSerializer, ExamVisitProtocolListSerializer,
@@ -83,6 +89,13 @@ from .serializers import (
     # Utility serializers
     ChoicesSerializer, DashboardStatsSerializer, WorkerRiskProfileSerializer
 )
+from apps.core.cache import cached_response, CHOICES_CACHE_TIMEOUT
+from apps.core.annotations import AnnotatedFieldsMixin
+from apps.core.pagination import OptionalKeysetPagination
+from apps.core.querysets import QuerysetProfile, QuerysetProfileMixin, model_columns
+from apps.core.fieldsets import SparseFieldsetsMixin
+from apps.core.search import DocumentSearchFilter
+from . import batch, protocol_tree
 
 # ==================== PROTOCOL HIERARCHY VIEWSETS ====================
 
@@ -127,7 +140,7 @@ class MedicalExamCatalogViewSet(viewsets.ModelViewSet):
         return Response(MedicalExamCatalogSerializer(exams, many=True).data)
 
 
-class OccSectorViewSet(viewsets.ModelViewSet):
+class OccSectorViewSet(AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """
     CRUD for occupational health sectors.
 
@@ -135,7 +148,7 @@ class OccSectorViewSet(viewsets.ModelViewSet):
     GET  /api/occ-sectors/{id}/departments/  → list departments of this sector
     GET  /api/occ-sectors/tree/              → full nested sector → dept → position → protocol tree
     """
-    queryset = OccSector.objects.prefetch_related('departments').all()
+    queryset = OccSector.objects.all()
     serializer_class = OccSectorSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -151,15 +164,38 @@ class OccSectorViewSet(viewsets.ModelViewSet):
         Used by the frontend to sync its local copy of the protocol data.
         Only active sectors/departments/positions are included by default.
         include_inactive=true to include inactive ones.
+
+        The response carries an ETag with the tree version:
+        - If-None-Match: <etag>   → 304 when the tree did not change
+        - since_version=<version> → only the nodes changed since that version
+          (flat lists + deleted ids), see protocol_tree.get_delta
         """
         include_inactive = request.query_params.get('include_inactive', 'false').lower() == 'true'
-        qs = OccSector.objects.prefetch_related(
-            'departments__positions__protocols__protocolrequiredexam_set__exam',
-            'departments__positions__protocols__recommended_exams',
-        )
-        if not include_inactive:
-            qs = qs.filter(is_active=True)
-        return Response(OccSectorNestedSerializer(qs, many=True).data)
+        version = protocol_tree.current_version()
+        etag = protocol_tree.make_etag(version, include_inactive)
+        headers = {'ETag': etag, 'X-Tree-Version': str(version), 'Cache-Control': 'no-cache'}
+
+        if protocol_tree.etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        since_version = request.query_params.get('since_version')
+        if since_version is not None:
+            try:
+                since_version = int(since_version)
+            except ValueError:
+                return Response(
+                    {'error': 'since_version must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if 0 <= since_version <= version:
+                return Response(protocol_tree.get_delta(since_version, version), headers=headers)
+            # Unknown (future) version: the client must reload the full tree.
+
+        payload = protocol_tree.get_full_payload(version, include_inactive)
+        response = HttpResponse(payload, content_type='application/json')
+        for header, value in headers.items():
+            response[header] = value
+        return response
 
     @action(detail=True, methods=['get'], url_path='departments')
     def departments(self, request, pk=None):
@@ -168,7 +204,7 @@ class OccSectorViewSet(viewsets.ModelViewSet):
         return Response(OccDepartmentSerializer(depts, many=True).data)
 
 
-class OccDepartmentViewSet(viewsets.ModelViewSet):
+class OccDepartmentViewSet(AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """
     CRUD for departments.
 
@@ -190,7 +226,7 @@ class OccDepartmentViewSet(viewsets.ModelViewSet):
         return Response(OccPositionSerializer(positions, many=True).data)
 
 
-class OccPositionViewSet(viewsets.ModelViewSet):
+class OccPositionViewSet(AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """
     CRUD for positions (job roles).
     The doctor can add a new position type and immediately assign protocols to it.
@@ -381,7 +417,7 @@ class ExamVisitProtocolViewSet(viewsets.ModelViewSet):
 
 # ==================== CORE API VIEWS ====================
 
-class EnterpriseViewSet(viewsets.ModelViewSet):
+class EnterpriseViewSet(SparseFieldsetsMixin, QuerysetProfileMixin, AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """Enterprise management API with sector-specific features"""
     
     queryset = Enterprise.objects.select_related('created_by')
@@ -391,6 +427,10 @@ class EnterpriseViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'rccm', 'nif', 'contact_person']
     ordering_fields = ['name', 'created_at', 'contract_start_date']
     ordering = ['-created_at']
+    query_budgets = {'list': 3, 'retrieve': 2}
+    queryset_profiles = {
+        'list': QuerysetProfile(select_related=[]),
+    }
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -489,7 +529,7 @@ class EnterpriseViewSet(viewsets.ModelViewSet):
         }
         return test_mapping.get(sector, ['basic_physical_exam'])
 
-class WorkSiteViewSet(viewsets.ModelViewSet):
+class WorkSiteViewSet(AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """Work site management API"""
     
     serializer_class = WorkSiteSerializer
@@ -498,22 +538,35 @@ class WorkSiteViewSet(viewsets.ModelViewSet):
     filterset_fields = ['enterprise', 'is_remote_site', 'has_medical_facility']
     search_fields = ['name', 'site_manager']
     ordering = ['enterprise__name', 'name']
+    query_budgets = {'list': 3}
     
     def get_queryset(self):
-        return WorkSite.objects.select_related('enterprise').prefetch_related('workers')
+        return WorkSite.objects.select_related('enterprise')
 
-class WorkerViewSet(viewsets.ModelViewSet):
+class WorkerViewSet(SparseFieldsetsMixin, QuerysetProfileMixin, AnnotatedFieldsMixin, viewsets.ModelViewSet):
     """Worker management API with Médecine du Travail profile"""
     
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, DocumentSearchFilter]
     filterset_fields = [
         'enterprise', 'work_site', 'job_category', 'employment_status',
         'current_fitness_status', 'gender'
     ]
-    search_fields = ['first_name', 'last_name', 'employee_id', 'job_title']
+    search_document = WORKER_SEARCH
     ordering_fields = ['last_name', 'hire_date', 'next_exam_due']
     ordering = ['last_name', 'first_name']
+    query_budgets = {'list': 3, 'retrieve': 2}
+    queryset_profiles = {
+        'list': QuerysetProfile(
+            only=[
+                'id', 'employee_id', 'first_name', 'last_name', 'date_of_birth', 'gender',
+                'enterprise', 'enterprise__name', 'enterprise__sector',
+                'work_site', 'work_site__name', 'job_category', 'job_title', 'hire_date',
+                'employment_status', 'phone', 'current_fitness_status', 'next_exam_due',
+            ],
+            select_related=['enterprise', 'work_site'],
+        ),
+    }
 
     FRONTEND_DROP_FIELDS = {
         'company', 'site', 'sector', 'sectorCode', 'departmentCode', 'positionCode',
@@ -522,11 +575,7 @@ class WorkerViewSet(viewsets.ModelViewSet):
     }
     
     def get_queryset(self):
-        return Worker.objects.select_related(
-            'enterprise', 'work_site', 'created_by'
-        ).prefetch_related(
-            'medical_examinations', 'incidents_involved', 'occupational_diseases'
-        )
+        return Worker.objects.select_related('enterprise', 'work_site', 'created_by')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -903,7 +952,7 @@ class WorkerViewSet(viewsets.ModelViewSet):
 
 # ==================== MEDICAL EXAMINATION API VIEWS ====================
 
-class MedicalExaminationViewSet(viewsets.ModelViewSet):
+class MedicalExaminationViewSet(SparseFieldsetsMixin, QuerysetProfileMixin, viewsets.ModelViewSet):
     """Medical examination API with sector-specific test requirements"""
     
     permission_classes = [IsAuthenticated]
@@ -915,6 +964,21 @@ class MedicalExaminationViewSet(viewsets.ModelViewSet):
     search_fields = ['exam_number', 'worker__first_name', 'worker__last_name', 'worker__employee_id']
     ordering_fields = ['exam_date', 'created_at']
     ordering = ['-exam_date']
+    pagination_class = OptionalKeysetPagination
+    query_budgets = {'list': 3}
+    queryset_profiles = {
+        'list': QuerysetProfile(
+            only=[
+                'id', 'exam_number', 'exam_type', 'exam_date', 'examination_completed',
+                'follow_up_required', 'next_periodic_exam', 'created_at',
+                'worker', 'worker__first_name', 'worker__last_name', 'worker__employee_id',
+                'worker__enterprise', 'worker__enterprise__name',
+                'examining_doctor', 'examining_doctor__first_name', 'examining_doctor__last_name',
+            ],
+            select_related=['worker__enterprise', 'examining_doctor'],
+            prefetch_related=[],
+        ),
+    }
     
     def get_queryset(self):
         return MedicalExamination.objects.select_related(
@@ -1004,6 +1068,31 @@ class VitalSignsViewSet(viewsets.ModelViewSet):
         """Auto-set recorded_by to current user"""
         serializer.save(recorded_by=self.request.user)
 
+    trend_parameters = [
+        'systolic_bp', 'diastolic_bp', 'heart_rate', 'respiratory_rate',
+        'temperature', 'weight', 'waist_circumference', 'pain_scale',
+    ]
+
+    @action(detail=False, methods=['get'], url_path='trends')
+    def trends(self, request):
+        """
+        Downsampled vital sign series of a ``?worker=`` across examinations
+        (apps.core.timeseries): ``start``, ``end``, ``points``, ``method``
+        and ``parameters`` as for hospital vital sign trends
+        """
+        worker = request.query_params.get('worker')
+        if not worker or not worker.isdigit():
+            return Response({'error': 'Paramètre worker requis (identifiant entier)'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end, points, method = timeseries.parse_window(request.query_params)
+            parameters = timeseries.parse_parameters(request.query_params, self.trend_parameters)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(VitalSigns.objects.filter(examination__worker_id=int(worker)))
+        return Response(timeseries.downsample(
+            queryset, 'recorded_at', parameters, start, end, points=points, method=method,
+        ))
+
 class PhysicalExaminationViewSet(viewsets.ModelViewSet):
     """Physical examination findings API"""
 
@@ -2683,6 +2772,7 @@ def _get_sector_icon(sector_key):
     return icons_map.get(sector_key, 'briefcase')
 
 @api_view(['GET'])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def choices_data(request):
     """Get all choice field options for frontend forms"""
     
@@ -3011,10 +3101,19 @@ class OverexposureAlertViewSet(viewsets.ModelViewSet):
     search_fields = ['worker__first_name', 'worker__last_name', 'exposure_type', 'area_location']
     ordering_fields = ['detected_date', 'severity', 'worker__last_name']
     ordering = ['-detected_date']
+    query_budgets = {'list': 3}
     
     def get_queryset(self):
         """Get alerts with related data, supporting date range and enterprise filters"""
-        qs = OverexposureAlert.objects.select_related('worker__enterprise', 'acknowledged_by')
+        other_alerts = OverexposureAlert.objects.filter(
+            worker_id=OuterRef('worker_id'),
+            exposure_type=OuterRef('exposure_type'),
+        ).exclude(pk=OuterRef('pk')).order_by().values('worker_id').annotate(
+            total=Count('pk')
+        ).values('total')
+        qs = OverexposureAlert.objects.select_related(
+            'worker__enterprise', 'acknowledged_by', 'source_reading'
+        ).annotate(other_alert_count=Coalesce(Subquery(other_alerts), 0))
         
         # Date range filter
         date_from = self.request.query_params.get('date_from')
@@ -3081,7 +3180,7 @@ class OverexposureAlertViewSet(viewsets.ModelViewSet):
         return Response({'message': f'{updated} alerts acknowledged'})
 
 
-class ExposureReadingViewSet(viewsets.ModelViewSet):
+class ExposureReadingViewSet(SparseFieldsetsMixin, QuerysetProfileMixin, viewsets.ModelViewSet):
     """
     Occupational exposure measurement management with ISO 45001 §9.1 compliance
     
@@ -3101,6 +3200,21 @@ class ExposureReadingViewSet(viewsets.ModelViewSet):
     filterset_fields = ['exposure_type', 'worker__enterprise', 'source_type']
     search_fields = ['worker__first_name', 'worker__last_name', 'exposure_type', 'equipment_name']
     ordering = ['-measurement_date']
+    pagination_class = OptionalKeysetPagination
+    query_budgets = {'list': 3}
+    queryset_profiles = {
+        'list': QuerysetProfile(
+            only=[
+                *model_columns(ExposureReading),
+                'worker__first_name', 'worker__last_name', 'worker__employee_id',
+                'worker__enterprise', 'worker__enterprise__name',
+                'measured_by__first_name', 'measured_by__last_name',
+                'reviewed_by__first_name', 'reviewed_by__last_name',
+            ],
+            select_related=['worker__enterprise', 'measured_by', 'reviewed_by'],
+            prefetch_related=[],
+        ),
+    }
     
     def get_queryset(self):
         """Get readings with related data, supporting comma-separated status filter"""
@@ -4319,6 +4433,7 @@ class HeavyMetalsTestViewSet(viewsets.ModelViewSet):
     POST /api/heavy-metals-tests/ - Create test result
     GET /api/heavy-metals-tests/elevated/ - Get elevated results
     GET /api/heavy-metals-tests/exceeding-osha/ - Get OSHA limit violations
+    GET /api/heavy-metals-tests/trends/?enterprise={id}&period=2025 - Per-worker trends and site cohorts
     """
     
     serializer_class = HeavyMetalsTestSerializer
@@ -4373,6 +4488,40 @@ class HeavyMetalsTestViewSet(viewsets.ModelViewSet):
         
         return Response(summaries)
     
+    @action(detail=False, methods=['get'])
+    def trends(self, request):
+        """
+        Per-worker slope, change from baseline, rolling max and alerts, and
+        per-site distributions of an ``?enterprise=`` over a ``?period=``
+        (year, quarter or month), served from HeavyMetalsTrendSnapshot
+        (apps.occupational_health.metal_trends).  ``?heavy_metal=`` narrows
+        the series and cohorts to one metal.
+        """
+        enterprise = request.query_params.get('enterprise')
+        if not enterprise or not enterprise.isdigit():
+            raise serializers.ValidationError({'enterprise': 'Paramètre enterprise requis'})
+        # Snapshots are stored: only for an enterprise that exists.
+        enterprise = get_object_or_404(Enterprise, pk=int(enterprise))
+        try:
+            snapshot = metal_trends.get_snapshot(enterprise.pk, request.query_params.get('period'))
+        except ValueError as exc:
+            raise serializers.ValidationError({'period': str(exc)})
+        series, cohorts = snapshot.series, snapshot.cohorts
+        metal = request.query_params.get('heavy_metal')
+        if metal:
+            series = [item for item in series if item['heavy_metal'] == metal]
+            cohorts = [item for item in cohorts if item['heavy_metal'] == metal]
+        return Response({
+            'enterprise': snapshot.enterprise_id,
+            'period': snapshot.period,
+            'start': snapshot.period_start,
+            'end': snapshot.period_end,
+            'computed_at': snapshot.computed_at,
+            'series': series,
+            'alerts': [item for item in series if item['alerts']],
+            'cohorts': cohorts,
+        })
+    
     @action(detail=True, methods=['post'])
     def confirm_occupational_exposure(self, request, pk=None):
         """Confirm result is from occupational exposure"""
@@ -4788,7 +4937,7 @@ class HierarchyOfControlsViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class RiskHeatmapDataViewSet(viewsets.ModelViewSet):
+class RiskHeatmapDataViewSet(QuerysetProfileMixin, viewsets.ModelViewSet):
     """
     ViewSet for Risk Heatmap Data points.
     
@@ -4813,6 +4962,23 @@ class RiskHeatmapDataViewSet(viewsets.ModelViewSet):
     search_fields = ['related_hazards__hazard_type', 'notes']
     ordering_fields = ['risk_score', 'heatmap_date', 'workers_affected_count']
     ordering = ['-risk_score', '-heatmap_date']
+    query_budgets = {'list': 5, 'retrieve': 4}
+    queryset_profiles = {
+        action: QuerysetProfile(
+            select_related=['enterprise'],
+            prefetch_related=[
+                Prefetch(
+                    'related_hazards',
+                    queryset=HazardIdentification.objects.only('id', 'hazard_type', 'severity'),
+                ),
+                Prefetch(
+                    'workers_exposed',
+                    queryset=Worker.objects.only('id', 'first_name', 'last_name', 'employee_id'),
+                ),
+            ],
+        )
+        for action in ('list', 'retrieve')
+    }
     
     @action(detail=False, methods=['get'])
     def critical_zones(self, request):
@@ -5099,6 +5265,44 @@ class AudiometryResultViewSet(viewsets.ModelViewSet):
         else:
             raise serializers.ValidationError('worker_id is required')
 
+    def _enterprise_audiograms(self, request):
+        enterprise = str(request.query_params.get('enterprise') or request.data.get('enterprise') or '')
+        if not enterprise.isdigit():
+            raise serializers.ValidationError({'enterprise': 'Paramètre enterprise requis (identifiant entier)'})
+        enterprise = int(enterprise)
+        return enterprise, AudiometryResult.objects.filter(examination__worker__enterprise_id=enterprise)
+
+    @action(detail=False, methods=['get'], url_path='cohort')
+    def cohort(self, request):
+        """
+        STS, noise notch, impairment and grades of the latest audiogram of each
+        worker of an ``?enterprise=``, by work site and job category
+        (apps.occupational_health.audiometry)
+        """
+        enterprise, queryset = self._enterprise_audiograms(request)
+        analysis = audiometry.analyze(audiometry.load(queryset))
+        groups = audiometry.cohort_summary(analysis)
+        return Response({
+            'enterprise': enterprise,
+            'tests': len(analysis.audiograms),
+            'workers': sum(group['workers'] for group in groups),
+            'sts': sum(group['sts'] for group in groups),
+            'recordable': sum(group['recordable'] for group in groups),
+            'groups': groups,
+        })
+
+    @action(detail=False, methods=['post'], url_path='analyze')
+    def analyze(self, request):
+        """Recompute and store the baseline comparison of every audiogram of an enterprise"""
+        enterprise, queryset = self._enterprise_audiograms(request)
+        analysis, updated = audiometry.analyze_queryset(queryset)
+        return Response({
+            'enterprise': enterprise,
+            'tests': len(analysis.audiograms),
+            'updated': updated,
+            'sts': int(analysis.sts.sum()),
+        })
+
 
 class SpirometryResultViewSet(viewsets.ModelViewSet):
     """API endpoints for spirometry test results"""
@@ -5131,6 +5335,37 @@ class SpirometryResultViewSet(viewsets.ModelViewSet):
         else:
             raise serializers.ValidationError('worker_id is required')
 
+    @action(detail=False, methods=['get'], url_path='decline-alerts')
+    def decline_alerts(self, request):
+        """
+        Workers of an ``?enterprise=`` whose latest spirometry shows an
+        excessive FEV1 decline (apps.occupational_health.spirometry)
+        """
+        enterprise = request.query_params.get('enterprise')
+        if not enterprise or not enterprise.isdigit():
+            raise serializers.ValidationError({'enterprise': 'Paramètre enterprise requis (identifiant entier)'})
+        enterprise = int(enterprise)
+        alerts = spirometry.decline_alerts(
+            SpirometryResult.objects.filter(examination__worker__enterprise_id=enterprise),
+        )
+        return Response({
+            'enterprise': enterprise,
+            'count': len(alerts),
+            'results': [{
+                'id': result.pk,
+                'worker': result.examination.worker_id,
+                'worker_name': result.examination.worker.full_name,
+                'employee_id': result.examination.worker.employee_id,
+                'exam_date': result.examination.exam_date,
+                'fev1_pre': result.fev1_pre,
+                'fev1_percent_predicted': result.fev1_percent_predicted,
+                'fev1_z_score': result.fev1_z_score,
+                'fev1_decline_percent': result.fev1_decline_percent,
+                'fev1_decline_ml_year': result.fev1_decline_ml_year,
+                'lln_pattern': result.lln_pattern,
+            } for result in alerts],
+        })
+
 
 class VisionTestResultViewSet(viewsets.ModelViewSet):
     """API endpoints for vision test results"""
@@ -5246,6 +5481,22 @@ class EnterpriseUsersViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
 
+# ==================== BATCH WRITES ====================
+
+@api_view(['POST'])
+def batch_operations(request):
+    """
+    Run an ordered list of create/update/delete operations on the
+    examination resources in one transaction (see batch.py).
+
+    Body: {"operations": [{"op": "create", "resource": "vital-signs",
+    "temp_id": "...", "data": {...}}, ...]}
+    """
+    operations = request.data.get('operations') if isinstance(request.data, dict) else None
+    status_code, payload = batch.execute(request, operations)
+    return Response(payload, status=status_code)
+
+
 # ==================== ISO 27001 & ISO 45001 VIEWSETS ====================
 # Import ISO compliance ViewSets for API routing
 from .views_iso_compliance import (
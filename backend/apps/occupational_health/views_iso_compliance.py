@@ -13,6 +13,8 @@ from django.utils import timezone
 from datetime import timedelta, date
 from django.db.models import Q,  Count, Sum, Avg
 
+from apps.core.pagination import OptionalKeysetPagination
+
 # ISO 27001 Imports
 from .models_iso27001 import (
     AuditLog, AccessControl, SecurityIncident, VulnerabilityRecord,
@@ -51,6 +53,7 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['user', 'action', 'resource_type', 'status', 'timestamp']
     search_fields = ['resource_name', 'description', 'ip_address']
     ordering_fields = ['-timestamp', 'action', 'user']
+    pagination_class = OptionalKeysetPagination
     
     @action(detail=False, methods=['get'])
     def user_activity(self, request):
@@ -12,6 +12,7 @@ from .serializers import (
     OrganizationCreateSerializer, OrganizationUpdateSerializer,
     OrganizationTypeChoicesSerializer
 )
+from apps.core.cache import cached_response, CHOICES_CACHE_TIMEOUT
 
 
 class OrganizationFilter(filters.FilterSet):
@@ -77,6 +78,7 @@ class OrganizationDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def organization_type_choices_view(request):
     """Get organization type choices"""
     choices = [
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from apps.core.search import SearchDocument, create_search_index, drop_search_index
+
+# Frozen copy of PATIENT_SEARCH in apps/patients/models.py.
+SEARCH = SearchDocument(
+    ['first_name', 'last_name', 'patient_number', 'phone', 'email'],
+    index_name='patients_search_trgm',
+)
+
+
+def create_index(apps, schema_editor):
+    create_search_index(apps.get_model('patients', 'Patient'), SEARCH, schema_editor)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(apps.get_model('patients', 'Patient'), SEARCH, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_search_extensions'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
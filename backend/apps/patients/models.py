@@ -1,6 +1,8 @@
 from django.db import models
 import uuid
 
+from apps.core.search import SearchDocument
+
 
 class Gender(models.TextChoices):
     MALE = 'male', 'Masculin'
@@ -74,6 +76,12 @@ class Patient(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.patient_number})"
 
+    # Columns read by the properties below (sparse fieldsets, apps.core.fieldsets).
+    FIELD_DEPENDENCIES = {
+        'full_name': ['first_name', 'middle_name', 'last_name'],
+        'age': ['date_of_birth'],
+    }
+
     @property
     def full_name(self):
         middle = f" {self.middle_name}" if self.middle_name else ""
@@ -85,4 +93,11 @@ class Patient(models.Model):
         today = timezone.now().date()
         return today.year - self.date_of_birth.year - (
             (today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day)
-        )
\ No newline at end of file
+        )
+
+
+# Mobile search box: name, number and contact details (see apps.core.search).
+PATIENT_SEARCH = SearchDocument(
+    ['first_name', 'last_name', 'patient_number', 'phone', 'email'],
+    index_name='patients_search_trgm',
+)
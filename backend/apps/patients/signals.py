@@ -0,0 +1,7 @@
+from apps.core import sync
+from .models import Patient
+
+
+# Patients are kept offline by the mobile app, which pulls their changes
+# from GET /api/v1/sync/ (see apps.core.sync).
+sync.register('patients', Patient, 'apps.patients.serializers.PatientListSerializer')
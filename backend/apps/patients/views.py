@@ -3,9 +3,8 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
-from django.db.models import Q
 from django.utils import timezone
-from .models import Patient, Gender, BloodType, PatientStatus
+from .models import Patient, Gender, BloodType, PatientStatus, PATIENT_SEARCH
 from .serializers import PatientSerializer, PatientListSerializer
 
 
@@ -38,13 +37,7 @@ class PatientFilter(filters.FilterSet):
         return queryset
 
     def filter_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(first_name__icontains=value) |
-            Q(last_name__icontains=value) |
-            Q(patient_number__icontains=value) |
-            Q(phone__icontains=value) |
-            Q(email__icontains=value)
-        )
+        return PATIENT_SEARCH.filter(queryset, value)
 
 
 class PatientListCreateAPIView(generics.ListCreateAPIView):
@@ -97,7 +97,8 @@ class PrescriptionListSerializer(serializers.ModelSerializer):
         return obj.items.count()
     
     def get_dispensed_items_count(self, obj):
-        return obj.items.filter(status=PrescriptionItemStatus.DISPENSED).count()
+        # Counted in Python: uses prefetched items
+        return sum(1 for item in obj.items.all() if item.status == PrescriptionItemStatus.FULLY_DISPENSED)
 
 
 class PrescriptionDetailSerializer(serializers.ModelSerializer):
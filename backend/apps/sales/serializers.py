@@ -220,8 +220,9 @@ class SaleCreateSerializer(serializers.ModelSerializer):
                 if sale.facility_id:
                     inv_qs = inv_qs.filter(facility_id=sale.facility_id)
 
-                # Use select_for_update to prevent race conditions
-                inv_item = inv_qs.select_for_update().first()
+                # Use select_for_update to prevent race conditions; the product
+                # is joined for the batch saves (InventoryBatch.effective_expiry).
+                inv_item = inv_qs.select_related('product').select_for_update(of=('self',)).first()
                 if inv_item:
                     prev_qty = int(inv_item.quantity_on_hand or 0)
 
@@ -16,14 +16,17 @@ from .serializers import (
 from apps.inventory.models import InventoryItem, StockMovement
 from apps.audit.decorators import audit_sale, audit_critical_action
 from apps.audit.models import AuditActionType
+from apps.core.fieldsets import SparseFieldsetsMixin
+from apps.core.pagination import OptionalKeysetPagination
 
 
-class SaleListCreateAPIView(generics.ListCreateAPIView):
+class SaleListCreateAPIView(SparseFieldsetsMixin, generics.ListCreateAPIView):
     queryset = Sale.objects.select_related('customer', 'cashier', 'organization')
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'type', 'payment_status']
     search_fields = ['sale_number', 'receipt_number', 'customer_name']
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -53,7 +56,7 @@ class SaleListCreateAPIView(generics.ListCreateAPIView):
         )
 
 
-class SaleDetailAPIView(generics.RetrieveUpdateAPIView):
+class SaleDetailAPIView(SparseFieldsetsMixin, generics.RetrieveUpdateAPIView):
     queryset = Sale.objects.select_related('customer', 'cashier', 'organization').prefetch_related('items', 'payments')
     serializer_class = SaleDetailSerializer
 
@@ -73,7 +76,7 @@ class SaleDetailAPIView(generics.RetrieveUpdateAPIView):
             serializer.save()
 
 
-class SaleItemListAPIView(generics.ListAPIView):
+class SaleItemListAPIView(SparseFieldsetsMixin, generics.ListAPIView):
     queryset = SaleItem.objects.select_related('sale', 'product')
     serializer_class = SaleItemSerializer
     filter_backends = [DjangoFilterBackend]
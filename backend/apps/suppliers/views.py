@@ -9,6 +9,7 @@ from .serializers import (
     SupplierSerializer, SupplierListSerializer, SupplierCreateSerializer,
     SupplierUpdateSerializer, SupplierContactSerializer
 )
+from apps.core.cache import cached_response, CHOICES_CACHE_TIMEOUT
 
 
 class SupplierFilter(filters.FilterSet):
@@ -66,6 +67,7 @@ class SupplierDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
 
 
 @api_view(['GET'])
+@cached_response('choices', timeout=CHOICES_CACHE_TIMEOUT)
 def payment_terms_choices_view(request):
     """Get payment terms choices"""
     choices = [
@@ -40,6 +40,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Trigram search indexes (apps.core.search)
 ]
 
 THIRD_PARTY_APPS = [
@@ -51,6 +52,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    'apps.core',  # Shared infrastructure (caching, ...)
     'apps.accounts',
     'apps.organizations',
     'apps.licenses',
@@ -69,6 +71,8 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'apps.core.querybudget.QueryBudgetMiddleware',  # Opt-in X-Query-Count / X-DB-Time
+    'apps.core.compression.CompressionMiddleware',  # brotli/gzip above API_COMPRESSION_MIN_SIZE
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -130,6 +134,77 @@ else:
 #     }
 # }
 
+# Cache
+# Redis is shared by every gunicorn worker; without it fall back to a file
+# cache so workers still share entries (locmem would be per process).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'katms',
+            'TIMEOUT': 300,
+        }
+    }
+elif config('CACHE_BACKEND', default='file') == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',  # python manage.py createcachetable
+            'KEY_PREFIX': 'katms',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.cache')),
+            'KEY_PREFIX': 'katms',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Tests must never share or persist cache entries between runs
+if 'test' in sys.argv:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'katms-tests',
+        }
+    }
+
+# Default TTL (seconds) of responses cached with apps.core.cache.cached_response
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+# Track hit/miss counters per namespace (GET /api/v1/system/cache/stats/)
+API_CACHE_STATS = config('API_CACHE_STATS', default=True, cast=bool)
+# Seconds a process trusts its local copy of license entitlements
+ENTITLEMENTS_LOCAL_TTL = config('ENTITLEMENTS_LOCAL_TTL', default=10, cast=int)
+ENTITLEMENTS_LOCAL_MAX_ENTRIES = config('ENTITLEMENTS_LOCAL_MAX_ENTRIES', default=1000, cast=int)
+# Seconds a process serves its POS product lookup index before re-checking
+# the shared version for changes made by other processes
+PRODUCT_LOOKUP_LOCAL_TTL = config('PRODUCT_LOOKUP_LOCAL_TTL', default=5, cast=int)
+# Seconds a process serves its bed board before re-checking the shared
+# version, the longest a bed board poll with ?wait= is held, and how many
+# such polls a process holds at once (each keeps a worker thread busy)
+BED_BOARD_LOCAL_TTL = config('BED_BOARD_LOCAL_TTL', default=2, cast=int)
+BED_BOARD_MAX_WAIT = config('BED_BOARD_MAX_WAIT', default=25, cast=int)
+BED_BOARD_MAX_WAITERS = config('BED_BOARD_MAX_WAITERS', default=1, cast=int)
+# Seconds a token → user resolution stays in the shared cache
+TOKEN_CACHE_TTL = config('TOKEN_CACHE_TTL', default=60, cast=int)
+
+# Response compression (apps.core.compression): brotli when the package is
+# installed and accepted by the client, gzip otherwise
+API_COMPRESSION = config('API_COMPRESSION', default=True, cast=bool)
+API_COMPRESSION_MIN_SIZE = config('API_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
+# Query budgets (apps.core.querybudget): add X-Query-Count / X-DB-Time headers
+# to a sample of responses and log budget overruns and repeated queries (N+1)
+QUERY_BUDGET_HEADERS = config('QUERY_BUDGET_HEADERS', default=False, cast=bool)
+QUERY_BUDGET_SAMPLE_RATE = config('QUERY_BUDGET_SAMPLE_RATE', default=1.0, cast=float)
+QUERY_BUDGET_DUPLICATE_THRESHOLD = config('QUERY_BUDGET_DUPLICATE_THRESHOLD', default=5, cast=int)
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -171,13 +246,36 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generative AI gateway (apps.core.ai): gateway class, concurrent provider
+# calls per process, seconds one call may take including retries, attempts
+# per call and seconds a response stays cached (keyed on prompt and media hash)
+GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
+AI_GATEWAY = config('AI_GATEWAY', default='apps.core.ai.GeminiGateway')
+AI_MAX_CONCURRENCY = config('AI_MAX_CONCURRENCY', default=4, cast=int)
+AI_LATENCY_BUDGET = config('AI_LATENCY_BUDGET', default=60, cast=int)
+AI_MAX_ATTEMPTS = config('AI_MAX_ATTEMPTS', default=4, cast=int)
+AI_CACHE_TIMEOUT = config('AI_CACHE_TIMEOUT', default=60 * 60 * 24 * 7, cast=int)
+# Tests never call the provider
+if 'test' in sys.argv:
+    AI_GATEWAY = 'apps.core.ai.FakeGateway'
+
+# Consultation transcription jobs (apps.hospital.transcription): service
+# factory, where chunked uploads are spooled (shared by gunicorn and the
+# run_transcription_worker processes), largest recording, attempts per job
+# and seconds after which a job left processing by a dead worker is retried
+TRANSCRIPTION_SERVICE = config('TRANSCRIPTION_SERVICE', default='apps.hospital.gemini_service.get_gemini_service')
+TRANSCRIPTION_UPLOAD_DIR = config('TRANSCRIPTION_UPLOAD_DIR', default=str(MEDIA_ROOT / 'transcriptions'))
+TRANSCRIPTION_MAX_BYTES = config('TRANSCRIPTION_MAX_BYTES', default=500 * 1024 * 1024, cast=int)
+TRANSCRIPTION_MAX_ATTEMPTS = config('TRANSCRIPTION_MAX_ATTEMPTS', default=3, cast=int)
+TRANSCRIPTION_JOB_TIMEOUT = config('TRANSCRIPTION_JOB_TIMEOUT', default=1800, cast=int)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -191,7 +289,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -4,6 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 from rest_framework.routers import DefaultRouter
+from apps.core.views import sync_view
 from apps.occupational_health.views_iso_compliance import IncidentInvestigationViewSet, OHSPolicyViewSet, HazardRegisterViewSet, SafetyTrainingViewSet
 
 
@@ -35,6 +36,12 @@ urlpatterns = [
     
     # Audit logging APIs
     path('api/v1/audit/', include('apps.audit.urls')),
+
+    # Shared infrastructure (cache statistics, ...)
+    path('api/v1/system/', include('apps.core.urls')),
+
+    # Delta sync change feed for the offline-first mobile app
+    path('api/v1/sync/', sync_view, name='sync'),
 ]
 
 # Serve media files in development
@@ -3,7 +3,7 @@
 # Docker Entrypoint — KAT Management Systems Backend
 #
 # Runs automatically on every container start (UAT / Production).
-# Order is intentional: wait -> migrate -> seed -> collectstatic -> serve.
+# Order is intentional: wait -> migrate -> seed -> collectstatic -> workers -> serve.
 # =============================================================================
 
 set -e  # Exit immediately on any error
@@ -15,7 +15,7 @@ echo "=========================================="
 
 # ── 1. Wait for Postgres to be ready ────────────────────────────────────────
 if [ -n "$DB_HOST" ]; then
-  echo "[1/6] Waiting for database at $DB_HOST:${DB_PORT:-5432}..."
+  echo "[1/8] Waiting for database at $DB_HOST:${DB_PORT:-5432}..."
   until python -c "
 import sys, psycopg2, os
 try:
@@ -35,11 +35,11 @@ except Exception:
   done
   echo "   [OK] Database is ready"
 else
-  echo "[1/6] Skipping DB wait (DB_HOST not set)"
+  echo "[1/8] Skipping DB wait (DB_HOST not set)"
 fi
 
 # ── 2. Apply database migrations ────────────────────────────────────────────
-echo "[2/6] Running migrations..."
+echo "[2/8] Running migrations..."
 python manage.py migrate --noinput || {
   echo "   [WARN] migrate returned non-zero — checking if it is a stale-migration warning..."
   python manage.py showmigrations --plan 2>&1 | tail -5
@@ -53,7 +53,7 @@ echo "   [OK] Migrations step done"
 #   and updates the password on subsequent runs if it already exists.
 #   Phone: +243828812498, Password: adminadmin
 #
-echo "[3/7] Creating superuser admin account..."
+echo "[3/8] Creating superuser admin account..."
 python create_superuser.py
 if [ $? -ne 0 ]; then
   echo "   [ERROR] create_superuser.py failed!"
@@ -69,7 +69,7 @@ echo "   [OK] Superuser step done"
 #     - Add new sectors / departments / positions / protocols
 #     - Leave existing records untouched (no data loss)
 #
-echo "[4/7] Loading occupational health protocol data..."
+echo "[4/8] Loading occupational health protocol data..."
 python manage.py load_occ_protocols || echo "   [WARN] load_occ_protocols failed (non-fatal, continuing...)"
 echo "   [OK] Protocol step done"
 
@@ -79,7 +79,7 @@ echo "   [OK] Protocol step done"
 #   It creates the demo organization, staff accounts, and 20 demo patients
 #   only if they do not already exist.  Safe to run on every container start.
 #
-echo "[5/7] Loading demo seed data (users + patients)..."
+echo "[5/8] Loading demo seed data (users + patients)..."
 python manage.py seed_demo_data || echo "   [WARN] seed_demo_data failed (non-fatal, continuing...)"
 echo "   [OK] Demo seed step done"
 
@@ -89,17 +89,38 @@ echo "   [OK] Demo seed step done"
 #   Requires WorkplaceIncident records to exist first; emits a warning and
 #   exits cleanly if none are found.
 #
-echo "[5b/7] Loading CAPA demo data (incident investigations)..."
+echo "[5b/8] Loading CAPA demo data (incident investigations)..."
 python manage.py seed_capa_demo || echo "   [WARN] seed_capa_demo failed (non-fatal, continuing...)"
 echo "   [OK] CAPA demo seed step done"
 
 # ── 6. Collect static files ─────────────────────────────────────────────────
-echo \"[6/7] Collecting static files...\"
+echo \"[6/8] Collecting static files...\"
 python manage.py collectstatic --noinput --clear || echo "   [WARN] collectstatic failed (non-fatal, continuing...)"
 echo "   [OK] Static files step done"
 
-# ── 7. Start gunicorn ───────────────────────────────────────────────────────
-echo \"[7/7] Starting Gunicorn...\"
+# ── 7. Start transcription workers ─────────────────────────────────────────
+#
+#   Uploaded recordings are spooled to TRANSCRIPTION_UPLOAD_DIR on this
+#   container's disk, so the workers run here, next to gunicorn, and are
+#   restarted if they exit.  Set TRANSCRIPTION_WORKERS=0 only when a separate
+#   worker service mounts the same TRANSCRIPTION_UPLOAD_DIR volume.
+#
+echo "[7/8] Starting transcription workers..."
+TRANSCRIPTION_WORKERS=${TRANSCRIPTION_WORKERS:-1}
+i=0
+while [ "$i" -lt "$TRANSCRIPTION_WORKERS" ]; do
+  (
+    while true; do
+      python manage.py run_transcription_worker || echo "   [WARN] run_transcription_worker exited, restarting in 5s..."
+      sleep 5
+    done
+  ) &
+  i=$((i + 1))
+done
+echo "   [OK] ${TRANSCRIPTION_WORKERS} transcription worker(s) started"
+
+# ── 8. Start gunicorn ───────────────────────────────────────────────────────
+echo \"[8/8] Starting Gunicorn...\"
 WORKERS=${GUNICORN_WORKERS:-3}
 TIMEOUT=${GUNICORN_TIMEOUT:-120}
 # Railway injects $PORT; fall back to 8000 for local Docker